@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+background_cache.py — Caché de proceso con stale-while-revalidate.
+
+Los fetchers decorados con @swr_cached se refrescan en segundo plano antes de
+que caduque su TTL. Los lectores reciben siempre el último valor bueno al
+instante (con su antigüedad) y solo la primera lectura en frío es síncrona.
+Los datasets que nadie ha consultado en IDLE_SECONDS dejan de refrescarse.
+
+Los fetchers señalan un fallo lanzando o devolviendo None (nunca datos de
+respaldo): así el refresco conserva el último valor bueno y aplica backoff.
+Los datos de respaldo solo se sirven, sin cachearlos, mientras no haya ninguno.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+TICK_SECONDS     = 5      # cadencia del planificador
+REFRESH_AT       = 0.8    # refrescar al 80% del TTL
+IDLE_SECONDS     = 900    # sin lecturas en 15 min → dejar de refrescar
+MAX_REFRESHERS   = 4      # refrescos concurrentes
+RETRY_BASE       = 30     # s; tras un fallo se reintenta con backoff exponencial
+RETRY_MAX        = 900
+
+
+class _Entry:
+    __slots__ = ("fn", "args", "ttl", "value", "fetched_at", "last_access",
+                 "refreshing", "error", "failures", "next_retry_at", "lock")
+
+    def __init__(self, fn, args, ttl):
+        self.fn          = fn
+        self.args        = args
+        self.ttl         = ttl
+        self.value       = None
+        self.fetched_at  = 0.0
+        self.last_access = 0.0
+        self.refreshing  = False
+        self.error       = None
+        self.failures    = 0
+        self.next_retry_at = 0.0
+        self.lock        = threading.Lock()
+
+
+class BackgroundCache:
+    """Registro de datasets + hilo planificador único por proceso."""
+
+    def __init__(self):
+        self._entries  = {}
+        self._lock     = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=MAX_REFRESHERS, thread_name_prefix="swr_refresh")
+        self._thread   = threading.Thread(target=self._loop, name="swr_scheduler", daemon=True)
+        self._thread.start()
+
+    # ── lectura ───────────────────────────────────────────────────────────────
+    def get(self, fn, args, ttl):
+        """Valor actual y su antigüedad en segundos. Solo bloquea en la primera carga."""
+        key = (fn.__module__, fn.__qualname__, args)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(fn, args, ttl)
+        entry.last_access = time.time()
+        if entry.fetched_at == 0.0:
+            with entry.lock:
+                # Sin valor todavía: se reintenta en la lectura, respetando el backoff
+                if entry.fetched_at == 0.0 and time.time() >= entry.next_retry_at:
+                    self._refresh(entry)
+        elif time.time() - entry.fetched_at >= entry.ttl and time.time() >= entry.next_retry_at:
+            # El planificador no llegó a tiempo: servir el valor viejo y refrescar detrás
+            self._schedule(entry)
+        return entry.value, time.time() - entry.fetched_at
+
+    def peek(self, fn, args, ttl):
+        """
+        Como get() pero sin bloquear nunca: en frío lanza la carga en segundo
+        plano y retorna (None, None) hasta que termine.
+        """
+        key = (fn.__module__, fn.__qualname__, args)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(fn, args, ttl)
+        now = entry.last_access = time.time()
+        if (entry.fetched_at == 0.0 or now - entry.fetched_at >= entry.ttl) and now >= entry.next_retry_at:
+            self._schedule(entry)
+        return entry.value, (now - entry.fetched_at if entry.fetched_at else None)
+
+    def refresh(self, fn, args, ttl):
+        """Fuerza un refresco en segundo plano conservando el valor actual."""
+        key = (fn.__module__, fn.__qualname__, args)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(fn, args, ttl)
+        self._schedule(entry)
+
+    def fetched_at(self, fn, args):
+        entry = self._entries.get((fn.__module__, fn.__qualname__, args))
+        return entry.fetched_at if entry and entry.fetched_at else None
+
+    def invalidate(self, fn=None):
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if fn is None or entry.fn is fn:
+                    del self._entries[key]
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return [{
+                'dataset': f"{e.fn.__name__}{e.args if e.args else ''}",
+                'age_s': round(now - e.fetched_at, 1) if e.fetched_at else None,
+                'ttl_s': e.ttl,
+                'idle_s': round(now - e.last_access, 1),
+                'refreshing': e.refreshing,
+                'error': e.error,
+                'retry_in_s': round(e.next_retry_at - now, 1) if e.next_retry_at > now else None,
+            } for e in self._entries.values()]
+
+    # ── refresco ──────────────────────────────────────────────────────────────
+    def _refresh(self, entry):
+        try:
+            value = entry.fn(*entry.args)
+            # Conservar el último valor bueno si el fetch devuelve vacío
+            if value is not None and (not hasattr(value, "__len__") or len(value) > 0 or entry.value is None):
+                entry.value = value
+                entry.fetched_at = time.time()
+                entry.error = None
+                entry.failures, entry.next_retry_at = 0, 0.0
+            else:
+                entry.error = "respuesta vacía"
+                self._backoff(entry)
+        except Exception as e:
+            entry.error = str(e)
+            self._backoff(entry)
+            if entry.fetched_at == 0.0:
+                raise
+        finally:
+            entry.refreshing = False
+
+    @staticmethod
+    def _backoff(entry):
+        """Sin avanzar fetched_at, el siguiente intento espera 30s, 60s, 120s… (tope RETRY_MAX)."""
+        entry.failures += 1
+        entry.next_retry_at = time.time() + min(RETRY_MAX, RETRY_BASE * 2 ** (entry.failures - 1))
+
+    def _schedule(self, entry):
+        with entry.lock:
+            if entry.refreshing:
+                return
+            entry.refreshing = True
+        self._executor.submit(self._refresh, entry)
+
+    def _loop(self):
+        while True:
+            time.sleep(TICK_SECONDS)
+            now = time.time()
+            with self._lock:
+                entries = list(self._entries.values())
+            for entry in entries:
+                if entry.fetched_at == 0.0 or now - entry.last_access > IDLE_SECONDS:
+                    continue
+                if now < entry.next_retry_at:
+                    continue
+                if now - entry.fetched_at >= entry.ttl * REFRESH_AT:
+                    self._schedule(entry)
+
+
+_instance = None
+_instance_lock = threading.Lock()
+
+
+def get_background_cache():
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = BackgroundCache()
+    return _instance
+
+
+def swr_cached(ttl, fallback=None):
+    """
+    Decorador stale-while-revalidate. La función decorada mantiene su firma y
+    devuelve el valor; `fn.with_age(*args)` devuelve (valor, antigüedad_s),
+    `fn.peek(*args)` lo mismo sin bloquear nunca (None mientras carga en frío),
+    `fn.refresh(*args)` fuerza un refresco detrás y `fn.fetched_at(*args)` da
+    el epoch de la última carga. `fallback(*args)` se sirve (con antigüedad
+    None y sin entrar en la caché) solo si aún no hay ningún valor bueno.
+    """
+    def deco(fn):
+        def _read(*args):
+            try:
+                value, age = get_background_cache().get(fn, args, ttl)
+            except Exception:
+                if fallback is None:
+                    raise
+                value = None
+            if value is None:
+                return (fallback(*args) if fallback is not None else None), None
+            return value, age
+
+        @wraps(fn)
+        def wrapper(*args):
+            return _read(*args)[0]
+
+        wrapper.with_age   = _read
+        wrapper.peek       = lambda *args: get_background_cache().peek(fn, args, ttl)
+        wrapper.refresh    = lambda *args: get_background_cache().refresh(fn, args, ttl)
+        wrapper.fetched_at = lambda *args: get_background_cache().fetched_at(fn, args)
+        wrapper.uncached   = fn
+        return wrapper
+    return deco
+
+
+def format_fetched_at(epoch, tz_hours=1):
+    """Hora local (CET por defecto) de la última carga, formato HH:MM:SS."""
+    if not epoch:
+        return "--:--:--"
+    return datetime.fromtimestamp(epoch, timezone(timedelta(hours=tz_hours))).strftime('%H:%M:%S')
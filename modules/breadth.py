@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+breadth.py — Motor de amplitud de mercado (breadth) sobre el S&P 500 real.
+
+Un único panel de precios diarios (constituyentes + SPY) descargado con una
+sola llamada yf.download y persistido en disco. En cada refresco solo se baja
+el delta de las últimas sesiones y las métricas se recalculan únicamente para
+las filas nuevas o revisadas; los acumulados (línea A/D, EMAs del McClellan,
+índice de sumación) continúan desde el estado de la sesión anterior. La
+recarga completa semanal tampoco los reinicia: se re-anclan en la serie
+persistida a partir de la primera sesión común.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+BENCHMARK        = "SPY"
+HISTORY_PERIOD   = "2y"     # SMA200 + máximos/mínimos de 52 semanas
+DELTA_PERIOD     = "5d"     # refresco incremental
+DELTA_MAX_GAP    = 4        # días naturales sin actualizar que cubre el delta
+FULL_RELOAD_DAYS = 7        # recarga completa semanal (splits/dividendos ajustados)
+MAX_BARS         = 520
+LOOKBACK_BARS    = 260      # ventana necesaria para recalcular una fila (SMA200 / 52s)
+HL_WINDOW        = 252
+MCCLELLAN_FAST   = 19
+MCCLELLAN_SLOW   = 39
+ACC_COLS         = ('ad_line', 'ema_fast', 'ema_slow', 'mcclellan', 'summation')
+
+PANEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          "data", "breadth_panel.pkl")
+
+
+def _constituents():
+    """Constituyentes del S&P 500 (lista de CANSLIM; sin red)."""
+    try:
+        from modules.canslim import SP500_TICKERS
+        return list(dict.fromkeys(SP500_TICKERS))
+    except Exception:
+        return []
+
+
+def _download_panel(symbols, period):
+    """Una llamada yf.download → {'close','high','low'} como DataFrames fecha × símbolo."""
+    raw = yf.download(symbols, period=period, interval="1d", auto_adjust=True,
+                      progress=False, group_by='ticker', threads=True)
+    if raw is None or raw.empty:
+        return None
+    if not isinstance(raw.columns, pd.MultiIndex):
+        raw = pd.concat({symbols[0]: raw}, axis=1)
+    panel = {}
+    for field in ("Close", "High", "Low"):
+        try:
+            df = raw.xs(field, axis=1, level=1)
+        except KeyError:
+            return None
+        df.index = pd.DatetimeIndex(df.index).tz_localize(None).normalize()
+        panel[field.lower()] = df.dropna(how='all').astype(float)
+    return panel
+
+
+def _daily_breadth(close, high, low):
+    """Métricas por sesión, vectorizadas sobre todas las columnas del panel."""
+    chg   = close.diff()
+    valid = close.notna() & close.shift().notna()
+    adv   = (chg > 0).sum(axis=1)
+    dec   = (chg < 0).sum(axis=1)
+    unch  = (valid & (chg == 0)).sum(axis=1)
+
+    out = pd.DataFrame(index=close.index)
+    out['adv']  = adv
+    out['dec']  = dec
+    out['unch'] = unch
+    total = (adv + dec).replace(0, np.nan)
+    # Ratio-adjusted net advances (RANA) × 1000, base del McClellan moderno
+    out['rana'] = ((adv - dec) / total * 1000).fillna(0.0)
+
+    for n in (20, 50, 200):
+        sma = close.rolling(n, min_periods=n).mean()
+        con_dato = sma.notna().sum(axis=1).replace(0, np.nan)
+        out[f'pct_above_sma{n}'] = (close > sma).sum(axis=1) / con_dato * 100
+
+    hi52 = high.rolling(HL_WINDOW, min_periods=200).max()
+    lo52 = low.rolling(HL_WINDOW, min_periods=200).min()
+    out['new_highs'] = ((high >= hi52) & hi52.notna()).sum(axis=1)
+    out['new_lows']  = ((low <= lo52) & lo52.notna()).sum(axis=1)
+    out['members']   = close.notna().sum(axis=1)
+    return out
+
+
+def _accumulate(daily, start, prev):
+    """Continúa línea A/D, EMAs y sumación desde la fila `start` con el estado `prev`."""
+    a_fast = 2.0 / (MCCLELLAN_FAST + 1)
+    a_slow = 2.0 / (MCCLELLAN_SLOW + 1)
+    ad, ema_f, ema_s, summ = prev
+    cols = {k: daily[k].to_numpy(dtype=float).copy() for k in ACC_COLS}
+    adv  = daily['adv'].to_numpy(dtype=float)
+    dec  = daily['dec'].to_numpy(dtype=float)
+    rana = daily['rana'].to_numpy(dtype=float)
+    for i in range(start, len(daily)):
+        ad = ad + adv[i] - dec[i]
+        ema_f = rana[i] if ema_f is None else ema_f + a_fast * (rana[i] - ema_f)
+        ema_s = rana[i] if ema_s is None else ema_s + a_slow * (rana[i] - ema_s)
+        osc = ema_f - ema_s
+        summ = summ + osc
+        cols['ad_line'][i], cols['ema_fast'][i], cols['ema_slow'][i] = ad, ema_f, ema_s
+        cols['mcclellan'][i], cols['summation'][i] = osc, summ
+    for k, v in cols.items():
+        daily[k] = v
+    return daily
+
+
+def _state_before(daily, pos):
+    if pos <= 0:
+        return (0.0, None, None, 0.0)
+    row = daily.iloc[pos - 1]
+    return (row['ad_line'], row['ema_fast'], row['ema_slow'], row['summation'])
+
+
+def _reanchor(daily, old):
+    """
+    Acumulados de una serie recalculada entera (recarga completa) continuando
+    la serie anterior `old`: desde la primera sesión común se toma su estado y
+    las sesiones previas, calculadas desde cero, se desplazan para empalmar.
+    """
+    common = daily.index.intersection(old.index) if old is not None else []
+    daily = _accumulate(daily, 0, (0.0, None, None, 0.0))
+    if not len(common):
+        return daily
+    anchor = daily.index.get_loc(common[0])
+    ref    = old.loc[common[0]]
+    shift  = {k: ref[k] - daily[k].iloc[anchor] for k in ('ad_line', 'summation')}
+    for k in ACC_COLS:
+        daily.iloc[anchor, daily.columns.get_loc(k)] = ref[k]
+    daily = _accumulate(daily, anchor + 1, _state_before(daily, anchor + 1))
+    for k, off in shift.items():
+        daily.iloc[:anchor, daily.columns.get_loc(k)] += off
+    return daily
+
+
+class BreadthEngine:
+    """Panel S&P 500 + serie diaria de breadth, compartidos por todo el proceso."""
+
+    def __init__(self, path=PANEL_PATH):
+        self.path         = path
+        self._lock        = threading.Lock()
+        self._panel       = None     # {'close','high','low'}
+        self._daily       = None     # métricas por sesión
+        self._loaded_at   = 0.0      # última recarga completa
+        self._load_disk()
+
+    # ── persistencia ──────────────────────────────────────────────────────────
+    def _load_disk(self):
+        try:
+            saved = pd.read_pickle(self.path)
+            self._panel, self._daily = saved['panel'], saved['daily']
+            self._loaded_at = saved.get('loaded_at', 0.0)
+        except Exception:
+            self._panel, self._daily = None, None
+
+    def _save_disk(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            pd.to_pickle({'panel': self._panel, 'daily': self._daily,
+                          'loaded_at': self._loaded_at}, tmp)
+            os.replace(tmp, self.path)
+        except Exception:
+            pass
+
+    # ── actualización ─────────────────────────────────────────────────────────
+    def refresh(self):
+        """Descarga el delta (o el histórico completo si hace falta) y actualiza métricas."""
+        with self._lock:
+            symbols = _constituents() + [BENCHMARK]
+            gap_days = None
+            if self._panel is not None:
+                gap_days = (pd.Timestamp(datetime.now().date()) - self._panel['close'].index[-1]).days
+            full = (self._panel is None or gap_days > DELTA_MAX_GAP
+                    or time.time() - self._loaded_at > FULL_RELOAD_DAYS * 86400)
+
+            fresh = _download_panel(symbols, HISTORY_PERIOD if full else DELTA_PERIOD)
+            if fresh is None:
+                return self._daily is not None
+            if full:
+                self._panel = {k: v.tail(MAX_BARS) for k, v in fresh.items()}
+                self._loaded_at = time.time()
+                first_changed = self._panel['close'].index[0]
+            else:
+                first_changed = fresh['close'].index[0]
+                self._panel = {
+                    k: pd.concat([self._panel[k].loc[:first_changed - pd.Timedelta(days=1)], fresh[k]])
+                         .tail(MAX_BARS)
+                    for k in self._panel
+                }
+            self._update_daily(first_changed, full)
+            self._save_disk()
+            return True
+
+    def _update_daily(self, first_changed, full):
+        close, high, low = (self._panel[k].drop(columns=[BENCHMARK], errors='ignore')
+                            for k in ('close', 'high', 'low'))
+        pos = int(close.index.searchsorted(first_changed))
+        if full or self._daily is None:
+            pos = 0
+        lo = max(0, pos - LOOKBACK_BARS)
+        nuevas = _daily_breadth(close.iloc[lo:], high.iloc[lo:], low.iloc[lo:]).iloc[pos - lo:]
+
+        if pos == 0:
+            daily = nuevas
+        else:
+            prev = self._daily.loc[:close.index[pos - 1]]
+            daily = pd.concat([prev[nuevas.columns], nuevas])
+            for k in ACC_COLS:
+                daily[k] = prev[k].reindex(daily.index)
+        for k in ACC_COLS:
+            if k not in daily:
+                daily[k] = np.nan
+        recorte = max(0, len(daily) - MAX_BARS)
+        daily = daily.iloc[recorte:].copy()
+        start = max(0, pos - recorte)
+        if full and self._daily is not None:
+            self._daily = _reanchor(daily, self._daily)
+        else:
+            self._daily = _accumulate(daily, start, _state_before(daily, start))
+
+    # ── lectura ───────────────────────────────────────────────────────────────
+    def benchmark_close(self):
+        if self._panel is None or BENCHMARK not in self._panel['close']:
+            return pd.Series(dtype=float)
+        return self._panel['close'][BENCHMARK].dropna()
+
+    def daily(self):
+        return self._daily
+
+    def snapshot(self):
+        """Última sesión: % sobre SMAs, A/D, McClellan, sumación y nuevos máx/mín."""
+        if self._daily is None or self._daily.empty:
+            return None
+        last = self._daily.iloc[-1]
+
+        def _f(key, nd=1):
+            v = last.get(key)
+            return round(float(v), nd) if v is not None and not pd.isna(v) else None
+
+        return {
+            'as_of': self._daily.index[-1].strftime('%Y-%m-%d'),
+            'members': int(last['members']),
+            'adv': int(last['adv']), 'dec': int(last['dec']), 'unch': int(last['unch']),
+            'ad_line': _f('ad_line', 0),
+            'pct_above_sma20': _f('pct_above_sma20'),
+            'pct_above_sma50': _f('pct_above_sma50'),
+            'pct_above_sma200': _f('pct_above_sma200'),
+            'mcclellan': _f('mcclellan', 2),
+            'summation': _f('summation', 0),
+            'new_highs': int(last['new_highs']), 'new_lows': int(last['new_lows']),
+        }
+
+
+_instance = None
+_instance_lock = threading.Lock()
+
+
+def get_breadth_engine():
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = BreadthEngine()
+    return _instance
@@ -1477,6 +1477,12 @@ def display_saved_results():
     st.markdown('<h2>📋 RESULTADOS DETALLADOS</h2>', unsafe_allow_html=True)
     max_r  = st.session_state.last_scan_params.get('max_results', 30)
     rows   = []
+    # Próximos earnings desde el event store local (sin llamadas de red)
+    try:
+        from modules.event_store import get_event_store
+        next_earn = get_event_store().next_event_by_ticker([c['ticker'] for c in candidates[:max_r]])
+    except Exception:
+        next_earn = {}
     for c in candidates[:max_r]:
         rows.append({
             'Ticker'    : c['ticker'],
@@ -1496,6 +1502,7 @@ def display_saved_results():
             'Del High'  : f"{c['metrics']['pct_from_high']:.1f}%",
             'VolRatio'  : f"{c['metrics']['volume_ratio']:.2f}x",
             'MktCap$B'  : f"${c['market_cap']:.1f}B",
+            'Earnings'  : next_earn.get(c['ticker'], '-'),
         })
     df = pd.DataFrame(rows)
 
@@ -8,42 +8,21 @@ from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
 from config import get_ia_model
 import time
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 import math
 import html
+import os
+import pickle
+import threading
 import traceback
 import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from modules.providers import get_provider, quota_report, translate_en_es
+from modules.sector_benchmarks import get_benchmarks
+from modules.fundamental_screener import SCREEN_PATH, load_screen, query_screen
 
 logging.basicConfig(level=logging.WARNING, format='%(asctime)s %(name)s %(levelname)s %(message)s')
 logger = logging.getLogger("rsu_earnings")
 
-# ────────────────────────────────────────────────
-# HTTP SESSION COMPARTIDA (connection pooling)
-# ────────────────────────────────────────────────
-
-def _make_session():
-    """Sesión requests con retry automático y connection pooling."""
-    s = requests.Session()
-    retry = Retry(
-        total=3,
-        backoff_factor=0.8,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["GET"],
-    )
-    adapter = HTTPAdapter(
-        pool_connections=8,
-        pool_maxsize=16,
-        max_retries=retry,
-    )
-    s.mount("https://", adapter)
-    s.mount("http://",  adapter)
-    s.headers.update({"User-Agent": "RSUEarnings/4.0"})
-    return s
-
-_HTTP = _make_session()
-
 # ────────────────────────────────────────────────
 # API KEYS
 # ────────────────────────────────────────────────
@@ -155,539 +134,685 @@ def translate_text_cached(text, ticker):
     if not text: return 'Descripción no disponible.'
     try:
         chunks = [text[i:i+500] for i in range(0, len(text), 500)]
-        translated = []
-        for chunk in chunks:
-            url = f"https://api.mymemory.translated.net/get?q={requests.utils.quote(chunk)}&langpair=en|es"
-            resp = requests.get(url, timeout=6)
-            if resp.status_code == 200:
-                d = resp.json()
-                if d.get('responseStatus') == 200:
-                    translated.append(d['responseData']['translatedText'])
-                    time.sleep(0.05)
-                    continue
-            translated.append(chunk)
-            time.sleep(0.05)
-        return ' '.join(translated)
+        return ' '.join(translate_en_es(chunk) or chunk for chunk in chunks)
     except:
         return text
 
 # ────────────────────────────────────────────────
-# YFINANCE — DATOS PRINCIPALES (cacheado)
+# YFINANCE — DATOS PRINCIPALES (descarga paralela + caché persistente)
 # ────────────────────────────────────────────────
 
-def get_yfinance_full(ticker):  # cache removed: debug log needs session_state
-    """
-    Carga datos de yfinance con 3 estrategias de precio y modo debug.
-    Devuelve datos parciales si hay historial aunque info{} esté vacío.
-    Nunca devuelve None si existe algún precio accesible.
-    """
-    debug_log = []   # acumulamos pasos — se expone en UI si falla
+_YF_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             "data", "yf_cache")
+_YF_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="yf_fetch")
+
+_QS_MODULES  = 'summaryProfile,defaultKeyStatistics,financialData,summaryDetail,price,incomeStatementHistory'
+_QS_CRITICAL = {'sector', 'industry', 'longBusinessSummary', 'trailingPE',
+                'profitMargins', 'returnOnEquity', 'totalRevenue', 'trailingEps'}
+_QS_FILLS = {
+    'summaryProfile':       ['sector','industry','longBusinessSummary',
+                             'country','city','website','fullTimeEmployees'],
+    'defaultKeyStatistics': ['trailingEps','forwardEps','bookValue',
+                             'priceToBook','pegRatio','enterpriseToEbitda',
+                             'shortRatio','heldPercentInsiders',
+                             'heldPercentInstitutions','beta','earningsGrowth',
+                             'sharesOutstanding'],
+    'financialData':        ['trailingPE','forwardPE',
+                             'priceToSalesTrailing12Months',
+                             'profitMargins','operatingMargins','grossMargins',
+                             'returnOnEquity','returnOnAssets','revenueGrowth',
+                             'debtToEquity','totalRevenue','ebitda',
+                             'freeCashflow','operatingCashflow',
+                             'totalCash','totalDebt','currentRatio',
+                             'targetMeanPrice','targetHighPrice',
+                             'targetLowPrice','targetMedianPrice',
+                             'numberOfAnalystOpinions'],
+    'summaryDetail':        ['dividendYield','dividendRate','payoutRatio',
+                             'fiftyTwoWeekHigh','fiftyTwoWeekLow',
+                             'fiftyDayAverage','twoHundredDayAverage',
+                             'averageVolume','marketCap','beta',
+                             'trailingPE','forwardPE'],
+    'price':                ['shortName','longName','regularMarketPrice',
+                             'marketCap','regularMarketVolume',
+                             'regularMarketPreviousClose','currency',
+                             'regularMarketOpen'],
+}
+
+_FAST_INFO_ATTRS = ('last_price', 'previous_close', 'market_cap', 'year_high', 'year_low',
+                    'fifty_day_average', 'two_hundred_day_average', 'shares', 'currency')
+
+
+def _fetch_quote_summary(ticker):
+    """quoteSummary directo de Yahoo (query1 → query2). Retorna (result, host)."""
+    yahoo = get_provider('yahoo')
+    error = None
+    for base in ('https://query1.finance.yahoo.com', 'https://query2.finance.yahoo.com'):
+        data, error = yahoo.get_json(f'{base}/v10/finance/quoteSummary/{ticker}',
+                                     {'modules': _QS_MODULES, 'formatted': 'false', 'lang': 'en-US'},
+                                     ttl=6 * 3600, timeout=8, return_error=True,
+                                     valid=lambda d: bool((d.get('quoteSummary') or {}).get('result')))
+        if data:
+            return data['quoteSummary']['result'][0], base.split('.')[1]
+    raise RuntimeError(error or "sin resultado")
+
+
+def _fetch_fast_info(stock):
+    fi = stock.fast_info
+    return {a: _safe(safe_call(getattr, fi, a, None, default=None, context=f"fast_info.{a}"))
+            for a in _FAST_INFO_ATTRS}
+
+
+def _fetch_holders(stock):
+    return {'institutional': stock.institutional_holders,
+            'major':         stock.major_holders,
+            'mutual_funds':  stock.mutualfund_holders}
+
+
+# Sub-descargas independientes de get_yfinance_full:
+# nombre → (función(stock, ticker), timeout s, TTL de la caché persistente s)
+_YF_TASKS = {
+    'info':             (lambda s, t: s.info or {},                             10, 6 * 3600),
+    'quote_summary':    (lambda s, t: _fetch_quote_summary(t),                  17, 6 * 3600),
+    'fast_info':        (lambda s, t: _fetch_fast_info(s),                       8, 900),
+    'hist_1y':          (lambda s, t: s.history(period="1y", auto_adjust=True), 10, 900),
+    'recommendations':  (lambda s, t: s.recommendations,                         8, 12 * 3600),
+    'rec_summary':      (lambda s, t: s.recommendations_summary,                 8, 12 * 3600),
+    'calendar':         (lambda s, t: s.calendar,                                8, 12 * 3600),
+    'earnings_history': (lambda s, t: s.earnings_history,                        8, 12 * 3600),
+    'income_stmt':      (lambda s, t: s.income_stmt,                            10, 12 * 3600),
+    'balance_sheet':    (lambda s, t: s.balance_sheet,                          10, 12 * 3600),
+    'cashflow':         (lambda s, t: s.cashflow,                               10, 12 * 3600),
+    'holders':          (lambda s, t: _fetch_holders(s),                        10, 12 * 3600),
+}
+_YF_PRICE_TTL = 900
+_YF_QUEUE_MAX = 10             # s que una sub-descarga puede esperar worker libre
+_YF_MEM_MAX   = 48             # tickers en memoria (LRU)
+_YF_DISK_AGE  = 7 * 86400      # ficheros de data/yf_cache sin tocar en 7 días se borran
+_YF_PRUNE_EVERY = 3600
+
+_yf_disk = {}                  # ticker → {tarea: (timestamp, valor)}, ordenado por último uso
+_yf_disk_lock = threading.Lock()
+_yf_inflight = {}              # (ticker, tarea) → (Future, {'queued', 'started', 't0'})
+_yf_last_prune = 0.0
+
+
+def _yf_cache_path(ticker):
+    safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in ticker.upper())
+    return os.path.join(_YF_CACHE_DIR, f"{safe_name}.pkl")
+
+
+def _yf_mem_entry(ticker):
+    """Entrada en memoria del ticker (cargada de disco si hace falta). Llamar con el lock."""
+    entry = _yf_disk.pop(ticker, None)
+    if entry is None:
+        try:
+            with open(_yf_cache_path(ticker), "rb") as f:
+                entry = pickle.load(f)
+        except Exception:
+            entry = {}
+    _yf_disk[ticker] = entry
+    while len(_yf_disk) > _YF_MEM_MAX:
+        _yf_disk.pop(next(iter(_yf_disk)))
+    return entry
+
+
+def _yf_cache_get(ticker):
+    with _yf_disk_lock:
+        return dict(_yf_mem_entry(ticker))
+
+
+def _prune_yf_cache():
+    """Borra de data/yf_cache los tickers que nadie ha consultado en _YF_DISK_AGE."""
+    global _yf_last_prune
+    now = time.time()
+    if now - _yf_last_prune < _YF_PRUNE_EVERY:
+        return
+    _yf_last_prune = now
     try:
-        stock = yf.Ticker(ticker)
-        debug_log.append("✅ yf.Ticker() creado")
+        names = os.listdir(_YF_CACHE_DIR)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(_YF_CACHE_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > _YF_DISK_AGE:
+                os.remove(path)
+        except OSError:
+            pass
+
 
+def _yf_cache_put(ticker, task, value):
+    """Guarda el resultado de una sub-descarga (también las que terminan tras su timeout)."""
+    with _yf_disk_lock:
+        entry = _yf_mem_entry(ticker)
+        entry[task] = (time.time(), value)
         try:
-            info = stock.info or {}
-            debug_log.append(f"✅ info dict: {len(info)} keys | quoteType={info.get('quoteType','?')} longName={info.get('longName','?')[:40]}")
+            os.makedirs(_YF_CACHE_DIR, exist_ok=True)
+            path = _yf_cache_path(ticker)
+            with open(f"{path}.tmp", "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(f"{path}.tmp", path)
         except Exception as e:
-            info = {}
-            debug_log.append(f"⚠️ info falló: {e}")
-
-        # ── Yahoo Finance quoteSummary directo (fallback cuando info{} incompleto) ──
-        _CRITICAL = {'sector','industry','longBusinessSummary','trailingPE',
-                     'profitMargins','returnOnEquity','totalRevenue','trailingEps'}
-        _missing_critical = _CRITICAL - set(k for k,v in info.items() if v is not None)
-        if len(_missing_critical) >= 3:
-            try:
-                _mods = 'summaryProfile,defaultKeyStatistics,financialData,summaryDetail,price,incomeStatementHistory'
-                _ua   = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                _hdrs = {'User-Agent': _ua, 'Accept': 'application/json',
-                         'Accept-Language': 'en-US,en;q=0.9',
-                         'Referer': 'https://finance.yahoo.com/'}
-                # Try v8 first, then v10
-                for _base in ['https://query1.finance.yahoo.com', 'https://query2.finance.yahoo.com']:
-                    _url = f'{_base}/v10/finance/quoteSummary/{ticker}?modules={_mods}&formatted=false&lang=en-US'
-                    try:
-                        _r = requests.get(_url, headers=_hdrs, timeout=8)
-                        if _r.status_code == 200:
-                            _res = _r.json().get('quoteSummary',{}).get('result')
-                            if _res:
-                                _d = _res[0]
-                                _fills = {
-                                    'summaryProfile':       ['sector','industry','longBusinessSummary',
-                                                             'country','city','website','fullTimeEmployees'],
-                                    'defaultKeyStatistics': ['trailingEps','forwardEps','bookValue',
-                                                             'priceToBook','pegRatio','enterpriseToEbitda',
-                                                             'shortRatio','heldPercentInsiders',
-                                                             'heldPercentInstitutions','beta','earningsGrowth',
-                                                             'sharesOutstanding'],
-                                    'financialData':        ['trailingPE','forwardPE',
-                                                             'priceToSalesTrailing12Months',
-                                                             'profitMargins','operatingMargins','grossMargins',
-                                                             'returnOnEquity','returnOnAssets','revenueGrowth',
-                                                             'debtToEquity','totalRevenue','ebitda',
-                                                             'freeCashflow','operatingCashflow',
-                                                             'totalCash','totalDebt','currentRatio',
-                                                             'targetMeanPrice','targetHighPrice',
-                                                             'targetLowPrice','targetMedianPrice',
-                                                             'numberOfAnalystOpinions'],
-                                    'summaryDetail':        ['dividendYield','dividendRate','payoutRatio',
-                                                             'fiftyTwoWeekHigh','fiftyTwoWeekLow',
-                                                             'fiftyDayAverage','twoHundredDayAverage',
-                                                             'averageVolume','marketCap','beta',
-                                                             'trailingPE','forwardPE'],
-                                    'price':                ['shortName','longName','regularMarketPrice',
-                                                             'marketCap','regularMarketVolume',
-                                                             'regularMarketPreviousClose','currency',
-                                                             'regularMarketOpen'],
-                                }
-                                enriched = 0
-                                for _mod, _keys in _fills.items():
-                                    _mod_data = _d.get(_mod, {})
-                                    for _k in _keys:
-                                        if info.get(_k) is None:
-                                            _raw = _mod_data.get(_k)
-                                            if _raw is None: continue
-                                            # Yahoo wraps numeric: {"raw":1.23,"fmt":"1.23"} or plain value
-                                            if isinstance(_raw, dict):
-                                                _v = _raw.get('raw')
-                                                if _v is None: _v = _raw.get('longFmt') or _raw.get('fmt')
-                                            else:
-                                                _v = _raw
-                                            if _v is not None and _v != '':
-                                                info[_k] = _v
-                                                enriched += 1
-                                debug_log.append(f"✅ quoteSummary ({_base.split('.')[1]}): +{enriched} campos, total {len(info)}")
-                                break  # success, no need to try second base
-                    except Exception as _e2:
-                        debug_log.append(f"⚠️ quoteSummary {_base}: {_e2}")
-                        continue
-            except Exception as _ye:
-                debug_log.append(f"⚠️ quoteSummary outer: {_ye}")
-
-        # ── Estrategia 1: campos de precio en info{} ──
-        cp_check = (
-            _safe(info.get('currentPrice')) or
-            _safe(info.get('regularMarketPrice')) or
-            _safe(info.get('regularMarketOpen')) or
-            _safe(info.get('ask')) or
-            _safe(info.get('bid')) or
-            _safe(info.get('navPrice')) or
-            _safe(info.get('postMarketPrice')) or
-            _safe(info.get('preMarketPrice'))
-        )
-        if cp_check:
-            debug_log.append(f"✅ Precio desde info: {cp_check}")
-        else:
-            debug_log.append(f"⚠️ info no tiene precio. Keys disponibles: {list(info.keys())[:20]}")
+            logger.warning("[yf_cache] %s/%s: %s", ticker, task, e)
+        _prune_yf_cache()
 
-        # ── Estrategia 2: historial reciente ──
-        hist_data = None
-        if not cp_check:
-            try:
-                hist_data = stock.history(period="5d", interval="1d", auto_adjust=True)
-                if hist_data is not None and not hist_data.empty and 'Close' in hist_data.columns:
-                    last_close = _safe(float(hist_data['Close'].dropna().iloc[-1]))
-                    if last_close:
-                        cp_check = last_close
-                        info['currentPrice'] = last_close
-                        info['regularMarketPrice'] = last_close
-                        if len(hist_data) >= 2:
-                            prev = _safe(float(hist_data['Close'].dropna().iloc[-2]))
-                            if prev: info['previousClose'] = prev
-                        debug_log.append(f"✅ Precio desde history(5d): {last_close}")
-                    else:
-                        debug_log.append(f"⚠️ history(5d) devolvió datos pero Close={last_close}")
-                else:
-                    debug_log.append(f"⚠️ history(5d) vacío o sin columna Close: {hist_data}")
-            except Exception as e:
-                debug_log.append(f"❌ history(5d) excepción: {e}")
 
-        # ── Estrategia 3: fast_info ──
-        if not cp_check:
+def _yf_submit(ticker, task, run):
+    """
+    Encola una sub-descarga salvo que la misma (ticker, tarea) siga en curso de
+    una consulta anterior abandonada por timeout: entonces se espera a esa.
+    """
+    key = (ticker, task)
+    with _yf_disk_lock:
+        cur = _yf_inflight.get(key)
+        if cur is not None and not cur[0].done():
+            return cur
+        box = {'queued': time.time(), 'started': threading.Event(), 't0': None}
+
+        def _job():
+            box['t0'] = time.time()
+            box['started'].set()
             try:
-                fi = stock.fast_info
-                last = _safe(getattr(fi, 'last_price', None))
-                debug_log.append(f"fast_info.last_price={last} | attrs={[a for a in dir(fi) if not a.startswith('_')][:8]}")
-                if last:
-                    cp_check = last
-                    info['currentPrice'] = last
-                    info['regularMarketPrice'] = last
-                    prev = _safe(getattr(fi, 'previous_close', None))
-                    if prev: info['previousClose'] = prev
-                    mc = _safe(getattr(fi, 'market_cap', None))
-                    if mc and not info.get('marketCap'): info['marketCap'] = mc
-                    debug_log.append(f"✅ Precio desde fast_info: {last}")
-                else:
-                    debug_log.append(f"⚠️ fast_info.last_price es None o 0")
-            except Exception as e:
-                debug_log.append(f"❌ fast_info excepción: {e}")
-
-        if not cp_check:
-            debug_log.append(f"❌ FALLO TOTAL: sin precio para {ticker}")
-            # Guardar log en session_state para mostrarlo en UI
-            import streamlit as _st
-            st.session_state['_debug_log'] = debug_log
-            st.session_state['_debug_ticker'] = ticker
-            logger.warning("[get_yfinance_full] Sin precio para %s | %s", ticker, " | ".join(debug_log))
-            return None
-
-        # Si llegamos aquí, tenemos precio. Guardar debug log de éxito también.
-        st.session_state['_debug_log'] = debug_log
-        st.session_state['_debug_ticker'] = ticker
-
-        # Recomendaciones
-        recommendations = None
-        try:
-            recs = stock.recommendations
-            if recs is not None and not recs.empty:
-                latest = recs.iloc[0]
-                sb = int(_safe(latest.get('strongBuy'))  or 0)
-                b  = int(_safe(latest.get('buy'))        or 0)
-                h  = int(_safe(latest.get('hold'))       or 0)
-                s  = int(_safe(latest.get('sell'))       or 0)
-                ss = int(_safe(latest.get('strongSell')) or 0)
-                recommendations = {'strong_buy': sb, 'buy': b, 'hold': h,
-                                   'sell': s, 'strong_sell': ss, 'total': sb+b+h+s+ss}
-        except Exception as e:
-            logger.warning("[yf.recommendations] %s: %s", ticker, e)
+                return run()
+            finally:
+                with _yf_disk_lock:
+                    if _yf_inflight.get(key, (None,))[0] is fut:
+                        _yf_inflight.pop(key, None)
+        fut = _YF_POOL.submit(_job)
+        _yf_inflight[key] = (fut, box)
+        return fut, box
 
-        rec_summary = None
-        try:
-            rs = stock.recommendations_summary
-            if rs is not None and not rs.empty:
-                rec_summary = rs.head(6)
-        except Exception as e:
-            logger.warning("[yf.recommendations_summary] %s: %s", ticker, e)
-
-        # Precio objetivo
-        tm = _safe(info.get('targetMeanPrice'))
-        cp = _safe(info.get('currentPrice')) or _safe(info.get('regularMarketPrice'))
-        target_data = {
-            'mean': tm, 'high': _safe(info.get('targetHighPrice')),
-            'low': _safe(info.get('targetLowPrice')), 'median': _safe(info.get('targetMedianPrice')),
-            'current': cp, 'upside': ((tm - cp) / cp * 100) if (tm and cp) else None
-        }
 
-        # Métricas valoración
-        metrics = {
-            'trailing_pe':    _safe(info.get('trailingPE')),
-            'forward_pe':     _safe(info.get('forwardPE')),
-            'price_to_sales': _safe(info.get('priceToSalesTrailing12Months')),
-            'ev_ebitda':      _safe(info.get('enterpriseToEbitda')),
-            'peg_ratio':      _safe(info.get('pegRatio')),
-            'price_to_book':  _safe(info.get('priceToBook')),
-        }
+def _yf_await(fut, box, timeout):
+    """Resultado de `fut` con `timeout` contado desde que empieza a correr, no desde que se encola."""
+    if not box['started'].wait(max(0.0, box['queued'] + _YF_QUEUE_MAX - time.time())):
+        fut.cancel()
+        raise FuturesTimeout()
+    return fut.result(timeout=max(0.0, box['t0'] + timeout - time.time()))
 
-        # ── Fallback Layer 1: fast_info ──
+
+def _fetch_yf_parts(ticker, debug_log):
+    """
+    Lanza en paralelo las sub-descargas que no estén frescas en la caché
+    persistente y espera a cada una como máximo su timeout desde que arranca
+    (y _YF_QUEUE_MAX en cola). Retorna
+    ({tarea: valor o None}, {tarea: antigüedad en s}, {tarea: error}).
+    """
+    now    = time.time()
+    cached = _yf_cache_get(ticker)
+    parts, ages, errors, pending = {}, {}, {}, {}
+    stock  = yf.Ticker(ticker)
+    for task, (fn, timeout, ttl) in _YF_TASKS.items():
+        hit = cached.get(task)
+        if hit and now - hit[0] < ttl:
+            parts[task], ages[task] = hit[1], now - hit[0]
+            continue
+        if task == 'quote_summary' and cached.get('info'):
+            # Solo hace falta si info{} viene incompleto; con un info conocido y
+            # completo no se lanza la descarga especulativa
+            known = cached['info'][1]
+            if len(_QS_CRITICAL - {k for k, v in known.items() if v is not None}) < 3:
+                continue
+
+        def _run(fn=fn, task=task):
+            value = fn(stock, ticker)
+            if value is not None and not (isinstance(value, dict) and not value):
+                _yf_cache_put(ticker, task, value)
+            return value
+        pending[task] = (*_yf_submit(ticker, task, _run), hit)
+
+    if parts:
+        debug_log.append(f"✅ caché local: {len(parts)}/{len(_YF_TASKS)} sub-descargas frescas")
+    for task, (fut, box, hit) in pending.items():
         try:
-            fi = stock.fast_info
-            fi_map = {
-                'market_cap':            'marketCap',
-                'year_high':             'fiftyTwoWeekHigh',
-                'year_low':              'fiftyTwoWeekLow',
-                'fifty_day_average':     'fiftyDayAverage',
-                'two_hundred_day_average': 'twoHundredDayAverage',
-                'shares':                'sharesOutstanding',
-                'currency':              'currency',
-            }
-            for fi_attr, info_key in fi_map.items():
-                if not info.get(info_key):
-                    v = _safe(getattr(fi, fi_attr, None))
-                    if v: info[info_key] = v
-            # P/E from fast_info
-            if metrics['trailing_pe'] is None:
-                fi_pe = _safe(getattr(fi, 'pe_forward', None))
-                if fi_pe: metrics['trailing_pe'] = fi_pe
-            # EPS from price + P/E if missing
-            if not info.get('trailingEps') and metrics['trailing_pe'] and cp:
-                info['trailingEps'] = round(cp / metrics['trailing_pe'], 4)
+            parts[task], ages[task] = _yf_await(fut, box, _YF_TASKS[task][1]), 0.0
+        except FuturesTimeout:
+            errors[task] = f"timeout {_YF_TASKS[task][1]}s"
         except Exception as e:
-            logger.warning("[yf.fast_info metrics] %s: %s", ticker, e)
+            errors[task] = str(e)
+        if task in errors and task != 'quote_summary':
+            # quoteSummary es especulativo: su fallo solo se anota si llega a hacer falta
+            debug_log.append(f"⚠️ {task} falló: {errors[task]}")
+        if task not in parts and hit:
+            # Sin respuesta a tiempo: se usa la copia caducada si la hay
+            parts[task], ages[task] = hit[1], now - hit[0]
+            debug_log.append(f"⚠️ {task}: usando caché de hace {int((now - hit[0]) / 60)} min")
+    for task in _YF_TASKS:
+        parts.setdefault(task, None)
+    return parts, ages, errors
+
+
+def _frame_value(df, row, col):
+    return _safe(df.loc[row, col]) if row in df.index else None
+
+
+def _assemble_yfinance(ticker, parts, ages, errors, debug_log):
+    """Combina las sub-descargas en el dict de get_yfinance_full. Sin E/S."""
+    info = dict(parts['info'] or {})
+    if parts['info'] is not None:
+        debug_log.append(f"✅ info dict: {len(info)} keys | quoteType={info.get('quoteType','?')} longName={str(info.get('longName','?'))[:40]}")
+    fi = parts['fast_info'] or {}
+
+    # ── Yahoo Finance quoteSummary directo (fallback cuando info{} incompleto) ──
+    _missing_critical = _QS_CRITICAL - set(k for k, v in info.items() if v is not None)
+    if len(_missing_critical) >= 3 and not parts['quote_summary'] and 'quote_summary' in errors:
+        debug_log.append(f"⚠️ quoteSummary: {errors['quote_summary']}")
+    if len(_missing_critical) >= 3 and parts['quote_summary']:
+        _d, _host = parts['quote_summary']
+        if _d:
+            enriched = 0
+            for _mod, _keys in _QS_FILLS.items():
+                _mod_data = _d.get(_mod, {})
+                for _k in _keys:
+                    if info.get(_k) is None:
+                        _raw = _mod_data.get(_k)
+                        if _raw is None: continue
+                        # Yahoo wraps numeric: {"raw":1.23,"fmt":"1.23"} or plain value
+                        if isinstance(_raw, dict):
+                            _v = _raw.get('raw')
+                            if _v is None: _v = _raw.get('longFmt') or _raw.get('fmt')
+                        else:
+                            _v = _raw
+                        if _v is not None and _v != '':
+                            info[_k] = _v
+                            enriched += 1
+            debug_log.append(f"✅ quoteSummary ({_host}): +{enriched} campos, total {len(info)}")
+
+    # info{} servido desde la caché persistente: el precio se refresca con fast_info
+    if ages.get('info', 0) > _YF_PRICE_TTL and fi.get('last_price'):
+        info['currentPrice'] = info['regularMarketPrice'] = fi['last_price']
+        if fi.get('previous_close'): info['previousClose'] = fi['previous_close']
+        if fi.get('market_cap'):     info['marketCap'] = fi['market_cap']
+
+    # ── Estrategia 1: campos de precio en info{} ──
+    cp_check = (
+        _safe(info.get('currentPrice')) or
+        _safe(info.get('regularMarketPrice')) or
+        _safe(info.get('regularMarketOpen')) or
+        _safe(info.get('ask')) or
+        _safe(info.get('bid')) or
+        _safe(info.get('navPrice')) or
+        _safe(info.get('postMarketPrice')) or
+        _safe(info.get('preMarketPrice'))
+    )
+    if cp_check:
+        debug_log.append(f"✅ Precio desde info: {cp_check}")
+    else:
+        debug_log.append(f"⚠️ info no tiene precio. Keys disponibles: {list(info.keys())[:20]}")
+
+    # ── Estrategia 2: historial reciente (del histórico 1 año) ──
+    hist_1y = parts['hist_1y'] if parts['hist_1y'] is not None and not parts['hist_1y'].empty else None
+    closes  = hist_1y['Close'].dropna() if hist_1y is not None and 'Close' in hist_1y.columns else None
+    if not cp_check:
+        if closes is not None and not closes.empty:
+            last_close = _safe(float(closes.iloc[-1]))
+            if last_close:
+                cp_check = last_close
+                info['currentPrice'] = last_close
+                info['regularMarketPrice'] = last_close
+                if len(closes) >= 2:
+                    prev = _safe(float(closes.iloc[-2]))
+                    if prev: info['previousClose'] = prev
+                debug_log.append(f"✅ Precio desde history(1y): {last_close}")
+            else:
+                debug_log.append(f"⚠️ history(1y) devolvió datos pero Close={last_close}")
+        else:
+            debug_log.append("⚠️ history(1y) vacío o sin columna Close")
+
+    # ── Estrategia 3: fast_info ──
+    if not cp_check:
+        last = fi.get('last_price')
+        debug_log.append(f"fast_info.last_price={last}")
+        if last:
+            cp_check = last
+            info['currentPrice'] = last
+            info['regularMarketPrice'] = last
+            if fi.get('previous_close'): info['previousClose'] = fi['previous_close']
+            if fi.get('market_cap') and not info.get('marketCap'): info['marketCap'] = fi['market_cap']
+            debug_log.append(f"✅ Precio desde fast_info: {last}")
+        else:
+            debug_log.append("⚠️ fast_info.last_price es None o 0")
 
-        # ── Fallback Layer 2: compute from financials if key metrics still missing ──
-        try:
-            shares = _safe(info.get('sharesOutstanding'))
-            price  = cp or 0
-
-            # income_stmt for EPS, margins, revenue
-            inc = stock.income_stmt
-            if inc is not None and not inc.empty:
-                col = inc.columns[0]  # most recent period
-                net_inc = _safe(inc.loc['Net Income', col]) if 'Net Income' in inc.index else None
-                rev     = _safe(inc.loc['Total Revenue', col]) if 'Total Revenue' in inc.index else None
-                op_inc  = _safe(inc.loc['Operating Income', col]) if 'Operating Income' in inc.index else None
-                gross   = _safe(inc.loc['Gross Profit', col]) if 'Gross Profit' in inc.index else None
-                ebitda  = _safe(inc.loc['EBITDA', col]) if 'EBITDA' in inc.index else None
-
-                if net_inc and shares and not info.get('trailingEps'):
-                    info['trailingEps'] = round(net_inc / shares, 4)
-                if net_inc and rev and not profitability.get('net_margin'):
-                    profitability['net_margin'] = net_inc / rev
-                if op_inc and rev and not profitability.get('op_margin'):
-                    profitability['op_margin'] = op_inc / rev
-                if gross and rev and not profitability.get('gross_margin'):
-                    profitability['gross_margin'] = gross / rev
-                if rev and not profitability.get('revenue_ttm'):
-                    profitability['revenue_ttm'] = rev
-                if ebitda and not info.get('ebitda'):
-                    info['ebitda'] = ebitda
-
-                # P/E from computed EPS
-                eps = _safe(info.get('trailingEps'))
-                if eps and eps != 0 and price and metrics['trailing_pe'] is None:
-                    metrics['trailing_pe'] = round(price / eps, 2)
-
-                # P/S from revenue
-                mc = _safe(info.get('marketCap'))
-                if rev and rev != 0 and mc and metrics['price_to_sales'] is None:
-                    metrics['price_to_sales'] = round(mc / rev, 2)
-
-                # EV/EBITDA
-                if ebitda and ebitda != 0 and mc and metrics['ev_ebitda'] is None:
-                    debt   = _safe(info.get('totalDebt')) or 0
-                    cash   = _safe(info.get('totalCash')) or 0
-                    ev     = mc + debt - cash
-                    metrics['ev_ebitda'] = round(ev / ebitda, 2)
-
-            # balance_sheet for book value, debt
-            bs = stock.balance_sheet
-            if bs is not None and not bs.empty:
-                col = bs.columns[0]
-                equity = _safe(bs.loc['Stockholders Equity', col]) if 'Stockholders Equity' in bs.index else None
-                debt_l = _safe(bs.loc['Long Term Debt', col]) if 'Long Term Debt' in bs.index else None
-                cash_b = _safe(bs.loc['Cash And Cash Equivalents', col]) if 'Cash And Cash Equivalents' in bs.index else None
-                total_debt = _safe(bs.loc['Total Debt', col]) if 'Total Debt' in bs.index else None
-
-                if equity and shares and not info.get('bookValue'):
-                    bv = equity / shares
-                    info['bookValue'] = round(bv, 4)
-                    if price and not metrics['price_to_book']:
-                        metrics['price_to_book'] = round(price / bv, 2)
-                if debt_l and not profitability.get('total_debt'):
-                    profitability['total_debt'] = debt_l
-                if total_debt and equity and equity != 0 and not profitability.get('debt_to_equity'):
-                    profitability['debt_to_equity'] = round(total_debt / equity * 100, 2)
-                if cash_b and not profitability.get('total_cash'):
-                    profitability['total_cash'] = cash_b
-
-            # cashflow for FCF
-            cf = stock.cashflow
-            if cf is not None and not cf.empty:
-                col = cf.columns[0]
-                ocf = _safe(cf.loc['Operating Cash Flow', col]) if 'Operating Cash Flow' in cf.index else None
-                cap = _safe(cf.loc['Capital Expenditure', col]) if 'Capital Expenditure' in cf.index else None
-                if ocf and not profitability.get('operating_cashflow'):
-                    profitability['operating_cashflow'] = ocf
-                if ocf and cap and not profitability.get('free_cashflow'):
-                    profitability['free_cashflow'] = ocf + cap  # capex is negative in yfinance
+    if not cp_check:
+        debug_log.append(f"❌ FALLO TOTAL: sin precio para {ticker}")
+        logger.warning("[get_yfinance_full] Sin precio para %s | %s", ticker, " | ".join(debug_log))
+        return None
 
-        except Exception as e:
-            logger.warning("[yf.financials fallback] %s: %s", ticker, e)
+    # Recomendaciones
+    recommendations = None
+    recs = parts['recommendations']
+    if recs is not None and not recs.empty:
+        latest = recs.iloc[0]
+        sb = int(_safe(latest.get('strongBuy'))  or 0)
+        b  = int(_safe(latest.get('buy'))        or 0)
+        h  = int(_safe(latest.get('hold'))       or 0)
+        s  = int(_safe(latest.get('sell'))       or 0)
+        ss = int(_safe(latest.get('strongSell')) or 0)
+        recommendations = {'strong_buy': sb, 'buy': b, 'hold': h,
+                           'sell': s, 'strong_sell': ss, 'total': sb+b+h+s+ss}
+
+    rs = parts['rec_summary']
+    rec_summary = rs.head(6) if rs is not None and not rs.empty else None
+
+    # Precio objetivo
+    tm = _safe(info.get('targetMeanPrice'))
+    cp = _safe(info.get('currentPrice')) or _safe(info.get('regularMarketPrice'))
+    target_data = {
+        'mean': tm, 'high': _safe(info.get('targetHighPrice')),
+        'low': _safe(info.get('targetLowPrice')), 'median': _safe(info.get('targetMedianPrice')),
+        'current': cp, 'upside': ((tm - cp) / cp * 100) if (tm and cp) else None
+    }
 
-        # ── Fallback Layer 3: compute SMAs from hist if still missing ──
-        try:
-            if (not info.get('fiftyDayAverage') or not info.get('twoHundredDayAverage')) and hist_data is not None and not hist_data.empty:
-                closes = hist_data['Close'].dropna()
-                if len(closes) >= 50 and not info.get('fiftyDayAverage'):
-                    info['fiftyDayAverage'] = round(float(closes.tail(50).mean()), 4)
-                if len(closes) >= 200 and not info.get('twoHundredDayAverage'):
-                    info['twoHundredDayAverage'] = round(float(closes.tail(200).mean()), 4)
-        except Exception as e:
-            logger.warning("[yf.sma fallback] %s: %s", ticker, e)
-
-        # Rentabilidad
-        profitability = {
-            'roe':             _safe(info.get('returnOnEquity')),
-            'roa':             _safe(info.get('returnOnAssets')),
-            'net_margin':      _safe(info.get('profitMargins')),
-            'op_margin':       _safe(info.get('operatingMargins')),
-            'gross_margin':    _safe(info.get('grossMargins')),
-            'revenue_growth':  _safe(info.get('revenueGrowth')),
-            'earnings_growth': _safe(info.get('earningsGrowth')),
-            'debt_to_equity':  _safe(info.get('debtToEquity')),
-            'current_ratio':   _safe(info.get('currentRatio')),
-            'free_cashflow':   _safe(info.get('freeCashflow')),
-            'operating_cashflow': _safe(info.get('operatingCashflow')),
-            'revenue_ttm':     _safe(info.get('totalRevenue')),
-            'ebitda':          _safe(info.get('ebitda')),
-            'total_cash':      _safe(info.get('totalCash')),
-            'total_debt':      _safe(info.get('totalDebt')),
-        }
+    # Métricas valoración
+    metrics = {
+        'trailing_pe':    _safe(info.get('trailingPE')),
+        'forward_pe':     _safe(info.get('forwardPE')),
+        'price_to_sales': _safe(info.get('priceToSalesTrailing12Months')),
+        'ev_ebitda':      _safe(info.get('enterpriseToEbitda')),
+        'peg_ratio':      _safe(info.get('pegRatio')),
+        'price_to_book':  _safe(info.get('priceToBook')),
+    }
 
-        # Datos de mercado
-        market = {
-            'price':           cp,
-            'prev_close':      _safe(info.get('previousClose')),
-            'market_cap':      _safe(info.get('marketCap')),
-            'volume':          _safe(info.get('volume')),
-            'avg_volume':      _safe(info.get('averageVolume')),
-            'beta':            _safe(info.get('beta')),
-            '52w_high':        _safe(info.get('fiftyTwoWeekHigh')),
-            '52w_low':         _safe(info.get('fiftyTwoWeekLow')),
-            'eps':             _safe(info.get('trailingEps')),
-            'eps_forward':     _safe(info.get('forwardEps')),
-            'dividend_yield':  _safe(info.get('dividendYield')),
-            'dividend_rate':   _safe(info.get('dividendRate')),
-            'payout_ratio':    _safe(info.get('payoutRatio')),
-            'sma_50':          _safe(info.get('fiftyDayAverage')),
-            'sma_200':         _safe(info.get('twoHundredDayAverage')),
-            'short_ratio':     _safe(info.get('shortRatio')),
-            'insider_pct':     _safe(info.get('heldPercentInsiders')),
-            'inst_pct':        _safe(info.get('heldPercentInstitutions')),
-            'n_analysts':      _safe(info.get('numberOfAnalystOpinions')),
-            'book_value':      _safe(info.get('bookValue')),
-            'employees':       _safe(info.get('fullTimeEmployees')),
-        }
+    # ── Fallback Layer 1: fast_info ──
+    fi_map = {
+        'market_cap':            'marketCap',
+        'year_high':             'fiftyTwoWeekHigh',
+        'year_low':              'fiftyTwoWeekLow',
+        'fifty_day_average':     'fiftyDayAverage',
+        'two_hundred_day_average': 'twoHundredDayAverage',
+        'shares':                'sharesOutstanding',
+        'currency':              'currency',
+    }
+    for fi_attr, info_key in fi_map.items():
+        if not info.get(info_key):
+            v = fi.get(fi_attr)
+            if v: info[info_key] = v
+    # EPS from price + P/E if missing
+    if not info.get('trailingEps') and metrics['trailing_pe'] and cp:
+        info['trailingEps'] = round(cp / metrics['trailing_pe'], 4)
+
+    # Rentabilidad
+    profitability = {
+        'roe':             _safe(info.get('returnOnEquity')),
+        'roa':             _safe(info.get('returnOnAssets')),
+        'net_margin':      _safe(info.get('profitMargins')),
+        'op_margin':       _safe(info.get('operatingMargins')),
+        'gross_margin':    _safe(info.get('grossMargins')),
+        'revenue_growth':  _safe(info.get('revenueGrowth')),
+        'earnings_growth': _safe(info.get('earningsGrowth')),
+        'debt_to_equity':  _safe(info.get('debtToEquity')),
+        'current_ratio':   _safe(info.get('currentRatio')),
+        'free_cashflow':   _safe(info.get('freeCashflow')),
+        'operating_cashflow': _safe(info.get('operatingCashflow')),
+        'revenue_ttm':     _safe(info.get('totalRevenue')),
+        'ebitda':          _safe(info.get('ebitda')),
+        'total_cash':      _safe(info.get('totalCash')),
+        'total_debt':      _safe(info.get('totalDebt')),
+    }
 
-        # Eventos calendario + estimaciones — una sola llamada
-        events = {}
-        analyst_estimates = {}
-        try:
-            cal = stock.calendar
-            if cal is not None:
-                raw = cal if isinstance(cal, dict) else cal.to_dict()
-                useful_events = {'Earnings Date', 'Ex-Dividend Date', 'Dividend Date'}
-                estimate_keys = {'Earnings High', 'Earnings Low', 'Earnings Average',
-                                 'Revenue High',  'Revenue Low',  'Revenue Average'}
-                for k, v in raw.items():
-                    if v is None: continue
-                    if k in useful_events:   events[k]            = v
-                    elif k in estimate_keys: analyst_estimates[k] = v
-        except Exception as e:
-            logger.warning("[yf.calendar] %s: %s", ticker, e)
+    # ── Fallback Layer 2: compute from financials if key metrics still missing ──
+    try:
+        shares = _safe(info.get('sharesOutstanding'))
+        price  = cp or 0
+
+        # income_stmt for EPS, margins, revenue
+        inc = parts['income_stmt']
+        if inc is not None and not inc.empty:
+            col = inc.columns[0]  # most recent period
+            net_inc = _frame_value(inc, 'Net Income', col)
+            rev     = _frame_value(inc, 'Total Revenue', col)
+            op_inc  = _frame_value(inc, 'Operating Income', col)
+            gross   = _frame_value(inc, 'Gross Profit', col)
+            ebitda  = _frame_value(inc, 'EBITDA', col)
+
+            if net_inc and shares and not info.get('trailingEps'):
+                info['trailingEps'] = round(net_inc / shares, 4)
+            if net_inc and rev and not profitability.get('net_margin'):
+                profitability['net_margin'] = net_inc / rev
+            if op_inc and rev and not profitability.get('op_margin'):
+                profitability['op_margin'] = op_inc / rev
+            if gross and rev and not profitability.get('gross_margin'):
+                profitability['gross_margin'] = gross / rev
+            if rev and not profitability.get('revenue_ttm'):
+                profitability['revenue_ttm'] = rev
+            if ebitda and not info.get('ebitda'):
+                info['ebitda'] = ebitda
+
+            # P/E from computed EPS
+            eps = _safe(info.get('trailingEps'))
+            if eps and eps != 0 and price and metrics['trailing_pe'] is None:
+                metrics['trailing_pe'] = round(price / eps, 2)
+
+            # P/S from revenue
+            mc = _safe(info.get('marketCap'))
+            if rev and rev != 0 and mc and metrics['price_to_sales'] is None:
+                metrics['price_to_sales'] = round(mc / rev, 2)
+
+            # EV/EBITDA
+            if ebitda and ebitda != 0 and mc and metrics['ev_ebitda'] is None:
+                debt   = _safe(info.get('totalDebt')) or 0
+                cash   = _safe(info.get('totalCash')) or 0
+                ev     = mc + debt - cash
+                metrics['ev_ebitda'] = round(ev / ebitda, 2)
+
+        # balance_sheet for book value, debt
+        bs = parts['balance_sheet']
+        if bs is not None and not bs.empty:
+            col = bs.columns[0]
+            equity     = _frame_value(bs, 'Stockholders Equity', col)
+            debt_l     = _frame_value(bs, 'Long Term Debt', col)
+            cash_b     = _frame_value(bs, 'Cash And Cash Equivalents', col)
+            total_debt = _frame_value(bs, 'Total Debt', col)
+
+            if equity and shares and not info.get('bookValue'):
+                bv = equity / shares
+                info['bookValue'] = round(bv, 4)
+                if price and not metrics['price_to_book']:
+                    metrics['price_to_book'] = round(price / bv, 2)
+            if debt_l and not profitability.get('total_debt'):
+                profitability['total_debt'] = debt_l
+            if total_debt and equity and equity != 0 and not profitability.get('debt_to_equity'):
+                profitability['debt_to_equity'] = round(total_debt / equity * 100, 2)
+            if cash_b and not profitability.get('total_cash'):
+                profitability['total_cash'] = cash_b
+
+        # cashflow for FCF
+        cf = parts['cashflow']
+        if cf is not None and not cf.empty:
+            col = cf.columns[0]
+            ocf = _frame_value(cf, 'Operating Cash Flow', col)
+            cap = _frame_value(cf, 'Capital Expenditure', col)
+            if ocf and not profitability.get('operating_cashflow'):
+                profitability['operating_cashflow'] = ocf
+            if ocf and cap and not profitability.get('free_cashflow'):
+                profitability['free_cashflow'] = ocf + cap  # capex is negative in yfinance
 
-        # Complementar fechas dividendo desde info si calendar no las devuelve
-        for k_info, label in [
-            ('exDividendDate', 'Fecha Ex-Dividendo'),
-            ('dividendDate',   'Fecha Pago Dividendo')
-        ]:
-            if label not in events and 'Ex-Dividend Date' not in events:
-                v = _safe(info.get(k_info))
-                if v: events[label] = v
+    except Exception as e:
+        logger.warning("[yf.financials fallback] %s: %s", ticker, e)
+
+    # ── Fallback Layer 3: compute SMAs from hist if still missing ──
+    if closes is not None:
+        if len(closes) >= 50 and not info.get('fiftyDayAverage'):
+            info['fiftyDayAverage'] = round(float(closes.tail(50).mean()), 4)
+        if len(closes) >= 200 and not info.get('twoHundredDayAverage'):
+            info['twoHundredDayAverage'] = round(float(closes.tail(200).mean()), 4)
+
+    # Datos de mercado
+    market = {
+        'price':           cp,
+        'prev_close':      _safe(info.get('previousClose')),
+        'market_cap':      _safe(info.get('marketCap')),
+        'volume':          _safe(info.get('volume')),
+        'avg_volume':      _safe(info.get('averageVolume')),
+        'beta':            _safe(info.get('beta')),
+        '52w_high':        _safe(info.get('fiftyTwoWeekHigh')),
+        '52w_low':         _safe(info.get('fiftyTwoWeekLow')),
+        'eps':             _safe(info.get('trailingEps')),
+        'eps_forward':     _safe(info.get('forwardEps')),
+        'dividend_yield':  _safe(info.get('dividendYield')),
+        'dividend_rate':   _safe(info.get('dividendRate')),
+        'payout_ratio':    _safe(info.get('payoutRatio')),
+        'sma_50':          _safe(info.get('fiftyDayAverage')),
+        'sma_200':         _safe(info.get('twoHundredDayAverage')),
+        'short_ratio':     _safe(info.get('shortRatio')),
+        'insider_pct':     _safe(info.get('heldPercentInsiders')),
+        'inst_pct':        _safe(info.get('heldPercentInstitutions')),
+        'n_analysts':      _safe(info.get('numberOfAnalystOpinions')),
+        'book_value':      _safe(info.get('bookValue')),
+        'employees':       _safe(info.get('fullTimeEmployees')),
+    }
 
-        # Sparkline 3 meses — reutiliza la sesión stock, sin llamada extra
-        sparkline = None
-        try:
-            hist = stock.history(period="3mo", interval="1d", auto_adjust=True)
-            if hist is not None and not hist.empty and 'Close' in hist.columns:
-                sparkline = [p for p in [_safe(x) for x in hist['Close'].dropna().tolist()] if p is not None]
-        except Exception as e:
-            logger.warning("[yf.sparkline] %s: %s", ticker, e)
+    # Eventos calendario + estimaciones
+    events = {}
+    analyst_estimates = {}
+    cal = parts['calendar']
+    if cal is not None:
+        raw = cal if isinstance(cal, dict) else cal.to_dict()
+        useful_events = {'Earnings Date', 'Ex-Dividend Date', 'Dividend Date'}
+        estimate_keys = {'Earnings High', 'Earnings Low', 'Earnings Average',
+                         'Revenue High',  'Revenue Low',  'Revenue Average'}
+        for k, v in raw.items():
+            if v is None: continue
+            if k in useful_events:   events[k]            = v
+            elif k in estimate_keys: analyst_estimates[k] = v
+
+    # Complementar fechas dividendo desde info si calendar no las devuelve
+    for k_info, label in [
+        ('exDividendDate', 'Fecha Ex-Dividendo'),
+        ('dividendDate',   'Fecha Pago Dividendo')
+    ]:
+        if label not in events and 'Ex-Dividend Date' not in events:
+            v = _safe(info.get(k_info))
+            if v: events[label] = v
+
+    # Sparkline 3 meses — recorte del histórico 1 año, sin llamada extra
+    sparkline = None
+    if closes is not None and not closes.empty:
+        recent = closes[closes.index >= closes.index[-1] - pd.DateOffset(months=3)]
+        sparkline = [p for p in [_safe(x) for x in recent.tolist()] if p is not None]
+
+    # Earnings surprises
+    earnings_surprises = []
+    eq = parts['earnings_history']
+    if eq is not None and not eq.empty:
+        for _, row in eq.head(8).iterrows():
+            eps_actual   = _safe(row.get('epsActual'))
+            eps_estimate = _safe(row.get('epsEstimate'))
+            if eps_actual is None and eps_estimate is None:
+                continue
+            surprise = (eps_actual - eps_estimate) if (eps_actual and eps_estimate) else None
+            surprise_pct = (surprise / abs(eps_estimate) * 100) if (surprise and eps_estimate and eps_estimate != 0) else None
+            date_val = row.name if hasattr(row, 'name') else ''
+            earnings_surprises.append({
+                'date': str(date_val)[:10] if date_val else 'N/D',
+                'eps_actual':   eps_actual   or 0,
+                'eps_estimate': eps_estimate or 0,
+                'surprise':     surprise     or 0,
+                'surprise_pct': surprise_pct or 0,
+            })
 
-        # Histórico 1 año para gráfico
-        hist_1y = None
-        try:
-            h = stock.history(period="1y", auto_adjust=True)
-            if not h.empty:
-                hist_1y = h
-        except Exception as e:
-            logger.warning("[yf.hist_1y] %s: %s", ticker, e)
+    inst_data = parts['holders'] or {}
+
+    # ── Refresh all metric dicts after enrichment layers ──
+    for _k, _info_k in [
+        ('trailing_pe',    'trailingPE'),
+        ('forward_pe',     'forwardPE'),
+        ('price_to_sales', 'priceToSalesTrailing12Months'),
+        ('ev_ebitda',      'enterpriseToEbitda'),
+        ('peg_ratio',      'pegRatio'),
+        ('price_to_book',  'priceToBook'),
+    ]:
+        if metrics.get(_k) is None:
+            v = _safe(info.get(_info_k))
+            if v: metrics[_k] = v
+
+    for _k, _info_k in [
+        ('net_margin',         'profitMargins'),
+        ('op_margin',          'operatingMargins'),
+        ('gross_margin',       'grossMargins'),
+        ('roe',                'returnOnEquity'),
+        ('roa',                'returnOnAssets'),
+        ('revenue_growth',     'revenueGrowth'),
+        ('earnings_growth',    'earningsGrowth'),
+        ('debt_to_equity',     'debtToEquity'),
+        ('free_cashflow',      'freeCashflow'),
+        ('operating_cashflow', 'operatingCashflow'),
+        ('revenue_ttm',        'totalRevenue'),
+        ('total_cash',         'totalCash'),
+        ('total_debt',         'totalDebt'),
+        ('current_ratio',      'currentRatio'),
+    ]:
+        if profitability.get(_k) is None:
+            v = _safe(info.get(_info_k))
+            if v: profitability[_k] = v
+
+    for _k, _info_k in [
+        ('eps',           'trailingEps'),
+        ('eps_forward',   'forwardEps'),
+        ('beta',          'beta'),
+        ('52w_high',      'fiftyTwoWeekHigh'),
+        ('52w_low',       'fiftyTwoWeekLow'),
+        ('sma_50',        'fiftyDayAverage'),
+        ('sma_200',       'twoHundredDayAverage'),
+        ('book_value',    'bookValue'),
+        ('dividend_yield','dividendYield'),
+        ('n_analysts',    'numberOfAnalystOpinions'),
+        ('insider_pct',   'heldPercentInsiders'),
+        ('inst_pct',      'heldPercentInstitutions'),
+    ]:
+        if market.get(_k) is None:
+            v = _safe(info.get(_info_k))
+            if v: market[_k] = v
+
+    # Refresh target_data
+    _tm2 = _safe(info.get('targetMeanPrice'))
+    _cp2 = market.get('price') or cp
+    if _tm2 and not target_data.get('mean'):
+        target_data['mean']   = _tm2
+        target_data['high']   = _safe(info.get('targetHighPrice'))
+        target_data['low']    = _safe(info.get('targetLowPrice'))
+        target_data['median'] = _safe(info.get('targetMedianPrice'))
+        if _cp2: target_data['upside'] = round((_tm2 - _cp2) / _cp2 * 100, 1)
 
-        # Earnings surprises
-        earnings_surprises = []
-        try:
-            eq = stock.earnings_history
-            if eq is not None and not eq.empty:
-                for _, row in eq.head(8).iterrows():
-                    eps_actual   = _safe(row.get('epsActual'))
-                    eps_estimate = _safe(row.get('epsEstimate'))
-                    if eps_actual is None and eps_estimate is None:
-                        continue
-                    surprise = (eps_actual - eps_estimate) if (eps_actual and eps_estimate) else None
-                    surprise_pct = (surprise / abs(eps_estimate) * 100) if (surprise and eps_estimate and eps_estimate != 0) else None
-                    date_val = row.name if hasattr(row, 'name') else ''
-                    earnings_surprises.append({
-                        'date': str(date_val)[:10] if date_val else 'N/D',
-                        'eps_actual':   eps_actual   or 0,
-                        'eps_estimate': eps_estimate or 0,
-                        'surprise':     surprise     or 0,
-                        'surprise_pct': surprise_pct or 0,
-                    })
-        except Exception as e:
-            logger.warning("[yf.earnings_history] %s: %s", ticker, e)
+    return {
+        'info': info, 'recommendations': recommendations, 'rec_summary': rec_summary,
+        'target_data': target_data, 'metrics': metrics, 'profitability': profitability,
+        'market': market, 'events': events, 'analyst_estimates': analyst_estimates,
+        'sparkline': sparkline, 'hist_1y': hist_1y,
+        'earnings_surprises': earnings_surprises,
+        'inst_data': inst_data,
+    }
 
-        # Institutional holders — same session, no extra call
-        inst_data = {}
-        try:
-            inst_data['institutional'] = stock.institutional_holders
-            inst_data['major']         = stock.major_holders
-            inst_data['mutual_funds']  = stock.mutualfund_holders
-        except Exception as e:
-            logger.warning("[yf.inst_data] %s: %s", ticker, e)
-
-        # ── Refresh all metric dicts after enrichment layers ──
-        for _k, _info_k in [
-            ('trailing_pe',    'trailingPE'),
-            ('forward_pe',     'forwardPE'),
-            ('price_to_sales', 'priceToSalesTrailing12Months'),
-            ('ev_ebitda',      'enterpriseToEbitda'),
-            ('peg_ratio',      'pegRatio'),
-            ('price_to_book',  'priceToBook'),
-        ]:
-            if metrics.get(_k) is None:
-                v = _safe(info.get(_info_k))
-                if v: metrics[_k] = v
-
-        for _k, _info_k in [
-            ('net_margin',         'profitMargins'),
-            ('op_margin',          'operatingMargins'),
-            ('gross_margin',       'grossMargins'),
-            ('roe',                'returnOnEquity'),
-            ('roa',                'returnOnAssets'),
-            ('revenue_growth',     'revenueGrowth'),
-            ('earnings_growth',    'earningsGrowth'),
-            ('debt_to_equity',     'debtToEquity'),
-            ('free_cashflow',      'freeCashflow'),
-            ('operating_cashflow', 'operatingCashflow'),
-            ('revenue_ttm',        'totalRevenue'),
-            ('total_cash',         'totalCash'),
-            ('total_debt',         'totalDebt'),
-            ('current_ratio',      'currentRatio'),
-        ]:
-            if profitability.get(_k) is None:
-                v = _safe(info.get(_info_k))
-                if v: profitability[_k] = v
-
-        for _k, _info_k in [
-            ('eps',           'trailingEps'),
-            ('eps_forward',   'forwardEps'),
-            ('beta',          'beta'),
-            ('52w_high',      'fiftyTwoWeekHigh'),
-            ('52w_low',       'fiftyTwoWeekLow'),
-            ('sma_50',        'fiftyDayAverage'),
-            ('sma_200',       'twoHundredDayAverage'),
-            ('book_value',    'bookValue'),
-            ('dividend_yield','dividendYield'),
-            ('n_analysts',    'numberOfAnalystOpinions'),
-            ('insider_pct',   'heldPercentInsiders'),
-            ('inst_pct',      'heldPercentInstitutions'),
-        ]:
-            if market.get(_k) is None:
-                v = _safe(info.get(_info_k))
-                if v: market[_k] = v
-
-        # Refresh target_data
-        _tm2 = _safe(info.get('targetMeanPrice'))
-        _cp2 = market.get('price') or cp
-        if _tm2 and not target_data.get('mean'):
-            target_data['mean']   = _tm2
-            target_data['high']   = _safe(info.get('targetHighPrice'))
-            target_data['low']    = _safe(info.get('targetLowPrice'))
-            target_data['median'] = _safe(info.get('targetMedianPrice'))
-            if _cp2: target_data['upside'] = round((_tm2 - _cp2) / _cp2 * 100, 1)
 
-        return {
-            'info': info, 'recommendations': recommendations, 'rec_summary': rec_summary,
-            'target_data': target_data, 'metrics': metrics, 'profitability': profitability,
-            'market': market, 'events': events, 'analyst_estimates': analyst_estimates,
-            'sparkline': sparkline, 'hist_1y': hist_1y,
-            'earnings_surprises': earnings_surprises,
-            'inst_data': inst_data,
-        }
+@st.cache_data(ttl=900, show_spinner=False)
+def get_yfinance_bundle(ticker):
+    """
+    Datos de get_yfinance_full + traza de carga, sin tocar session_state (cacheable
+    entre sesiones). Las sub-descargas van en paralelo con timeout individual, así
+    que un ticker nuevo tarda lo que la más lenta y no la suma de todas.
+    Retorna (data o None, debug_log).
+    """
+    debug_log = []
+    try:
+        parts, ages, errors = _fetch_yf_parts(ticker, debug_log)
+        return _assemble_yfinance(ticker, parts, ages, errors, debug_log), debug_log
     except Exception as e:
         logger.error("[get_yfinance_full] %s: %s\n%s", ticker, e, traceback.format_exc())
-        return None
+        debug_log.append(f"❌ excepción: {e}")
+        return None, debug_log
+
+
+def get_yfinance_full(ticker):
+    """
+    Carga datos de yfinance con 3 estrategias de precio y modo debug.
+    Devuelve datos parciales si hay historial aunque info{} esté vacío.
+    Nunca devuelve None si existe algún precio accesible.
+    El log de carga se publica en session_state para la UI.
+    """
+    data, debug_log = get_yfinance_bundle(ticker)
+    st.session_state['_debug_log'] = debug_log
+    st.session_state['_debug_ticker'] = ticker
+    return data
 
 # ────────────────────────────────────────────────
 # ALPHA VANTAGE — EARNINGS HISTORY (complementario)
@@ -697,16 +822,12 @@ def get_yfinance_full(ticker):  # cache removed: debug log needs session_state
 def get_alpha_vantage_earnings(ticker, api_key):
     if not api_key: return None
     try:
-        resp = _HTTP.get(
-            "https://www.alphavantage.co/query",
-            params={'function': 'EARNINGS', 'symbol': ticker, 'apikey': api_key},
-            timeout=20
-        )
-        if resp.status_code == 200:
-            data = resp.json()
-            if 'Note' in data or 'Information' in data or not data.get('quarterlyEarnings'):
-                logger.warning("[AV] Rate limit or no data for %s: %s", ticker, list(data.keys()))
-                return None
+        # 25 peticiones/día en el plan gratuito: la respuesta se guarda 12h
+        data = get_provider('alpha_vantage').get_json(
+            params={'function': 'EARNINGS', 'symbol': ticker}, api_key=api_key,
+            ttl=12 * 3600, timeout=20,
+            valid=lambda d: 'Note' not in d and 'Information' not in d and bool(d.get('quarterlyEarnings')))
+        if data:
             surprises = []
             for r in data['quarterlyEarnings'][:8]:
                 ea  = safe_float(r.get('reportedEPS'))
@@ -720,6 +841,8 @@ def get_alpha_vantage_earnings(ticker, api_key):
                         'surprise': sur, 'surprise_pct': pct,
                     })
             return surprises if surprises else None
+        logger.warning("[AV] Rate limit or no data for %s", ticker)
+        return None
     except Exception as e:
         logger.warning("[get_alpha_vantage_earnings] %s: %s", ticker, e)
         return None
@@ -731,35 +854,24 @@ def get_alpha_vantage_earnings(ticker, api_key):
 @st.cache_data(ttl=900, show_spinner=False)
 def get_finnhub_data(ticker, api_key):
     if not api_key: return None
-    base_url = "https://finnhub.io/api/v1"
-    headers  = {"X-Finnhub-Token": api_key}
-    result   = {}
+    finnhub = get_provider('finnhub')
+    result  = {}
     try:
         for key, params in [
             ('revenue_breakdown', {'symbol': ticker}),
             ('geographic_revenue', {'symbol': ticker, 'breakdown': 'geographic'}),
         ]:
-            try:
-                r = _HTTP.get(f"{base_url}/stock/revenue-breakdown",
-                              params=params, headers=headers, timeout=10)
-                result[key] = r.json() if r.status_code == 200 else {}
-            except Exception as e:
-                logger.warning("[finnhub.%s] %s: %s", key, ticker, e)
-                result[key] = {}
-            time.sleep(0.2)
-
-        try:
-            to_date   = datetime.now().strftime('%Y-%m-%d')
-            from_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-            r = _HTTP.get(f"{base_url}/company-news",
-                          params={'symbol': ticker, 'from': from_date, 'to': to_date},
-                          headers=headers, timeout=10)
-            result['news'] = r.json() if r.status_code == 200 else []
-            if r.status_code == 429:
-                logger.warning("[finnhub] Rate limit hit for %s news", ticker)
-        except Exception as e:
-            logger.warning("[finnhub.news] %s: %s", ticker, e)
-            result['news'] = []
+            # Los segmentos cambian con cada 10-Q: 24h de caché
+            result[key] = finnhub.get_json("stock/revenue-breakdown", params, api_key=api_key,
+                                           ttl=86400) or {}
+
+        to_date   = datetime.now().strftime('%Y-%m-%d')
+        from_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+        news, error = finnhub.get_json("company-news", {'symbol': ticker, 'from': from_date, 'to': to_date},
+                                       api_key=api_key, ttl=900, return_error=True)
+        if news is None:
+            logger.warning("[finnhub.news] %s: %s", ticker, error)
+        result['news'] = news or []
 
         result['source'] = 'finnhub'
         return result
@@ -878,27 +990,20 @@ def get_institutional_holders(ticker):
 # Plan free: 250 req/día, sin WebSocket, datos fundamentales completos
 # ────────────────────────────────────────────────
 
-_FMP_BASE = "https://financialmodelingprep.com/api/v3"
-
-def _fmp_get(endpoint, params, api_key, timeout=12):
-    """Llamada a FMP con session compartida y logging de errores."""
+def _fmp_get(endpoint, params, api_key, timeout=12, ttl=6 * 3600):
+    """
+    Llamada a FMP vía el cliente de proveedores (cuota 250/día, caché persistente).
+    Los fundamentales cambian como mucho una vez al día: 6h de caché por defecto.
+    """
     if not api_key:
         return None
-    try:
-        p = {"apikey": api_key, **params}
-        resp = _HTTP.get(f"{_FMP_BASE}/{endpoint}", params=p, timeout=timeout)
-        if resp.status_code == 200:
-            data = resp.json()
-            # FMP devuelve lista vacía o dict con error si el ticker no existe
-            if isinstance(data, dict) and data.get("Error Message"):
-                logger.warning("[FMP] %s → %s", endpoint, data["Error Message"])
-                return None
-            return data
-        logger.warning("[FMP] HTTP %s for %s", resp.status_code, endpoint)
-        return None
-    except Exception as e:
-        logger.warning("[FMP] %s: %s", endpoint, e)
-        return None
+    fmp  = get_provider('fmp')
+    # FMP devuelve un dict con "Error Message" si el ticker no existe o la key no vale
+    data, error = fmp.get_json(endpoint, params, api_key=api_key, ttl=ttl, timeout=timeout, return_error=True,
+                               valid=lambda d: not (isinstance(d, dict) and d.get("Error Message")))
+    if data is None:
+        logger.warning("[FMP] %s: %s", endpoint, error)
+    return data
 
 @st.cache_data(ttl=900, show_spinner=False)
 def get_fmp_data(ticker, api_key):
@@ -1102,33 +1207,17 @@ def get_suggestions(info, recommendations, target_data, profitability, metrics=N
             v = metrics.get(met_key)
         return v if v is not None else default
 
-    # ── Umbrales ajustados por sector ──
-    # PE razonable varía enormemente: utilities ~15, tech ~30, biotech no aplica
+    # ── Umbrales por sector/industria: percentiles del universo (sector_benchmarks) ──
+    bench = get_benchmarks()
+
     def pe_label(pe_val):
         if not pe_val or pe_val <= 0: return None, None
-        if 'technology' in sector or 'communication' in sector:
-            lo, hi = 20, 50
-        elif 'financial' in sector or 'bank' in industry:
-            lo, hi = 8, 18
-        elif 'utilities' in sector or 'real estate' in sector:
-            lo, hi = 12, 22
-        elif 'health' in sector or 'biotech' in industry:
-            lo, hi = 15, 60  # biotech puede tener PE muy alto o N/A
-        else:
-            lo, hi = 15, 30
-        if pe_val < lo:    return "barato vs sector", "#00ffad"
-        elif pe_val > hi:  return "caro vs sector", "#f23645"
+        q = bench.quality('pe', pe_val, sector, industry)
+        if q is None:      return None, None
+        if q > 75:         return "barato vs sector", "#00ffad"
+        elif q < 25:       return "caro vs sector", "#f23645"
         else:              return "valoración razonable vs sector", "#ff9800"
 
-    def roe_thresholds():
-        """ROE esperado varía por sector."""
-        if 'financial' in sector or 'bank' in industry:
-            return 0.10, 0.05   # bancos con ROE >10% = bueno
-        elif 'real estate' in sector:
-            return 0.08, 0.03
-        else:
-            return 0.20, 0.05   # tech/consumer: >20% = bueno
-
     pe         = _safe(info.get('trailingPE'))
     forward_pe = _safe(info.get('forwardPE'))
     cp         = target_data.get('current', 0) or 0
@@ -1183,9 +1272,9 @@ def get_suggestions(info, recommendations, target_data, profitability, metrics=N
 
     roe = profitability.get('roe')
     if roe is not None:
-        roe_hi, roe_lo = roe_thresholds()
-        if roe > roe_hi * 1.5:  suggestions.append(f"💎 ROE excepcional ({roe*100:.1f}%) para el sector {info.get('sector','N/A')} — empresa muy eficiente.")
-        elif roe > roe_hi:       suggestions.append(f"💚 ROE sólido ({roe*100:.1f}%) — buena rentabilidad sobre fondos propios.")
+        roe_q = bench.quality('roe', roe, sector, industry) or 0
+        if roe_q >= 90 and roe > 0: suggestions.append(f"💎 ROE excepcional ({roe*100:.1f}%) para el sector {info.get('sector','N/A')} — empresa muy eficiente.")
+        elif roe_q > 75 and roe > 0: suggestions.append(f"💚 ROE sólido ({roe*100:.1f}%) — buena rentabilidad sobre fondos propios.")
         elif roe < 0:            suggestions.append(f"🔴 ROE negativo ({roe*100:.1f}%) — empresa destruyendo valor actualmente.")
 
     nm = profitability.get('net_margin')
@@ -1245,26 +1334,30 @@ def compute_rsu_score(info, metrics, profitability, market, recommendations, tar
     fcf = profitability.get('free_cashflow')
     op_m = profitability.get('op_margin')
 
-    # Márgenes netos — contexto sectorial
+    # Márgenes y ROE — percentil dentro de su industria/sector (sector_benchmarks)
+    bench = get_benchmarks()
+    nm_q  = bench.quality('net_margin', nm, sector, industry)
+    roe_q = bench.quality('roe', roe, sector, industry)
+    op_q  = bench.quality('op_margin', op_m, sector, industry)
+
     if nm is not None:
-        if 'financial' in sector or 'bank' in industry:
-            q_score += 5
-        elif nm > 0.20:  q_score += 8
-        elif nm > 0.10:  q_score += 6
-        elif nm > 0.02:  q_score += 3
-        elif nm < 0 and not is_pre_revenue:  q_score -= 3   # no penalizar si es pre-revenue
+        if nm < 0 and not is_pre_revenue:  q_score -= 3   # no penalizar si es pre-revenue
+        elif nm_q is not None and nm > 0:
+            if nm_q >= 90:   q_score += 8
+            elif nm_q >= 50: q_score += 6
+            elif nm_q >= 25: q_score += 3
 
     if roe is not None:
-        roe_hi = 0.10 if ('financial' in sector) else 0.15
-        if roe > roe_hi * 2:   q_score += 8
-        elif roe > roe_hi:     q_score += 5
-        elif roe < 0 and not is_pre_revenue: q_score -= 4
+        if roe < 0 and not is_pre_revenue: q_score -= 4
+        elif roe_q is not None and roe > 0:
+            if roe_q >= 90:   q_score += 8
+            elif roe_q > 75:  q_score += 5
 
     if fcf is not None:
         if fcf > 0:   q_score += 5
         elif fcf < 0 and not is_pre_revenue: q_score -= 2
 
-    if op_m is not None and op_m > 0.15:
+    if op_q is not None and op_m > 0 and op_q > 75:
         q_score += 4
 
     q_score = max(0, min(25, q_score))
@@ -1275,22 +1368,13 @@ def compute_rsu_score(info, metrics, profitability, market, recommendations, tar
     forward_pe = metrics.get('forward_pe')
     peg = metrics.get('peg_ratio')
 
-    if 'technology' in sector or 'communication' in sector:
-        pe_cheap, pe_fair, pe_exp = 20, 35, 55
-    elif 'financial' in sector or 'bank' in industry:
-        pe_cheap, pe_fair, pe_exp = 8, 15, 22
-    elif 'utilities' in sector or 'real estate' in sector:
-        pe_cheap, pe_fair, pe_exp = 10, 18, 28
-    elif 'health' in sector or 'biotech' in industry:
-        pe_cheap, pe_fair, pe_exp = 15, 40, 80
-    else:
-        pe_cheap, pe_fair, pe_exp = 12, 22, 35
-
-    if pe and pe > 0:
-        if pe < pe_cheap:       v_score += 8
-        elif pe < pe_fair:      v_score += 4
-        elif pe > pe_exp:       v_score -= 6
-        elif pe > pe_fair:      v_score -= 3
+    # Percentil del P/E en su grupo: barato < p25, justo ~ p50, caro > p90
+    pe_p = bench.percentile('pe', pe, sector, industry) if (pe and pe > 0) else None
+    if pe_p is not None:
+        if pe_p < 25:       v_score += 8
+        elif pe_p < 50:     v_score += 4
+        elif pe_p > 90:     v_score -= 6
+        elif pe_p > 50:     v_score -= 3
 
     if peg and peg > 0:
         if peg < 1.0:   v_score += 5
@@ -1375,74 +1459,13 @@ def compute_rsu_score(info, metrics, profitability, market, recommendations, tar
 # ────────────────────────────────────────────────
 
 def sector_metric_color(metric_name, value, sector, industry):
-    """Devuelve color (#hex) para una métrica considerando el sector."""
+    """
+    Devuelve color (#hex) para una métrica según su percentil en la industria o
+    el sector (tabla precalculada del universo, ver sector_benchmarks).
+    """
     v = _safe(value)
     if v is None: return "#888"
-
-    s = (sector or '').lower()
-    ind = (industry or '').lower()
-
-    # Thresholds por tipo de métrica y sector
-    THRESHOLDS = {
-        'pe': {
-            'tech':    (20, 50), 'comm': (18, 45), 'fin': (8, 18),
-            'util':    (12, 22), 'real': (12, 25), 'health': (15, 60),
-            'default': (12, 28),
-        },
-        'roe': {
-            'fin':     (0.10, 0.05), 'real': (0.08, 0.03),
-            'default': (0.20, 0.08),
-        },
-        'net_margin': {
-            'fin':     (0.18, 0.08), 'real': (0.10, 0.02),
-            'util':    (0.08, 0.03), 'health': (0.12, 0.00),
-            'default': (0.15, 0.05),
-        },
-        'de': {
-            'fin':     (300, 600),   # bancos: D/E muy alto es normal
-            'util':    (100, 200),
-            'real':    (80, 200),
-            'default': (50, 150),
-        },
-    }
-
-    def _sector_key(s, ind):
-        if 'technology' in s or 'software' in ind: return 'tech'
-        if 'communication' in s: return 'comm'
-        if 'financial' in s or 'bank' in ind: return 'fin'
-        if 'utilities' in s: return 'util'
-        if 'real estate' in s: return 'real'
-        if 'health' in s or 'biotech' in ind: return 'health'
-        return 'default'
-
-    sk = _sector_key(s, ind)
-
-    if metric_name == 'pe':
-        thr = THRESHOLDS['pe'].get(sk, THRESHOLDS['pe']['default'])
-        if v < thr[0]: return "#00ffad"
-        if v > thr[1]: return "#f23645"
-        return "#ff9800"
-
-    elif metric_name == 'roe':
-        thr = THRESHOLDS['roe'].get(sk, THRESHOLDS['roe']['default'])
-        if v > thr[0]:  return "#00ffad"
-        if v < thr[1]:  return "#f23645"
-        return "#ff9800"
-
-    elif metric_name == 'net_margin':
-        thr = THRESHOLDS['net_margin'].get(sk, THRESHOLDS['net_margin']['default'])
-        if v > thr[0]:  return "#00ffad"
-        if v < thr[1]:  return "#f23645"
-        return "#ff9800"
-
-    elif metric_name == 'de':
-        thr = THRESHOLDS['de'].get(sk, THRESHOLDS['de']['default'])
-        if v < thr[0]:  return "#00ffad"
-        if v > thr[1]:  return "#f23645"
-        return "#ff9800"
-
-    # Fallback genérico
-    return "#888"
+    return get_benchmarks().color(metric_name, v, sector, industry) or "#888"
 
 # ────────────────────────────────────────────────
 # PROMPT IA
@@ -1837,6 +1860,64 @@ def inject_css():
     </style>
     """, unsafe_allow_html=True)
 
+# ────────────────────────────────────────────────
+# SCREENER FUNDAMENTAL — RSU Score del universo (job nocturno)
+# ────────────────────────────────────────────────
+
+@st.cache_data(show_spinner=False)
+def _load_fundamental_screen(mtime):
+    """Resultado del screener nocturno; `mtime` invalida la caché al regenerarse."""
+    return load_screen()
+
+
+def render_fundamental_screener():
+    try:
+        mtime = os.path.getmtime(SCREEN_PATH)
+    except OSError:
+        return
+    df, meta = _load_fundamental_screen(mtime)
+    if df is None or df.empty:
+        return
+
+    with st.expander(f"🔎 Screener fundamental — RSU Score de {len(df)} empresas", expanded=False):
+        sectors = sorted(s for s in df['sector'].dropna().unique() if s)
+        c1, c2, c3, c4 = st.columns([2, 1.5, 1, 1.5])
+        with c1:
+            sector = st.selectbox("Sector", ["Todos"] + sectors, key="fs_sector")
+        with c2:
+            min_score = st.slider("Score mínimo", 0, 100, 0, 5, key="fs_min")
+        with c3:
+            top = st.selectbox("Top", [25, 50, 100, 0], index=1,
+                               format_func=lambda n: "Todos" if n == 0 else str(n), key="fs_top")
+        with c4:
+            sort_by = st.selectbox("Ordenar por", ['total', 'calidad', 'valoracion', 'momentum',
+                                                   'consenso', 'upside', 'pe', 'roe'], key="fs_sort")
+
+        res = query_screen(df, sector=None if sector == "Todos" else sector,
+                           min_score=min_score, top=top, sort_by=sort_by)
+        view = pd.DataFrame({
+            '#':           res['rank'] if sector == "Todos" else res['sector_rank'],
+            'Ticker':      res['ticker'],
+            'Empresa':     res['name'],
+            'Sector':      res['sector'],
+            'RSU':         res['total'],
+            'Nivel':       res['label'],
+            'Cal.':        res['calidad'],
+            'Val.':        res['valoracion'],
+            'Mom.':        res['momentum'],
+            'Cons.':       res['consenso'],
+            'P/E':         res['pe'].map(fmt_x),
+            'Mg. Neto':    res['net_margin'].map(lambda v: fmt_pct(v, 100)),
+            'ROE':         res['roe'].map(lambda v: fmt_pct(v, 100)),
+            'Upside':      res['upside'].map(lambda v: f"{v:+.1f}%" if pd.notna(v) else "N/D"),
+            'Market Cap':  res['market_cap'].map(lambda v: format_value(v, '$')),
+            'Señales':     res['signals'],
+        })
+        st.dataframe(view, use_container_width=True, hide_index=True)
+        st.caption(f"Generado {str(meta.get('generated_at', ''))[:16].replace('T', ' ')} UTC · "
+                   f"universo {meta.get('universe', len(df))} · percentiles por sector/industria · "
+                   "consenso aproximado por recommendationMean")
+
 # ────────────────────────────────────────────────
 # RENDER PRINCIPAL
 # ────────────────────────────────────────────────
@@ -1881,6 +1962,7 @@ def render():
             </div>
         </div>
         """, unsafe_allow_html=True)
+        render_fundamental_screener()
         return
 
     st.session_state['last_ticker'] = t_in
@@ -2176,10 +2258,13 @@ def render():
             v = _safe(val)
             if v is None: return "#888"
             if v < 0: return "#f23645"
-            # P/E — sector-aware via the global function
-            if name == "P/E":        return sector_metric_color('pe', v, sector, industry)
+            # Percentil del sector/industria cuando la tabla lo cubre
+            bench_key = {"P/E": 'pe', "Forward P/E": 'forward_pe', "P/S": 'ps',
+                         "EV/EBITDA": 'ev_ebitda', "PEG Ratio": 'peg'}.get(name)
+            color = get_benchmarks().color(bench_key, v, sector, industry) if bench_key else None
+            if color: return color
             if name == "Forward P/E": return sector_metric_color('pe', v, sector, industry)
-            # Other metrics: use fixed thresholds (no sectorial distortion for these)
+            # Sin referencia sectorial: umbrales fijos
             thresholds = {
                 "P/S": (2, 8), "EV/EBITDA": (10, 20), "PEG Ratio": (1, 2), "P/B": (1, 4),
             }
@@ -3397,6 +3482,20 @@ def render():
                 color = "#00ffad" if step.startswith("✅") else ("#ff9800" if step.startswith("⚠️") else "#f23645")
                 st.markdown(f'<div style="font-family:monospace;font-size:0.78rem;color:{color};padding:2px 0;">{step}</div>',
                             unsafe_allow_html=True)
+    with st.expander("📡 Cuota de proveedores de datos", expanded=False):
+        # La columna se arma desde los dicts: en el DataFrame los None sin tope diario serían NaN
+        _rows = quota_report()
+        for _r in _rows:
+            _r['per_day'] = f"{_r['calls_today']}/{_r['per_day']}" if _r['per_day'] else '—'
+        _q = pd.DataFrame(_rows)
+        st.dataframe(
+            _q[['provider', 'per_day', 'rate_per_min', 'tokens', 'calls', 'cache_hits', 'dedup',
+                'stale', 'throttled', 'quota_blocked', 'errors', 'last_error']].rename(columns={
+                'provider': 'Proveedor', 'per_day': 'Hoy / día', 'rate_per_min': 'Req/min',
+                'tokens': 'Tokens', 'calls': 'Llamadas', 'cache_hits': 'Caché', 'dedup': 'Agrupadas',
+                'stale': 'Stale', 'throttled': '429', 'quota_blocked': 'Sin cuota', 'errors': 'Errores',
+                'last_error': 'Último error'}),
+            use_container_width=True, hide_index=True)
     st.markdown(f"""
     <div class="mod-box">
         <div class="mod-header">
@@ -1,4 +1,8 @@
 # -*- coding: utf-8 -*-
+import hashlib
+import os
+import re
+import threading
 import streamlit as st
 import pandas as pd
 import numpy as np
@@ -6,12 +10,13 @@ import yfinance as yf
 from datetime import datetime, timedelta
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.model_selection import TimeSeriesSplit
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, roc_auc_score
 from sklearn.calibration import CalibratedClassifierCV
+import joblib
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -86,8 +91,100 @@ def download_data(symbol, period, interval):
             data.index = data.index.tz_localize(None)
     return data
 
+# ── Caché de barras por símbolo: 1 descarga 1h → 4H / 1D / 1W locales ──
+
+BAR_CACHE_PERIOD = '720d'   # Yahoo limita el histórico 1h a ~730 días
+OHLCV_AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+# Timeframe principal de la UI → (periodo, intervalo) de descarga directa
+TF_DOWNLOAD_MAP = {"15m": ("5d", "15m"), "1h": ("1mo", "1h"), "4h": ("3mo", "1h"), "1d": ("1y", "1d")}
+# Timeframe principal de la UI → (clave en la caché de barras, días de ventana)
+TF_BAR_WINDOW   = {"1h": ("1H", 30), "4h": ("4H", 92), "1d": ("1D", 365)}
+
+
+def _agg_ohlcv(df, keys):
+    agg = {c: f for c, f in OHLCV_AGG.items() if c in df.columns}
+    return df.groupby(keys).agg(agg).dropna(subset=['Close'])
+
+
+def resample_session_bars(hourly, bars_per_group=4):
+    """
+    Agrupa barras 1h en bloques de N barras dentro de cada sesión (fecha local),
+    de modo que el 4H de acciones USA queda 09:30–13:30 / 13:30–16:00 y nunca
+    mezcla el cierre de un día con la apertura del siguiente.
+    """
+    sess  = hourly.index.normalize()
+    slot  = hourly.groupby(sess).cumcount().values // bars_per_group
+    first = pd.Series(hourly.index, index=hourly.index).groupby([sess, slot]).transform('first')
+    return _agg_ohlcv(hourly, first.values)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_bar_cache(symbol):
+    """
+    Una sola petición 1h por símbolo; los timeframes superiores se construyen
+    localmente: {'1H', '4H', '1D', '1W'} → DataFrame OHLCV sin timezone.
+    """
+    raw = download_data(symbol, BAR_CACHE_PERIOD, '1h')
+    if raw.empty:
+        return {}
+    hourly = flatten_columns(raw)
+    hourly = hourly[[c for c in OHLCV_AGG if c in hourly.columns]].dropna(subset=['Close'])
+    if hourly.empty:
+        return {}
+    daily  = _agg_ohlcv(hourly, hourly.index.normalize())
+    weekly = _agg_ohlcv(daily, pd.Grouper(freq='W-FRI'))
+    return {'1H': hourly, '4H': resample_session_bars(hourly, 4), '1D': daily, '1W': weekly}
+
+
+def get_analysis_bars(symbol, timeframe):
+    """Barras del timeframe principal desde la caché por símbolo (15m: descarga propia)."""
+    if timeframe in TF_BAR_WINDOW:
+        tf, days = TF_BAR_WINDOW[timeframe]
+        df = get_bar_cache(symbol).get(tf)
+        if df is not None and not df.empty:
+            return df[df.index >= df.index[-1] - pd.Timedelta(days=days)]
+    period, interval = TF_DOWNLOAD_MAP.get(timeframe, ("1y", "1d"))
+    return download_data(symbol, period, interval)
+
+
+def _trend_from_bars(tf, data):
+    if data is None or data.empty:
+        return {'trend': 'NO_DATA', 'strength': 0}
+    data = flatten_columns(data)
+    if 'Close' not in data.columns or len(data) < 50:
+        return {'trend': 'INSUFFICIENT_DATA', 'strength': 0}
+    close = ensure_1d_series(data['Close'])
+    ema_fast = calculate_ema(close, 9 if tf in ['15m', '1H'] else 20)
+    ema_slow = calculate_ema(close, 21 if tf in ['15m', '1H'] else 50)
+    current_price = float(close.iloc[-1])
+    ema_fast_val = float(ema_fast.iloc[-1])
+    ema_slow_val = float(ema_slow.iloc[-1])
+    trend = "BULLISH" if ema_fast_val > ema_slow_val else "BEARISH"
+    strength = abs(ema_fast_val - ema_slow_val) / current_price * 100
+    return {
+        'trend': trend, 'strength': float(strength),
+        'price': float(current_price), 'ema_fast': float(ema_fast_val), 'ema_slow': float(ema_slow_val)
+    }
+
+
 @st.cache_data(ttl=300, show_spinner=False)
-def get_multi_timeframe_trend(symbol):
+def get_multi_timeframe_trend(symbol, resample=True):
+    """
+    Tendencia EMA rápida/lenta por timeframe.
+    resample=True  → 1W/1D/4H/1H derivados de la caché de barras (1 petición).
+    resample=False → modo clásico 1D/4H/1H/15m con una descarga por timeframe.
+    """
+    if resample:
+        bars = get_bar_cache(symbol)
+        trends = {}
+        for tf in ['1W', '1D', '4H', '1H']:
+            try:
+                trends[tf] = _trend_from_bars(tf, bars.get(tf))
+            except Exception as e:
+                trends[tf] = {'trend': 'ERROR', 'strength': 0, 'error': str(e)}
+        return trends
+
     timeframes = {
         '1D': ('1y', '1d'),
         '4H': ('3mo', '1h'),
@@ -97,24 +194,7 @@ def get_multi_timeframe_trend(symbol):
 
     def fetch_tf(tf, period, interval):
         try:
-            data = download_data(symbol, period, interval)
-            if data.empty:
-                return tf, {'trend': 'NO_DATA', 'strength': 0}
-            data = flatten_columns(data)
-            if 'Close' not in data.columns or len(data) < 50:
-                return tf, {'trend': 'INSUFFICIENT_DATA', 'strength': 0}
-            close = ensure_1d_series(data['Close'])
-            ema_fast = calculate_ema(close, 9 if tf in ['15m', '1H'] else 20)
-            ema_slow = calculate_ema(close, 21 if tf in ['15m', '1H'] else 50)
-            current_price = float(close.iloc[-1])
-            ema_fast_val = float(ema_fast.iloc[-1])
-            ema_slow_val = float(ema_slow.iloc[-1])
-            trend = "BULLISH" if ema_fast_val > ema_slow_val else "BEARISH"
-            strength = abs(ema_fast_val - ema_slow_val) / current_price * 100
-            return tf, {
-                'trend': trend, 'strength': float(strength),
-                'price': float(current_price), 'ema_fast': float(ema_fast_val), 'ema_slow': float(ema_slow_val)
-            }
+            return tf, _trend_from_bars(tf, download_data(symbol, period, interval))
         except Exception as e:
             return tf, {'trend': 'ERROR', 'strength': 0, 'error': str(e)}
 
@@ -180,7 +260,8 @@ def calculate_rsu_score(z_score, trend_alignment, volume_score, rsi_value):
     z_points = 40 if z_abs <= 0.5 else 30 if z_abs <= 1.0 else 15 if z_abs <= 2.0 else 0
 
     # Pesos por timeframe: mayor timeframe = mayor peso (jerarquía de tendencia)
-    TF_WEIGHTS = {'1D': 0.45, '4H': 0.30, '1H': 0.15, '15m': 0.10}
+    # 1W sustituye a 15m en el modo resample (mismo peso de contexto)
+    TF_WEIGHTS = {'1D': 0.45, '4H': 0.30, '1H': 0.15, '15m': 0.10, '1W': 0.10}
     weighted_bullish = 0.0
     total_weight = 0.0
     valid_trends = {}
@@ -289,7 +370,7 @@ def create_trend_alignment_chart(trends):
     timeframes = list(trends.keys())
     values, bar_colors, status_labels, weight_labels = [], [], [], []
 
-    TF_WEIGHTS = {'1D': 45, '4H': 30, '1H': 15, '15m': 10}
+    TF_WEIGHTS = {'1D': 45, '4H': 30, '1H': 15, '15m': 10, '1W': 10}
 
     for tf in timeframes:
         trend = trends.get(tf, {}).get('trend', 'ERROR')
@@ -967,10 +1048,10 @@ def render_explanation_section():
                 <td>Tendencia corto plazo.</td>
             </tr>
             <tr>
-                <td style="padding:5px 8px; color:#888;"><b>15m — 15 Min</b></td>
-                <td style="text-align:center;">EMA 9</td><td style="text-align:center;">EMA 21</td>
+                <td style="padding:5px 8px; color:#888;"><b>1W — Semanal</b></td>
+                <td style="text-align:center;">EMA 20</td><td style="text-align:center;">EMA 50</td>
                 <td style="text-align:center; color:#888;"><b>10%</b></td>
-                <td>Micro-tendencia. Muy ruidosa.</td>
+                <td>Contexto de largo plazo (sustituye a 15m; derivado de la misma descarga 1h).</td>
             </tr>
         </table>
     </div>
@@ -1394,25 +1475,15 @@ def render_risks_section():
 # BACKTEST + ML ENGINE
 # ────────────────────────────────────────────────
 
-@st.cache_data(ttl=600, show_spinner=False)
-def build_feature_matrix(symbol, horizon_days=5):
+def _feature_frames(close, volume, open_):
     """
-    Descarga 2 años de datos diarios y construye features + etiquetas para ML/backtest.
-    Label: 1 si el precio sube >= 1% en los próximos `horizon_days` días, else 0.
+    Las 13 features como dict {nombre: Series|DataFrame}. Todas las operaciones son
+    elemento a elemento / por columna, así que sirve igual para un símbolo (Series)
+    que para un panel alineado (DataFrame fechas × símbolos).
     """
-    raw = download_data(symbol, '2y', '1d')
-    if raw.empty or len(raw) < 100:
-        return None, "Datos insuficientes para backtest (mínimo 100 días)."
-    data = flatten_columns(raw).copy()
-
-    close  = ensure_1d_series(data['Close'])
-    volume = ensure_1d_series(data['Volume']) if 'Volume' in data.columns else pd.Series(1, index=close.index)
-    open_  = ensure_1d_series(data['Open'])   if 'Open'  in data.columns else close
-
-    # ── Features ──────────────────────────────────────────────
-    ema9  = calculate_ema(close, 9)
-    ema21 = calculate_ema(close, 21)
-    ema50 = calculate_ema(close, 50)
+    ema9  = close.ewm(span=9,  adjust=False).mean()
+    ema21 = close.ewm(span=21, adjust=False).mean()
+    ema50 = close.ewm(span=50, adjust=False).mean()
 
     # Z-Score (retornos log, estacionario)
     log_ret   = np.log(close / close.shift(1))
@@ -1421,47 +1492,55 @@ def build_feature_matrix(symbol, horizon_days=5):
     z_score   = dev_pct / std20.replace(0, np.nan)
 
     # RSI Wilder
-    rsi = calculate_rsi(close, 14)
-
-    # Momentum
-    ret_1d  = close.pct_change(1)
-    ret_5d  = close.pct_change(5)
-    ret_20d = close.pct_change(20)
-
-    # EMA slopes (velocidad de tendencia)
-    ema21_slope = ema21.pct_change(3)
-    ema50_slope = ema50.pct_change(5)
-
-    # Cruce EMA rápida/lenta (señal binaria)
-    ema_cross = (ema9 > ema21).astype(int)
+    delta    = close.diff()
+    avg_gain = delta.where(delta > 0, 0.0).ewm(com=13, min_periods=14, adjust=False).mean()
+    avg_loss = (-delta.where(delta < 0, 0.0)).ewm(com=13, min_periods=14, adjust=False).mean()
+    rsi      = 100 - (100 / (1 + avg_gain / avg_loss.replace(0, 1e-10)))
 
     # Volumen relativo y direccional
     vol_avg20 = volume.rolling(20).mean()
-    vol_ratio = volume / vol_avg20.replace(0, 1)
     bull_vol  = volume.where(close >= open_, 0)
     bear_vol  = volume.where(close < open_,  0)
-    vol_dir   = (bull_vol.rolling(10).sum() /
-                 (bull_vol.rolling(10).sum() + bear_vol.rolling(10).sum() + 1e-9))
-
-    # Volatilidad
-    atr = (close.rolling(14).std() / close)
+    bull_10   = bull_vol.rolling(10).sum()
+    bear_10   = bear_vol.rolling(10).sum()
 
-    # ── Feature DataFrame ──────────────────────────────────────
-    feat = pd.DataFrame({
+    return {
         'z_score':      z_score,
         'rsi':          rsi,
-        'ret_1d':       ret_1d,
-        'ret_5d':       ret_5d,
-        'ret_20d':      ret_20d,
-        'ema21_slope':  ema21_slope,
-        'ema50_slope':  ema50_slope,
-        'ema_cross':    ema_cross,
-        'vol_ratio':    vol_ratio,
-        'vol_dir':      vol_dir,
-        'atr':          atr,
+        # Momentum
+        'ret_1d':       close.pct_change(1),
+        'ret_5d':       close.pct_change(5),
+        'ret_20d':      close.pct_change(20),
+        # EMA slopes (velocidad de tendencia)
+        'ema21_slope':  ema21.pct_change(3),
+        'ema50_slope':  ema50.pct_change(5),
+        # Cruce EMA rápida/lenta (señal binaria)
+        'ema_cross':    (ema9 > ema21).astype(int),
+        'vol_ratio':    volume / vol_avg20.replace(0, 1),
+        'vol_dir':      bull_10 / (bull_10 + bear_10 + 1e-9),
+        # Volatilidad
+        'atr':          close.rolling(14).std() / close,
         'ema9_vs_21':   (ema9 - ema21) / ema21,
         'ema21_vs_50':  (ema21 - ema50) / ema50,
-    }, index=close.index)
+    }
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def build_feature_matrix(symbol, horizon_days=5):
+    """
+    Descarga 2 años de datos diarios y construye features + etiquetas para ML/backtest.
+    Label: 1 si el precio sube >= 1% en los próximos `horizon_days` días, else 0.
+    """
+    raw = download_data(symbol, '2y', '1d')
+    if raw.empty or len(raw) < 100:
+        return None, "Datos insuficientes para backtest (mínimo 100 días)."
+    data = flatten_columns(raw).copy()
+
+    close  = ensure_1d_series(data['Close'])
+    volume = ensure_1d_series(data['Volume']) if 'Volume' in data.columns else pd.Series(1, index=close.index)
+    open_  = ensure_1d_series(data['Open'])   if 'Open'  in data.columns else close
+
+    feat = pd.DataFrame(_feature_frames(close, volume, open_), index=close.index)
 
     # ── Label: retorno futuro > +1% en horizon_days ────────────
     future_ret = close.shift(-horizon_days) / close - 1
@@ -1474,23 +1553,16 @@ def build_feature_matrix(symbol, horizon_days=5):
     return feat, None
 
 
-@st.cache_data(ttl=600, show_spinner=False)
-def train_ml_model(symbol, horizon_days=5):
-    """Entrena Random Forest con TimeSeriesSplit (sin data leakage) y calibra probabilidades."""
-    feat_df, err = build_feature_matrix(symbol, horizon_days)
-    if feat_df is None:
-        return None, None, None, err
+FEATURE_COLS = ['z_score','rsi','ret_1d','ret_5d','ret_20d',
+                'ema21_slope','ema50_slope','ema_cross',
+                'vol_ratio','vol_dir','atr','ema9_vs_21','ema21_vs_50']
 
-    feature_cols = ['z_score','rsi','ret_1d','ret_5d','ret_20d',
-                    'ema21_slope','ema50_slope','ema_cross',
-                    'vol_ratio','vol_dir','atr','ema9_vs_21','ema21_vs_50']
 
+def _fit_ml_model(feat_df, feature_cols=FEATURE_COLS):
+    """Ajuste puro (sin Streamlit): RF calibrado, split 80/20 cronológico."""
     X = feat_df[feature_cols].values
     y = feat_df['label'].values
 
-    if len(X) < 80:
-        return None, None, None, "Histórico demasiado corto para entrenar."
-
     # TimeSeriesSplit: respeta orden cronológico, sin mirar el futuro
     tscv   = TimeSeriesSplit(n_splits=5)
     scaler = StandardScaler()
@@ -1542,9 +1614,485 @@ def train_ml_model(symbol, horizon_days=5):
     prob_now   = float(model.predict_proba(X_current)[0, 1])
 
     return model, scaler, {'metrics': metrics, 'prob_now': prob_now,
-                           'feat_df': feat_df, 'feature_cols': feature_cols,
+                           'feature_cols': feature_cols,
                            'y_test': y_test, 'y_prob': y_prob,
-                           'X_test_dates': feat_df.index[split_idx:]}, None
+                           'X_test_dates': feat_df.index[split_idx:]}
+
+
+# ── Registro de modelos en disco ───────────────────────────────
+# Clave: (símbolo, horizonte, versión del feature set, última barra).
+# Si la última barra no cambia, el modelo se reutiliza entre sesiones/reinicios.
+
+FEATURE_SET_VERSION = "fs1"
+MODEL_REGISTRY_DIR  = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   "data", "ema_edge_models")
+
+_MODEL_MEMO    = {}   # key → artefacto cargado (memoria del proceso)
+_PENDING_FITS  = {}   # key → Future del worker de entrenamiento
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _registry_key(symbol, horizon_days, last_bar):
+    safe = re.sub(r'[^A-Za-z0-9._-]', '_', symbol.upper())
+    return f"{safe}__h{horizon_days}__{FEATURE_SET_VERSION}__{pd.Timestamp(last_bar):%Y%m%d}"
+
+
+def _registry_path(key):
+    return os.path.join(MODEL_REGISTRY_DIR, f"{key}.joblib")
+
+
+def load_registered_model(key):
+    """Carga perezosa del artefacto: memoria del proceso → disco. None si no existe."""
+    with _REGISTRY_LOCK:
+        if key in _MODEL_MEMO:
+            return _MODEL_MEMO[key]
+    path = _registry_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        artifact = joblib.load(path)
+    except Exception:
+        return None
+    with _REGISTRY_LOCK:
+        _MODEL_MEMO[key] = artifact
+    return artifact
+
+
+def _save_artifact(key, artifact):
+    """Escritura atómica y purga de versiones anteriores del mismo símbolo/horizonte."""
+    os.makedirs(MODEL_REGISTRY_DIR, exist_ok=True)
+    path = _registry_path(key)
+    tmp  = f"{path}.tmp"
+    joblib.dump(artifact, tmp, compress=3)
+    os.replace(tmp, path)
+    prefix = key.rsplit("__", 1)[0] + "__"
+    for fname in os.listdir(MODEL_REGISTRY_DIR):
+        if fname.startswith(prefix) and fname != os.path.basename(path):
+            try:
+                os.remove(os.path.join(MODEL_REGISTRY_DIR, fname))
+            except OSError:
+                pass
+            with _REGISTRY_LOCK:
+                _MODEL_MEMO.pop(fname[:-len(".joblib")], None)
+
+
+@st.cache_resource(show_spinner=False)
+def _get_training_executor():
+    """Worker único por proceso: serializa los ajustes y evita entrenar dos veces lo mismo."""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="ema_edge_fit")
+
+
+def _fit_and_register(key, feat_df):
+    try:
+        model, scaler, result = _fit_ml_model(feat_df)
+        artifact = {'model': model, 'scaler': scaler, 'result': result,
+                    'trained_at': datetime.now().isoformat(timespec='seconds')}
+        try:
+            _save_artifact(key, artifact)
+        except OSError:
+            pass  # disco de solo lectura: el modelo sigue vivo en memoria
+        with _REGISTRY_LOCK:
+            _MODEL_MEMO[key] = artifact
+        return artifact
+    finally:
+        with _REGISTRY_LOCK:
+            _PENDING_FITS.pop(key, None)
+
+
+def schedule_training(symbol, horizon_days=5, feat_df=None):
+    """
+    Encola el ajuste en el worker de fondo solo si el modelo no está registrado
+    para la última barra disponible. Retorna (key, Future | None). Solo lo usa el
+    precalentamiento; el ajuste interactivo de train_ml_model no pasa por la cola.
+    """
+    if feat_df is None:
+        feat_df, _ = build_feature_matrix(symbol, horizon_days)
+        if feat_df is None or len(feat_df) < 80:
+            return None, None
+    key = _registry_key(symbol, horizon_days, feat_df.index[-1])
+    if load_registered_model(key) is not None:
+        return key, None
+    with _REGISTRY_LOCK:
+        future = _PENDING_FITS.get(key)
+        if future is None:
+            future = _get_training_executor().submit(_fit_and_register, key, feat_df)
+            _PENDING_FITS[key] = future
+    return key, future
+
+
+def _prewarm_models(symbols, horizon_days):
+    for sym in symbols:
+        try:
+            schedule_training(sym, horizon_days)
+        except Exception:
+            pass  # un símbolo sin datos no debe frenar al resto
+
+
+def prewarm_models(symbols, horizon_days=5):
+    """
+    Precalienta el registro en segundo plano para `symbols` (p. ej. los mejores del
+    ranking de panel): la descarga de features y los ajustes corren en el worker,
+    así que la llamada vuelve al instante y abrir el modelo ML de esos símbolos
+    encuentra el artefacto ya registrado.
+    """
+    _get_training_executor().submit(_prewarm_models, tuple(symbols), horizon_days)
+
+
+def train_ml_model(symbol, horizon_days=5):
+    """
+    Random Forest con TimeSeriesSplit (sin data leakage) y probabilidades calibradas.
+    Reutiliza el modelo del registro si los datos no cambiaron; si no, lo ajusta en
+    el hilo de la sesión (sin cola compartida). Si otra sesión o el precalentamiento
+    ya está ajustando la misma clave, espera a ese ajuste en lugar de repetirlo; si
+    el precalentamiento aún no lo empezó, lo cancela y ajusta aquí.
+    """
+    feat_df, err = build_feature_matrix(symbol, horizon_days)
+    if feat_df is None:
+        return None, None, None, err
+
+    if len(feat_df) < 80:
+        return None, None, None, "Histórico demasiado corto para entrenar."
+
+    key = _registry_key(symbol, horizon_days, feat_df.index[-1])
+    artifact = load_registered_model(key)
+    if artifact is None:
+        with _REGISTRY_LOCK:
+            future = _PENDING_FITS.get(key)
+            # Un ajuste de precalentamiento todavía en cola no debe hacer esperar a la sesión
+            owner  = future is None or future.cancel()
+            if owner:
+                future = _PENDING_FITS[key] = Future()
+                future.set_running_or_notify_cancel()  # en curso: ya no se puede cancelar
+        try:
+            if owner:
+                try:
+                    future.set_result(_fit_and_register(key, feat_df))
+                except Exception as e:
+                    future.set_exception(e)
+            artifact = future.result()
+        except Exception as e:
+            return None, None, None, f"Error entrenando modelo: {e}"
+    if artifact is None:
+        return None, None, None, "Modelo no disponible."
+
+    result = dict(artifact['result'], feat_df=feat_df, trained_at=artifact.get('trained_at'))
+    return artifact['model'], artifact['scaler'], result, None
+
+
+# ── Walk-forward: re-entrenamiento por ventana deslizante ──────
+
+WF_CACHE_DIR   = os.path.join(MODEL_REGISTRY_DIR, "walkforward")
+WF_MEMO_MAX    = 32    # evaluaciones en memoria (LRU)
+WF_DISK_MAX    = 200   # ficheros en WF_CACHE_DIR; se purgan los más antiguos
+_WF_MEMO       = {}    # key → folds/oos (dict ordenado por último uso)
+_WF_LOCK       = threading.Lock()
+
+
+def _wf_fold(X_train, y_train, X_test):
+    """Worker de proceso: ajusta un fold y devuelve probabilidades out-of-sample."""
+    scaler = StandardScaler()
+    rf_base = RandomForestClassifier(
+        n_estimators=200, max_depth=6, min_samples_leaf=10,
+        class_weight='balanced', random_state=42, n_jobs=1
+    )
+    model = CalibratedClassifierCV(rf_base, cv=TimeSeriesSplit(n_splits=3), method='isotonic')
+    model.fit(scaler.fit_transform(X_train), y_train)
+    return model.predict_proba(scaler.transform(X_test))[:, 1]
+
+
+def _wf_hash(feat_df, horizon_days, train_size, test_size, expanding):
+    h = hashlib.sha1(pd.util.hash_pandas_object(feat_df[FEATURE_COLS + ['label']], index=True).values.tobytes())
+    h.update(f"{FEATURE_SET_VERSION}|{horizon_days}|{train_size}|{test_size}|{expanding}".encode())
+    return h.hexdigest()[:20]
+
+
+def _wf_memo_get(key):
+    with _WF_LOCK:
+        res = _WF_MEMO.pop(key, None)
+        if res is not None:
+            _WF_MEMO[key] = res
+        return res
+
+
+def _wf_memo_put(key, res):
+    with _WF_LOCK:
+        _WF_MEMO.pop(key, None)
+        _WF_MEMO[key] = res
+        while len(_WF_MEMO) > WF_MEMO_MAX:
+            _WF_MEMO.pop(next(iter(_WF_MEMO)))
+
+
+def _prune_wf_cache():
+    """Deja en disco solo las WF_DISK_MAX evaluaciones más recientes."""
+    try:
+        files = [os.path.join(WF_CACHE_DIR, f) for f in os.listdir(WF_CACHE_DIR) if f.endswith(".joblib")]
+    except OSError:
+        return
+    if len(files) <= WF_DISK_MAX:
+        return
+    files.sort(key=lambda f: os.path.getmtime(f) if os.path.exists(f) else 0)
+    for f in files[:-WF_DISK_MAX]:
+        try:
+            os.remove(f)
+        except OSError:
+            pass
+
+
+def _wf_trades(base, prob_threshold):
+    """Métricas que dependen del umbral, derivadas en cada llamada de los OOS cacheados."""
+    oos_df = base['oos']
+    trades = oos_df[oos_df['prob'] >= prob_threshold]
+    return dict(
+        base,
+        prob_threshold=prob_threshold,
+        equity_dates=list(trades.index), equity_rets=list(trades['future_ret']),
+        win_rate_trades=float((trades['future_ret'] > 0).mean()) if len(trades) else 0.0,
+    )
+
+
+def walk_forward_folds(n_rows, train_size=250, test_size=40, purge=5, expanding=False):
+    """Índices (train, test) que avanzan `test_size` filas; `purge` filas separan train y test."""
+    folds = []
+    start = train_size + purge
+    while start < n_rows:
+        test_hi  = min(start + test_size, n_rows)
+        train_hi = start - purge
+        train_lo = 0 if expanding else max(0, train_hi - train_size)
+        folds.append((np.arange(train_lo, train_hi), np.arange(start, test_hi)))
+        start = test_hi
+    return folds
+
+
+def walk_forward_evaluate(feat_df, horizon_days=5, train_size=250, test_size=40,
+                          expanding=False, prob_threshold=0.55, max_workers=None):
+    """
+    Evaluación walk-forward sobre una matriz de features ya construida (se reutiliza
+    en todos los folds). Cada fold se re-entrena en un ProcessPoolExecutor.
+    Las probabilidades OOS se cachean por hash de datos + parámetros (memoria y
+    disco); las métricas del umbral `prob_threshold` se derivan en cada llamada.
+    """
+    if feat_df is None or len(feat_df) < train_size + test_size + horizon_days:
+        return None, "Histórico insuficiente para walk-forward."
+
+    key = _wf_hash(feat_df, horizon_days, train_size, test_size, expanding)
+    base = _wf_memo_get(key)
+    if base is not None:
+        return _wf_trades(base, prob_threshold), None
+    path = os.path.join(WF_CACHE_DIR, f"{key}.joblib")
+    if os.path.exists(path):
+        try:
+            base = joblib.load(path)
+            _wf_memo_put(key, base)
+            return _wf_trades(base, prob_threshold), None
+        except Exception:
+            pass
+
+    X = feat_df[FEATURE_COLS].values
+    y = feat_df['label'].values
+    folds = walk_forward_folds(len(X), train_size, test_size, purge=horizon_days, expanding=expanding)
+    probs = [None] * len(folds)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers or min(len(folds), os.cpu_count() or 1)) as ex:
+            futures = {ex.submit(_wf_fold, X[tr], y[tr], X[te]): k for k, (tr, te) in enumerate(folds)}
+            for fut in as_completed(futures):
+                probs[futures[fut]] = fut.result()
+    except Exception:
+        # Sin multiproceso disponible → folds en serie
+        for k, (tr, te) in enumerate(folds):
+            if probs[k] is None:
+                probs[k] = _wf_fold(X[tr], y[tr], X[te])
+
+    fold_rows, oos = [], []
+    for k, ((tr, te), p) in enumerate(zip(folds, probs)):
+        y_te = y[te]
+        try:
+            auc = roc_auc_score(y_te, p)
+        except Exception:
+            auc = np.nan
+        fold_rows.append({
+            'fold': k + 1,
+            'train_desde': feat_df.index[tr[0]], 'test_desde': feat_df.index[te[0]],
+            'test_hasta': feat_df.index[te[-1]], 'n_test': len(te),
+            'auc': auc, 'win_rate_real': y_te.mean(),
+        })
+        oos.append(pd.DataFrame({'prob': p, 'label': y_te,
+                                 'future_ret': feat_df['future_ret'].values[te]},
+                                index=feat_df.index[te]))
+
+    oos_df   = pd.concat(oos)
+    folds_df = pd.DataFrame(fold_rows)
+    try:
+        auc_oos = roc_auc_score(oos_df['label'], oos_df['prob'])
+    except Exception:
+        auc_oos = 0.5
+
+    base = {
+        'oos': oos_df, 'folds': folds_df,
+        'auc_oos': round(float(auc_oos), 3),
+        'auc_fold_mean': round(float(folds_df['auc'].mean()), 3),
+        'auc_fold_std':  round(float(folds_df['auc'].std()), 3),
+        'n_folds': len(folds), 'n_oos': len(oos_df),
+    }
+    _wf_memo_put(key, base)
+    try:
+        os.makedirs(WF_CACHE_DIR, exist_ok=True)
+        joblib.dump(base, path, compress=3)
+        _prune_wf_cache()
+    except OSError:
+        pass
+    return _wf_trades(base, prob_threshold), None
+
+
+# ── Modo panel: un modelo agrupado para toda la watchlist ──────
+
+PANEL_WATCHLIST_DEFAULT = [
+    'AAPL', 'MSFT', 'NVDA', 'AMZN', 'GOOGL', 'META', 'TSLA', 'AVGO', 'AMD', 'NFLX',
+    'CRM', 'ORCL', 'ADBE', 'JPM', 'V', 'MA', 'BAC', 'GS', 'UNH', 'LLY',
+    'JNJ', 'ABBV', 'XOM', 'CVX', 'HD', 'COST', 'WMT', 'PG', 'KO', 'CAT',
+    'GE', 'BA', 'DIS', 'UBER', 'PLTR', 'SPY', 'QQQ', 'IWM',
+]
+PANEL_PREWARM_TOP = 5   # símbolos del ranking cuyo modelo ML se precalienta
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def download_panel(symbols_tuple, period='2y'):
+    """Una sola descarga batch → dict {campo OHLCV: DataFrame fechas × símbolos} alineado."""
+    symbols = list(dict.fromkeys(symbols_tuple))
+    raw = yf.download(symbols, period=period, interval='1d', progress=False,
+                      auto_adjust=True, threads=True)
+    if raw.empty:
+        return {}
+    if hasattr(raw.index, 'tz') and raw.index.tz is not None:
+        raw.index = raw.index.tz_localize(None)
+    panel = {}
+    for field in ['Open', 'High', 'Low', 'Close', 'Volume']:
+        if isinstance(raw.columns, pd.MultiIndex):
+            if field not in raw.columns.get_level_values(0):
+                continue
+            panel[field] = raw[field]
+        elif field in raw.columns:
+            panel[field] = raw[[field]].rename(columns={field: symbols[0]})
+    if 'Close' in panel:
+        valid = panel['Close'].columns[panel['Close'].notna().sum() >= 100]
+        panel = {f: df.reindex(columns=valid) for f, df in panel.items()}
+    return panel
+
+
+def build_panel_features(panel, horizon_days=5):
+    """
+    Features vectorizadas sobre el panel completo (una pasada por feature para todos
+    los símbolos). Retorna (feat_long etiquetado, latest sin etiqueta) indexados
+    por (date, symbol).
+    """
+    close  = panel['Close']
+    volume = panel.get('Volume', pd.DataFrame(1.0, index=close.index, columns=close.columns))
+    open_  = panel.get('Open', close)
+
+    frames = _feature_frames(close, volume, open_)
+    future_ret = close.shift(-horizon_days) / close - 1
+    frames['future_ret'] = future_ret
+    frames['label']      = (future_ret > 0.01).astype(float).where(future_ret.notna())
+
+    # Formato largo (date, symbol): ravel por filas == producto cartesiano fechas × símbolos
+    long_idx = pd.MultiIndex.from_product([close.index, close.columns], names=['date', 'symbol'])
+    long_df  = pd.DataFrame({k: v.reindex_like(close).to_numpy(dtype=float).ravel()
+                             for k, v in frames.items()}, index=long_idx)
+    long_df = long_df.dropna(subset=FEATURE_COLS)
+
+    labelled = long_df.dropna(subset=['label']).copy()
+    labelled['label'] = labelled['label'].astype(int)
+    latest = long_df.groupby(level='symbol', sort=False).tail(1)
+    return labelled, latest
+
+
+def _purged_splits(row_dates, n_splits=3, purge=5):
+    """
+    Splits cronológicos por fecha (no por fila) con purga: entre el final del train
+    y el inicio del test se eliminan `purge` sesiones para que las etiquetas
+    (retorno futuro a N días) no se solapen con el test.
+    """
+    row_dates = np.asarray(row_dates)
+    uniq = np.unique(row_dates)
+    bounds = np.linspace(0, len(uniq), n_splits + 2, dtype=int)
+    splits = []
+    for k in range(1, n_splits + 1):
+        test_lo, test_hi = bounds[k], bounds[k + 1]
+        train_hi = test_lo - purge
+        if train_hi <= 0 or test_hi <= test_lo:
+            continue
+        train_idx = np.flatnonzero(row_dates < uniq[train_hi])
+        test_idx  = np.flatnonzero((row_dates >= uniq[test_lo]) & (row_dates <= uniq[test_hi - 1]))
+        if len(train_idx) and len(test_idx):
+            splits.append((train_idx, test_idx))
+    return splits
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def rank_watchlist_panel(symbols_tuple, horizon_days=5):
+    """
+    Entrena un único modelo agrupado sobre toda la watchlist (features sin identidad
+    de símbolo, CV temporal purgada) y puntúa todos los símbolos con un solo
+    predict_proba. Retorna (ranking DataFrame, métricas, error).
+    """
+    panel = download_panel(tuple(sorted(set(symbols_tuple))))
+    if not panel or 'Close' not in panel or panel['Close'].shape[1] == 0:
+        return None, None, "No se pudieron descargar datos del panel."
+
+    labelled, latest = build_panel_features(panel, horizon_days)
+    if len(labelled) < 500:
+        return None, None, "Panel demasiado corto para entrenar."
+
+    # Holdout: último 20% de fechas, con purga de `horizon_days` sesiones
+    dates   = labelled.index.get_level_values('date').values
+    uniq    = np.unique(dates)
+    cut     = int(len(uniq) * 0.8)
+    train_m = dates < uniq[max(cut - horizon_days, 1)]
+    test_m  = dates >= uniq[cut]
+
+    X_train = labelled.loc[train_m, FEATURE_COLS].values
+    y_train = labelled.loc[train_m, 'label'].values
+    X_test  = labelled.loc[test_m,  FEATURE_COLS].values
+    y_test  = labelled.loc[test_m,  'label'].values
+
+    scaler = StandardScaler()
+    X_train_sc = scaler.fit_transform(X_train)
+
+    # Submuestreo por árbol: el panel tiene decenas de miles de filas y cada árbol
+    # ya ve más muestras que el modelo por símbolo completo
+    rf_base = RandomForestClassifier(
+        n_estimators=80, max_depth=6, min_samples_leaf=50, max_samples=0.1,
+        class_weight='balanced', random_state=42, n_jobs=-1
+    )
+    cv = _purged_splits(dates[train_m], n_splits=3, purge=horizon_days)
+    model = CalibratedClassifierCV(rf_base, cv=cv or 3, method='isotonic')
+    model.fit(X_train_sc, y_train)
+
+    y_prob = model.predict_proba(scaler.transform(X_test))[:, 1] if len(X_test) else np.array([])
+    try:
+        auc = roc_auc_score(y_test, y_prob)
+    except Exception:
+        auc = 0.5
+
+    # Puntuación batch: una fila (última barra) por símbolo, un solo predict_proba
+    probs = model.predict_proba(scaler.transform(latest[FEATURE_COLS].values))[:, 1]
+    ranking = pd.DataFrame({
+        'Símbolo':   latest.index.get_level_values('symbol'),
+        'Fecha':     latest.index.get_level_values('date').strftime('%Y-%m-%d'),
+        'Prob %':    np.round(probs * 100, 1),
+        'Z-Score':   latest['z_score'].round(2).values,
+        'RSI':       latest['rsi'].round(1).values,
+        'Ret 20d %': (latest['ret_20d'] * 100).round(2).values,
+        'Vol Ratio': latest['vol_ratio'].round(2).values,
+    }).sort_values('Prob %', ascending=False).reset_index(drop=True)
+
+    metrics = {
+        'auc':       round(auc, 3),
+        'n_symbols': int(panel['Close'].shape[1]),
+        'n_train':   int(train_m.sum()),
+        'n_test':    int(test_m.sum()),
+        'win_rate_real': round(float(y_test.mean()), 3) if len(y_test) else 0.0,
+    }
+    return ranking, metrics, None
 
 
 def run_backtest(feat_df, horizon_days=5, score_threshold=60):
@@ -1616,7 +2164,7 @@ def create_backtest_distribution(bt_df, horizon_days):
     return fig
 
 
-def create_equity_curve(equity_dates, equity_rets, symbol):
+def create_equity_curve(equity_dates, equity_rets, symbol, title='EQUITY CURVE // ENTRADAS Z≤1σ'):
     if not equity_dates:
         return go.Figure()
     cum = np.cumprod([1 + r for r in equity_rets])
@@ -1624,7 +2172,7 @@ def create_equity_curve(equity_dates, equity_rets, symbol):
     colors  = ['#00ffad' if r >= 0 else '#f23645' for r in equity_rets]
     fig = make_subplots(rows=2, cols=1, shared_xaxes=True,
                         row_heights=[0.7, 0.3], vertical_spacing=0.06,
-                        subplot_titles=('EQUITY CURVE // ENTRADAS Z≤1σ', 'RETORNO POR TRADE'))
+                        subplot_titles=(title, 'RETORNO POR TRADE'))
     fig.add_trace(go.Scatter(
         x=equity_dates, y=cum_pct,
         line=dict(color='#00ffad', width=2),
@@ -1715,6 +2263,32 @@ def create_ml_calibration_chart(y_test, y_prob):
     return fig
 
 
+def create_auc_over_time_chart(folds_df):
+    colors = ['#00ffad' if a > 0.55 else '#ff9800' if a >= 0.5 else '#f23645'
+              for a in folds_df['auc'].fillna(0.5)]
+    fig = go.Figure(go.Bar(
+        x=folds_df['test_desde'], y=folds_df['auc'],
+        marker_color=colors, marker_line=dict(color='rgba(0,255,173,0.3)', width=1),
+        text=[f"{a:.2f}" if pd.notna(a) else "n/a" for a in folds_df['auc']],
+        textposition='outside', textfont=dict(color='white', family='Courier New', size=10),
+        customdata=folds_df['n_test'],
+        hovertemplate='Test desde %{x|%Y-%m-%d}<br>AUC: %{y:.3f}<br>n=%{customdata}<extra></extra>'
+    ))
+    fig.add_hline(y=0.5, line_dash='dash', line_color='rgba(255,255,255,0.3)',
+                  annotation_text='0.50 (azar)', annotation_font_color='#888',
+                  annotation_font_family='Courier New')
+    fig.update_layout(
+        **PLOTLY_LAYOUT,
+        title=dict(text="AUC OUT-OF-SAMPLE POR FOLD // WALK-FORWARD",
+                   font=dict(color='#00d9ff', size=13, family='VT323,monospace')),
+        xaxis=dict(color='white', gridcolor='#1a1e26', tickfont=dict(family='Courier New')),
+        yaxis=dict(color='white', gridcolor='#1a1e26', range=[0, 1.1],
+                   title='AUC', tickfont=dict(family='Courier New')),
+        showlegend=False, height=320, margin=dict(l=50, r=20, t=55, b=40)
+    )
+    return fig
+
+
 def create_prob_gauge(prob, horizon_days):
     color = '#00ffad' if prob >= 0.6 else '#ff9800' if prob >= 0.45 else '#f23645'
     fig = go.Figure(go.Indicator(
@@ -1832,6 +2406,9 @@ def render_backtest_ml_section():
                         <span class="verdict-badge" style="background:#9c27b011;color:#9c27b0;border:1px solid #9c27b033;">
                             TEST {m['n_test']} días
                         </span>
+                        <span class="verdict-badge" style="background:#55555511;color:#888;border:1px solid #55555533;">
+                            MODELO {ml_result.get('trained_at') or 'N/A'}
+                        </span>
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
@@ -1963,6 +2540,129 @@ def render_backtest_ml_section():
                 """, unsafe_allow_html=True)
 
 
+def render_walk_forward_section():
+    st.markdown("""
+    <div style="font-family:'VT323',monospace; color:#00d9ff; font-size:1.3rem;
+                letter-spacing:3px; margin-bottom:12px;">
+        WALK-FORWARD // EVALUACIÓN OUT-OF-SAMPLE
+    </div>
+    <div style="font-family:'Courier New'; color:#aaa; font-size:11px; margin-bottom:12px; line-height:1.7;">
+        ▸ La ventana de entrenamiento avanza sobre el histórico y el modelo se re-entrena en cada fold.
+        Solo se reportan predicciones sobre datos que el modelo no vio.
+    </div>
+    """, unsafe_allow_html=True)
+
+    c1, c2, c3, c4 = st.columns([1, 1, 1, 1])
+    with c1:
+        train_size = st.selectbox("VENTANA TRAIN (días)", [150, 250, 350], index=1, key="wf_train")
+    with c2:
+        test_size = st.selectbox("PASO TEST (días)", [20, 40, 60], index=1, key="wf_test")
+    with c3:
+        expanding = st.checkbox("Ventana expansiva", value=False, key="wf_expanding")
+    with c4:
+        run_wf = st.button("// WALK-FORWARD", use_container_width=True, key="wf_run_btn")
+
+    if not run_wf:
+        return
+    symbol  = st.session_state.get("bt_symbol", "AAPL").upper().strip()
+    horizon = st.session_state.get("bt_horizon", 5)
+
+    feat_df, err = build_feature_matrix(symbol, horizon)
+    if feat_df is None:
+        st.error(err)
+        return
+    with st.spinner(f"Walk-forward {symbol} // re-entrenando folds en paralelo..."):
+        wf, err = walk_forward_evaluate(feat_df, horizon, train_size, test_size, expanding)
+    if err:
+        st.warning(err)
+        return
+
+    w1, w2, w3, w4 = st.columns(4)
+    with w1:
+        render_metric_card("AUC OOS", f"{wf['auc_oos']:.3f}", f"{wf['n_oos']} predicciones",
+                           '#00ffad' if wf['auc_oos'] > 0.55 else '#ff9800')
+    with w2:
+        render_metric_card("AUC POR FOLD", f"{wf['auc_fold_mean']:.3f}", f"± {wf['auc_fold_std']:.3f}", '#00d9ff')
+    with w3:
+        render_metric_card("FOLDS", str(wf['n_folds']), f"Train {train_size}d / Test {test_size}d", '#9c27b0')
+    with w4:
+        render_metric_card("WIN RATE OOS", f"{wf['win_rate_trades']:.0%}",
+                           f"{len(wf['equity_rets'])} entradas prob ≥ {wf['prob_threshold']:.0%}",
+                           '#00ffad' if wf['win_rate_trades'] >= 0.55 else '#ff9800')
+
+    a1, a2 = st.columns(2)
+    with a1:
+        st.plotly_chart(create_auc_over_time_chart(wf['folds']), use_container_width=True, key="wf_auc")
+    with a2:
+        st.plotly_chart(create_ml_calibration_chart(wf['oos']['label'].values, wf['oos']['prob'].values),
+                        use_container_width=True, key="wf_calib")
+    if wf['equity_dates']:
+        st.plotly_chart(create_equity_curve(wf['equity_dates'], wf['equity_rets'], symbol,
+                                            title=f"EQUITY OOS // PROB ≥ {wf['prob_threshold']:.0%}"),
+                        use_container_width=True, key="wf_equity")
+    else:
+        st.warning("Ninguna predicción out-of-sample superó el umbral de probabilidad.")
+
+
+def render_panel_ranking_section():
+    st.markdown("""
+    <div style="font-family:'VT323',monospace; color:#00d9ff; font-size:1.3rem;
+                letter-spacing:3px; margin-bottom:12px;">
+        05 // MODO PANEL // RANKING DE WATCHLIST
+    </div>
+    <div style="font-family:'Courier New'; color:#aaa; font-size:11px; margin-bottom:12px; line-height:1.7;">
+        ▸ Un único modelo agrupado entrenado sobre toda la watchlist (features sin identidad de símbolo,
+        CV temporal purgada) y una probabilidad por símbolo en una sola pasada.
+    </div>
+    """, unsafe_allow_html=True)
+
+    c1, c2, c3 = st.columns([3, 1, 1])
+    with c1:
+        wl_txt = st.text_area("WATCHLIST", value=", ".join(PANEL_WATCHLIST_DEFAULT),
+                              height=80, key="panel_watchlist")
+    with c2:
+        horizon = st.selectbox("HORIZONTE (días)", [3, 5, 10, 20], index=1, key="panel_horizon")
+    with c3:
+        st.markdown("<br>", unsafe_allow_html=True)
+        run_panel = st.button("// RANKING PANEL", use_container_width=True, key="panel_run_btn")
+
+    if not run_panel:
+        return
+    symbols = tuple(dict.fromkeys(t.strip().upper() for t in wl_txt.replace(",", " ").split() if t.strip()))
+    if not symbols:
+        st.warning("Watchlist vacía.")
+        return
+
+    with st.spinner(f"Entrenando modelo panel sobre {len(symbols)} símbolos..."):
+        ranking, pm, err = rank_watchlist_panel(symbols, horizon)
+    if err:
+        st.error(err)
+        return
+
+    k1, k2, k3, k4 = st.columns(4)
+    with k1:
+        render_metric_card("AUC PANEL", f"{pm['auc']:.3f}", "Holdout purgado",
+                           '#00ffad' if pm['auc'] > 0.55 else '#ff9800')
+    with k2:
+        render_metric_card("SÍMBOLOS", str(pm['n_symbols']), "Con histórico válido", '#00d9ff')
+    with k3:
+        render_metric_card("FILAS TRAIN", f"{pm['n_train']:,}", "Panel agrupado", '#9c27b0')
+    with k4:
+        render_metric_card("WIN RATE BASE", f"{pm['win_rate_real']:.0%}", f"Test // {horizon}d", '#ff9800')
+
+    st.dataframe(
+        ranking.style.background_gradient(subset=['Prob %'], cmap='RdYlGn', vmin=30, vmax=70)
+                     .format({'Prob %': '{:.1f}', 'Z-Score': '{:+.2f}', 'RSI': '{:.1f}',
+                              'Ret 20d %': '{:+.2f}', 'Vol Ratio': '{:.2f}'}),
+        use_container_width=True, hide_index=True
+    )
+
+    # Los mejores del ranking son los que se abrirán en el modelo ML: se entrenan ya
+    prewarm_models(ranking['Símbolo'].head(PANEL_PREWARM_TOP).tolist(), horizon)
+    st.caption(f"▸ Precalentando en segundo plano el modelo ML de los {PANEL_PREWARM_TOP} primeros "
+               f"(horizonte {horizon}d).")
+
+
 # ────────────────────────────────────────────────
 # RENDER PRINCIPAL
 # ────────────────────────────────────────────────
@@ -2001,13 +2701,16 @@ def render():
         if analyze_btn:
             with st.spinner("Calculando matrices de probabilidad..."):
                 try:
-                    tf_map = {"15m": ("5d", "15m"), "1h": ("1mo", "1h"), "4h": ("3mo", "1h"), "1d": ("1y", "1d")}
-                    period, interval = tf_map.get(timeframe, ("1y", "1d"))
+                    if timeframe in TF_BAR_WINDOW:
+                        period, interval = BAR_CACHE_PERIOD, f"1h → {TF_BAR_WINDOW[timeframe][0]}"
+                    else:
+                        period, interval = TF_DOWNLOAD_MAP.get(timeframe, ("1y", "1d"))
 
                     if show_debug:
                         st.write(f"Descargando: {symbol} | Periodo: {period} | Intervalo: {interval}")
 
-                    data = download_data(symbol, period, interval)
+                    # Caché de barras compartida con la tendencia multi-timeframe
+                    data = get_analysis_bars(symbol, timeframe)
 
                     if show_debug:
                         st.write("Estructura original:")
@@ -2128,7 +2831,7 @@ Puntos:     {rsu_data['rsi_component']}/10
                             """)
                         with col_c2:
                             st.markdown("**Multi-Timeframe (Ponderado)**")
-                            TF_W = {'1D': 0.45, '4H': 0.30, '1H': 0.15, '15m': 0.10}
+                            TF_W = {'1D': 0.45, '4H': 0.30, '1H': 0.15, '15m': 0.10, '1W': 0.10}
                             for tf, info in trends.items():
                                 w = TF_W.get(tf, 0.1)
                                 st.write(f"▸ **{tf}** (peso {w:.0%}): {info.get('trend', 'N/A')} ({info.get('strength', 0):.3f}%)")
@@ -2147,7 +2850,7 @@ Puntos:   {rsu_data['volume_component']}/20
                         st.subheader("Fórmula Final")
                         st.code(f"RSU SCORE = {rsu_data['z_component']} + {rsu_data['trend_component']} + {rsu_data['volume_component']} + {rsu_data['rsi_component']} = {rsu_data['total']}/100")
 
-                        st.info("Nota: El Z-Score v2 usa retornos logarítmicos para estacionariedad — evita que el std escale con el nivel de precio. El RSI usa suavizado de Wilder (EWM) estándar de la industria. Los timeframes 1D/4H tienen mayor peso en la tendencia que 1H/15m.")
+                        st.info("Nota: El Z-Score v2 usa retornos logarítmicos para estacionariedad — evita que el std escale con el nivel de precio. El RSI usa suavizado de Wilder (EWM) estándar de la industria. Los timeframes 1D/4H tienen mayor peso en la tendencia que 1H/1W; todos se derivan de una única descarga 1h.")
 
                 except Exception as e:
                     st.error(f"Error en el análisis: {str(e)}")
@@ -2157,6 +2860,10 @@ Puntos:   {rsu_data['volume_component']}/20
 
     with tab2:
         render_backtest_ml_section()
+        st.markdown("<hr>", unsafe_allow_html=True)
+        render_walk_forward_section()
+        st.markdown("<hr>", unsafe_allow_html=True)
+        render_panel_ranking_section()
 
     with tab3:
         render_explanation_section()
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+event_store.py — Almacén local (SQLite) de eventos por ticker y fecha:
+earnings, operaciones de insiders y operaciones de congresistas.
+
+La ingesta es incremental: cada evento lleva un uid determinista y se inserta
+con INSERT OR IGNORE, así que re-ingerir una fuente solo añade lo nuevo.
+Los índices (ticker, fecha) y (tipo, fecha) permiten responder consultas del
+tipo "eventos de estos tickers en los próximos N días" en milisegundos.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+EVENT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             "data", "events.db")
+
+KIND_EARNINGS = "earnings"
+KIND_INSIDER  = "insider"
+KIND_CONGRESS = "congress"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id          INTEGER PRIMARY KEY,
+    uid         TEXT    NOT NULL UNIQUE,
+    kind        TEXT    NOT NULL,
+    ticker      TEXT    NOT NULL,
+    event_date  TEXT    NOT NULL,
+    side        TEXT,
+    value       REAL,
+    source      TEXT,
+    payload     TEXT,
+    ingested_at REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_events_ticker_date ON events (ticker, event_date);
+CREATE INDEX IF NOT EXISTS ix_events_kind_date   ON events (kind, event_date);
+CREATE TABLE IF NOT EXISTS ingest_log (
+    source   TEXT PRIMARY KEY,
+    last_run REAL NOT NULL
+);
+"""
+
+
+def _iso(d):
+    if isinstance(d, datetime):
+        return d.date().isoformat()
+    if isinstance(d, date):
+        return d.isoformat()
+    return str(d)[:10]
+
+
+def make_uid(*parts):
+    return "|".join(str(p) for p in parts)
+
+
+class EventStore:
+    """Conexión SQLite compartida por el proceso (WAL, acceso serializado)."""
+
+    def __init__(self, path=EVENT_DB_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path  = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    # ── ingesta ───────────────────────────────────────────────────────────────
+    def add_events(self, events, supersede_from=None, across_sources=False):
+        """
+        Inserta eventos nuevos (los uid ya presentes se ignoran). Cada evento es un
+        dict con kind, ticker, date, uid y opcionalmente side, value, source, payload.
+        `supersede_from` (fecha) borra antes los eventos futuros de esos mismos
+        tipo/ticker/fuente que ya no aparecen en el lote (p. ej. earnings reprogramados);
+        con `across_sources` se sustituyen los de cualquier fuente para ese tipo/ticker.
+        Retorna el número de filas añadidas.
+        """
+        now  = time.time()
+        rows = [(
+            ev['uid'], ev['kind'], ev['ticker'].upper(), _iso(ev['date']),
+            ev.get('side'), ev.get('value'), ev.get('source'),
+            json.dumps(ev.get('payload') or {}, default=str), now,
+        ) for ev in events]
+        with self._lock:
+            cur = self._conn.cursor()
+            if supersede_from is not None:
+                keep = {}
+                for r in rows:
+                    keep.setdefault((r[1], r[2], None if across_sources else r[6]), []).append(r[0])
+                for (kind, ticker, source), uids in keep.items():
+                    cur.execute(
+                        f"DELETE FROM events WHERE kind=? AND ticker=? AND event_date>=? "
+                        f"{'' if across_sources else 'AND source IS ? '}"
+                        f"AND uid NOT IN ({','.join('?' * len(uids))})",
+                        (kind, ticker, _iso(supersede_from),
+                         *(() if across_sources else (source,)), *uids))
+            before = self._conn.total_changes
+            cur.executemany(
+                "INSERT OR IGNORE INTO events (uid, kind, ticker, event_date, side, value, source, payload, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            added = self._conn.total_changes - before
+            self._conn.commit()
+        return added
+
+    def is_stale(self, source, ttl):
+        """True si `source` no se ha ingerido en los últimos `ttl` segundos."""
+        with self._lock:
+            row = self._conn.execute("SELECT last_run FROM ingest_log WHERE source=?", (source,)).fetchone()
+        return row is None or time.time() - row['last_run'] > ttl
+
+    def stale_sources(self, sources, ttl):
+        """Subconjunto de `sources` que necesita re-ingesta (una sola consulta)."""
+        sources = list(sources)
+        if not sources:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT source, last_run FROM ingest_log WHERE source IN ({','.join('?' * len(sources))})",
+                sources).fetchall()
+        fresh = {r['source'] for r in rows if time.time() - r['last_run'] <= ttl}
+        return [s for s in sources if s not in fresh]
+
+    def mark_ingested(self, *sources):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO ingest_log (source, last_run) VALUES (?, ?) "
+                "ON CONFLICT(source) DO UPDATE SET last_run=excluded.last_run",
+                [(s, now) for s in sources])
+            self._conn.commit()
+
+    # ── consultas ─────────────────────────────────────────────────────────────
+    def query(self, kind=None, tickers=None, start=None, end=None, side=None,
+              source=None, order="event_date ASC", limit=None):
+        """Eventos filtrados por tipo, tickers, rango de fechas [start, end], lado y fuente."""
+        where, params = [], []
+        if kind is not None:
+            where.append("kind=?"); params.append(kind)
+        if tickers is not None:
+            tickers = [t.upper() for t in tickers]
+            if not tickers:
+                return []
+            where.append(f"ticker IN ({','.join('?' * len(tickers))})"); params.extend(tickers)
+        if start is not None:
+            where.append("event_date>=?"); params.append(_iso(start))
+        if end is not None:
+            where.append("event_date<=?"); params.append(_iso(end))
+        if side is not None:
+            where.append("side=?"); params.append(side)
+        if isinstance(source, (list, tuple, set)):
+            where.append(f"source IN ({','.join('?' * len(source))})"); params.extend(source)
+        elif source is not None:
+            where.append("source=?"); params.append(source)
+        sql = "SELECT * FROM events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._row(r) for r in rows]
+
+    def upcoming(self, tickers=None, days=30, kind=KIND_EARNINGS, from_date=None):
+        """Eventos de `tickers` entre hoy (o `from_date`) y dentro de `days` días."""
+        start = from_date or date.today()
+        return self.query(kind=kind, tickers=tickers, start=start, end=start + timedelta(days=days))
+
+    def recent(self, kind, days=7, tickers=None, order="event_date DESC", **kw):
+        """Eventos de los últimos `days` días, más recientes primero."""
+        return self.query(kind=kind, tickers=tickers, start=date.today() - timedelta(days=days),
+                          order=order, **kw)
+
+    def next_event_by_ticker(self, tickers, kind=KIND_EARNINGS, days=90):
+        """{ticker: fecha ISO del próximo evento} para unir con tablas de screening."""
+        out = {}
+        for ev in self.upcoming(tickers, days=days, kind=kind):
+            out.setdefault(ev['ticker'], ev['event_date'])
+        return out
+
+    @staticmethod
+    def _row(r):
+        ev = dict(r)
+        ev['payload'] = json.loads(ev['payload']) if ev['payload'] else {}
+        return ev
+
+
+_instance = None
+_instance_lock = threading.Lock()
+
+
+def get_event_store():
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = EventStore()
+    return _instance
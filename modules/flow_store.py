@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+flow_store.py — Tabla columnar en memoria del flujo de opciones de RSU DB.
+
+Todos los filtros del panel son discretos (tramo de prima, tramo de DTE, flag
+inusual, tramo de score y sentimiento), así que cada fila se reduce a un código
+de "celda" (int16) al insertarla. Un filtro se traduce a una tabla booleana de
+400 celdas y la selección de filas es un único lookup por fila, sin volver a
+comparar floats ni strings.
+
+Los agregados que pintan stats, gráficos y resumen por ticker se mantienen en un
+cubo denso celda × ticker × medida que se actualiza incrementalmente al añadir
+filas (np.add.at); consultar con filtros es sumar las celdas seleccionadas, con
+coste independiente del número de filas del día.
+
+Sin dependencias de Streamlit.
+"""
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+PREMIUM_TIERS = (100_000, 500_000, 1_000_000, 5_000_000)   # prima >= umbral
+SCORE_TIERS   = (20, 40, 60, 80)                           # score >= umbral
+DTE_BUCKETS   = ('<7', '7-30', '30-90', '>90')
+SENTIMENTS    = ('BULLISH', 'BEARISH')
+FLOW_TYPES    = ('CALL_BOUGHT', 'CALL_SOLD', 'PUT_BOUGHT', 'PUT_SOLD')
+SCORE_LABELS  = ('0-20', '20-40', '40-60', '60-80', '80-100')
+
+# Medidas del cubo (última dimensión)
+_PREMIUM, _TRADES, _SCORE, _SWEEPS, _BLOCKS = range(5)
+_N_MEASURES = 5
+
+_CELL_SHAPE = (len(PREMIUM_TIERS) + 1, len(DTE_BUCKETS), 2, len(SCORE_TIERS) + 1, len(SENTIMENTS))
+N_CELLS = int(np.prod(_CELL_SHAPE))
+_CELL_PREM, _CELL_DTE, _CELL_UNUSUAL, _CELL_SCORE, _CELL_SENT = np.unravel_index(np.arange(N_CELLS), _CELL_SHAPE)
+
+_CATEGORICAL = ('ticker', 'sector', 'flow_type', 'sentiment')
+_QUERY_CACHE = 64
+
+
+def _cell_codes(df):
+    """Código de celda por fila (int16) a partir de las columnas de filtro."""
+    prem  = np.searchsorted(PREMIUM_TIERS, df['premium'].to_numpy(dtype=float), side='right')
+    score = np.searchsorted(SCORE_TIERS, df['score'].to_numpy(dtype=float), side='right')
+    dte   = df['days_to_exp'].to_numpy(dtype=float)
+    dte_b = np.select([dte < 7, dte <= 30, dte <= 90], [0, 1, 2], 3)
+    unusual = ((df['volume_oi_ratio'].to_numpy(dtype=float) > 1)
+               | df['is_sweep'].to_numpy(dtype=bool) | df['is_block'].to_numpy(dtype=bool))
+    sent = (df['sentiment'].astype(str).to_numpy() != SENTIMENTS[0]).astype(int)
+    return np.ravel_multi_index((prem, dte_b, unusual.astype(int), score, sent), _CELL_SHAPE).astype(np.int16)
+
+
+def _cell_mask(min_premium=0, dte_bucket=None, unusual_only=False, sentiment=None, min_score=0):
+    """Filtro → booleano por celda. min_premium y min_score deben caer en un umbral de tramo."""
+    prem_tier  = 0 if not min_premium else PREMIUM_TIERS.index(min_premium) + 1
+    score_tier = 0 if not min_score else SCORE_TIERS.index(min_score) + 1
+    ok = (_CELL_PREM >= prem_tier) & (_CELL_SCORE >= score_tier)
+    if dte_bucket is not None:
+        ok &= _CELL_DTE == DTE_BUCKETS.index(dte_bucket)
+    if unusual_only:
+        ok &= _CELL_UNUSUAL == 1
+    if sentiment is not None:
+        ok &= _CELL_SENT == SENTIMENTS.index(sentiment)
+    return ok
+
+
+class FlowStore:
+    """
+    Flujo del día en columnas: filas con tickers/sectores/tipos categóricos,
+    código de celda por fila y cubo de agregados incremental.
+    """
+
+    def __init__(self, df=None):
+        self.version  = 0
+        self._chunks  = []                  # bloques añadidos; se concatenan al consultar
+        self._frame   = None
+        self._len     = 0
+        self._cells   = np.empty(0, dtype=np.int16)
+        self._tickers = {}                  # ticker → posición en el cubo
+        self._sectors = []                  # sector por posición de ticker
+        self._cube    = np.zeros((N_CELLS, 0, _N_MEASURES))
+        self._ft_cube = np.zeros((N_CELLS, len(FLOW_TYPES)))
+        self._cache   = OrderedDict()
+        if df is not None:
+            self.append(df)
+
+    def __len__(self):
+        return self._len
+
+    @property
+    def frame(self):
+        """Todas las filas, con ticker/sector/flow_type/sentiment categóricos."""
+        if self._frame is None:
+            frame = pd.concat(self._chunks, ignore_index=True) if self._chunks else pd.DataFrame()
+            cats = {c: 'category' for c in _CATEGORICAL if c in frame}
+            self._frame  = frame.astype(cats)
+            self._chunks = [self._frame] if self._chunks else []
+        return self._frame
+
+    # ── ingesta ───────────────────────────────────────────────────────────────
+    def append(self, df):
+        """Añade filas y actualiza el cubo solo con ellas."""
+        if df is None:
+            return
+        if df.empty:
+            # Un bloque vacío solo aporta el esquema de columnas
+            if not self._chunks:
+                self._chunks, self._frame = [df], None
+            return
+        df = df.reset_index(drop=True)
+        cells = _cell_codes(df)
+
+        # Tickers nuevos amplían el eje del cubo
+        tk = df['ticker'].astype(str)
+        first = df.assign(ticker=tk).drop_duplicates('ticker')
+        for t, s in zip(first['ticker'], first['sector'].astype(str)):
+            if t not in self._tickers:
+                self._tickers[t] = len(self._tickers)
+                self._sectors.append(s)
+        grow = len(self._tickers) - self._cube.shape[1]
+        if grow:
+            self._cube = np.concatenate([self._cube, np.zeros((N_CELLS, grow, _N_MEASURES))], axis=1)
+        tpos = tk.map(self._tickers).to_numpy(dtype=np.int64)
+
+        measures = np.column_stack([
+            df['premium'].to_numpy(dtype=float), np.ones(len(df)), df['score'].to_numpy(dtype=float),
+            df['is_sweep'].to_numpy(dtype=float), df['is_block'].to_numpy(dtype=float)])
+        np.add.at(self._cube, (cells, tpos), measures)
+        ft = pd.Categorical(df['flow_type'].astype(str), categories=FLOW_TYPES).codes
+        known = ft >= 0
+        np.add.at(self._ft_cube, (cells[known], ft[known]), measures[known, _PREMIUM])
+
+        if self._frame is not None:
+            self._chunks = [self._frame.astype({c: str for c in _CATEGORICAL})]
+        self._chunks.append(df)
+        self._frame = None
+        self._len  += len(df)
+        self._cells = np.concatenate([self._cells, cells])
+        self.version += 1
+        self._cache.clear()
+
+    # ── consultas ─────────────────────────────────────────────────────────────
+    def _cached(self, key, compute):
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        val = compute()
+        self._cache[key] = val
+        while len(self._cache) > _QUERY_CACHE:
+            self._cache.popitem(last=False)
+        return val
+
+    def rows(self, **query):
+        """Filas que cumplen el filtro (ver _cell_mask), vía el índice de celdas."""
+        key = ('rows',) + tuple(sorted(query.items()))
+        return self._cached(key, lambda: self.frame[_cell_mask(**query)[self._cells]])
+
+    def aggregates(self, **query):
+        """
+        Agregados del subconjunto filtrado: totales, por ticker, por sector, prima
+        por flow_type y distribución de score. Sale del cubo, no de las filas.
+        """
+        key = ('agg',) + tuple(sorted(query.items()))
+        return self._cached(key, lambda: self._aggregate(_cell_mask(**query)))
+
+    def _aggregate(self, ok):
+        cube = self._cube[ok]                                   # celdas × ticker × medida
+        sent = _CELL_SENT[ok]
+        bull = cube[sent == 0].sum(axis=0)
+        bear = cube[sent == 1].sum(axis=0)
+        tot  = bull + bear
+        tickers = list(self._tickers)
+
+        by_ticker = pd.DataFrame({
+            'ticker': tickers, 'sector': self._sectors,
+            'premium': tot[:, _PREMIUM], 'bullish': bull[:, _PREMIUM], 'bearish': bear[:, _PREMIUM],
+            'trades': tot[:, _TRADES].astype(int), 'score_sum': tot[:, _SCORE],
+            'sweeps': tot[:, _SWEEPS].astype(int), 'blocks': tot[:, _BLOCKS].astype(int),
+        })
+        by_ticker = by_ticker[by_ticker['trades'] > 0].reset_index(drop=True)
+        by_ticker['avg_score'] = by_ticker['score_sum'] / by_ticker['trades']
+        by_ticker['net'] = by_ticker['bullish'] - by_ticker['bearish']
+        by_sector = by_ticker.groupby('sector')[['bullish', 'bearish']].sum()
+
+        score_dist = np.bincount(_CELL_SCORE[ok], weights=cube[:, :, _TRADES].sum(axis=1),
+                                 minlength=len(SCORE_LABELS)).astype(int)
+        trades = int(tot[:, _TRADES].sum())
+        return {
+            'premium': float(tot[:, _PREMIUM].sum()),
+            'bullish': float(bull[:, _PREMIUM].sum()),
+            'bearish': float(bear[:, _PREMIUM].sum()),
+            'trades': trades,
+            'sweeps': int(tot[:, _SWEEPS].sum()),
+            'blocks': int(tot[:, _BLOCKS].sum()),
+            'avg_score': float(tot[:, _SCORE].sum() / trades) if trades else 0.0,
+            'by_ticker': by_ticker,
+            'by_sector': by_sector,
+            'by_flow_type': pd.Series(self._ft_cube[ok].sum(axis=0), index=FLOW_TYPES),
+            'score_dist': pd.Series(score_dist, index=SCORE_LABELS),
+        }
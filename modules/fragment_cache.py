@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+fragment_cache.py — Caché LRU de fragmentos HTML por proceso.
+
+Los renderers (tarjetas de noticias, timeline, heatmap, ticker tape, gráfico
+del VIX) se decoran con @fragment_cached y una función `key` que resume su
+entrada (id del item, hash de contenido o los conteos que pinta). En cada
+refresco solo se vuelven a generar los fragmentos cuya clave cambió; el resto
+sale de memoria, así que el coste por refresco escala con lo que cambia y no
+con la longitud del feed.
+"""
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+DEFAULT_MAXSIZE = 2048
+
+
+class FragmentCache:
+    """LRU clave → HTML, seguro entre hilos."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.hits    = 0
+        self.misses  = 0
+        self._data   = OrderedDict()
+        self._lock   = threading.Lock()
+
+    def get(self, key, render):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+        html = render()
+        with self._lock:
+            self.misses += 1
+            self._data[key] = html
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {'size': len(self._data), 'hits': self.hits, 'misses': self.misses}
+
+
+_registry = {}
+
+
+def fragment_cached(key=None, maxsize=DEFAULT_MAXSIZE):
+    """
+    Decorador: memoiza el HTML devuelto por la función según `key(*args)`
+    (por defecto, los propios argumentos, que deben ser hashables).
+    `fn.cache` expone la FragmentCache subyacente.
+    """
+    def deco(fn):
+        cache = FragmentCache(maxsize)
+        _registry[f"{fn.__module__}.{fn.__qualname__}"] = cache
+
+        @wraps(fn)
+        def wrapper(*args):
+            k = key(*args) if key else args
+            return cache.get(k, lambda: fn(*args))
+
+        wrapper.cache = cache
+        return wrapper
+    return deco
+
+
+def fragment_stats():
+    """{renderer: {size, hits, misses}} de todas las cachés registradas."""
+    return {name: c.stats() for name, c in _registry.items()}
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+fundamental_screener.py — RSU Score fundamental de todo el universo en lote.
+
+Replica compute_rsu_score y las reglas principales de get_suggestions de
+earnings.py sobre un DataFrame con una fila por ticker, con operaciones por
+columnas (np.select / máscaras) en lugar de dicts por ticker. Los percentiles
+sectoriales salen de la misma tabla de sector_benchmarks.
+
+Lo ejecuta el job nocturno con el `info` de yfinance que ya descarga, y el
+resultado (ranking + ratios clave + señales) se guarda en
+data/fundamental_screen.json para mostrarlo al instante en RSU Research.
+
+Diferencias con el cálculo por ticker: el consenso usa recommendationMean
+(el desglose strong_buy/buy no viene en `info`) y no se aplican los overrides
+de FMP.
+
+Sin dependencias de Streamlit.
+"""
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from modules.sector_benchmarks import get_benchmarks
+
+SCREEN_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "data", "fundamental_screen.json")
+
+# columna → claves de yfinance .info (la primera no nula)
+_INFO_COLUMNS = {
+    'name':           ('shortName', 'longName'),
+    'sector':         ('sector',),
+    'industry':       ('industry',),
+    'price':          ('currentPrice', 'regularMarketPrice'),
+    'market_cap':     ('marketCap',),
+    'pe':             ('trailingPE',),
+    'forward_pe':     ('forwardPE',),
+    'peg':            ('pegRatio', 'trailingPegRatio'),
+    'net_margin':     ('profitMargins',),
+    'op_margin':      ('operatingMargins',),
+    'roe':            ('returnOnEquity',),
+    'de':             ('debtToEquity',),
+    'revenue_growth': ('revenueGrowth',),
+    'revenue_ttm':    ('totalRevenue',),
+    'fcf':            ('freeCashflow',),
+    'sma_50':         ('fiftyDayAverage',),
+    'sma_200':        ('twoHundredDayAverage',),
+    'hi52':           ('fiftyTwoWeekHigh',),
+    'lo52':           ('fiftyTwoWeekLow',),
+    'target_mean':    ('targetMeanPrice',),
+    'rec_mean':       ('recommendationMean',),
+    'n_analysts':     ('numberOfAnalystOpinions',),
+}
+_TEXT_COLUMNS = ('name', 'sector', 'industry')
+
+LABELS = (
+    (75, "EXCELENTE", "#00ffad"),
+    (60, "BUENO",     "#7fffad"),
+    (45, "NEUTRAL",   "#ff9800"),
+    (30, "DÉBIL",     "#ff5722"),
+    (0,  "NEGATIVO",  "#f23645"),
+)
+
+
+def _pts(conds, values, default=0):
+    """np.select con NaN → False: cada condición es una máscara booleana."""
+    return np.select([np.nan_to_num(c, nan=0).astype(bool) for c in conds], values, default)
+
+
+def _has(x):
+    """Equivalente vectorial de `if x` sobre un valor numérico opcional."""
+    return np.isfinite(x) & (x != 0)
+
+
+def universe_frame(info_by_ticker):
+    """{ticker: info de yfinance} → DataFrame con las columnas de entrada del score."""
+    rows = []
+    for ticker, info in info_by_ticker.items():
+        info = info or {}
+        row = {'ticker': ticker}
+        for col, keys in _INFO_COLUMNS.items():
+            row[col] = next((info[k] for k in keys if info.get(k) is not None), None)
+        rows.append(row)
+    df = pd.DataFrame(rows, columns=['ticker', *_INFO_COLUMNS])
+    for col in _INFO_COLUMNS:
+        if col in _TEXT_COLUMNS:
+            df[col] = df[col].fillna('').astype(str)
+        else:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def score_frame(df, bench=None):
+    """
+    Añade a `df` (formato universe_frame) los pilares y el total del RSU Score,
+    etiqueta, upside, percentiles sectoriales y señales. Mismos umbrales que
+    earnings.compute_rsu_score.
+    """
+    bench = bench or get_benchmarks()
+    df = df.copy()
+    col = {c: df[c].to_numpy(dtype=float) for c in _INFO_COLUMNS if c not in _TEXT_COLUMNS}
+    sec, ind = df['sector'], df['industry']
+
+    nm, roe, op_m, fcf = col['net_margin'], col['roe'], col['op_margin'], col['fcf']
+    pe, fpe, peg = col['pe'], col['forward_pe'], col['peg']
+    nm_q  = bench.quality_array('net_margin', nm, sec, ind)
+    roe_q = bench.quality_array('roe', roe, sec, ind)
+    op_q  = bench.quality_array('op_margin', op_m, sec, ind)
+    pe_p  = bench.percentile_array('pe', np.where(pe > 0, pe, np.nan), sec, ind)
+
+    # ── Pilar 1: Calidad ──
+    pre_rev = ~(np.nan_to_num(col['revenue_ttm']) >= 50_000_000)
+    q = np.where(pre_rev, 8, 0)
+    q = q + _pts([(nm < 0) & ~pre_rev, (nm > 0) & (nm_q >= 90), (nm > 0) & (nm_q >= 50), (nm > 0) & (nm_q >= 25)],
+                 [-3, 8, 6, 3])
+    q = q + _pts([(roe < 0) & ~pre_rev, (roe > 0) & (roe_q >= 90), (roe > 0) & (roe_q > 75)], [-4, 8, 5])
+    q = q + _pts([fcf > 0, (fcf < 0) & ~pre_rev], [5, -2])
+    q = q + _pts([(op_m > 0) & (op_q > 75)], [4])
+    df['calidad'] = np.clip(q, 0, 25)
+
+    # ── Pilar 2: Valoración ──
+    v = 12 + _pts([pe_p < 25, pe_p < 50, pe_p > 90, pe_p > 50], [8, 4, -6, -3])
+    v = v + _pts([(peg > 0) & (peg < 1.0), (peg > 0) & (peg < 1.5), peg > 3.0], [5, 2, -5])
+    both = (fpe > 0) & (pe > 0)
+    v = v + _pts([both & (fpe < pe * 0.85), both & (fpe > pe * 1.1)], [3, -2])
+    df['valoracion'] = np.clip(v, 0, 25)
+
+    # ── Pilar 3: Momentum ──
+    cp, s50, s200, hi, lo = col['price'], col['sma_50'], col['sma_200'], col['hi52'], col['lo52']
+    ok50, ok200 = _has(cp) & _has(s50), _has(cp) & _has(s200)
+    m = 12 + _pts([ok50 & (cp > s50 * 1.05), ok50 & (cp > s50), ok50 & (cp < s50 * 0.95), ok50], [5, 2, -4, -1])
+    m = m + _pts([ok200 & (cp > s200 * 1.10), ok200 & (cp > s200), ok200 & (cp < s200 * 0.90), ok200], [5, 2, -5, -1])
+    rng_ok = _has(cp) & _has(hi) & _has(lo) & (hi > lo)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pos = np.where(rng_ok, (cp - lo) / (hi - lo), np.nan)
+    m = m + _pts([pos > 0.80, pos < 0.20], [3, -4])
+    df['momentum'] = np.clip(m, 0, 25)
+
+    # ── Pilar 4: Consenso ──
+    # recommendationMean (1 = strong buy … 5 = sell) en lugar del % de compras
+    rec = np.where(np.nan_to_num(col['n_analysts']) > 0, col['rec_mean'], np.nan)
+    c = 12 + _pts([rec <= 1.8, rec <= 2.2, rec <= 2.6, rec >= 3.2, np.isfinite(rec)], [8, 5, 2, -6, -2])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        upside = np.where(_has(col['target_mean']) & _has(cp), (col['target_mean'] - cp) / cp * 100, np.nan)
+    c = c + _pts([upside > 30, upside > 15, upside > 5, upside < -15, upside < -5], [5, 3, 1, -5, -2])
+    df['consenso'] = np.clip(c, 0, 25)
+
+    df['total'] = df['calidad'] + df['valoracion'] + df['momentum'] + df['consenso']
+    thresholds = [df['total'].to_numpy() >= t for t, _, _ in LABELS]
+    df['label'] = np.select(thresholds, [l for _, l, _ in LABELS], LABELS[-1][1])
+    df['color'] = np.select(thresholds, [c for _, _, c in LABELS], LABELS[-1][2])
+    df['upside'] = upside
+    df['pe_pct'] = pe_p
+    df['roe_pct'] = roe_q
+    df['signals'] = _signals(df, col, pe_p, roe_q, upside)
+    return df
+
+
+def _signals(df, col, pe_p, roe_q, upside):
+    """Resumen de las reglas de get_suggestions como etiquetas cortas por fila."""
+    nm, roe, de, rg = col['net_margin'], col['roe'], col['de'], col['revenue_growth']
+    pe, fpe, peg, fcf = col['pe'], col['forward_pe'], col['peg'], col['fcf']
+    rules = [
+        (pe_p < 25,                                  "📊 barato vs sector"),
+        (pe_p > 75,                                  "📊 caro vs sector"),
+        ((fpe > 0) & (pe > 0) & (fpe < pe * 0.85),   "📈 fuerte crecimiento BPA esperado"),
+        (upside > 25,                                "🎯 upside >25%"),
+        (upside < -10,                               "⚠️ sobre objetivo medio"),
+        (rg > 0.25,                                  "🚀 ingresos >+25%"),
+        (rg < 0,                                     "📉 ingresos en contracción"),
+        ((roe > 0) & (roe_q >= 90),                  "💎 ROE top sector"),
+        (roe < 0,                                    "🔴 ROE negativo"),
+        (nm > 0.25,                                  "💰 margen neto >25%"),
+        (nm < 0,                                     "🔴 en pérdidas"),
+        (de > 150,                                   "💳 deuda elevada"),
+        ((de >= 0) & (de < 30),                      "💪 balance conservador"),
+        (fcf < 0,                                    "⚠️ FCF negativo"),
+        ((peg > 0) & (peg < 1),                      "🟢 PEG <1"),
+        (peg > 3,                                    "🔴 PEG >3"),
+    ]
+    out = pd.Series('', index=df.index)
+    for mask, text in rules:
+        hit = pd.Series(np.nan_to_num(mask, nan=0).astype(bool), index=df.index)
+        out = out.where(~hit, out + np.where(out == '', '', ' · ') + text)
+    return out
+
+
+def rank_frame(df):
+    """Ordena por score y añade ranking global y dentro del sector."""
+    df = df.sort_values(['total', 'calidad', 'market_cap'], ascending=False, na_position='last')
+    df = df.reset_index(drop=True)
+    df['rank'] = np.arange(1, len(df) + 1)
+    df['sector_rank'] = df.groupby('sector').cumcount() + 1
+    return df
+
+
+def run_screen(info_by_ticker, bench=None):
+    """Pipeline completo: info del universo → tabla ranqueada."""
+    return rank_frame(score_frame(universe_frame(info_by_ticker), bench))
+
+
+def query_screen(df, sector=None, industry=None, min_score=0, labels=None, top=50, sort_by='total'):
+    """Filtro del ranking: p.ej. top 50 por RSU Score en Healthcare."""
+    mask = df['total'] >= min_score
+    if sector:
+        mask &= df['sector'] == sector
+    if industry:
+        mask &= df['industry'] == industry
+    if labels:
+        mask &= df['label'].isin(labels)
+    out = df[mask]
+    if sort_by != 'total':
+        out = out.sort_values(sort_by, ascending=sort_by in ('pe', 'forward_pe', 'peg', 'de'), na_position='last')
+    return out.head(top) if top else out
+
+
+# ── persistencia ──────────────────────────────────────────────────────────────
+def save_screen(df, path=SCREEN_PATH, universe=None):
+    """JSON columnar compacto (se versiona desde el job nocturno)."""
+    clean = df.round(4).astype(object).where(df.notna(), None)
+    payload = {
+        'generated_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'universe': universe if universe is not None else len(df),
+        'columns': {c: clean[c].tolist() for c in clean.columns},
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def load_screen(path=SCREEN_PATH):
+    """(DataFrame, meta) o (None, {}) si no hay resultados guardados."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+    except Exception:
+        return None, {}
+    df = pd.DataFrame(payload.pop('columns'))
+    for c in df.columns:
+        if c not in _TEXT_COLUMNS + ('ticker', 'label', 'color', 'signals'):
+            df[c] = pd.to_numeric(df[c], errors='coerce')
+    return df, payload
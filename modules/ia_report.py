@@ -6,9 +6,9 @@ import yfinance as yf
 import pandas as pd
 import math
 import datetime
-import requests
 import time
 from config import get_ia_model
+from modules.providers import translate_en_es
 
 # ────────────────────────────────────────────────
 # PROMPT RSU — INYECTADO DIRECTAMENTE
@@ -351,21 +351,7 @@ def translate_text_cached(text, ticker):
     if not text: return 'Descripción no disponible.'
     try:
         chunks = [text[i:i+500] for i in range(0, len(text), 500)]
-        translated = []
-        for chunk in chunks:
-            url = f"https://api.mymemory.translated.net/get?q={requests.utils.quote(chunk)}&langpair=en|es"
-            try:
-                resp = requests.get(url, timeout=6)
-                if resp.status_code == 200:
-                    d = resp.json()
-                    if d.get('responseStatus') == 200:
-                        translated.append(d['responseData']['translatedText'])
-                        time.sleep(0.05)
-                        continue
-            except Exception: pass
-            translated.append(chunk)
-            time.sleep(0.05)
-        return ' '.join(translated)
+        return ' '.join(translate_en_es(chunk) or chunk for chunk in chunks)
     except Exception:
         return text
 
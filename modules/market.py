@@ -2,16 +2,24 @@
 import streamlit as st
 from datetime import datetime, timedelta, timezone
 from config import get_market_index, get_cnn_fear_greed
-import requests
 import streamlit.components.v1 as components
 import time
 import yfinance as yf
 from bs4 import BeautifulSoup
 import pandas as pd
+import numpy as np
+import os
 import re
 from collections import Counter
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
+from modules.background_cache import swr_cached, format_fetched_at, get_background_cache
+from modules.breadth import get_breadth_engine
+from modules.quotes import get_quote_snapshot, register_symbols
+from modules.event_store import get_event_store, make_uid, KIND_EARNINGS, KIND_INSIDER, KIND_CONGRESS
+from modules.ticker_extractor import get_ticker_extractor
+from modules.fragment_cache import fragment_cached
+from modules.providers import get_provider, provider_session, translate_en_es
 
 try:
     import investpy
@@ -33,12 +41,8 @@ def get_api_health(name: str) -> bool | None:
 # ── SHARED HTTP SESSION (st.cache_resource) ───────────────────────────────────
 @st.cache_resource
 def get_http_session():
-    s = requests.Session()
-    s.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8',
-    })
-    return s
+    """Session compartida del proveedor 'web' (pool de conexiones + rate limit)."""
+    return provider_session('web')
 
 def get_timestamp():
     """Timestamp en hora española (CET = UTC+1)"""
@@ -183,7 +187,7 @@ def translate_event(event_name):
         return event_name[:32] + "..."
     return event_name
 
-@st.cache_data(ttl=900)
+@swr_cached(ttl=900, fallback=lambda: get_fallback_economic_calendar())
 def get_economic_calendar():
     """
     Scraping de Investing.com para obtener el calendario económico real.
@@ -325,7 +329,8 @@ def get_economic_calendar():
         deduped.sort(key=lambda x: (x['date'], x['time'] if x['time'] != 'TBD' else '99:99'))
         return deduped[:25]
 
-    return get_fallback_economic_calendar()
+    # Sin datos: None para que el background cache conserve el último valor bueno
+    return None
 
 def get_forexfactory_calendar():
     """Scraping de ForexFactory como respaldo del calendario económico"""
@@ -404,7 +409,7 @@ def get_fallback_economic_calendar():
         }
     ]
 
-@st.cache_data(ttl=300)
+@swr_cached(ttl=300, fallback=lambda: get_fallback_crypto_prices())
 def get_crypto_prices():
     try:
         crypto_symbols = {
@@ -429,9 +434,9 @@ def get_crypto_prices():
                     time.sleep(0.1)
             except:
                 continue
-        return cryptos if cryptos else get_fallback_crypto_prices()
+        return cryptos or None
     except:
-        return get_fallback_crypto_prices()
+        return None
 
 def get_fallback_crypto_prices():
     return [
@@ -443,39 +448,8 @@ def get_fallback_crypto_prices():
         {"symbol": "ADA", "name": "Cardano", "price": "0.52", "change": "-4.20%", "is_positive": False},
     ]
 
-@st.cache_data(ttl=300)
-
 # ─── Reddit JSON API + StockTwits: fuentes de datos reales sin autenticación ──
 
-def _extract_tickers_from_text(text: str, top_n: int = 30):
-    """Extrae tickers válidos mencionados en texto de Reddit/StockTwits."""
-    import re as _re
-    # Blacklist: palabras comunes que no son tickers
-    blacklist = {
-        'A','I','IT','IS','AT','BE','BY','DO','FOR','GO','HE','IF','IN','ME',
-        'MY','NO','OF','ON','OR','SO','TO','UP','US','WE','AND','ARE','BUT',
-        'CAN','DID','GET','GOT','HAS','HAD','HER','HIM','HIS','HOW','ITS',
-        'LET','MAY','NEW','NOT','NOW','OFF','OUR','OUT','OWN','PUT','RUN',
-        'SAY','SHE','THE','TOO','TWO','USE','WAS','WAY','WHO','WHY','WITH',
-        'YOU','YOLO','LMAO','FOMO','EPS','CEO','IPO','ETF','GDP','FED','ALL',
-        'GOOD','BEST','NEXT','LAST','HIGH','LOW','MORE','MUCH','JUST','LIKE',
-        'MAKE','MANY','MOST','MOVE','NEED','OVER','SOME','SUCH','THAN','THAT',
-        'THEM','THEN','THEY','THIS','WHAT','WHEN','WILL','YEAR','HOLD','SELL',
-        'BUY','LONG','SHORT','PUMP','DUMP','MOON','BEAR','BULL','CALLS','PUTS',
-        'DD','TA','OTM','ITM','ATM','WSB','RH','TD','WS','AI','ML','API','SaaS',
-        'LOL','WTF','OMG','GG','GE','F','T','X','V','D','C','K','M','R','S',
-        'PRE','POST','AH','PM','AM','EST','PST','UTC','USD','EUR','CAD','CAT',
-        'WELL','WORK','TAKE','GIVE','BACK','COME','WANT','SHOW','ONLY','VERY',
-    }
-    found = {}
-    # Patrón: $TICKER o ticker en contexto bursátil
-    for m in _re.finditer(r'\$([A-Z]{1,6})\b|\b([A-Z]{2,5})\b', text):
-        t = (m.group(1) or m.group(2) or '').strip()
-        if t and t not in blacklist and 2 <= len(t) <= 6:
-            found[t] = found.get(t, 0) + (2 if m.group(1) else 1)
-    return sorted(found.items(), key=lambda x: -x[1])[:top_n]
-
-
 @st.cache_data(ttl=900, show_spinner=False)  # 15 min cache
 def get_reddit_buzz():
     """Extrae tickers más mencionados en r/wallstreetbets, r/stocks, r/investing via Reddit JSON API."""
@@ -496,11 +470,9 @@ def get_reddit_buzz():
                     continue
                 data = r.json()
                 posts = data.get('data', {}).get('children', [])
-                for post in posts:
-                    p = post.get('data', {})
-                    text = f"{p.get('title','')} {p.get('selftext','')}"
-                    for ticker, count in _extract_tickers_from_text(text.upper()):
-                        ticker_counts[ticker] = ticker_counts.get(ticker, 0) + count
+                texts = [f"{p.get('data', {}).get('title','')} {p.get('data', {}).get('selftext','')}" for p in posts]
+                for ticker, count in get_ticker_extractor().count_batch(texts).items():
+                    ticker_counts[ticker] = ticker_counts.get(ticker, 0) + count
             except Exception:
                 continue
 
@@ -547,12 +519,12 @@ def get_buzztickr_master_data(timeframe: str = 'day'):
             if r.status_code != 200:
                 continue
             reddit_ok = True
-            for post in r.json().get('data', {}).get('children', []):
-                p    = post.get('data', {})
-                text = f"{p.get('title','')} {p.get('selftext','')}".upper()
+            posts = [post.get('data', {}) for post in r.json().get('data', {}).get('children', [])]
+            texts = [f"{p.get('title','')} {p.get('selftext','')}" for p in posts]
+            for p, found in zip(posts, get_ticker_extractor().extract_batch(texts)):
                 upr  = p.get('upvote_ratio', 0.5)
                 scr  = p.get('score', 0)
-                for ticker, count in _extract_tickers_from_text(text):
+                for ticker, count in found.items():
                     ticker_mentions[ticker] = ticker_mentions.get(ticker, 0) + count
                     if scr > 100 and upr > 0.7:
                         ticker_sentiment[ticker] = ticker_sentiment.get(ticker, 0) + 1
@@ -701,64 +673,103 @@ def get_fallback_master_data():
 
 # ── INSIDER BUYING — OpenInsider scraping, sin API key ───────────────────────
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_insider_buying(ticker: str) -> dict:
-    result = {'has_buying': False, 'count': 0, 'total_value': 0.0, 'names': []}
-    try:
-        session = get_http_session()
-        url = (
-            f'http://openinsider.com/screener?s={ticker}&o=&pl=&ph=&ls=&lp=&nh=&nl='
-            f'&fd=7&td=0&tdd=&isoDateFrom=&isoDateTo=&ownershipType=D%2BO'
-            f'&type=P%25&action=1'
-        )
-        r = session.get(url, timeout=8, headers={'Accept': 'text/html'})
-        if r.status_code != 200:
-            return result
-        soup = BeautifulSoup(r.text, 'html.parser')
-        table = soup.find('table', {'class': 'tinytable'})
-        if not table:
-            return result
-        rows = table.find_all('tr')[1:]
-        names, total = [], 0.0
-        for row in rows[:5]:
-            cols = row.find_all('td')
-            if len(cols) < 12:
-                continue
-            name_td  = cols[5].get_text(strip=True)
-            value_td = cols[11].get_text(strip=True).replace(',', '').replace('$', '').replace('+', '')
-            try:
-                total += float(value_td)
-            except Exception:
-                pass
-            if name_td and name_td not in names:
-                names.append(name_td)
-        if names:
-            result = {'has_buying': True, 'count': len(names), 'total_value': total, 'names': names}
-    except Exception:
-        pass
-    return result
+INSIDER_BUYING_TTL    = 3600     # re-scrape por ticker como máximo cada hora
+CAPITOL_INGEST_TTL    = 7200
+CAPITOL_LOOKBACK_DAYS = 7
 
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_insider_buying_batch(tickers: tuple) -> dict:
-    results = {}
-    def _fetch(t):
-        return t, get_insider_buying(t)
+def _scrape_insider_buying(ticker: str) -> list:
+    """Compras de insiders (últimos 7 días) de un ticker en OpenInsider → eventos."""
+    events = []
+    session = get_http_session()
+    url = (
+        f'http://openinsider.com/screener?s={ticker}&o=&pl=&ph=&ls=&lp=&nh=&nl='
+        f'&fd=7&td=0&tdd=&isoDateFrom=&isoDateTo=&ownershipType=D%2BO'
+        f'&type=P%25&action=1'
+    )
+    r = session.get(url, timeout=8, headers={'Accept': 'text/html'})
+    if r.status_code != 200:
+        return events
+    soup = BeautifulSoup(r.text, 'html.parser')
+    table = soup.find('table', {'class': 'tinytable'})
+    if not table:
+        return events
+    rows = table.find_all('tr')[1:]
+    today = datetime.now().date()
+    for row in rows[:5]:
+        cols = row.find_all('td')
+        if len(cols) < 12:
+            continue
+        name_td  = cols[5].get_text(strip=True)
+        value_td = cols[11].get_text(strip=True).replace(',', '').replace('$', '').replace('+', '')
+        try:
+            value = float(value_td)
+        except Exception:
+            value = 0.0
+        filed = pd.to_datetime(cols[1].get_text(strip=True)[:10], errors='coerce')
+        filed = filed.date() if not pd.isna(filed) else today
+        events.append({
+            'kind': KIND_INSIDER, 'ticker': ticker, 'date': filed, 'side': 'COMPRA',
+            'value': value, 'source': 'openinsider_ticker',
+            'uid': make_uid(KIND_INSIDER, 'openinsider_ticker', ticker, filed, name_td, value),
+            'payload': {'name': name_td},
+        })
+    return events
+
+
+def _ingest_insider_buying(tickers) -> None:
+    """Re-scrapea solo los tickers cuya ingesta haya caducado y guarda los eventos nuevos."""
+    store = get_event_store()
+    stale = store.stale_sources([f"openinsider:{t}" for t in tickers], INSIDER_BUYING_TTL)
+    if not stale:
+        return
+    stale_tickers = [src.split(':', 1)[1] for src in stale]
     with ThreadPoolExecutor(max_workers=6) as ex:
-        futures = {ex.submit(_fetch, t): t for t in tickers}
+        futures = {ex.submit(_scrape_insider_buying, t): t for t in stale_tickers}
         for f in as_completed(futures):
             try:
-                ticker, data = f.result(timeout=12)
-                results[ticker] = data
+                events = f.result(timeout=12)
             except Exception:
-                results[futures[f]] = {'has_buying': False, 'count': 0, 'total_value': 0.0, 'names': []}
+                continue
+            store.add_events(events)
+            store.mark_ingested(f"openinsider:{futures[f]}")
+
+
+def _aggregate_insider_buying(tickers) -> dict:
+    """Una consulta al event store → {ticker: {has_buying, count, total_value, names}}."""
+    results = {t: {'has_buying': False, 'count': 0, 'total_value': 0.0, 'names': []} for t in tickers}
+    rows = get_event_store().recent(KIND_INSIDER, days=7, tickers=tickers,
+                                    side='COMPRA', source='openinsider_ticker')
+    for ev in rows:
+        res  = results.setdefault(ev['ticker'], {'has_buying': False, 'count': 0, 'total_value': 0.0, 'names': []})
+        name = ev['payload'].get('name')
+        res['total_value'] += ev['value'] or 0.0
+        if name and name not in res['names']:
+            res['names'].append(name)
+        res['has_buying'] = bool(res['names'])
+        res['count'] = len(res['names'])
     return results
 
 
+def get_insider_buying(ticker: str) -> dict:
+    try:
+        _ingest_insider_buying([ticker])
+        return _aggregate_insider_buying([ticker])[ticker]
+    except Exception:
+        return {'has_buying': False, 'count': 0, 'total_value': 0.0, 'names': []}
+
+
+def get_insider_buying_batch(tickers: tuple) -> dict:
+    try:
+        _ingest_insider_buying(tickers)
+        return _aggregate_insider_buying(list(tickers))
+    except Exception:
+        return {t: {'has_buying': False, 'count': 0, 'total_value': 0.0, 'names': []} for t in tickers}
+
+
 # ── CAPITOL TRADES — scraping sin API key ────────────────────────────────────
 
-@st.cache_data(ttl=7200, show_spinner=False)
-def get_capitol_trades_tickers() -> set:
+def _scrape_capitol_trades_tickers() -> set:
     found = set()
     session = get_http_session()
     headers = {
@@ -787,57 +798,65 @@ def get_capitol_trades_tickers() -> set:
     return found
 
 
-def get_financial_ticker_data():
-    # Agrupado por categorías para el ticker estilo Bloomberg
-    all_symbols = {
-        # MAG7
-        'AAPL': ('AAPL', 'MAG7'), 'MSFT': ('MSFT', 'MAG7'), 'GOOGL': ('GOOGL', 'MAG7'),
-        'AMZN': ('AMZN', 'MAG7'), 'NVDA': ('NVDA', 'MAG7'), 'META': ('META', 'MAG7'), 'TSLA': ('TSLA', 'MAG7'),
-        # Índices USA
-        '^GSPC': ('S&P 500', 'IDX'), '^IXIC': ('NASDAQ', 'IDX'), '^DJI': ('DOW', 'IDX'), '^RUT': ('RUSSELL', 'IDX'),
-        # Índices mundiales
-        '^N225': ('NIKKEI', 'IDX'), '^GDAXI': ('DAX', 'IDX'), '^FTSE': ('FTSE 100', 'IDX'),
-        '^FCHI': ('CAC 40', 'IDX'), '^IBEX': ('IBEX 35', 'IDX'), '^HSI': ('HANG SENG', 'IDX'),
-        # Futuros
-        'ES=F': ('S&P FUT', 'FUT'), 'NQ=F': ('NQ FUT', 'FUT'), 'YM=F': ('DOW FUT', 'FUT'),
-        # Commodities
-        'GC=F': ('ORO', 'COM'), 'SI=F': ('PLATA', 'COM'), 'CL=F': ('PETRÓLEO', 'COM'),
-        'NG=F': ('GAS NAT.', 'COM'), 'HG=F': ('COBRE', 'COM'), 'ZW=F': ('TRIGO', 'COM'),
-        # Crypto
-        'BTC-USD': ('BTC', 'CRYPTO'), 'ETH-USD': ('ETH', 'CRYPTO'), 'SOL-USD': ('SOL', 'CRYPTO'),
-        # Bonos/FX
-        '^TNX': ('BONO 10Y', 'BOND'), 'DX-Y.NYB': ('USD INDEX', 'FX'),
-    }
-    
-    def _fetch(symbol, name_cat):
-        name, cat = name_cat
-        try:
-            hist = yf.Ticker(symbol).history(period="2d")
-            if len(hist) >= 2:
-                current = hist['Close'].iloc[-1]
-                prev = hist['Close'].iloc[-2]
-                pct = ((current - prev) / prev) * 100
-                if current >= 10000:
-                    price_str = f"{current:,.0f}"
-                elif current >= 100:
-                    price_str = f"{current:,.2f}"
-                elif current >= 1:
-                    price_str = f"{current:.3f}"
-                else:
-                    price_str = f"{current:.4f}"
-                return {'name': name, 'cat': cat, 'price': price_str, 'change': pct, 'is_positive': pct >= 0}
-        except:
-            pass
-        return None
+def get_capitol_trades_tickers() -> set:
+    """Tickers con operaciones de congresistas vistas en los últimos CAPITOL_LOOKBACK_DAYS días."""
+    store = get_event_store()
+    if store.is_stale('capitoltrades', CAPITOL_INGEST_TTL):
+        today = datetime.now().date()
+        store.add_events([{
+            'kind': KIND_CONGRESS, 'ticker': t, 'date': today, 'source': 'capitoltrades',
+            'uid': make_uid(KIND_CONGRESS, t, today),
+        } for t in _scrape_capitol_trades_tickers()])
+        store.mark_ingested('capitoltrades')
+    return {ev['ticker'] for ev in store.recent(KIND_CONGRESS, days=CAPITOL_LOOKBACK_DAYS)}
+
+
+# Agrupado por categorías para el ticker estilo Bloomberg
+TICKER_TAPE_SYMBOLS = {
+    # MAG7
+    'AAPL': ('AAPL', 'MAG7'), 'MSFT': ('MSFT', 'MAG7'), 'GOOGL': ('GOOGL', 'MAG7'),
+    'AMZN': ('AMZN', 'MAG7'), 'NVDA': ('NVDA', 'MAG7'), 'META': ('META', 'MAG7'), 'TSLA': ('TSLA', 'MAG7'),
+    # Índices USA
+    '^GSPC': ('S&P 500', 'IDX'), '^IXIC': ('NASDAQ', 'IDX'), '^DJI': ('DOW', 'IDX'), '^RUT': ('RUSSELL', 'IDX'),
+    # Índices mundiales
+    '^N225': ('NIKKEI', 'IDX'), '^GDAXI': ('DAX', 'IDX'), '^FTSE': ('FTSE 100', 'IDX'),
+    '^FCHI': ('CAC 40', 'IDX'), '^IBEX': ('IBEX 35', 'IDX'), '^HSI': ('HANG SENG', 'IDX'),
+    # Futuros
+    'ES=F': ('S&P FUT', 'FUT'), 'NQ=F': ('NQ FUT', 'FUT'), 'YM=F': ('DOW FUT', 'FUT'),
+    # Commodities
+    'GC=F': ('ORO', 'COM'), 'SI=F': ('PLATA', 'COM'), 'CL=F': ('PETRÓLEO', 'COM'),
+    'NG=F': ('GAS NAT.', 'COM'), 'HG=F': ('COBRE', 'COM'), 'ZW=F': ('TRIGO', 'COM'),
+    # Crypto
+    'BTC-USD': ('BTC', 'CRYPTO'), 'ETH-USD': ('ETH', 'CRYPTO'), 'SOL-USD': ('SOL', 'CRYPTO'),
+    # Bonos/FX
+    '^TNX': ('BONO 10Y', 'BOND'), 'DX-Y.NYB': ('USD INDEX', 'FX'),
+}
+register_symbols(TICKER_TAPE_SYMBOLS)
+
 
+def _format_tape_price(current):
+    if current >= 10000:
+        return f"{current:,.0f}"
+    elif current >= 100:
+        return f"{current:,.2f}"
+    elif current >= 1:
+        return f"{current:.3f}"
+    return f"{current:.4f}"
+
+
+@swr_cached(ttl=60)
+def get_financial_ticker_data():
+    # Una sola descarga batch compartida con heatmap sectorial y ticker de noticias
+    quotes = get_quote_snapshot(TICKER_TAPE_SYMBOLS)
     ticker_data = []
-    with ThreadPoolExecutor(max_workers=12) as executor:
-        futures = {executor.submit(_fetch, sym, name_cat): sym for sym, name_cat in all_symbols.items()}
-        for fut in as_completed(futures, timeout=20):
-            result = fut.result()
-            if result:
-                ticker_data.append(result)
-    
+    for symbol, (name, cat) in TICKER_TAPE_SYMBOLS.items():
+        q = quotes.get(symbol)
+        if not q or q['chg_1d'] is None:
+            continue
+        pct = q['chg_1d']
+        ticker_data.append({'name': name, 'cat': cat, 'price': _format_tape_price(q['price']),
+                            'change': pct, 'is_positive': pct >= 0})
+
     # Ordenar: MAG7 primero, luego índices, futuros, commodities, crypto, bonos
     cat_order = {'MAG7': 0, 'IDX': 1, 'FUT': 2, 'COM': 3, 'CRYPTO': 4, 'BOND': 5, 'FX': 6}
     ticker_data.sort(key=lambda x: cat_order.get(x.get('cat', 'IDX'), 99))
@@ -865,6 +884,13 @@ def generate_ticker_html():
             {'name': 'BTC', 'cat': 'CRYPTO', 'price': '68,984.88', 'change': -1.62, 'is_positive': False},
             {'name': 'ORO', 'cat': 'COM', 'price': '2,865.40', 'change': 0.89, 'is_positive': True},
         ]
+    return _ticker_tape_html(tuple(
+        (d['name'], d.get('cat', 'IDX'), d['price'], round(d['change'], 2), d['is_positive']) for d in data))
+
+# La cinta solo se regenera cuando cambia algún precio o variación mostrados
+@fragment_cached(maxsize=64)
+def _ticker_tape_html(rows):
+    data = [dict(zip(('name', 'cat', 'price', 'change', 'is_positive'), r)) for r in rows]
 
     # Agrupar por categoría
     from collections import OrderedDict
@@ -927,57 +953,43 @@ def generate_ticker_html():
     </style>
     """
 
-@st.cache_data(ttl=300)
+SECTOR_PERFORMANCE_ETFS = {
+    'XLK': ('Technology', 'Tecnología'), 
+    'XLF': ('Financials', 'Financieros'),
+    'XLV': ('Healthcare', 'Salud'), 
+    'XLE': ('Energy', 'Energía'),
+    'XLY': ('Consumer Disc.', 'Consumo Discrecional'), 
+    'XLU': ('Utilities', 'Utilidades'),
+    'XLI': ('Industrials', 'Industriales'), 
+    'XLB': ('Materials', 'Materiales'),
+    'XLP': ('Consumer Staples', 'Consumo Básico'), 
+    'XLRE': ('Real Estate', 'Bienes Raíces'),
+    'XLC': ('Communication', 'Comunicaciones')
+}
+register_symbols(SECTOR_PERFORMANCE_ETFS)
+
+
+@swr_cached(ttl=300, fallback=lambda timeframe="1D": get_fallback_sectors(timeframe))
 def get_sector_performance(timeframe="1D"):
     try:
-        sector_etfs = {
-            'XLK': ('Technology', 'Tecnología'), 
-            'XLF': ('Financials', 'Financieros'),
-            'XLV': ('Healthcare', 'Salud'), 
-            'XLE': ('Energy', 'Energía'),
-            'XLY': ('Consumer Disc.', 'Consumo Discrecional'), 
-            'XLU': ('Utilities', 'Utilidades'),
-            'XLI': ('Industrials', 'Industriales'), 
-            'XLB': ('Materials', 'Materiales'),
-            'XLP': ('Consumer Staples', 'Consumo Básico'), 
-            'XLRE': ('Real Estate', 'Bienes Raíces'),
-            'XLC': ('Communication', 'Comunicaciones')
-        }
-
-        period_map = {"1D": "2d", "3D": "5d", "1W": "10d", "1M": "1mo"}
-        period = period_map.get(timeframe, "2d")
+        quotes = get_quote_snapshot(SECTOR_PERFORMANCE_ETFS)
+        chg_key = f"chg_{timeframe.lower()}" if timeframe in ("1D", "3D", "1W", "1M") else "chg_1d"
         sectors_data = []
 
-        for symbol, (name_en, name_es) in sector_etfs.items():
-            try:
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period=period)
-                if len(hist) >= 2:
-                    if timeframe == "1D":
-                        current, prev = hist['Close'].iloc[-1], hist['Close'].iloc[-2]
-                    elif timeframe == "3D":
-                        current = hist['Close'].iloc[-1]
-                        prev = hist['Close'].iloc[-4] if len(hist) >= 4 else hist['Close'].iloc[0]
-                    elif timeframe == "1W":
-                        current = hist['Close'].iloc[-1]
-                        prev = hist['Close'].iloc[-6] if len(hist) >= 6 else hist['Close'].iloc[0]
-                    else:
-                        current, prev = hist['Close'].iloc[-1], hist['Close'].iloc[0]
-
-                    change = ((current - prev) / prev) * 100
-                    sectors_data.append({
-                        'code': symbol, 
-                        'name': name_en, 
-                        'name_es': name_es,
-                        'change': change
-                    })
-                time.sleep(0.05)
-            except:
+        for symbol, (name_en, name_es) in SECTOR_PERFORMANCE_ETFS.items():
+            q = quotes.get(symbol)
+            if not q or q[chg_key] is None:
                 continue
+            sectors_data.append({
+                'code': symbol, 
+                'name': name_en, 
+                'name_es': name_es,
+                'change': q[chg_key]
+            })
 
-        return sectors_data if sectors_data else get_fallback_sectors(timeframe)
+        return sectors_data or None
     except:
-        return get_fallback_sectors(timeframe)
+        return None
 
 def get_fallback_sectors(timeframe="1D"):
     base = [
@@ -991,35 +1003,95 @@ def get_fallback_sectors(timeframe="1D"):
     mult = {"1D": 1, "3D": 2.5, "1W": 4, "1M": 8}.get(timeframe, 1)
     return [{'code': c, 'name': n, 'name_es': n, 'change': v * mult} for c, n, v in base]
 
-@st.cache_data(ttl=300)
+VIX_TERM_SYMBOLS   = ["^VIX", "VXX", "^VIX3M", "^VIX6M"]
+VIX_ROLL_WINDOW    = 15      # sesiones (~21 días naturales) para el roll yield vía VXX
+VIX_CURVE_ARCHIVE  = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  "data", "vix_term_archive.csv")
+
+
+def _download_vix_term(period="1y"):
+    """Una sola descarga batch de todos los instrumentos de la estructura temporal → cierres."""
+    raw = yf.download(VIX_TERM_SYMBOLS, period=period, interval="1d", auto_adjust=False,
+                      progress=False, group_by='ticker', threads=True)
+    closes = pd.DataFrame({sym: raw[sym]['Close'] for sym in VIX_TERM_SYMBOLS
+                           if sym in raw.columns.get_level_values(0)})
+    closes.index = pd.DatetimeIndex(closes.index).tz_localize(None).normalize()
+    return closes.dropna(subset=['^VIX'])
+
+
+def vix_term_history(closes):
+    """
+    Serie diaria vectorizada de pendiente de la curva: % de VIX6M (o VIX3M si falta)
+    sobre el spot y estado Contango / Backwardation / Flat con el mismo umbral ±1%.
+    """
+    spot = closes['^VIX']
+    far  = closes.get('^VIX6M', pd.Series(np.nan, index=closes.index))
+    far  = far.fillna(closes.get('^VIX3M', pd.Series(np.nan, index=closes.index)))
+    hist = pd.DataFrame({'spot': spot, 'far': far})
+    hist['slope_pct'] = (hist['far'] / hist['spot'] - 1) * 100
+    hist['state'] = np.select([hist['slope_pct'] > 1, hist['slope_pct'] < -1],
+                              ["Contango", "Backwardation"], default="Flat")
+    return hist.dropna(subset=['slope_pct'])
+
+
+def load_vix_curve_archive():
+    """Curvas diarias archivadas (una fila por sesión) o DataFrame vacío."""
+    try:
+        return pd.read_csv(VIX_CURVE_ARCHIVE, parse_dates=['date']).set_index('date').sort_index()
+    except Exception:
+        return pd.DataFrame()
+
+
+def _archive_vix_curve(as_of, result):
+    """Guarda (o sobrescribe) la curva de la sesión `as_of` en el archivo diario."""
+    try:
+        row = {
+            'spot': result['current_spot'], 'vix3m': result['vix3m'], 'vix6m': result['vix6m'],
+            'roll_yield': result['roll_yield'], 'state': result['state'],
+            **{f'm{i}': d['current'] for i, d in enumerate(result['data'])},
+        }
+        as_of   = pd.Timestamp(as_of)
+        archive = load_vix_curve_archive()
+        archive = pd.concat([archive.drop(index=as_of, errors='ignore'),
+                             pd.DataFrame([row], index=pd.DatetimeIndex([as_of], name='date'))])
+        os.makedirs(os.path.dirname(VIX_CURVE_ARCHIVE), exist_ok=True)
+        tmp = f"{VIX_CURVE_ARCHIVE}.tmp"
+        archive.sort_index().to_csv(tmp)
+        os.replace(tmp, VIX_CURVE_ARCHIVE)
+    except Exception:
+        pass
+
+
+@swr_cached(ttl=300, fallback=lambda: get_fallback_vix_structure())
 def get_vix_term_structure():
     """
-    VIX Term Structure con datos reales:
+    VIX Term Structure con datos reales (una sola descarga batch):
     - Spot: ^VIX
     - Anclas a 3m y 6m: ^VIX3M, ^VIX6M (cuando disponibles)
-    - Roll yield mensual: calculado desde VXX vs ^VIX (21 días)
+    - Roll yield mensual: calculado desde VXX vs ^VIX (15 sesiones)
     - Curva de 8 meses interpolada/extrapolada sobre esas anclas reales
     - Estado Contango / Backwardation / Flat con umbral ±1%
+    - Histórico de pendiente (1 año) y archivo diario de curvas en data/
     """
     try:
+        closes = _download_vix_term()
+        vix_close = closes['^VIX']
+
         # ── Spot VIX ──────────────────────────────────────────────────────────
-        vix = yf.Ticker("^VIX")
-        vix_hist = vix.history(period="5d")
-        if len(vix_hist) >= 3:
-            current_spot = float(vix_hist['Close'].iloc[-1])
-            prev_spot    = float(vix_hist['Close'].iloc[-2])
-            spot_2days   = float(vix_hist['Close'].iloc[-3])
+        if len(vix_close) >= 3:
+            current_spot = float(vix_close.iloc[-1])
+            prev_spot    = float(vix_close.iloc[-2])
+            spot_2days   = float(vix_close.iloc[-3])
         else:
             current_spot, prev_spot, spot_2days = 20.0, 20.0, 20.0
 
-        # ── Roll yield real via VXX (21 días) ─────────────────────────────────
+        # ── Roll yield real via VXX ───────────────────────────────────────────
         roll_yield_monthly = 0.0
         try:
-            vxx_h = yf.Ticker("VXX").history(period="21d")
-            if len(vxx_h) >= 15:
-                vxx_now  = float(vxx_h['Close'].iloc[-1])
-                vxx_1m   = float(vxx_h['Close'].iloc[0])
-                vix_1m   = float(vix_hist['Close'].iloc[0]) if len(vix_hist) > 0 else current_spot
+            pair = closes[['^VIX', 'VXX']].dropna().tail(VIX_ROLL_WINDOW)
+            if len(pair) >= VIX_ROLL_WINDOW:
+                vxx_now, vxx_1m = float(pair['VXX'].iloc[-1]), float(pair['VXX'].iloc[0])
+                vix_1m    = float(pair['^VIX'].iloc[0])
                 vix_ratio = current_spot / vix_1m if vix_1m > 0 else 1.0
                 vxx_adj   = vxx_now / (vxx_1m * vix_ratio) if (vxx_1m * vix_ratio) > 0 else 1.0
                 roll_yield_monthly = max(-5.0, min(3.0, (vxx_adj - 1.0) * 100))
@@ -1028,18 +1100,15 @@ def get_vix_term_structure():
 
         # ── Anclas de plazo medio ─────────────────────────────────────────────
         vix3m, vix6m = None, None
-        try:
-            h3 = yf.Ticker("^VIX3M").history(period="2d")
-            if len(h3) >= 1:
-                vix3m = float(h3['Close'].iloc[-1])
-        except Exception:
-            pass
-        try:
-            h6 = yf.Ticker("^VIX6M").history(period="2d")
-            if len(h6) >= 1:
-                vix6m = float(h6['Close'].iloc[-1])
-        except Exception:
-            pass
+        for sym in ('^VIX3M', '^VIX6M'):
+            if sym in closes and closes[sym].notna().any():
+                val = float(closes[sym].dropna().iloc[-1])
+                if sym == '^VIX3M': vix3m = val
+                else:               vix6m = val
+
+        # Curvas archivadas de sesiones anteriores (sustituyen al escalado por spot)
+        archive = load_vix_curve_archive()
+        archived_prev = archive[archive.index < vix_close.index[-1]].tail(2) if not archive.empty else archive
 
         # ── Construir curva de 8 puntos ───────────────────────────────────────
         now = datetime.now(timezone(timedelta(hours=1))).replace(tzinfo=None)
@@ -1073,6 +1142,8 @@ def get_vix_term_structure():
                 td  = round(cur * (spot_2days / current_spot), 2)
             else:
                 prv = cur; td = cur
+            if len(archived_prev) == 2 and f'm{i}' in archived_prev:
+                td, prv = (float(v) for v in archived_prev[f'm{i}'])
 
             vix_futures.append({
                 'month':    label,
@@ -1098,7 +1169,7 @@ def get_vix_term_structure():
             explanation = (f"<b>Flat:</b> Futuros ≈ Spot. Mercado en transición, sin sesgo claro. "
                            f"Roll yield mensual estimado: {roll_yield_monthly:+.1f}%.")
 
-        return {
+        result = {
             'data':          vix_futures,
             'current_spot':  current_spot,
             'prev_spot':     prev_spot,
@@ -1111,9 +1182,12 @@ def get_vix_term_structure():
             'roll_yield':    roll_yield_monthly,
             'vix3m':         vix3m,
             'vix6m':         vix6m,
+            'history':       vix_term_history(closes),
         }
+        _archive_vix_curve(vix_close.index[-1], result)
+        return result
     except Exception:
-        return get_fallback_vix_structure()
+        return None
 
 def get_fallback_vix_structure():
     return {
@@ -1137,6 +1211,12 @@ def get_fallback_vix_structure():
         'is_contango': True
     }
 
+def _vix_chart_key(vix_data):
+    today = datetime.now(timezone(timedelta(hours=1))).strftime('%d/%m')
+    return (today, vix_data['current_spot'], vix_data['prev_spot'], vix_data['spot_2days'],
+            tuple((d['month'], d['current'], d['previous'], d['two_days']) for d in vix_data['data']))
+
+@fragment_cached(key=_vix_chart_key, maxsize=16)
 def generate_vix_chart_html(vix_data):
     data = vix_data['data']
     months = [d['month'].split()[0] for d in data]
@@ -1213,7 +1293,33 @@ def generate_vix_chart_html(vix_data):
     </div>
     """
 
-@st.cache_data(ttl=300)
+def generate_vix_slope_sparkline(history, sessions=60):
+    """Mini-gráfico SVG de la pendiente de la curva (contango > 0 > backwardation)."""
+    if history is None or len(history) < 2:
+        return ""
+    slope = history['slope_pct'].tail(sessions).to_numpy()
+    width, height, pad = 340, 60, 4
+    lo, hi = min(slope.min(), -1.0), max(slope.max(), 1.0)
+    xs = pad + np.arange(len(slope)) / (len(slope) - 1) * (width - 2 * pad)
+    ys = height - pad - (slope - lo) / (hi - lo) * (height - 2 * pad)
+    zero_y = height - pad - (0 - lo) / (hi - lo) * (height - 2 * pad)
+    points = " ".join(f"{x:.1f},{y:.1f}" for x, y in zip(xs, ys))
+    last_color = "#00ffad" if slope[-1] > 1 else ("#f23645" if slope[-1] < -1 else "#ff9800")
+    pct_contango = (history['state'].tail(sessions) == "Contango").mean() * 100
+    return f"""
+    <div style="margin-top:8px; background:#0c0e12; border:1px solid #1a1e26; border-radius:6px; padding:6px 8px;">
+        <div style="display:flex; justify-content:space-between; font-size:9px; color:#888; margin-bottom:2px;">
+            <span>Pendiente VIX6M/Spot · {len(slope)} sesiones</span>
+            <span style="color:{last_color}; font-weight:bold;">{slope[-1]:+.1f}% · {pct_contango:.0f}% en contango</span>
+        </div>
+        <svg width="100%" height="{height}" viewBox="0 0 {width} {height}" preserveAspectRatio="none">
+            <line x1="{pad}" y1="{zero_y:.1f}" x2="{width-pad}" y2="{zero_y:.1f}" stroke="#2a2e36" stroke-width="1" stroke-dasharray="3,3"/>
+            <polyline points="{points}" fill="none" stroke="{last_color}" stroke-width="1.5" stroke-linejoin="round"/>
+        </svg>
+    </div>
+    """
+
+@swr_cached(ttl=300, fallback=lambda: get_fallback_crypto_fear_greed())
 def get_crypto_fear_greed():
     try:
         session = get_http_session()
@@ -1236,10 +1342,10 @@ def get_crypto_fear_greed():
                     'source': 'alternative.me'
                 }
         set_api_health('CryptoFG', False)
-        return get_fallback_crypto_fear_greed()
+        return None
     except:
         set_api_health('CryptoFG', False)
-        return get_fallback_crypto_fear_greed()
+        return None
 
 def get_fallback_crypto_fear_greed():
     return {
@@ -1249,39 +1355,46 @@ def get_fallback_crypto_fear_greed():
         'source': 'Datos no disponibles'
     }
 
-@st.cache_data(ttl=1800)
-def get_earnings_calendar():
+EARNINGS_INGEST_TTL = 3 * 3600
+EARNINGS_MAX_DAYS   = 90
+
+# True=After Market, False=Before Market
+EARNINGS_MEGA_CAPS_TIMING = {
+    'NVDA': True,  'AAPL': True,  'MSFT': True,  'AMZN': True,
+    'META': True,  'GOOGL': False, 'TSLA': True,  'AVGO': False,
+    'AMD': True,   'ADBE': False,  'CRM': True,   'ORCL': True,
+    'INTC': True,  'QCOM': True,   'MU': True,    'AMAT': True,
+    'JPM': False,  'BAC': False,   'GS': False,   'MS': False,
+    'WFC': False,  'C': False,     'V': False,    'MA': False,
+    'AXP': True,   'BLK': False,   'BRK-B': False,
+    'LLY': False,  'UNH': False,   'JNJ': False,  'PFE': False,
+    'MRK': False,  'ABBV': False,  'TMO': False,
+    'WMT': False,  'HD': False,    'COST': False,  'MCD': False,
+    'SBUX': True,  'NKE': True,    'TGT': False,
+    'ACN': False,  'CAT': False,   'BA': False,
+    'XOM': False,  'CVX': False,   'LIN': False,
+    'NFLX': True,  'SPOT': True,   'PLTR': True,  'SNOW': True,
+    'UBER': True,  'COIN': True,   'HOOD': True,  'RBLX': True,
+    'MSTR': True,  'SMCI': True,   'ARM': True,   'IONQ': True,
+}
+
+
+def _ingest_earnings_calendar(store):
     """
-    Earnings de mega-caps. Solo muestra fechas futuras reales.
-    Si hoy es fin de semana (sáb/dom), el filtro mínimo es mañana (days>=1).
-    Si hoy es día laborable, mostramos hoy (days>=0) solo si aún no pasó.
+    Descarga el calendario de earnings y lo vuelca al event store.
+    Alpha Vantage aporta el calendario completo de EE.UU. a 3 meses (útil para
+    unir con CANSLIM/Earnings); si no hay key o no cubre las mega-caps, yfinance.
+    Las fechas futuras que desaparecen de la fuente (reprogramaciones) se sustituyen;
+    la última fuente que informa un ticker manda, así que no quedan dos "próximos
+    earnings" por ticker. Retorna el número de eventos obtenidos (0 = fallo).
     """
-    now = datetime.now(timezone(timedelta(hours=1))).replace(tzinfo=None)
-    today = now.date()
-    is_weekend = today.weekday() >= 5  # sábado=5, domingo=6
-    min_days = 1 if is_weekend else 0
-    # True=After Market, False=Before Market
-    mega_caps_timing = {
-        'NVDA': True,  'AAPL': True,  'MSFT': True,  'AMZN': True,
-        'META': True,  'GOOGL': False, 'TSLA': True,  'AVGO': False,
-        'AMD': True,   'ADBE': False,  'CRM': True,   'ORCL': True,
-        'INTC': True,  'QCOM': True,   'MU': True,    'AMAT': True,
-        'JPM': False,  'BAC': False,   'GS': False,   'MS': False,
-        'WFC': False,  'C': False,     'V': False,    'MA': False,
-        'AXP': True,   'BLK': False,   'BRK-B': False,
-        'LLY': False,  'UNH': False,   'JNJ': False,  'PFE': False,
-        'MRK': False,  'ABBV': False,  'TMO': False,
-        'WMT': False,  'HD': False,    'COST': False,  'MCD': False,
-        'SBUX': True,  'NKE': True,    'TGT': False,
-        'ACN': False,  'CAT': False,   'BA': False,
-        'XOM': False,  'CVX': False,   'LIN': False,
-        'NFLX': True,  'SPOT': True,   'PLTR': True,  'SNOW': True,
-        'UBER': True,  'COIN': True,   'HOOD': True,  'RBLX': True,
-        'MSTR': True,  'SMCI': True,   'ARM': True,   'IONQ': True,
-    }
-    
-    earnings_list = []
-    api_key = None
+    today = datetime.now(timezone(timedelta(hours=1))).replace(tzinfo=None).date()
+
+    def _event(sym, rd, source, market_cap='-'):
+        return {'kind': KIND_EARNINGS, 'ticker': sym, 'date': rd, 'source': source,
+                'uid': make_uid(KIND_EARNINGS, sym, rd), 'payload': {'market_cap': market_cap}}
+
+    api_key, events = None, []
     try:
         api_key = st.secrets.get("ALPHA_VANTAGE_API_KEY", None)
     except:
@@ -1291,36 +1404,20 @@ def get_earnings_calendar():
     if api_key:
         try:
             from io import StringIO
-            session = get_http_session()
-            url = f"https://www.alphavantage.co/query?function=EARNINGS_CALENDAR&horizon=3month&apikey={api_key}"
-            r = session.get(url, timeout=15)
-            set_api_health('AlphaVantage', r.status_code == 200)
-            if r.status_code == 200:
-                df = pd.read_csv(StringIO(r.text))
-                df_f = df[df['symbol'].isin(list(mega_caps_timing.keys()))].copy()
-                for _, row in df_f.iterrows():
-                    try:
-                        rd = pd.to_datetime(row['reportDate']).date()
-                        days = (rd - today).days
-                        if days < min_days:
-                            continue
-                        sym = row['symbol']
-                        after_mkt = mega_caps_timing.get(sym, False)
-                        timing = "Tras el cierre" if after_mkt else "Antes de apertura"
-                        earnings_list.append({
-                            'ticker': sym,
-                            'date': rd.strftime('%d %b'),
-                            'full_date': rd,
-                            'time': timing,
-                            'impact': 'High',
-                            'market_cap': '-',
-                            'days': days,
-                        })
-                    except:
-                        continue
-                earnings_list.sort(key=lambda x: x['full_date'])
-                if len(earnings_list) >= 3:
-                    return earnings_list[:20]
+            # 25 peticiones/día en el plan gratuito: el CSV se guarda 12h
+            text = get_provider('alpha_vantage').get_text(
+                params={'function': 'EARNINGS_CALENDAR', 'horizon': '3month'}, api_key=api_key,
+                ttl=12 * 3600, timeout=15, valid=lambda t: t.lstrip().startswith('symbol'))
+            set_api_health('AlphaVantage', text is not None)
+            if text:
+                df = pd.read_csv(StringIO(text))
+                df['reportDate'] = pd.to_datetime(df['reportDate'], errors='coerce')
+                df = df.dropna(subset=['symbol', 'reportDate'])
+                events = [_event(sym, rd.date(), 'alphavantage')
+                          for sym, rd in zip(df['symbol'], df['reportDate']) if rd.date() >= today]
+                store.add_events(events, supersede_from=today, across_sources=True)
+                if sum(1 for ev in events if ev['ticker'] in EARNINGS_MEGA_CAPS_TIMING) >= 3:
+                    return len(events)
         except Exception as e:
             set_api_health('AlphaVantage', False)
 
@@ -1335,33 +1432,62 @@ def get_earnings_calendar():
                     if ed and len(ed) > 0:
                         rd = pd.Timestamp(ed[0]).date()
                         days = (rd - today).days
-                        if min_days <= days <= 60:
+                        if 0 <= days <= 60:
                             info = t.info
                             mc = info.get('marketCap', 0) or 0
                             mc_str = f"${mc/1e12:.1f}T" if mc >= 1e12 else (f"${mc/1e9:.0f}B" if mc >= 1e9 else "-")
-                            after_mkt = mega_caps_timing.get(ticker, False)
-                            return {
-                                'ticker': ticker,
-                                'date': rd.strftime('%d %b'),
-                                'full_date': rd,
-                                'time': "Tras el cierre" if after_mkt else "Antes de apertura",
-                                'impact': 'High',
-                                'market_cap': mc_str,
-                                'days': days,
-                            }
+                            return _event(ticker, rd, 'yfinance', mc_str)
         except:
             pass
         return None
 
+    av_count, events = len(events), []
     try:
         with ThreadPoolExecutor(max_workers=8) as executor:
-            futures = {executor.submit(fetch_earnings, t): t for t in list(mega_caps_timing.keys())[:20]}
+            futures = {executor.submit(fetch_earnings, t): t for t in list(EARNINGS_MEGA_CAPS_TIMING.keys())[:20]}
             for fut in as_completed(futures, timeout=20):
                 result = fut.result()
                 if result:
-                    earnings_list.append(result)
-        
-        earnings_list.sort(key=lambda x: x['full_date'])
+                    events.append(result)
+    except:
+        pass
+    store.add_events(events, supersede_from=today, across_sources=True)
+    return av_count + len(events)
+
+
+def get_earnings_calendar():
+    """
+    Earnings de mega-caps desde el event store local (ingesta incremental cada
+    EARNINGS_INGEST_TTL). Solo muestra fechas futuras reales.
+    Si hoy es fin de semana (sáb/dom), el filtro mínimo es mañana (days>=1).
+    Si hoy es día laborable, mostramos hoy (days>=0) solo si aún no pasó.
+    """
+    now = datetime.now(timezone(timedelta(hours=1))).replace(tzinfo=None)
+    today = now.date()
+    is_weekend = today.weekday() >= 5  # sábado=5, domingo=6
+    min_days = 1 if is_weekend else 0
+
+    try:
+        store = get_event_store()
+        if store.is_stale('earnings_calendar', EARNINGS_INGEST_TTL):
+            # Solo se marca si llegó algo: un fallo total reintenta en la próxima lectura
+            if _ingest_earnings_calendar(store):
+                store.mark_ingested('earnings_calendar')
+
+        earnings_list = []
+        for ev in store.upcoming(list(EARNINGS_MEGA_CAPS_TIMING), days=EARNINGS_MAX_DAYS,
+                                 from_date=today + timedelta(days=min_days)):
+            rd = datetime.strptime(ev['event_date'], '%Y-%m-%d').date()
+            after_mkt = EARNINGS_MEGA_CAPS_TIMING.get(ev['ticker'], False)
+            earnings_list.append({
+                'ticker': ev['ticker'],
+                'date': rd.strftime('%d %b'),
+                'full_date': rd,
+                'time': "Tras el cierre" if after_mkt else "Antes de apertura",
+                'impact': 'High',
+                'market_cap': ev['payload'].get('market_cap', '-'),
+                'days': (rd - today).days,
+            })
         if earnings_list:
             return earnings_list[:20]
     except:
@@ -1385,17 +1511,17 @@ def get_fallback_earnings_realistic():
         }
     ]
 
-@st.cache_data(ttl=1800)
-def get_insider_trading():
+INSIDER_INGEST_TTL = 1800
+
+
+def _scrape_insider_trades(session):
     """
-    Obtiene transacciones reales de insiders via múltiples fuentes.
+    Transacciones recientes de insiders con ticker fiable:
     1. OpenInsider CSV export (más fiable que HTML scraping)
-    2. SEC EDGAR últimas Form 4 con enriquecimiento de datos
-    3. FMP API si hay key configurada
+    2. FMP API si hay key configurada (solo si OpenInsider no devuelve nada)
     """
     all_trades = []
-    session = get_http_session()
-    
+
     # ── FUENTE 1: OpenInsider CSV (sin necesidad de parsear HTML) ─────────────
     try:
         # CSV export directo de OpenInsider - mucho más fiable
@@ -1513,61 +1639,28 @@ def get_insider_trading():
                             'amount': value_fmt,
                             'date': safe_cell(col_map['date'])[:10],
                             'value_num': value_num,
+                            'source': 'openinsider',
                         })
                     except:
                         continue
     except Exception as e:
         set_api_health('Insider', False)
     
-    # ── FUENTE 2: SEC EDGAR EFTS (búsqueda de Form 4 recientes) ───────────────
-    if not all_trades:
-        try:
-            # API pública de búsqueda EDGAR - Form 4 = transacciones de insiders
-            sec_url = "https://efts.sec.gov/LATEST/search-index?q=%22form+4%22&dateRange=custom&startdt={}&enddt={}&forms=4".format(
-                (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d'),
-                datetime.now(timezone(timedelta(hours=1))).strftime('%Y-%m-%d')
-            )
-            r = session.get(sec_url, timeout=12, headers={'User-Agent': 'MarketDashboard/1.0 contact@example.com'})
-            if r.status_code == 200:
-                data = r.json()
-                hits = data.get('hits', {}).get('hits', [])[:8]
-                for hit in hits:
-                    src = hit.get('_source', {})
-                    display_names = src.get('display_names', [])
-                    entity = display_names[0].get('name', 'Desconocido') if display_names else 'Desconocido'
-                    # Form 4 del ticker / company
-                    tickers = src.get('period_of_report', '')
-                    filed = src.get('file_date', '')[:10]
-                    # Usar entity_name como ticker si es corto
-                    company = src.get('entity_name', '')
-                    ticker_candidate = company[:6].replace(' ', '') if company else 'N/D'
-                    
-                    all_trades.append({
-                        'ticker': ticker_candidate,
-                        'insider': entity[:26],
-                        'position': 'Form 4 SEC',
-                        'type': 'N/D',
-                        'amount': 'Ver SEC',
-                        'date': filed,
-                        'value_num': 0,
-                    })
-                if all_trades:
-                    set_api_health('Insider', True)
-        except:
-            pass
-    
-    # ── FUENTE 3: FMP API ──────────────────────────────────────────────────────
+    # ── FUENTE 2: FMP API ──────────────────────────────────────────────────────
     if not all_trades:
         try:
             api_key = st.secrets.get("FMP_API_KEY", None)
             if api_key:
                 symbols = ['AAPL', 'MSFT', 'NVDA', 'TSLA', 'META', 'GOOGL', 'AMZN', 'NFLX', 'AMD', 'CRM']
+                fmp = get_provider('fmp')
                 for symbol in symbols[:8]:
                     try:
-                        url = f"https://financialmodelingprep.com/api/v4/insider-trading?symbol={symbol}&limit=3&apikey={api_key}"
-                        r = session.get(url, timeout=10)
-                        if r.status_code == 200:
-                            for trade in r.json():
+                        # Cuota FMP (250/día) y caché persistente de 6h por símbolo
+                        data = fmp.get_json("https://financialmodelingprep.com/api/v4/insider-trading",
+                                            {'symbol': symbol, 'limit': 3}, api_key=api_key,
+                                            ttl=6 * 3600, timeout=10, valid=lambda d: isinstance(d, list))
+                        if data:
+                            for trade in data:
                                 tt = trade.get('transactionType', '')
                                 trans = "COMPRA" if 'P' in tt else ("VENTA" if 'S' in tt else None)
                                 if not trans: continue
@@ -1583,14 +1676,91 @@ def get_insider_trading():
                                         'amount': f"${amount/1e6:.1f}M" if amount >= 1e6 else f"${amount/1e3:.0f}K",
                                         'date': trade.get('transactionDate', '')[:10],
                                         'value_num': amount,
+                                        'source': 'fmp',
                                     })
                     except:
                         continue
         except:
             pass
     
+    return all_trades
+
+
+def _sec_form4_fallback(session):
+    """Últimas Form 4 de SEC EDGAR. No se persisten: el 'ticker' sale del nombre de la entidad."""
+    all_trades = []
+    # ── FUENTE 3: SEC EDGAR EFTS (búsqueda de Form 4 recientes) ───────────────
+    try:
+        # API pública de búsqueda EDGAR - Form 4 = transacciones de insiders
+        sec_url = "https://efts.sec.gov/LATEST/search-index?q=%22form+4%22&dateRange=custom&startdt={}&enddt={}&forms=4".format(
+            (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d'),
+            datetime.now(timezone(timedelta(hours=1))).strftime('%Y-%m-%d')
+        )
+        r = session.get(sec_url, timeout=12, headers={'User-Agent': 'MarketDashboard/1.0 contact@example.com'})
+        if r.status_code == 200:
+            data = r.json()
+            hits = data.get('hits', {}).get('hits', [])[:8]
+            for hit in hits:
+                src = hit.get('_source', {})
+                display_names = src.get('display_names', [])
+                entity = display_names[0].get('name', 'Desconocido') if display_names else 'Desconocido'
+                # Form 4 del ticker / company
+                tickers = src.get('period_of_report', '')
+                filed = src.get('file_date', '')[:10]
+                # Usar entity_name como ticker si es corto
+                company = src.get('entity_name', '')
+                ticker_candidate = company[:6].replace(' ', '') if company else 'N/D'
+                
+                all_trades.append({
+                    'ticker': ticker_candidate,
+                    'insider': entity[:26],
+                    'position': 'Form 4 SEC',
+                    'type': 'N/D',
+                    'amount': 'Ver SEC',
+                    'date': filed,
+                    'value_num': 0,
+                })
+            if all_trades:
+                set_api_health('Insider', True)
+    except:
+        pass
+    
+    return all_trades
+
+
+def _insider_event(trade):
+    d = pd.to_datetime(str(trade.get('date', ''))[:10], errors='coerce')
+    d = d.date() if not pd.isna(d) else datetime.now().date()
+    return {
+        'kind': KIND_INSIDER, 'ticker': trade['ticker'], 'date': d, 'side': trade['type'],
+        'value': trade.get('value_num', 0), 'source': trade['source'],
+        'uid': make_uid(KIND_INSIDER, trade['source'], trade['ticker'], d,
+                        trade['insider'], trade['type'], trade.get('value_num', 0)),
+        'payload': trade,
+    }
+
+
+def get_insider_trading():
+    """
+    Mayores transacciones de insiders de los últimos 7 días desde el event store.
+    La ingesta (OpenInsider → FMP) se repite como máximo cada INSIDER_INGEST_TTL y
+    solo añade operaciones nuevas. SEC EDGAR queda como último recurso sin persistir.
+    """
+    session = get_http_session()
+    try:
+        store = get_event_store()
+        if store.is_stale('insider_feed', INSIDER_INGEST_TTL):
+            store.add_events([_insider_event(t) for t in _scrape_insider_trades(session)])
+            store.mark_ingested('insider_feed')
+        rows = store.recent(KIND_INSIDER, days=7, source=('openinsider', 'fmp'),
+                            order='value DESC', limit=8)
+        if rows:
+            return [ev['payload'] for ev in rows]
+    except Exception:
+        pass
+
+    all_trades = _sec_form4_fallback(session)
     if all_trades:
-        all_trades.sort(key=lambda x: x.get('value_num', 0), reverse=True)
         return all_trades[:8]
     
     return get_fallback_insider()
@@ -1600,8 +1770,48 @@ def get_fallback_insider():
         {"ticker": "N/D", "insider": "Datos no disponibles", "position": "-", "type": "N/D", "amount": "-"},
     ]
 
-@st.cache_data(ttl=600)
+def _spy_trend_metrics(close):
+    """Precio, SMA50/200 y RSI(14) del SPY a partir de su serie de cierres."""
+    current = float(close.iloc[-1])
+    sma50   = float(close.rolling(50).mean().iloc[-1])
+    sma200  = float(close.rolling(200).mean().iloc[-1])
+    deltas  = close.diff()
+    gains   = deltas.where(deltas > 0, 0).rolling(14).mean()
+    losses  = (-deltas.where(deltas < 0, 0)).rolling(14).mean()
+    rs      = gains / losses
+    rsi     = float(100 - (100 / (1 + rs.iloc[-1]))) if not pd.isna(rs.iloc[-1]) else 50.0
+    return {
+        'price': current, 'sma50': sma50, 'sma200': sma200,
+        'above_sma50': current > sma50, 'above_sma200': current > sma200,
+        'golden_cross': sma50 > sma200, 'rsi': rsi,
+        'trend': 'ALCISTA' if sma50 > sma200 else 'BAJISTA',
+        'strength': 'FUERTE' if (current > sma50 and current > sma200) else 'DÉBIL',
+    }
+
+
+@swr_cached(ttl=600, fallback=lambda: get_fallback_market_breadth())
 def get_market_breadth():
+    """
+    Breadth real del S&P 500 (motor de modules.breadth: un yf.download batch del
+    panel de constituyentes, actualizado incrementalmente). Si el motor no tiene
+    datos se recurre al proxy SPY + ETFs sectoriales.
+    """
+    try:
+        engine = get_breadth_engine()
+        engine.refresh()
+        snap = engine.snapshot()
+        spy_close = engine.benchmark_close()
+        if snap and len(spy_close) >= 200 and snap['pct_above_sma50'] is not None:
+            result = _spy_trend_metrics(spy_close)
+            result.update(snap)
+            result['real_data'] = True
+            return result
+    except Exception:
+        pass
+    return _market_breadth_proxy()
+
+
+def _market_breadth_proxy():
     try:
         spy = yf.Ticker("SPY")
         # Necesitamos al menos 200 días para SMA200
@@ -1665,9 +1875,9 @@ def get_market_breadth():
                 'trend': 'N/D', 'strength': 'N/D',
                 'mcclellan': 0.0, 'pct_above_sma50': 50.0,
             }
-        return get_fallback_market_breadth()
+        return None
     except:
-        return get_fallback_market_breadth()
+        return None
 
 def get_fallback_market_breadth():
     return {
@@ -1685,13 +1895,9 @@ def get_fallback_news():
 def translate_to_spanish(text):
     """Intenta traducir texto al castellano usando MyMemory API (gratuita)"""
     try:
-        url = f"https://api.mymemory.translated.net/get?q={requests.utils.quote(text[:500])}&langpair=en|es"
-        r = requests.get(url, timeout=5)
-        if r.status_code == 200:
-            data = r.json()
-            translated = data.get('responseData', {}).get('translatedText', '')
-            if translated and translated != text:
-                return translated
+        translated = translate_en_es(text[:500], timeout=5)
+        if translated and translated != text:
+            return translated
     except:
         pass
     return text
@@ -1702,9 +1908,8 @@ def fetch_finnhub_news():
     if not api_key:
         return get_fallback_news()
     try:
-        url = f"https://finnhub.io/api/v1/news?category=general&token={api_key}"
-        r = requests.get(url, timeout=12)
-        data = r.json()
+        data = get_provider('finnhub').get_json("news", {"category": "general"}, api_key=api_key,
+                                                ttl=300, timeout=12) or []
         news_list = []
         for item in data[:8]:
             title_en = item.get("headline", "Sin título")
@@ -2593,6 +2798,7 @@ def render():
             _saved_briefing = st.session_state.get("briefing_text", "")
             _saved_briefing_ts = st.session_state.get("briefing_ts", "")
             st.cache_data.clear()
+            get_background_cache().invalidate()
             # Restaurar briefing tras limpiar caché
             st.session_state["briefing_text"] = _saved_briefing
             st.session_state["briefing_ts"]   = _saved_briefing_ts
@@ -2919,7 +3125,7 @@ def render():
                 </div>
             </div>
             <div class="content">{events_html}</div>
-            <div class="update-timestamp">Actualizado: {get_timestamp()} • {len(events)} eventos</div>
+            <div class="update-timestamp">Actualizado: {format_fetched_at(get_economic_calendar.fetched_at())} • {len(events)} eventos</div>
         </div>
         </body></html>'''
         components.html(cal_full_html, height=420, scrolling=False)
@@ -3235,7 +3441,7 @@ body{{font-family:-apple-system,BlinkMacSystemFont,"Segoe UI",Roboto,sans-serif;
             '<div class="module-content">'
             '<div class="sector-grid">' + _s_html + '</div>'
             '</div>'
-            f'<div class="update-timestamp">Actualizado: {get_timestamp()} · 1M</div>'
+            f'<div class="update-timestamp">Actualizado: {format_fetched_at(get_sector_performance.fetched_at(current_tf))} · 1M</div>'
             '</div>',
             unsafe_allow_html=True
         )
@@ -3808,13 +4014,42 @@ body{{font-family:-apple-system,BlinkMacSystemFont,"Segoe UI",Roboto,sans-serif;
         elif rsi < 30: rsi_color, rsi_text = "#00ffad", "SOBREVENTA"
         else: rsi_color, rsi_text = "#ff9800", "NEUTRAL"
         
-        mcclellan = breadth.get('mcclellan', 0.0)
+        mcclellan = breadth.get('mcclellan') or 0.0
         mcclellan_color = "#00ffad" if mcclellan > 0 else "#f23645"
         mcclellan_state = "ALCISTA" if mcclellan > 20 else ("BAJISTA" if mcclellan < -20 else "NEUTRO")
         
         pct_sma50 = breadth.get('pct_above_sma50', 50.0)
         pct_color = "#00ffad" if pct_sma50 >= 60 else ("#f23645" if pct_sma50 <= 40 else "#ff9800")
-        
+        pct_label = "% S&P 500 sobre SMA50" if breadth.get('real_data') else "% Sectores sobre SMA50"
+
+        # Amplitud real del panel S&P 500: SMA20/200, avances/descensos, nuevos máx/mín
+        real_breadth_html = ""
+        if breadth.get('real_data'):
+            def _pct(v):
+                return f"{v:.0f}%" if v is not None else "N/D"
+            ad_color = "#00ffad" if breadth['adv'] >= breadth['dec'] else "#f23645"
+            hl_color = "#00ffad" if breadth['new_highs'] >= breadth['new_lows'] else "#f23645"
+            summation = breadth.get('summation') or 0.0
+            real_breadth_html = f'''
+                <div style="display:grid; grid-template-columns:1fr 1fr; gap:6px; margin-bottom:5px;">
+                    <div class="metric-box" style="margin-bottom:0; padding:6px;">
+                        <span class="metric-label">% &gt; SMA20 / SMA200</span>
+                        <span class="metric-value" style="color:white; font-size:11px;">{_pct(breadth.get('pct_above_sma20'))} / {_pct(breadth.get('pct_above_sma200'))}</span>
+                    </div>
+                    <div class="metric-box" style="margin-bottom:0; padding:6px;">
+                        <span class="metric-label">Avances / Desc.</span>
+                        <span class="metric-value" style="color:{ad_color}; font-size:11px;">{breadth['adv']} / {breadth['dec']}</span>
+                    </div>
+                    <div class="metric-box" style="margin-bottom:0; padding:6px;">
+                        <span class="metric-label">Máx / Mín 52s</span>
+                        <span class="metric-value" style="color:{hl_color}; font-size:11px;">{breadth['new_highs']} / {breadth['new_lows']}</span>
+                    </div>
+                    <div class="metric-box" style="margin-bottom:0; padding:6px;">
+                        <span class="metric-label">Sumación</span>
+                        <span class="metric-value" style="color:{'#00ffad' if summation >= 0 else '#f23645'}; font-size:11px;">{summation:+,.0f}</span>
+                    </div>
+                </div>'''
+
         # SMA200: si es nan, mostrar N/D
         sma200_val = breadth['sma200']
         import math
@@ -3825,8 +4060,8 @@ body{{font-family:-apple-system,BlinkMacSystemFont,"Segoe UI",Roboto,sans-serif;
             sma200_str = f"${sma200_val:.2f}"
             sma200_color_use = sma200_color
 
-        tooltip_text = "Market Breadth: SMA50/200, Golden/Death Cross, RSI(14), Oscilador McClellan, % activos sobre SMA50"
-        timestamp_str = get_timestamp()
+        tooltip_text = "Market Breadth: SMA50/200, Golden/Death Cross, RSI(14), Oscilador McClellan y Sumación (avances/descensos del S&P 500), % constituyentes sobre SMA20/50/200, nuevos máximos/mínimos de 52 semanas"
+        timestamp_str = format_fetched_at(get_market_breadth.fetched_at())
 
         breadth_html = f'''<!DOCTYPE html><html><head>
         <link rel="preconnect" href="https://fonts.googleapis.com">
@@ -3891,7 +4126,7 @@ body{{font-family:-apple-system,BlinkMacSystemFont,"Segoe UI",Roboto,sans-serif;
                 <div class="metric-box">
                     <div style="flex:1;">
                         <div style="display:flex; justify-content:space-between; margin-bottom:3px;">
-                            <span class="metric-label">% Sectores sobre SMA50</span>
+                            <span class="metric-label">{pct_label}</span>
                             <span style="color:{pct_color}; font-size:11px; font-weight:bold;">{pct_sma50:.0f}%</span>
                         </div>
                         <div class="pct-bar-bg">
@@ -3899,6 +4134,7 @@ body{{font-family:-apple-system,BlinkMacSystemFont,"Segoe UI",Roboto,sans-serif;
                         </div>
                     </div>
                 </div>
+                {real_breadth_html}
                 <div style="margin-top:6px;">
                     <div style="display:flex; justify-content:space-between; margin-bottom:3px;">
                         <span class="metric-label">RSI (14)</span>
@@ -3934,10 +4170,11 @@ body{{font-family:-apple-system,BlinkMacSystemFont,"Segoe UI",Roboto,sans-serif;
         state_color = vix_data['state_color']
         state_bg = f"{state_color}15"
         chart_html = generate_vix_chart_html(vix_data)
+        slope_html = generate_vix_slope_sparkline(vix_data.get('history'))
         tooltip_text = f"VIX Term Structure: {vix_data['state']}. {vix_data['explanation']}"
         data_points = vix_data['data']
         slope_pct = ((data_points[-1]['current'] - data_points[0]['current']) / data_points[0]['current']) * 100 if len(data_points) >= 2 else 0
-        timestamp_str = get_timestamp()
+        timestamp_str = format_fetched_at(get_vix_term_structure.fetched_at())
 
         vix_html_full = f"""
 <!DOCTYPE html><html><head>
@@ -3989,6 +4226,7 @@ body {{ font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans
             <div class="insight-title">● {vix_data['state']}</div>
             <div class="insight-desc">{vix_data['state_desc']}</div>
         </div>
+        {slope_html}
     </div>
     <div class="update-timestamp">Actualizado: {timestamp_str}</div>
 </div>
@@ -4021,7 +4259,7 @@ body {{ font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans
             )
             crypto_items_html.append(item_html)
         crypto_content = "".join(crypto_items_html)
-        timestamp_str = get_timestamp()
+        timestamp_str = format_fetched_at(get_crypto_prices.fetched_at())
 
         crypto_html_full = '''<!DOCTYPE html><html><head>
         <link rel="preconnect" href="https://fonts.googleapis.com">
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+news_archive.py — Archivo local (SQLite + FTS5) de las noticias del newsfeed.
+
+Cada historia (cluster de near-duplicates) se guarda una sola vez con sus campos
+de clasificación; re-archivarla solo actualiza la lista de fuentes. Un índice
+full-text (FTS5) sobre título y descripción, más índices por fecha, sector,
+impacto y ticker, permiten buscar semanas de titulares en milisegundos sin
+volver a consultar los feeds. La retención borra lo antiguo y compacta el
+índice una vez al día.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+NEWS_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "data", "news.db")
+
+RETENTION_DAYS = 90
+COMPACT_EVERY  = 86400     # segundos entre purga + compactación
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS news (
+    id              INTEGER PRIMARY KEY,
+    uid             TEXT    NOT NULL UNIQUE,
+    title           TEXT    NOT NULL,
+    descr           TEXT,
+    link            TEXT,
+    src_id          TEXT,
+    src_label       TEXT,
+    src_css         TEXT,
+    special         TEXT,
+    sources         TEXT,
+    tickers         TEXT,
+    impact          TEXT,
+    sentiment       TEXT,
+    sentiment_score INTEGER,
+    sector          TEXT,
+    score           INTEGER,
+    published_ts    REAL    NOT NULL,
+    archived_at     REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_news_ts        ON news (published_ts);
+CREATE INDEX IF NOT EXISTS ix_news_sector_ts ON news (sector, published_ts);
+CREATE INDEX IF NOT EXISTS ix_news_impact_ts ON news (impact, published_ts);
+CREATE INDEX IF NOT EXISTS ix_news_special   ON news (special, published_ts);
+CREATE TABLE IF NOT EXISTS news_tickers (
+    ticker       TEXT    NOT NULL,
+    published_ts REAL    NOT NULL,
+    news_id      INTEGER NOT NULL,
+    PRIMARY KEY (ticker, published_ts, news_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value REAL
+);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+    title, descr, content='news', content_rowid='id', tokenize='unicode61 remove_diacritics 2');
+CREATE TRIGGER IF NOT EXISTS news_ai AFTER INSERT ON news BEGIN
+    INSERT INTO news_fts (rowid, title, descr) VALUES (new.id, new.title, new.descr);
+END;
+CREATE TRIGGER IF NOT EXISTS news_ad AFTER DELETE ON news BEGIN
+    INSERT INTO news_fts (news_fts, rowid, title, descr) VALUES ('delete', old.id, old.title, old.descr);
+END;
+CREATE TRIGGER IF NOT EXISTS news_au AFTER UPDATE OF title, descr ON news BEGIN
+    INSERT INTO news_fts (news_fts, rowid, title, descr) VALUES ('delete', old.id, old.title, old.descr);
+    INSERT INTO news_fts (rowid, title, descr) VALUES (new.id, new.title, new.descr);
+END;
+"""
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _fts_query(text):
+    """Texto libre → consulta FTS5 segura: cada palabra como prefijo, todas requeridas."""
+    return " ".join(f'"{w}"*' for w in _WORD_RE.findall(text))
+
+
+class NewsArchive:
+    """Conexión SQLite compartida por el proceso (WAL, acceso serializado)."""
+
+    def __init__(self, path=NEWS_DB_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path  = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            # auto_vacuum solo tiene efecto en una base nueva (antes de crear tablas)
+            self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            try:
+                self._conn.executescript(_FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError:
+                # SQLite sin FTS5: la búsqueda de texto cae a LIKE
+                self.fts = False
+            self._conn.commit()
+
+    # ── ingesta ───────────────────────────────────────────────────────────────
+    def add_items(self, items):
+        """
+        Archiva items del newsfeed (ya clasificados y agrupados). Cada item necesita
+        story_id, title y published_ts; las historias ya archivadas solo actualizan
+        sus fuentes y tickers. Retorna el número de historias nuevas.
+        """
+        now  = time.time()
+        rows = [(
+            it["story_id"], it["title"], it.get("desc", ""), it.get("link", ""),
+            it.get("src_id"), it.get("src_label"), it.get("src_css"), it.get("special"),
+            json.dumps(it.get("sources") or [it.get("src_label")]),
+            json.dumps(it.get("tickers") or []),
+            it.get("impact"), (it.get("sentiment") or {}).get("label"),
+            (it.get("sentiment") or {}).get("score"), it.get("sector"), it.get("score"),
+            it["published_ts"], now,
+        ) for it in items]
+        tk_rows = [(t, it["published_ts"], it["story_id"]) for it in items for t in it.get("tickers") or []]
+        with self._lock:
+            cur = self._conn.cursor()
+            uids = [r[0] for r in rows]
+            existentes = {r[0] for i in range(0, len(uids), 500) for r in cur.execute(
+                f"SELECT uid FROM news WHERE uid IN ({','.join('?' * len(uids[i:i + 500]))})", uids[i:i + 500])}
+            cur.executemany(
+                "INSERT INTO news (uid, title, descr, link, src_id, src_label, src_css, special, sources, "
+                "tickers, impact, sentiment, sentiment_score, sector, score, published_ts, archived_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(uid) DO UPDATE SET sources=excluded.sources, tickers=excluded.tickers "
+                "WHERE news.sources != excluded.sources OR news.tickers != excluded.tickers", rows)
+            cur.executemany(
+                "INSERT OR IGNORE INTO news_tickers (ticker, published_ts, news_id) "
+                "SELECT ?, ?, id FROM news WHERE uid=?", tk_rows)
+            self._conn.commit()
+        self._maybe_compact()
+        return len(set(uids) - existentes)
+
+    # ── retención ─────────────────────────────────────────────────────────────
+    def _maybe_compact(self):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key='last_compact'").fetchone()
+        if row is None or time.time() - row["value"] > COMPACT_EVERY:
+            self.compact()
+
+    def compact(self, retention_days=RETENTION_DAYS):
+        """Borra historias más antiguas que la retención y compacta índice y fichero."""
+        cutoff = time.time() - retention_days * 86400
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("DELETE FROM news_tickers WHERE published_ts < ?", (cutoff,))
+            borradas = cur.execute("DELETE FROM news WHERE published_ts < ?", (cutoff,)).rowcount
+            if self.fts:
+                cur.execute("INSERT INTO news_fts (news_fts) VALUES ('optimize')")
+            cur.execute("INSERT INTO meta (key, value) VALUES ('last_compact', ?) "
+                        "ON CONFLICT(key) DO UPDATE SET value=excluded.value", (time.time(),))
+            self._conn.commit()
+            self._conn.execute("PRAGMA incremental_vacuum")
+        return borradas
+
+    # ── consultas ─────────────────────────────────────────────────────────────
+    def search(self, text=None, tickers=None, sector=None, impact=None, start_ts=None,
+               end_ts=None, special=None, exclude_special=None, limit=100):
+        """Historias filtradas por texto, tickers, sector, impacto y rango [start_ts, end_ts]."""
+        where, params, join = [], [], ""
+        if text and text.strip():
+            if self.fts:
+                q = _fts_query(text)
+                if not q:
+                    return []
+                join = "JOIN news_fts ON news_fts.rowid = n.id"
+                where.append("news_fts MATCH ?"); params.append(q)
+            else:
+                for w in _WORD_RE.findall(text):
+                    where.append("(n.title LIKE ? OR n.descr LIKE ?)"); params += [f"%{w}%"] * 2
+        if tickers is not None:
+            tickers = [t.upper() for t in tickers]
+            if not tickers:
+                return []
+            sub = f"SELECT news_id FROM news_tickers WHERE ticker IN ({','.join('?' * len(tickers))})"
+            sub_params = list(tickers)
+            if start_ts is not None:
+                sub += " AND published_ts >= ?"; sub_params.append(start_ts)
+            where.append(f"n.id IN ({sub})"); params.extend(sub_params)
+        if sector is not None:
+            where.append("n.sector=?"); params.append(sector)
+        if isinstance(impact, (list, tuple, set)):
+            where.append(f"n.impact IN ({','.join('?' * len(impact))})"); params.extend(impact)
+        elif impact is not None:
+            where.append("n.impact=?"); params.append(impact)
+        if start_ts is not None:
+            where.append("n.published_ts>=?"); params.append(start_ts)
+        if end_ts is not None:
+            where.append("n.published_ts<=?"); params.append(end_ts)
+        if special is not None:
+            where.append("n.special=?"); params.append(special)
+        if exclude_special is not None:
+            where.append("(n.special IS NULL OR n.special!=?)"); params.append(exclude_special)
+        sql = f"SELECT n.* FROM news n {join}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY n.published_ts DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._row(r) for r in rows]
+
+    @staticmethod
+    def _row(r):
+        """Fila → item con la misma forma que los del newsfeed (sin minutes_ago)."""
+        return {
+            "story_id": r["uid"], "title": r["title"], "desc": r["descr"] or "", "link": r["link"] or "",
+            "src_id": r["src_id"], "src_label": r["src_label"], "src_css": r["src_css"] or "src-generic",
+            "special": r["special"], "sources": json.loads(r["sources"] or "[]"),
+            "tickers": json.loads(r["tickers"] or "[]"), "impact": r["impact"] or "low",
+            "sentiment": {"label": r["sentiment"] or "neutral", "score": r["sentiment_score"] or 0},
+            "sector": r["sector"] or "GENERAL", "score": r["score"] or 0,
+            "published_ts": r["published_ts"],
+        }
+
+
+_instance = None
+_instance_lock = threading.Lock()
+
+
+def get_news_archive():
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = NewsArchive()
+    return _instance
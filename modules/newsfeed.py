@@ -2,12 +2,27 @@
 """
 RSU News Feed — autocontenido, sin utils/, sin st.set_page_config(), sin st.sidebar.
 """
+import asyncio
+import hashlib
+import json
+import os
 import re
+import threading
+import time
 import html as _html
 import streamlit as st
 import streamlit.components.v1 as _components
 from datetime import datetime, timezone
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.fragment_cache import fragment_cached
+from modules.news_archive import get_news_archive
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
 
 # ══════════════════════════════════════════════════════════════════════
 # SOURCES  (~50, matching HTML reference)
@@ -115,15 +130,6 @@ BULL_KW = ["surge","rally","beats","upgrade","bullish","growth","record high","b
            "strong","profit","gain","rise","boost","soar","jump","outperform","buy"]
 BEAR_KW = ["plunge","crash","miss","downgrade","bearish","recession","default","crisis",
            "collapse","loss","decline","fall","weak","layoff","slump","underperform","sell"]
-KNOWN_TICKERS = {
-    "AAPL","MSFT","GOOGL","GOOG","AMZN","META","TSLA","NVDA","AMD","INTC",
-    "JPM","GS","BAC","MS","C","WFC","XOM","CVX","JNJ","PFE","MRK",
-    "SPY","QQQ","IWM","DIA","TLT","GLD","SLV","HYG","VXX","BTC","ETH","SOL",
-    "UBER","LYFT","NFLX","DIS","PYPL","SQ","SHOP","CRM","SNOW","PLTR",
-    "HOOD","COIN","MSTR","SMCI","ARM","AVGO","QCOM","MU","ASML","SOFI",
-    "RIVN","NIO","BABA","JD","PDD","ROKU","ZM","DOCU","ORCL","IBM","DELL",
-    "F","GM","BA","LMT","RTX","CAT","DE","GE","MMM","HON","UNH","V","MA",
-}
 
 # ══════════════════════════════════════════════════════════════════════
 # CSS
@@ -232,6 +238,7 @@ _CSS = """
 .nf-nc-header{display:flex;align-items:center;gap:7px;margin-bottom:5px;flex-wrap:wrap;}
 .nf-src-badge{font-size:8px;letter-spacing:.12em;padding:2px 7px;border-radius:2px;
   border:1px solid;font-family:"Courier New",monospace;text-transform:uppercase;}
+.nf-src-more{font-size:8px;color:#6a6a88;letter-spacing:.08em;font-family:"Courier New",monospace;}
 .nf-sector{font-size:8px;color:#4a4a68;letter-spacing:.12em;font-family:"Courier New",monospace;text-transform:uppercase;}
 .nf-title{font-family:"VT323",monospace;font-size:1.2rem;font-weight:600;
   line-height:1.35;color:#dde1f0;margin-bottom:4px;}
@@ -344,7 +351,8 @@ _CSS = """
 .nf-src-bw{flex:2;height:3px;background:#1c1c2a;border-radius:1px;overflow:hidden;}
 .nf-src-b{height:100%;background:#00e676;border-radius:1px;}
 .nf-src-dot{width:6px;height:6px;border-radius:50%;flex-shrink:0;}
-.nf-src-ok{background:#00e676}.nf-src-err{background:#ff1744}
+.nf-src-ok{background:#00e676}.nf-src-err{background:#ff1744}.nf-src-off{background:#4a4a68}
+.nf-src-meta{color:#4a4a68;font-size:8px;min-width:52px;text-align:right;}
 .nf-src-loading{background:#ffab00;animation:nf-blink 1s infinite;}
 
 /* ── KEYWORDS LEGEND ─────────────────────────────────────── */
@@ -400,37 +408,83 @@ _CSS = """
 # ══════════════════════════════════════════════════════════════════════
 # NLP
 # ══════════════════════════════════════════════════════════════════════
-def _classify_impact(text):
-    t = text.lower()
-    if any(k in t for k in HIGH_KW): return "high"
-    if any(k in t for k in MED_KW):  return "med"
-    if any(k in t for k in LOW_KW):  return "low"
-    return "low"
-
-def _sentiment(text):
-    t = text.lower()
-    b = sum(1 for k in BULL_KW if k in t)
-    e = sum(1 for k in BEAR_KW if k in t)
-    if b > e: return {"label":"bullish","score":b}
-    if e > b: return {"label":"bearish","score":e}
-    return {"label":"neutral","score":0}
-
-def _sector(text):
-    t = text.lower()
-    for sec, kws in SECTORS_MAP.items():
-        if any(k in t for k in kws): return sec
-    return "GENERAL"
-
-def _score(text):
-    t = text.lower()
-    s = 3
-    s += sum(2 for k in HIGH_KW if k in t)
-    s += sum(1 for k in MED_KW  if k in t)
-    return min(10, s)
-
-def _tickers(text):
-    words = re.findall(r'\b[A-Z]{2,5}\b', text)
-    return sorted({w for w in words if w in KNOWN_TICKERS})
+class _KeywordClassifier:
+    """
+    Clasificador de una sola pasada: un único regex compilado con todas las
+    keywords (HIGH/MED/LOW/BULL/BEAR/SECTORS_MAP) localiza cada coincidencia
+    como subcadena del texto en minúsculas, igual que los antiguos `k in t`.
+    En cada posición el regex devuelve la keyword más larga; las keywords que
+    son prefijo de ella coinciden en la misma posición y se añaden por tabla.
+    El patrón está factorizado como un trie, así que el coste por carácter no
+    crece con el número de keywords.
+    """
+
+    def __init__(self):
+        groups = [("high", HIGH_KW), ("med", MED_KW), ("low", LOW_KW),
+                  ("bull", BULL_KW), ("bear", BEAR_KW)]
+        groups += [(f"sec:{sec}", kws) for sec, kws in SECTORS_MAP.items()]
+        self._tags = {}                                  # keyword → [grupo, ...] (con repeticiones)
+        for tag, kws in groups:
+            for k in kws:
+                self._tags.setdefault(k, []).append(tag)
+        kws = list(self._tags)
+        self._prefixes = {k: [p for p in kws if k.startswith(p)] for k in kws}
+        self._regex = re.compile("(?=(" + self._trie_pattern(kws) + "))")
+        self._sectors = list(SECTORS_MAP)
+
+    @staticmethod
+    def _trie_pattern(words):
+        """Regex factorizado por prefijos (trie): en cada posición se decide por el
+        siguiente carácter en lugar de probar todas las keywords una a una."""
+        trie = {}
+        for w in words:
+            node = trie
+            for ch in w:
+                node = node.setdefault(ch, {})
+            node[""] = {}
+        def build(node):
+            alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+            if not alts:
+                return ""
+            body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+            # Nodo terminal: rama opcional (greedy → coincidencia más larga primero)
+            return f"(?:{body})?" if "" in node else body
+        return build(trie)
+
+    def classify(self, text):
+        t = text.lower()
+        found = set()
+        for m in self._regex.finditer(t):
+            found.update(self._prefixes[m.group(1)])
+        counts = {}
+        for k in found:
+            for tag in self._tags[k]:
+                counts[tag] = counts.get(tag, 0) + 1
+
+        nh, nm = counts.get("high", 0), counts.get("med", 0)
+        impact = "high" if nh else ("med" if nm else "low")
+        b, e = counts.get("bull", 0), counts.get("bear", 0)
+        if b > e:   sentiment = {"label":"bullish","score":b}
+        elif e > b: sentiment = {"label":"bearish","score":e}
+        else:       sentiment = {"label":"neutral","score":0}
+        sector = next((sec for sec in self._sectors if counts.get(f"sec:{sec}")), "GENERAL")
+        return {"impact":impact, "sentiment":sentiment, "sector":sector,
+                "score":min(10, 3 + 2 * nh + nm)}
+
+    def classify_batch(self, texts):
+        return [self.classify(t) for t in texts]
+
+_CLASSIFIER = _KeywordClassifier()
+
+def _classify_items(items):
+    """Rellena impact/sentiment/sector/score/tickers de todos los items en lote."""
+    from modules.ticker_extractor import get_ticker_extractor
+    texts = [f"{it['title']} {it.pop('_full_desc', it['desc'])}" for it in items]
+    for it, cls, tks in zip(items, _CLASSIFIER.classify_batch(texts),
+                            get_ticker_extractor().extract_batch(texts)):
+        it.update(cls)
+        it["tickers"] = sorted(tks)
+    return items
 
 def _mins_feedparser(entry):
     import calendar
@@ -451,26 +505,193 @@ def _mins_pubdate(s):
     except: return 30
 
 def _build(title, desc, link, src, mins):
+    # La clasificación (impact/sentiment/sector/score/tickers) se hace en lote al fusionar
     title = _strip_html(title)
     desc  = _strip_html(desc)
-    combined = f"{title} {desc}"
-    return {"title":title,"desc":desc[:300],"link":link,
+    return {"title":title,"desc":desc[:300],"_full_desc":desc,"link":link,
             "src_id":src["id"],"src_label":src["label"],"src_css":src.get("css","src-generic"),
-            "special":src.get("special"),
-            "impact":_classify_impact(combined),"sentiment":_sentiment(combined),
-            "sector":_sector(combined),"score":_score(combined),
-            "tickers":_tickers(combined),"minutes_ago":mins}
+            "special":src.get("special"),"published_ts":time.time() - mins * 60}
+
+def _item_id(it):
+    return it["link"] or f"{it['src_id']}|{it['title']}"
+
+# ══════════════════════════════════════════════════════════════════════
+# FETCH STATE  (GET condicional por fuente)
+# ══════════════════════════════════════════════════════════════════════
+# Por URL se persiste ETag, Last-Modified, hash del cuerpo y los ids ya vistos;
+# los items viven en memoria del proceso. Un 304 o un cuerpo idéntico no se
+# parsea, y de un feed cambiado solo se clasifican y fusionan los items nuevos.
+_FEED_STATE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "data", "newsfeed_state.json")
+_ROLLING_MAX = 30      # items por fuente en la lista rodante
+_SEEN_MAX    = 200     # ids recordados por fuente
+
+_feed_state = None     # {url: {etag, last_modified, hash, seen}}
+_feed_items = {}       # {url: [items]} más recientes primero
+_state_lock = threading.Lock()
+_http_local = threading.local()
+
+def _load_feed_state():
+    global _feed_state
+    with _state_lock:
+        if _feed_state is None:
+            try:
+                with open(_FEED_STATE_PATH, encoding="utf-8") as f:
+                    _feed_state = json.load(f)
+            except (OSError, ValueError):
+                _feed_state = {}
+    return _feed_state
+
+def _save_feed_state():
+    try:
+        os.makedirs(os.path.dirname(_FEED_STATE_PATH), exist_ok=True)
+        tmp = f"{_FEED_STATE_PATH}.tmp"
+        with _state_lock:
+            payload = json.dumps(_feed_state or {})
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp, _FEED_STATE_PATH)
+    except OSError:
+        pass
+
+def _http():
+    """requests.Session por hilo (keep-alive entre refrescos)."""
+    s = getattr(_http_local, "session", None)
+    if s is None:
+        import requests
+        s = _http_local.session = requests.Session()
+        s.headers.update(_HEADERS)
+    return s
+
+def _merge_items(url, parsed):
+    """Fusiona en la lista rodante de `url` solo los items no vistos; retorna (lista, nº nuevos)."""
+    state = _load_feed_state()
+    with _state_lock:
+        prev  = _feed_items.get(url, [])
+        known = {_item_id(it) for it in prev}
+        known.update(state.get(url, {}).get("seen", []) if prev else [])
+    fresh = [it for it in parsed if _item_id(it) not in known]
+    _classify_items(fresh)
+    _CLUSTERS.add(fresh)
+    merged = sorted(fresh + prev, key=lambda x: x["published_ts"], reverse=True)[:_ROLLING_MAX]
+    with _state_lock:
+        _feed_items[url] = merged
+        entry = state.setdefault(url, {})
+        entry["seen"] = ([_item_id(it) for it in fresh] + entry.get("seen", []))[:_SEEN_MAX]
+    return merged, len(fresh)
+
+# ══════════════════════════════════════════════════════════════════════
+# STORY CLUSTERS  (near-duplicates entre fuentes)
+# ══════════════════════════════════════════════════════════════════════
+# SimHash de 64 bits sobre shingles del título (bigramas + palabras) y las
+# primeras palabras de la descripción. El índice LSH parte la firma en bandas:
+# dos historias a distancia de Hamming ≤ _SIM_MAX_DIST comparten al menos una
+# banda, así que cada item nuevo solo se compara con los candidatos de sus
+# buckets y nunca se recalculan similitudes por pares.
+_SIM_WORD_RE  = re.compile(r"[a-z0-9]+")
+_SIM_MAX_DIST = 9
+_SIM_BANDS    = [(i * 64 // 10, (i + 1) * 64 // 10) for i in range(_SIM_MAX_DIST + 1)]   # bandas de 6-7 bits
+_SIM_DESC_WORDS = 20
+_CLUSTER_TTL  = 48 * 3600
+
+def _simhash(title, desc):
+    t = _SIM_WORD_RE.findall(title.lower())
+    feats = {}
+    for a, b in zip(t, t[1:]):
+        feats[f"{a} {b}"] = feats.get(f"{a} {b}", 0) + 3
+    for w in t:
+        feats[w] = feats.get(w, 0) + 2
+    for w in _SIM_WORD_RE.findall(desc.lower())[:_SIM_DESC_WORDS]:
+        feats[w] = feats.get(w, 0) + 1
+    v = [0] * 64
+    for f, w in feats.items():
+        h = int.from_bytes(hashlib.blake2b(f.encode(), digest_size=8).digest(), "little")
+        for i in range(64):
+            v[i] += w if h >> i & 1 else -w
+    return sum(1 << i for i in range(64) if v[i] > 0)
+
+class _StoryClusters:
+    """Índice incremental item → historia; agrupa solo items del mismo canal (special)."""
+
+    def __init__(self):
+        self._lock     = threading.Lock()
+        self._buckets  = [{} for _ in _SIM_BANDS]   # valor de banda → {cluster_id}
+        self._clusters = {}                          # cluster_id → (simhash, special, creado)
+        self._of       = {}                          # item_id → cluster_id
+
+    @staticmethod
+    def _bands(h):
+        return [(h >> lo) & ((1 << (hi - lo)) - 1) for lo, hi in _SIM_BANDS]
+
+    def add(self, items):
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            for it in items:
+                iid = _item_id(it)
+                if iid in self._of:
+                    continue
+                h = _simhash(it["title"], it["desc"])
+                bands = self._bands(h)
+                cands = set()
+                for bucket, b in zip(self._buckets, bands):
+                    cands |= bucket.get(b, set())
+                best, best_d = None, _SIM_MAX_DIST + 1
+                for cid in cands:
+                    ch, special, _ = self._clusters[cid]
+                    d = bin(h ^ ch).count("1")
+                    if special == it.get("special") and d < best_d:
+                        best, best_d = cid, d
+                if best is None:
+                    best = iid
+                    self._clusters[best] = (h, it.get("special"), now)
+                    for bucket, b in zip(self._buckets, bands):
+                        bucket.setdefault(b, set()).add(best)
+                self._of[iid] = best
+
+    def cluster_of(self, item_id):
+        return self._of.get(item_id, item_id)
+
+    def _evict(self, now):
+        viejos = {cid for cid, (_, _, t) in self._clusters.items() if now - t > _CLUSTER_TTL}
+        if not viejos:
+            return
+        for cid in viejos:
+            h = self._clusters.pop(cid)[0]
+            for bucket, b in zip(self._buckets, self._bands(h)):
+                s = bucket.get(b)
+                if s:
+                    s.discard(cid)
+                    if not s:
+                        del bucket[b]
+        self._of = {i: c for i, c in self._of.items() if c not in viejos}
+
+_CLUSTERS = _StoryClusters()
+
+def _collapse_clusters(items):
+    """Una entrada por historia: la primera publicada, con su timestamp y todas las fuentes."""
+    groups = {}
+    for it in items:
+        groups.setdefault(_CLUSTERS.cluster_of(_item_id(it)), []).append(it)
+    out = []
+    for members in groups.values():
+        members.sort(key=lambda x: x["minutes_ago"], reverse=True)
+        rep = members[0]
+        rep["story_id"] = _CLUSTERS.cluster_of(_item_id(rep))
+        rep["sources"] = list(dict.fromkeys(m["src_label"] for m in members))
+        if len(members) > 1:
+            rep["tickers"] = sorted({t for m in members for t in m["tickers"]})
+        out.append(rep)
+    return out
 
 # ══════════════════════════════════════════════════════════════════════
 # FETCHING
 # ══════════════════════════════════════════════════════════════════════
-def _fetch_feedparser(src):
+_HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; RSU-Terminal/2.0; +https://rsu.app)"}
+
+def _parse_feedparser(content, src):
     import feedparser
-    try:
-        import socket as _socket
-        _socket.setdefaulttimeout(5)
-    except: pass
-    feed = feedparser.parse(src["url"], request_headers=_HEADERS)
+    feed = feedparser.parse(content)
     items = []
     for e in feed.entries[:30]:
         title = getattr(e,"title","") or ""
@@ -480,15 +701,11 @@ def _fetch_feedparser(src):
         items.append(_build(title.strip(),desc.strip(),link.strip(),src,_mins_feedparser(e)))
     return items, len(items)>0
 
-_HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; RSU-Terminal/2.0; +https://rsu.app)"}
-
-def _fetch_requests_rss(src):
-    """Fetch RSS 2.0 or Atom, auto-detecting the format."""
-    import requests, xml.etree.ElementTree as ET
-    r = requests.get(src["url"], timeout=5, headers=_HEADERS)
-    r.raise_for_status()
+def _parse_rss(content, src):
+    """Parse RSS 2.0 or Atom, auto-detecting the format."""
+    import xml.etree.ElementTree as ET
     # Strip BOM / leading whitespace that can break ET
-    text = r.text.lstrip("﻿").strip()
+    text = content.lstrip(b"\xef\xbb\xbf").strip()
     try:
         root = ET.fromstring(text)
     except ET.ParseError:
@@ -528,12 +745,10 @@ def _fetch_requests_rss(src):
             items.append(_build(title, desc, link, src, _mins_pubdate(pub)))
         return items, len(items) > 0
 
-def _fetch_atom(src):
+def _parse_atom(content, src):
     """Robust Atom parser — auto-detects namespace, finds entries recursively."""
-    import requests, xml.etree.ElementTree as ET
-    r = requests.get(src["url"], timeout=5, headers=_HEADERS)
-    r.raise_for_status()
-    root = ET.fromstring(r.content)  # bytes → ET handles encoding declaration
+    import xml.etree.ElementTree as ET
+    root = ET.fromstring(content)  # bytes → ET handles encoding declaration
     # Detect namespace from root tag {uri}feed → uri
     ns_uri = root.tag.split("}")[0][1:] if root.tag.startswith("{") else ""
     pfx = {"a": ns_uri} if ns_uri else {}
@@ -579,74 +794,336 @@ def _fetch_atom(src):
             items.append(_build(title, summary[:300], link, src, mins))
     return items, len(items) > 0
 
-def _fetch_source(src):
-    """Fetch one source. Returns (items, ok). Never raises."""
-    fmt = src.get("fmt", "rss")
-    # Skip sources with no URL (X-only, HF without feed)
-    urls_to_try = [u for u in [src["url"]] + src.get("fallback_urls", []) if u]
-    if not urls_to_try:
-        return [], False
-    for url in urls_to_try:
-        src_with_url = {**src, "url": url}
+def _conditional_headers(url):
+    """(lista rodante actual, cabeceras condicionales) para la URL."""
+    state = _load_feed_state()
+    with _state_lock:
+        prev  = _feed_items.get(url)
+        entry = state.get(url, {})
+        headers = {}
+        # Los validadores solo sirven si aún tenemos en memoria los items de esa versión
+        if prev:
+            if entry.get("etag"):          headers["If-None-Match"]     = entry["etag"]
+            if entry.get("last_modified"): headers["If-Modified-Since"] = entry["last_modified"]
+    return prev, headers
+
+def _process_response(src, url, prev, status, resp_headers, content):
+    """
+    Resuelve la respuesta de un GET condicional. Retorna (items, ok, nº nuevos) con
+    la lista rodante de la fuente; en 304 o cuerpo sin cambios no se parsea nada.
+    """
+    if status == 304 and prev:
+        return prev, True, 0
+    if status >= 400:
+        return [], False, 0
+    state  = _load_feed_state()
+    digest = hashlib.sha1(content).hexdigest()
+    with _state_lock:
+        cur = state.setdefault(url, {})
+        unchanged = bool(prev) and digest == cur.get("hash")
+        cur["etag"]          = resp_headers.get("ETag")
+        cur["last_modified"] = resp_headers.get("Last-Modified")
+    if unchanged:
+        return prev, True, 0
+
+    if src.get("fmt", "rss") == "atom":
+        parsed, ok = _parse_atom(content, src)
+    else:
         try:
-            if fmt == "atom":
-                items, ok = _fetch_atom(src_with_url)
+            parsed, ok = _parse_feedparser(content, src)
+        except Exception:
+            parsed, ok = _parse_rss(content, src)
+    if not ok:
+        return [], False, 0
+    with _state_lock:
+        state[url]["hash"] = digest
+    merged, new = _merge_items(url, parsed)
+    return merged, True, new
+
+# ══════════════════════════════════════════════════════════════════════
+# INGESTION ENGINE  (asyncio, un bucle por proceso)
+# ══════════════════════════════════════════════════════════════════════
+# Un hilo daemon mantiene un event loop de larga vida con una sesión HTTP
+# compartida (pool de conexiones). Cada URL tiene su timeout y se cancela de
+# verdad al vencer; la concurrencia está acotada por un semáforo. El parseo y
+# la clasificación corren en un pool fijo de hilos, así que el número de hilos
+# no crece con los refrescos. Sin aiohttp, las peticiones usan requests en ese
+# mismo pool acotado.
+#
+# Cada fuente tiene su propio intervalo de sondeo: se acorta cuando trae items
+# nuevos, se alarga cuando no cambia y retrocede exponencialmente si falla;
+# tras _BREAKER_FAILS fallos seguidos un circuit breaker la aparca
+# _BREAKER_SECS antes de un único reintento.
+_MAX_CONCURRENCY = 12
+_URL_TIMEOUT     = 6       # segundos por petición HTTP (sin la espera del semáforo)
+_ROUND_TIMEOUT   = 15      # tope de la ronda inicial (síncrona)
+_TICK_SECONDS    = 5       # cadencia del planificador
+_IDLE_SECONDS    = 900     # sin lecturas en 15 min → dejar de sondear
+_POLL_BASE       = 120     # intervalo inicial por fuente
+_POLL_MIN        = 45      # fuentes activas: por debajo del auto-refresco de 60s;
+                           # el GET condicional (ETag/Last-Modified) abarata el sondeo sin cambios
+_POLL_MAX        = 900
+_POLL_FASTER     = 0.5     # factor tras traer items nuevos
+_POLL_SLOWER     = 1.25    # factor tras un sondeo sin novedades
+_BREAKER_FAILS   = 5
+_BREAKER_SECS    = 3600
+_LAT_BUCKETS     = (0.25, 0.5, 1, 2, 4, 8)    # segundos; el último cubo es > 8s
+
+class _SourceStats:
+    """Telemetría y planificación de una fuente."""
+    __slots__ = ("interval", "next_due", "lat_hist", "last_latency", "fetches", "bytes",
+                 "items_last", "new_total", "new_rate", "fail_streak", "breaker_until",
+                 "last_outcome", "last_fetch")
+
+    def __init__(self):
+        self.interval      = _POLL_BASE
+        self.next_due      = 0.0
+        self.lat_hist      = [0] * (len(_LAT_BUCKETS) + 1)
+        self.last_latency  = None
+        self.fetches       = 0
+        self.bytes         = 0
+        self.items_last    = 0
+        self.new_total     = 0
+        self.new_rate      = 0.0     # items nuevos por hora (EWMA)
+        self.fail_streak   = 0
+        self.breaker_until = 0.0
+        self.last_outcome  = None    # "new" | "same" | "fail"
+        self.last_fetch    = 0.0
+
+    def record(self, latency, nbytes, nitems, new, ok, now):
+        self.fetches += 1
+        self.bytes   += nbytes
+        self.last_latency = latency
+        self.lat_hist[next((i for i, b in enumerate(_LAT_BUCKETS) if latency <= b), len(_LAT_BUCKETS))] += 1
+        if ok:
+            gap = max(now - self.last_fetch, 1.0) if self.last_fetch else self.interval
+            self.new_rate = 0.7 * self.new_rate + 0.3 * new * 3600 / gap
+            self.items_last, self.new_total = nitems, self.new_total + new
+            self.fail_streak, self.breaker_until = 0, 0.0
+            self.last_outcome = "new" if new else "same"
+            factor = _POLL_FASTER if new else _POLL_SLOWER
+            self.interval = min(_POLL_MAX, max(_POLL_MIN, self.interval * factor))
+            self.next_due = now + self.interval
+        else:
+            self.fail_streak += 1
+            self.last_outcome = "fail"
+            if self.fail_streak >= _BREAKER_FAILS:
+                self.breaker_until = now + _BREAKER_SECS
+                self.next_due = self.breaker_until
             else:
-                try:
-                    items, ok = _fetch_feedparser(src_with_url)
-                except ImportError:
-                    items, ok = _fetch_requests_rss(src_with_url)
-                except Exception:
-                    items, ok = _fetch_requests_rss(src_with_url)
-            if ok:
-                return items, ok
+                self.next_due = now + min(_POLL_MAX, self.interval * 2 ** self.fail_streak)
+        self.last_fetch = now
+
+    def latency_p(self, q):
+        """Percentil aproximado (límite superior del cubo) a partir del histograma."""
+        total = sum(self.lat_hist)
+        if not total:
+            return None
+        acc = 0
+        for i, n in enumerate(self.lat_hist):
+            acc += n
+            if acc >= q * total:
+                return _LAT_BUCKETS[i] if i < len(_LAT_BUCKETS) else float("inf")
+
+    def summary(self, now):
+        return {"interval": int(self.interval), "fetches": self.fetches, "bytes": self.bytes,
+                "items_last": self.items_last, "new_per_h": round(self.new_rate, 1),
+                "fail_streak": self.fail_streak, "breaker": self.breaker_until > now,
+                "p50": self.latency_p(0.5), "p95": self.latency_p(0.95),
+                "last_latency": self.last_latency, "lat_hist": list(self.lat_hist)}
+
+class _NewsIngestor:
+    def __init__(self):
+        self._loop        = asyncio.new_event_loop()
+        self._workers     = ThreadPoolExecutor(max_workers=_MAX_CONCURRENCY, thread_name_prefix="news_worker")
+        self._sem         = None
+        self._session     = None
+        self._sources     = []
+        self._stats       = {}      # src_id → _SourceStats
+        self._results     = {}      # src_id → (items, ok) del último sondeo
+        self._inflight    = set()
+        self._last_access = 0.0
+        self._scheduler   = None
+        self._thread      = threading.Thread(target=self._run, name="news_ingest", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    # ── API síncrona (llamada desde Streamlit) ────────────────────────
+    def snapshot(self, sources):
+        """
+        {src_id: (items, ok)} con lo último de cada fuente. Solo la primera lectura
+        en frío hace una ronda síncrona; después el planificador sondea en segundo
+        plano cada fuente a su ritmo.
+        """
+        self._sources     = list(sources)
+        self._last_access = time.time()
+        if not self._results:
+            self.fetch_all(self._sources)
+        if self._scheduler is None:
+            self._scheduler = asyncio.run_coroutine_threadsafe(self._schedule_loop(), self._loop)
+        return dict(self._results)
+
+    def fetch_all(self, sources):
+        """Ronda completa e inmediata; las fuentes que no terminan a tiempo faltan."""
+        fut = asyncio.run_coroutine_threadsafe(self._fetch_all(sources), self._loop)
+        try:
+            return fut.result(timeout=_ROUND_TIMEOUT + 2)
         except Exception:
-            continue
-    return [], False
+            fut.cancel()
+            return {}
+
+    def telemetry(self):
+        now = time.time()
+        return {sid: s.summary(now) for sid, s in list(self._stats.items())}
+
+    # ── corrutinas ────────────────────────────────────────────────────
+    async def _fetch_all(self, sources):
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(_MAX_CONCURRENCY)
+        tasks = {asyncio.ensure_future(self._poll(s)): s["id"] for s in sources}
+        done, pending = await asyncio.wait(tasks, timeout=_ROUND_TIMEOUT)
+        for t in pending:
+            t.cancel()
+        await self._loop.run_in_executor(self._workers, _save_feed_state)
+        return {tasks[t]: t.result() for t in done if not t.cancelled() and t.exception() is None}
+
+    async def _schedule_loop(self):
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(_MAX_CONCURRENCY)
+        while True:
+            await asyncio.sleep(_TICK_SECONDS)
+            now = time.time()
+            if now - self._last_access > _IDLE_SECONDS:
+                continue
+            due = [s for s in self._sources
+                   if s["id"] not in self._inflight and self._has_urls(s)
+                   and self._stats.setdefault(s["id"], _SourceStats()).next_due <= now]
+            if due:
+                await asyncio.gather(*(self._poll(s) for s in due), return_exceptions=True)
+                await self._loop.run_in_executor(self._workers, _save_feed_state)
+
+    @staticmethod
+    def _has_urls(src):
+        return bool(src["url"] or src.get("fallback_urls"))
+
+    async def _poll(self, src):
+        """Sondea una fuente, registra su telemetría y guarda el resultado."""
+        sid = src["id"]
+        stats = self._stats.setdefault(sid, _SourceStats())
+        if not self._has_urls(src):
+            self._results[sid] = ([], False)
+            return self._results[sid]
+        self._inflight.add(sid)
+        try:
+            items, ok, nbytes, new, latency = await self._fetch_source(src)
+        finally:
+            self._inflight.discard(sid)
+        stats.record(latency, nbytes, len(items), new, ok, time.time())
+        # Si falla se sigue sirviendo lo último bueno (marcado como caído)
+        prev_items = self._results.get(sid, ([], False))[0]
+        self._results[sid] = (items, True) if ok else (prev_items, False)
+        return self._results[sid]
+
+    async def _fetch_source(self, src):
+        """Prueba la URL principal y los fallback_urls en orden. Nunca lanza."""
+        nbytes, latency = 0, 0.0
+        for url in [u for u in [src["url"]] + src.get("fallback_urls", []) if u]:
+            try:
+                items, ok, size, new, lat = await self._fetch_url(src, url)
+                nbytes, latency = nbytes + size, latency + lat
+                if ok:
+                    return items, ok, nbytes, new, latency
+            except Exception:
+                continue
+        return [], False, nbytes, 0, latency
+
+    async def _fetch_url(self, src, url):
+        """(items, ok, bytes, nuevos, latencia); la latencia mide solo la petición HTTP."""
+        prev, headers = _conditional_headers(url)
+        # El timeout y la latencia cubren solo la petición: ni la cola del
+        # semáforo ni el parseo posterior cuentan
+        async with self._sem:
+            t0 = time.time()
+            try:
+                status, resp_headers, content = await asyncio.wait_for(self._get(url, headers), _URL_TIMEOUT)
+            except Exception:
+                return [], False, 0, 0, time.time() - t0
+            latency = time.time() - t0
+        items, ok, new = await self._loop.run_in_executor(
+            self._workers, _process_response, src, url, prev, status, resp_headers, content)
+        return items, ok, len(content), new, latency
+
+    async def _get(self, url, headers):
+        if not AIOHTTP_AVAILABLE:
+            r = await self._loop.run_in_executor(
+                self._workers, lambda: _http().get(url, timeout=_URL_TIMEOUT, headers=headers))
+            return r.status_code, r.headers, r.content
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                headers=_HEADERS,
+                connector=aiohttp.TCPConnector(limit=_MAX_CONCURRENCY, ttl_dns_cache=300))
+        async with self._session.get(url, headers=headers, allow_redirects=True) as r:
+            return r.status, r.headers, await r.read()
+
+_ingestor = None
+_ingestor_lock = threading.Lock()
+
+def _get_ingestor():
+    global _ingestor
+    if _ingestor is None:
+        with _ingestor_lock:
+            if _ingestor is None:
+                _ingestor = _NewsIngestor()
+    return _ingestor
 
-@st.cache_data(ttl=120, show_spinner=False)
+@st.cache_data(ttl=60, show_spinner=False)
 def _load_news():
-    from concurrent.futures import wait as _wait
     all_items, status = [], {}
     for s in SOURCES:
         status[s["id"]] = {"count": 0, "ok": False}
 
-    # DO NOT use context manager — its __exit__ calls shutdown(wait=True)
-    # which blocks indefinitely on stuck HTTP threads (can't cancel running threads).
-    ex = ThreadPoolExecutor(max_workers=12)
+    ingestor  = _get_ingestor()
+    results   = ingestor.snapshot(SOURCES)
+    telemetry = ingestor.telemetry()
+    now = time.time()
+    for src_id, (items, ok) in results.items():
+        # Copias: los items de la lista rodante se comparten entre refrescos
+        all_items.extend({**it, "minutes_ago": max(0, int((now - it["published_ts"]) / 60))}
+                         for it in items)
+        status[src_id] = {"count": len(items), "ok": ok, **telemetry.get(src_id, {})}
+
+    all_items = _collapse_clusters(all_items)
     try:
-        futures = {ex.submit(_fetch_source, s): s for s in SOURCES}
-        done, _not_done = _wait(futures.keys(), timeout=15)
-        for fut in _not_done:
-            fut.cancel()
-        for fut in done:
-            src = futures[fut]
-            try:
-                items, ok = fut.result(timeout=1)
-                all_items.extend(items)
-                status[src["id"]] = {"count": len(items), "ok": ok}
-            except Exception:
-                pass
-    finally:
-        ex.shutdown(wait=False)   # ← key: don't block on stuck threads
-
+        get_news_archive().add_items(all_items)
+    except Exception:
+        pass
     all_items.sort(key=lambda x: x["minutes_ago"])
     return all_items, status
 
+def _archive_search(**kw):
+    """Historias del archivo local con minutes_ago calculado; [] si no está disponible."""
+    try:
+        rows = get_news_archive().search(**kw)
+    except Exception:
+        return []
+    now = time.time()
+    for it in rows:
+        it["minutes_ago"] = max(0, int((now - it["published_ts"]) / 60))
+    return rows
+
 @st.cache_data(ttl=60, show_spinner=False)
 def _load_prices():
     try:
-        import yfinance as yf
+        from modules.quotes import get_quote_snapshot
+        quotes = get_quote_snapshot(PRICE_TICKERS.values())
         prices = {}
         for label,sym in PRICE_TICKERS.items():
-            try:
-                h = yf.Ticker(sym).history(period="2d",interval="1d")
-                if len(h)>=2:
-                    price=float(h["Close"].iloc[-1]); prev=float(h["Close"].iloc[-2])
-                    prices[label]={"price":price,"chg":(price-prev)/prev*100 if prev else None}
-                elif len(h)==1:
-                    prices[label]={"price":float(h["Close"].iloc[-1]),"chg":None}
-            except: pass
+            q = quotes.get(sym)
+            if q:
+                prices[label]={"price":q["price"],"chg":q["chg_1d"]}
         return prices
     except: return {}
 
@@ -691,11 +1168,24 @@ def _status_html(nh,nm,nl,active,total):
             f'<span class="nf-stat-time">⏱ {now}</span>'
             f'</div>')
 
+# El cuerpo de la tarjeta sale de un fragmento cacheado por el contenido de la
+# historia; la columna de tiempo cambia cada minuto y se monta directamente.
 def _card_html(it):
     mins=it["minutes_ago"]
     tstr=f"{mins}" if mins<60 else f"{mins//60}h{mins%60:02d}"
     lbl="MIN AGO" if mins<60 else "AGO"
     dot_cls={"high":"nf-dot-high","med":"nf-dot-med","low":"nf-dot-low"}[it["impact"]]
+    return (f'<div class="nf-card {it["impact"]}">'
+            f'<div class="nf-time-col"><div class="nf-mins">{tstr}</div>'
+            f'<div class="nf-mins-lbl">{lbl}</div>'
+            f'<div class="nf-impact-dot {dot_cls}"></div>'
+            f'<div class="nf-score">{it["score"]}/10</div></div>'
+            f'{_card_body_html(it)}</div>')
+
+@fragment_cached(key=lambda it: (it.get("story_id") or _item_id(it), it["title"], it["desc"], it["link"],
+                                 it["src_label"], tuple(it.get("sources", ())), it["sector"],
+                                 it["sentiment"]["label"], tuple(it["tickers"])))
+def _card_body_html(it):
     sent=it["sentiment"]["label"]
     sdot=""
     if sent=="bullish": sdot='<span class="nf-sent-dot nf-sent-bull"></span>'
@@ -706,18 +1196,16 @@ def _card_html(it):
     safe_desc  = _html.escape(it["desc"][:180])
     th=(f'<a href="{it["link"]}" target="_blank" rel="noopener">{safe_title}</a>'
         if it["link"] else safe_title)
-    return (f'<div class="nf-card {it["impact"]}">'
-            f'<div class="nf-time-col"><div class="nf-mins">{tstr}</div>'
-            f'<div class="nf-mins-lbl">{lbl}</div>'
-            f'<div class="nf-impact-dot {dot_cls}"></div>'
-            f'<div class="nf-score">{it["score"]}/10</div></div>'
-            f'<div class="nf-body">'
+    otras=it.get("sources",[])[1:]
+    more=(f'<span class="nf-src-more" title="{_html.escape(", ".join(otras))}">+{len(otras)}</span>'
+          if otras else "")
+    return (f'<div class="nf-body">'
             f'<div class="nf-nc-header">'
-            f'<span class="nf-src-badge {it["src_css"]}">{it["src_label"]}</span>'
+            f'<span class="nf-src-badge {it["src_css"]}">{it["src_label"]}</span>{more}'
             f'<span class="nf-sector">{it["sector"]}</span>{sdot}</div>'
             f'<div class="nf-title">{th}</div>'
             f'<div class="nf-desc">{safe_desc}</div>'
-            f'<div class="nf-keywords">{tks}</div></div></div>')
+            f'<div class="nf-keywords">{tks}</div></div>')
 
 def _trump_panel_html(trump_items):
     if not trump_items:
@@ -761,6 +1249,10 @@ def _sentiment_html(items):
     recent=[it for it in items if it["minutes_ago"]<=60]
     bull=sum(1 for it in recent if it["sentiment"]["label"]=="bullish")
     bear=sum(1 for it in recent if it["sentiment"]["label"]=="bearish")
+    return _sentiment_fragment(bull, bear)
+
+@fragment_cached(maxsize=256)
+def _sentiment_fragment(bull, bear):
     total=bull+bear or 1
     net=(bull-bear)/total
     pct=int((net+1)/2*100)
@@ -781,6 +1273,11 @@ def _timeline_html(items):
         h=it["minutes_ago"]//60
         if 0<=h<24:
             idx=23-h; buckets[idx]+=1; imp_cnt[idx][it["impact"]]+=1
+    return _timeline_fragment(tuple(buckets), tuple((d["high"],d["med"],d["low"]) for d in imp_cnt))
+
+@fragment_cached(maxsize=256)
+def _timeline_fragment(buckets, imp_cnt):
+    imp_cnt=[dict(zip(("high","med","low"),c)) for c in imp_cnt]
     mx=max(buckets) or 1
     bars=labels=""
     for i in range(24):
@@ -799,7 +1296,10 @@ def _timeline_html(items):
 def _heatmap_html(items):
     counts={}
     for it in items: counts[it["sector"]]=counts.get(it["sector"],0)+1
-    top=sorted(counts.items(),key=lambda x:-x[1])[:8]
+    return _heatmap_fragment(tuple(sorted(counts.items(),key=lambda x:-x[1])[:8]))
+
+@fragment_cached(maxsize=256)
+def _heatmap_fragment(top):
     mx=top[0][1] if top else 1
     def heat(n):
         r=n/mx if mx else 0
@@ -816,10 +1316,19 @@ def _source_health_html(status):
     rows=""
     for src in SOURCES:
         st_=status.get(src["id"],{"count":0,"ok":False})
-        dot="nf-src-ok" if st_["ok"] else "nf-src-err"
+        dot=("nf-src-off" if st_.get("breaker") else "nf-src-ok" if st_["ok"] else "nf-src-err")
         pct=int(st_["count"]/mc*100)
-        rows+=(f'<div class="nf-src-row"><span class="nf-src-dot {dot}"></span>'
+        # Telemetría: intervalo de sondeo actual y latencia p50
+        meta=""
+        if st_.get("fetches"):
+            p50=st_.get("p50")
+            lat="—" if p50 is None else (">8s" if p50==float("inf") else f"{p50:g}s")
+            meta=f'{st_["interval"]}s·{lat}'
+        tip=(f'{st_.get("new_per_h",0)} nuevos/h · {st_.get("bytes",0)//1024} KB · '
+             f'fallos seguidos {st_.get("fail_streak",0)}')
+        rows+=(f'<div class="nf-src-row" title="{tip}"><span class="nf-src-dot {dot}"></span>'
                f'<span class="nf-src-name">{src["label"]}</span>'
+               f'<span class="nf-src-meta">{meta}</span>'
                f'<div class="nf-src-bw"><div class="nf-src-b" style="width:{pct}%"></div></div>'
                f'<span class="nf-src-count">{st_["count"]}</span></div>')
     return (f'<div class="nf-sbox"><div class="nf-sbox-hdr">◈ ESTADO <span class="acc">FUENTES</span></div>'
@@ -859,8 +1368,8 @@ o.connect(g);g.connect(c.destination);o.frequency.value=880;o.type="sine";
 g.gain.setValueAtTime(.4,c.currentTime);
 g.gain.exponentialRampToValueAtTime(.001,c.currentTime+.25);
 o.start(c.currentTime);o.stop(c.currentTime+.25);}},d*350);}})(_i);}}}}catch(e){{}}"""
-    # Countdown: updates #nf-cd-secs then clicks Streamlit ACTUALIZAR button
-    # (button click triggers st.rerun(), preserving auth session)
+    # Countdown: only updates #nf-cd-secs; the rerun itself comes from the
+    # st.fragment(run_every=...) in render(), so no DOM clicks are needed
     # NEVER use window.location.reload() — it clears the Streamlit session
     cd=f"""(function(){{
   var secs={refresh_secs};
@@ -869,18 +1378,7 @@ o.start(c.currentTime);o.stop(c.currentTime+.25);}},d*350);}})(_i);}}}}catch(e){
       var el=window.parent.document.getElementById("nf-cd-secs");
       if(el) el.textContent=secs+"s";
     }}catch(e){{}}
-    if(secs<=0){{
-      // Click the Streamlit ACTUALIZAR button (triggers rerun, preserves auth)
-      try{{
-        var btns=window.parent.document.querySelectorAll("button");
-        for(var i=0;i<btns.length;i++){{
-          var t=btns[i].innerText||btns[i].textContent||"";
-          if(t.indexOf("ACTUALIZAR")>=0){{btns[i].click();return;}}
-        }}
-      }}catch(e){{}}
-      return;
-    }}
-    secs--;
+    secs=secs<=0?{refresh_secs}:secs-1;
     setTimeout(tick,1000);
   }}
   tick();
@@ -891,7 +1389,7 @@ o.start(c.currentTime);o.stop(c.currentTime+.25);}},d*350);}})(_i);}}}}catch(e){
 # RENDER
 # ══════════════════════════════════════════════════════════════════════
 def render():
-    _REFRESH_SECS = 120
+    _REFRESH_SECS = 60
 
     st.markdown(_CSS, unsafe_allow_html=True)
 
@@ -918,6 +1416,15 @@ def render():
         st.markdown(
             "<br><div class='nf-countdown'>AUTO ⟳<br><span id='nf-cd-secs'>—</span></div>",
             unsafe_allow_html=True)
+        # Auto-refresco: el fragmento se re-ejecuta solo cada _REFRESH_SECS y
+        # relanza la app sin vaciar cachés, así solo se re-renderizan los
+        # fragmentos que cambiaron (ACTUALIZAR fuerza todo)
+        @st.fragment(run_every=_REFRESH_SECS)
+        def _auto_refresh():
+            if time.time() - st.session_state.get("nf_last_render", 0.0) >= _REFRESH_SECS:
+                st.rerun()
+        st.session_state.nf_last_render = time.time()
+        _auto_refresh()
     with hc4:
         st.markdown("<br>", unsafe_allow_html=True)
         if st.button("⟳ ACTUALIZAR", use_container_width=True, key="nf_ref_btn"):
@@ -945,7 +1452,9 @@ def render():
     sc1, sc2, sc3 = st.columns(3)
     with sc1: st.markdown(_impact_bars_html(nh_all,nm_all,nl_all), unsafe_allow_html=True)
     with sc2: st.markdown(_sentiment_html(main_items), unsafe_allow_html=True)
-    with sc3: st.markdown(_timeline_html(main_items), unsafe_allow_html=True)
+    # El timeline sale del archivo: cubre 24h aunque los feeds solo expongan las últimas
+    tl_items = _archive_search(start_ts=time.time() - 86400, exclude_special="trump", limit=None) or main_items
+    with sc3: st.markdown(_timeline_html(tl_items), unsafe_allow_html=True)
 
     # ── FILTER ROW ──────────────────────────────────────────────
     fc1, fc2, fc3, fc4 = st.columns([3, 3, 3, 2])
@@ -973,7 +1482,7 @@ def render():
 
     filtered = [it for it in main_items if it["impact"] in impact_sel]
     if src_sel != "(todas)":
-        filtered = [it for it in filtered if it["src_label"] == src_sel]
+        filtered = [it for it in filtered if src_sel in it["sources"]]
     if search:
         q = search.lower()
         filtered = [it for it in filtered if q in (it["title"]+it["desc"]).lower()]
@@ -997,7 +1506,11 @@ def render():
 
     # ── RIGHT PANEL ─────────────────────────────────────────────
     with col_panel:
-        # Trump at top
+        # Trump at top — se completa con posts archivados si el feed trae pocos
+        if len(trump_items) < 5:
+            vistos = {it["story_id"] for it in trump_items}
+            trump_items = trump_items + [it for it in _archive_search(special="trump", limit=5)
+                                         if it["story_id"] not in vistos]
         st.markdown(_trump_panel_html(trump_items), unsafe_allow_html=True)
 
         # Collapsible sections
@@ -1007,6 +1520,17 @@ def render():
         with st.expander("◈ HEATMAP SECTORES", expanded=False):
             st.markdown(_heatmap_html(filtered), unsafe_allow_html=True)
 
+        with st.expander("◈ ARCHIVO", expanded=False):
+            aq = st.text_input("archivo", placeholder="🔍 buscar en el archivo...",
+                               key="nf_arch_q", label_visibility="collapsed")
+            ad = st.selectbox("días", [1, 7, 30, 90], index=1, key="nf_arch_days",
+                              format_func=lambda d: f"Últimos {d} días")
+            if aq or tk_flt:
+                hits = _archive_search(text=aq or None, tickers=[tk_flt] if tk_flt else None,
+                                       impact=impact_sel, start_ts=time.time() - ad * 86400, limit=30)
+                st.caption(f"{len(hits)} historias")
+                st.markdown("".join(_card_html(it) for it in hits), unsafe_allow_html=True)
+
         al_title = "◈ ALERTAS SONORAS  🔔" if st.session_state.nf_alerts_on else "◈ ALERTAS SONORAS  🔕"
         with st.expander(al_title, expanded=False):
             st.caption(
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+options_analytics.py — Analítica vectorizada de cadenas de opciones.
+
+Todas las cadenas de un refresco (varios subyacentes × vencimientos × calls/puts)
+se concatenan en un único DataFrame y se procesan con operaciones de columna:
+prima, Vol/OI, moneyness, flags sweep/block, lado del agresor, score de
+inusualidad, IV y griegas Black-Scholes, y la exposición gamma de los dealers
+por strike. No hay bucles por fila, así que el coste de escanear 100+
+subyacentes es el de la descarga, no el del cálculo.
+
+Sin dependencias de Streamlit.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.special import ndtr as _ndtr
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+RISK_FREE     = 0.043     # tipo libre de riesgo anual para Black-Scholes
+CONTRACT_SIZE = 100
+IV_BOUNDS     = (1e-3, 5.0)
+IV_ITERATIONS = 60        # bisección: error < 5 / 2^60
+
+SWEEP_VOI   = 3           # Vol/OI por encima del cual se marca sweep
+BLOCK_PREM  = 1_000_000   # prima mínima de un block
+
+_SQRT_2PI = math.sqrt(2 * math.pi)
+_erf = np.frompyfunc(math.erf, 1, 1)
+
+
+def norm_cdf(x):
+    x = np.asarray(x, dtype=float)
+    if SCIPY_AVAILABLE:
+        return _ndtr(x)
+    return 0.5 * (1.0 + _erf(x / math.sqrt(2)).astype(float))
+
+
+def norm_pdf(x):
+    x = np.asarray(x, dtype=float)
+    return np.exp(-0.5 * x * x) / _SQRT_2PI
+
+
+# ── Black-Scholes ─────────────────────────────────────────────────────────────
+def _d1_d2(S, K, T, sigma, r):
+    vol_t = sigma * np.sqrt(T)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(S / K) + (r + 0.5 * sigma * sigma) * T) / vol_t
+    return d1, d1 - vol_t
+
+
+def bs_price(S, K, T, sigma, is_call, r=RISK_FREE):
+    """Precio Black-Scholes (arrays del mismo tamaño; is_call booleano)."""
+    d1, d2 = _d1_d2(S, K, T, sigma, r)
+    disc = K * np.exp(-r * T)
+    call = S * norm_cdf(d1) - disc * norm_cdf(d2)
+    put  = disc * norm_cdf(-d2) - S * norm_cdf(-d1)
+    return np.where(is_call, call, put)
+
+
+def bs_greeks(S, K, T, sigma, is_call, r=RISK_FREE):
+    """
+    Griegas por contrato unitario: delta, gamma, vega (por punto de vol) y
+    theta (por día natural). Retorna un dict de arrays.
+    """
+    d1, d2 = _d1_d2(S, K, T, sigma, r)
+    pdf    = norm_pdf(d1)
+    sqrt_t = np.sqrt(T)
+    disc   = K * np.exp(-r * T)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gamma = pdf / (S * sigma * sqrt_t)
+        decay = -S * pdf * sigma / (2 * sqrt_t)
+    delta = np.where(is_call, norm_cdf(d1), norm_cdf(d1) - 1.0)
+    theta = np.where(is_call, decay - r * disc * norm_cdf(d2), decay + r * disc * norm_cdf(-d2)) / 365
+    return {'delta': delta, 'gamma': gamma, 'vega': S * pdf * sqrt_t / 100, 'theta': theta}
+
+
+def implied_vol(price, S, K, T, is_call, r=RISK_FREE):
+    """
+    IV por bisección vectorizada (el precio es monótono en sigma). Las primas por
+    debajo del valor intrínseco o por encima del máximo teórico dan NaN.
+    """
+    price = np.asarray(price, dtype=float)
+    lo = np.full(price.shape, IV_BOUNDS[0])
+    hi = np.full(price.shape, IV_BOUNDS[1])
+    p_lo = bs_price(S, K, T, lo, is_call, r)
+    p_hi = bs_price(S, K, T, hi, is_call, r)
+    valid = (price > p_lo) & (price < p_hi)
+    for _ in range(IV_ITERATIONS):
+        mid = 0.5 * (lo + hi)
+        above = bs_price(S, K, T, mid, is_call, r) > price
+        hi = np.where(above, mid, hi)
+        lo = np.where(above, lo, mid)
+    return np.where(valid, 0.5 * (lo + hi), np.nan)
+
+
+# ── scoring ───────────────────────────────────────────────────────────────────
+def unusualness_score(voi, premium, is_sweep, is_block, dte):
+    """
+    Score de inusualidad 0-100 vectorizado (mismos tramos que rsudb):
+    Vol/OI 40 pts, prima 30 pts, sweep/block 15 pts, DTE corto con prima 15 pts.
+    """
+    voi, premium, dte = (np.asarray(a, dtype=float) for a in (voi, premium, dte))
+    is_sweep, is_block = np.asarray(is_sweep, dtype=bool), np.asarray(is_block, dtype=bool)
+    pts = (np.select([voi >= 10, voi >= 5, voi >= 2, voi >= 1], [40, 30, 20, 10], 0)
+           + np.select([premium >= 5_000_000, premium >= 1_000_000, premium >= 500_000, premium >= 100_000],
+                       [30, 22, 14, 6], 0)
+           + np.select([is_sweep & is_block, is_sweep, is_block], [15, 10, 8], 0)
+           + np.select([(dte <= 7) & (premium >= 500_000), (dte <= 14) & (premium >= 300_000),
+                        (dte <= 30) & (premium >= 100_000)], [15, 10, 5], 0))
+    return np.minimum(pts, 100).astype(int)
+
+
+# ── cadenas ───────────────────────────────────────────────────────────────────
+def chain_frame(chain_df, ticker, spot, expiration, opt_type):
+    """Normaliza una tabla calls/puts de yfinance añadiendo subyacente, spot, vencimiento y tipo."""
+    cols = ['strike', 'lastPrice', 'bid', 'ask', 'volume', 'openInterest', 'impliedVolatility']
+    df = chain_df.reindex(columns=cols).copy()
+    df['ticker'], df['spot'], df['opt_type'] = ticker, float(spot), opt_type
+    df['expiration'] = pd.Timestamp(expiration)
+    return df
+
+
+def analyze_chains(raw, now=None, r=RISK_FREE):
+    """
+    Analítica completa sobre cadenas concatenadas (salida de chain_frame).
+    Añade premium, volume_oi_ratio, moneyness, days_to_exp, iv, griegas,
+    is_sweep, is_block, side (BOUGHT/SOLD), flow_type, sentiment y score.
+    """
+    if raw is None or raw.empty:
+        return pd.DataFrame()
+    now = pd.Timestamp(now or pd.Timestamp.now())
+    df = raw.copy()
+    num = lambda c: pd.to_numeric(df[c], errors='coerce').fillna(0.0).to_numpy(dtype=float)
+    S, K = df['spot'].to_numpy(dtype=float), num('strike')
+    last, bid, ask = num('lastPrice'), num('bid'), num('ask')
+    vol, oi = num('volume'), num('openInterest')
+    is_call = (df['opt_type'] == 'call').to_numpy()
+
+    dte = np.maximum((df['expiration'] - now).dt.days.to_numpy(), 0)
+    T   = np.maximum(dte, 1) / 365.0
+
+    premium = last * vol * CONTRACT_SIZE
+    # OI 0 cuenta como 1: una posición sin interés abierto previo es máxima novedad
+    oi  = np.maximum(oi, 1)
+    voi = np.round(vol / oi, 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        moneyness = np.round((K / S - 1) * 100, 1)
+    df['volume'], df['open_interest'] = vol.astype(int), oi.astype(int)
+    df['premium'], df['volume_oi_ratio'], df['moneyness'] = premium, voi, moneyness
+    df['days_to_exp'] = dte
+
+    # IV: la de yfinance si es razonable; si no, la resolvemos sobre el mid (o el último)
+    iv_yf = num('impliedVolatility')
+    mid   = np.where((bid > 0) & (ask > 0), (bid + ask) / 2, last)
+    bad   = (iv_yf <= IV_BOUNDS[0] * 10) | (iv_yf >= IV_BOUNDS[1])
+    iv    = iv_yf.copy()
+    if bad.any():
+        iv[bad] = implied_vol(mid[bad], S[bad], K[bad], T[bad], is_call[bad], r)
+    df['iv'] = iv
+    greeks = bs_greeks(S, K, T, iv, is_call, r)
+    for k, v in greeks.items():
+        df[k] = v
+
+    df['is_sweep'] = voi > SWEEP_VOI
+    df['is_block'] = premium > BLOCK_PREM
+    # Lado del agresor: último precio en o por encima del mid → comprado; sin cotización, comprado
+    quoted = (bid > 0) & (ask > 0)
+    bought = np.where(quoted, last >= mid, True)
+    df['side'] = np.where(bought, 'BOUGHT', 'SOLD')
+    df['flow_type'] = np.where(is_call, 'CALL_', 'PUT_') + df['side']
+    df['sentiment'] = np.where(is_call == bought, 'BULLISH', 'BEARISH')
+    df['score'] = unusualness_score(voi, premium, df['is_sweep'], df['is_block'], dte)
+    return df
+
+
+def select_flow(analytics, per_group=3, min_volume=10, min_premium=5_000):
+    """Prints relevantes: top `per_group` por volumen en cada (ticker, vencimiento, tipo)."""
+    if analytics.empty:
+        return analytics
+    df = analytics[analytics['volume'] > min_volume]
+    rank = df.groupby(['ticker', 'expiration', 'opt_type'])['volume'].rank(method='first', ascending=False)
+    df = df[(rank <= per_group) & (df['premium'] >= min_premium)]
+    return df.reset_index(drop=True)
+
+
+def dealer_gamma_exposure(analytics):
+    """
+    GEX de los dealers por (ticker, strike) en $ por 1% de movimiento del spot,
+    con la convención habitual: dealers largos de calls y cortos de puts.
+    """
+    if analytics.empty:
+        return pd.DataFrame(columns=['ticker', 'strike', 'spot', 'call_gex', 'put_gex', 'net_gex'])
+    df = analytics[['ticker', 'strike', 'opt_type', 'gamma', 'open_interest', 'spot']].copy()
+    gex = df['gamma'].fillna(0) * df['open_interest'] * CONTRACT_SIZE * df['spot'] ** 2 * 0.01
+    df['call_gex'] = np.where(df['opt_type'] == 'call', gex, 0.0)
+    df['put_gex']  = np.where(df['opt_type'] == 'put', -gex, 0.0)
+    out = df.groupby(['ticker', 'strike'], as_index=False).agg(
+        spot=('spot', 'first'), call_gex=('call_gex', 'sum'), put_gex=('put_gex', 'sum'))
+    out['net_gex'] = out['call_gex'] + out['put_gex']
+    return out
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+options_chains.py — Descarga concurrente de cadenas de opciones y diff entre
+snapshots para detectar flujo nuevo.
+
+Las cadenas de todos los subyacentes se piden en paralelo con un pool acotado y
+un token bucket que limita las peticiones por segundo a Yahoo. Cada refresco se
+guarda como snapshot compacto (volumen y OI por contrato) en disco; comparando
+con el anterior se obtiene el volumen negociado desde el último refresco, de
+modo que solo los strikes cuyo volumen creció se vuelven a puntuar como flujo
+nuevo.
+
+Sin dependencias de Streamlit.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+from modules.options_analytics import chain_frame
+from modules.providers import TokenBucket
+
+MAX_WORKERS      = 8
+REQUESTS_PER_SEC = 10.0     # tope de peticiones a Yahoo (options + option_chain)
+BURST            = 10
+SCAN_TIMEOUT     = 180      # segundos para el escaneo completo
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             "data", "options_snapshot.pkl")
+SNAPSHOT_KEY  = ['ticker', 'expiration', 'opt_type', 'strike']
+
+
+_bucket = TokenBucket(REQUESTS_PER_SEC, BURST)
+
+
+def _fetch_ticker(symbol, n_expirations, default_spot):
+    """Cadenas near-term de un subyacente → lista de frames (chain_frame)."""
+    import yfinance as yf
+    tk = yf.Ticker(symbol)
+    _bucket.acquire()
+    spot = getattr(tk.fast_info, 'last_price', None) or default_spot
+    _bucket.acquire()
+    expirations = (tk.options or ())[:n_expirations]
+    frames = []
+    for exp_str in expirations:
+        _bucket.acquire()
+        try:
+            chain = tk.option_chain(exp_str)
+        except Exception:
+            continue
+        for opt_type, df_opts in (('call', chain.calls), ('put', chain.puts)):
+            if df_opts is not None and not df_opts.empty:
+                frames.append(chain_frame(df_opts, symbol, spot, exp_str, opt_type))
+    return frames
+
+
+def fetch_chains(tickers, n_expirations=3, default_spots=None, max_workers=MAX_WORKERS):
+    """
+    Descarga concurrente de las cadenas de `tickers`. Retorna un único DataFrame
+    concatenado (formato chain_frame) o None si no hay datos. attrs['complete']
+    es False si algún subyacente falló o el escaneo agotó SCAN_TIMEOUT.
+    """
+    default_spots = default_spots or {}
+    frames, done = [], 0
+    ex = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chain_fetch")
+    try:
+        futures = [ex.submit(_fetch_ticker, t, n_expirations, default_spots.get(t, 100)) for t in tickers]
+        try:
+            for fut in as_completed(futures, timeout=SCAN_TIMEOUT):
+                try:
+                    frames.extend(fut.result())
+                    done += 1
+                except Exception:
+                    continue
+        except Exception:
+            # Timeout global: se usa lo que haya llegado
+            pass
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+    if not frames:
+        return None
+    raw = pd.concat(frames, ignore_index=True)
+    raw.attrs['complete'] = done == len(tickers)
+    return raw
+
+
+# ── snapshots ─────────────────────────────────────────────────────────────────
+def load_snapshot(path=SNAPSHOT_PATH):
+    try:
+        return pd.read_pickle(path)
+    except Exception:
+        return None
+
+
+def save_snapshot(raw, taken_at=None, path=SNAPSHOT_PATH):
+    """Guarda solo lo necesario para el diff: clave de contrato, volumen y OI."""
+    snap = raw[SNAPSHOT_KEY + ['volume', 'openInterest']].copy()
+    snap['volume'] = pd.to_numeric(snap['volume'], errors='coerce').fillna(0).astype('int64')
+    snap['openInterest'] = pd.to_numeric(snap['openInterest'], errors='coerce').fillna(0).astype('int64')
+    snap['ticker'] = snap['ticker'].astype('category')
+    snap['opt_type'] = snap['opt_type'].astype('category')
+    snap.attrs['taken_at'] = (taken_at or datetime.now()).isoformat()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        snap.to_pickle(tmp)
+        os.replace(tmp, path)
+    except Exception:
+        pass
+
+
+def diff_snapshot(raw, prev, now=None):
+    """
+    Añade a `raw` vol_delta (volumen desde el snapshot anterior de la misma
+    sesión; toda la sesión si no lo hay) y oi_delta (cambio de OI frente al
+    snapshot anterior, 0 sin referencia).
+    """
+    now = now or datetime.now()
+    df = raw.copy()
+    vol = pd.to_numeric(df['volume'], errors='coerce').fillna(0)
+    oi  = pd.to_numeric(df['openInterest'], errors='coerce').fillna(0)
+    if prev is None or prev.empty:
+        df['vol_delta'], df['oi_delta'] = vol.astype('int64'), 0
+        return df
+    same_session = str(prev.attrs.get('taken_at', ''))[:10] == now.date().isoformat()
+    ref = prev.astype({'ticker': str, 'opt_type': str}).set_index(SNAPSHOT_KEY)
+    joined = ref.reindex(pd.MultiIndex.from_frame(df[SNAPSHOT_KEY].astype({'strike': float})))
+    prev_vol = joined['volume'].to_numpy() if same_session else None
+    prev_oi  = joined['openInterest'].to_numpy()
+    df['vol_delta'] = (vol - pd.Series(prev_vol, index=df.index).fillna(0)).clip(lower=0).astype('int64') \
+        if prev_vol is not None else vol.astype('int64')
+    df['oi_delta'] = (oi - pd.Series(prev_oi, index=df.index)).fillna(0).astype('int64')
+    return df
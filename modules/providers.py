@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""
+providers.py — Cliente HTTP unificado para los proveedores de datos externos.
+
+Cada proveedor (FMP, Finnhub, Alpha Vantage, Yahoo quoteSummary, MyMemory,
+FRED y el scraping web genérico) tiene su propio pool de conexiones, un token
+bucket con su cuota publicada y, si la hay, un tope diario compartido entre
+procesos. Las respuestas se guardan en una caché persistente (SQLite) indexada
+por endpoint + parámetros (sin la API key), y las peticiones idénticas en vuelo
+se agrupan en una sola: con N usuarios abriendo el mismo ticker, el proveedor
+recibe una llamada por ticker y TTL, no una por página vista. Si la llamada
+falla o se agota la cuota diaria, se sirve la última respuesta guardada.
+
+Sin dependencias de Streamlit.
+"""
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+PROVIDER_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "data", "provider_cache.db")
+
+CACHE_MAX_AGE = 7 * 86400     # vida mínima en disco (stale); las entradas con TTL mayor duran su TTL
+PURGE_EVERY   = 86400
+RETRIES       = 3
+BACKOFF_BASE  = 0.8           # s; espera = base · 2^intento · U(0.5, 1.5)
+BACKOFF_MAX   = 20
+RETRY_STATUS  = {429, 500, 502, 503, 504}
+
+_BROWSER_UA = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+               '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
+# Cuotas publicadas de los planes gratuitos (rate en peticiones/s)
+PROVIDERS = {
+    'fmp': {
+        'base': 'https://financialmodelingprep.com/api/v3', 'rate': 5.0, 'burst': 5,
+        'per_day': 250, 'pool': 8, 'auth': ('param', 'apikey'),
+    },
+    'finnhub': {
+        'base': 'https://finnhub.io/api/v1', 'rate': 1.0, 'burst': 10,          # 60/min
+        'per_day': None, 'pool': 8, 'auth': ('header', 'X-Finnhub-Token'),
+    },
+    'alpha_vantage': {
+        'base': 'https://www.alphavantage.co/query', 'rate': 5 / 60, 'burst': 5,  # 5/min
+        'per_day': 25, 'pool': 2, 'auth': ('param', 'apikey'),
+    },
+    'yahoo': {
+        'base': 'https://query1.finance.yahoo.com', 'rate': 2.0, 'burst': 5,
+        'per_day': None, 'pool': 8, 'auth': None,
+        'headers': {'User-Agent': _BROWSER_UA, 'Accept': 'application/json',
+                    'Accept-Language': 'en-US,en;q=0.9', 'Referer': 'https://finance.yahoo.com/'},
+    },
+    'mymemory': {
+        'base': 'https://api.mymemory.translated.net/get', 'rate': 2.0, 'burst': 4,
+        'per_day': None, 'pool': 4, 'auth': None,
+    },
+    'fred': {
+        'base': 'https://fred.stlouisfed.org', 'rate': 2.0, 'burst': 4,
+        'per_day': None, 'pool': 2, 'auth': None,
+    },
+    'web': {
+        'base': '', 'rate': 5.0, 'burst': 10, 'per_day': None, 'pool': 16, 'auth': None,
+        'headers': {'User-Agent': _BROWSER_UA, 'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8'},
+    },
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key        TEXT PRIMARY KEY,
+    provider   TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    body       TEXT NOT NULL,
+    expires_at REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS quota (
+    provider TEXT NOT NULL,
+    day      TEXT NOT NULL,
+    calls    INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (provider, day)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value REAL
+);
+"""
+
+
+class TokenBucket:
+    """Limitador de tasa compartido entre hilos."""
+
+    def __init__(self, rate, burst):
+        self.rate, self.capacity = rate, burst
+        self._tokens  = float(burst)
+        self._updated = time.monotonic()
+        self._lock    = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def available(self):
+        with self._lock:
+            return min(self.capacity, self._tokens + (time.monotonic() - self._updated) * self.rate)
+
+
+def _today():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+
+class ResponseStore:
+    """Caché persistente de respuestas + contadores diarios de cuota (WAL, acceso serializado)."""
+
+    def __init__(self, path=PROVIDER_DB_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            cols = {r[1] for r in self._conn.execute("PRAGMA table_info(responses)")}
+            if 'expires_at' not in cols:
+                # Bases creadas antes de guardar la caducidad por entrada
+                self._conn.execute("ALTER TABLE responses ADD COLUMN expires_at REAL NOT NULL DEFAULT 0")
+                self._conn.execute("UPDATE responses SET expires_at = fetched_at + ?", (CACHE_MAX_AGE,))
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_exp ON responses (expires_at)")
+            self._conn.commit()
+        self._maybe_purge()
+
+    def get(self, key):
+        """(fetched_at, body) o None."""
+        with self._lock:
+            return self._conn.execute("SELECT fetched_at, body FROM responses WHERE key=?", (key,)).fetchone()
+
+    def put(self, key, provider, body, ttl=0):
+        """Guarda la respuesta; se conserva max(ttl, CACHE_MAX_AGE) antes de purgarla."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO responses (key, provider, fetched_at, body, expires_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET fetched_at=excluded.fetched_at, body=excluded.body, "
+                "expires_at=excluded.expires_at",
+                (key, provider, now, body, now + max(ttl or 0, CACHE_MAX_AGE)))
+            self._conn.commit()
+
+    def count_call(self, provider):
+        """Suma una llamada al contador del día y retorna el total."""
+        day = _today()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO quota (provider, day, calls) VALUES (?, ?, 1) "
+                "ON CONFLICT(provider, day) DO UPDATE SET calls=calls+1", (provider, day))
+            self._conn.commit()
+            return self._conn.execute("SELECT calls FROM quota WHERE provider=? AND day=?",
+                                      (provider, day)).fetchone()[0]
+
+    def calls_today(self, provider):
+        with self._lock:
+            row = self._conn.execute("SELECT calls FROM quota WHERE provider=? AND day=?",
+                                     (provider, _today())).fetchone()
+        return row[0] if row else 0
+
+    def _maybe_purge(self):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key='last_purge'").fetchone()
+            if row is not None and time.time() - row[0] < PURGE_EVERY:
+                return
+            self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+            self._conn.execute("DELETE FROM quota WHERE day < ?",
+                               (datetime.fromtimestamp(time.time() - 30 * 86400, timezone.utc).strftime('%Y-%m-%d'),))
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('last_purge', ?) "
+                               "ON CONFLICT(key) DO UPDATE SET value=excluded.value", (time.time(),))
+            self._conn.commit()
+
+
+class _ProviderSession(requests.Session):
+    """Session cuyo cada request pasa por el token bucket y el contador del proveedor."""
+
+    def __init__(self, provider):
+        super().__init__()
+        self._provider = provider
+
+    def request(self, *args, **kwargs):
+        self._provider._acquire()
+        return super().request(*args, **kwargs)
+
+
+class Provider:
+    """Proveedor con pool propio, cuota, reintentos con jitter y caché persistente."""
+
+    def __init__(self, name, spec, store):
+        self.name    = name
+        self.spec    = spec
+        self.store   = store
+        self.bucket  = TokenBucket(spec['rate'], spec['burst'])
+        self.session = _ProviderSession(self)
+        adapter = HTTPAdapter(pool_connections=spec['pool'], pool_maxsize=spec['pool'], max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(spec.get('headers') or {'User-Agent': 'RSUEarnings/4.0'})
+        self.stats = {'calls': 0, 'cache_hits': 0, 'dedup': 0, 'stale': 0,
+                      'throttled': 0, 'errors': 0, 'quota_blocked': 0, 'last_error': None}
+        self._inflight = {}
+        self._lock     = threading.Lock()
+
+    def _acquire(self):
+        self.bucket.acquire()
+        with self._lock:
+            self.stats['calls'] += 1
+        if self.spec['per_day']:
+            self.store.count_call(self.name)
+
+    def _key(self, url, params):
+        return f"{self.name}|{url}|{json.dumps(params or {}, sort_keys=True, default=str)}"
+
+    def _url(self, path):
+        if path.startswith('http'):
+            return path
+        return f"{self.spec['base']}/{path}" if path else self.spec['base']
+
+    # ── API pública ───────────────────────────────────────────────────────────
+    def get_json(self, path='', params=None, api_key=None, ttl=3600, **kw):
+        """GET → JSON decodificado, o None si no hay respuesta válida ni guardada."""
+        return self.get(path, params, api_key, ttl, parse='json', **kw)
+
+    def get_text(self, path='', params=None, api_key=None, ttl=3600, **kw):
+        return self.get(path, params, api_key, ttl, parse='text', **kw)
+
+    def get(self, path='', params=None, api_key=None, ttl=3600, parse='json',
+            valid=None, headers=None, timeout=10, return_error=False):
+        """
+        GET cacheado. `valid(data)` decide si una respuesta 200 se acepta (p.ej.
+        Alpha Vantage devuelve 200 con una nota cuando se agota la cuota).
+        ttl=0 desactiva la lectura de caché pero la respuesta se sigue guardando.
+        Con return_error=True retorna (data, error) con el error de esta petición
+        (None si hubo datos); stats['last_error'] es del proceso y puede ser de otra.
+        """
+        data, error = self._get(path, params, api_key, ttl, parse, valid, headers, timeout)
+        return (data, error) if return_error else data
+
+    def _get(self, path, params, api_key, ttl, parse, valid, headers, timeout):
+        url = self._url(path)
+        key = self._key(url, params)
+        hit = self.store.get(key)
+        if hit and ttl and time.time() - hit[0] < ttl:
+            with self._lock:
+                self.stats['cache_hits'] += 1
+            return self._decode(hit[1], parse), None
+
+        # Single-flight: una sola petición por clave aunque la pidan N sesiones a la vez
+        with self._lock:
+            event  = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+        if not leader:
+            event.wait(timeout * (RETRIES + 1))
+            with self._lock:
+                self.stats['dedup'] += 1
+            hit = self.store.get(key)
+            if hit:
+                return self._decode(hit[1], parse), None
+            return None, f"sin respuesta de la petición agrupada ({url})"
+
+        try:
+            body, error = self._fetch(url, params, api_key, headers, timeout, parse, valid)
+            if body is not None:
+                self.store.put(key, self.name, body, ttl)
+                return self._decode(body, parse), None
+            if hit:
+                with self._lock:
+                    self.stats['stale'] += 1
+                return self._decode(hit[1], parse), None
+            return None, error
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    @staticmethod
+    def _decode(body, parse):
+        return json.loads(body) if parse == 'json' else body
+
+    def _fetch(self, url, params, api_key, headers, timeout, parse, valid):
+        """Petición con reintentos (backoff exponencial con jitter). Retorna (cuerpo en texto o None, error)."""
+        per_day = self.spec['per_day']
+        params  = dict(params or {})
+        headers = dict(headers or {})
+        auth    = self.spec['auth']
+        if auth and api_key:
+            (params if auth[0] == 'param' else headers)[auth[1]] = api_key
+
+        error = None
+        for attempt in range(RETRIES + 1):
+            if per_day and self.store.calls_today(self.name) >= per_day:
+                with self._lock:
+                    self.stats['quota_blocked'] += 1
+                return None, error or f"cuota diaria agotada ({per_day})"
+            retry_after = None
+            try:
+                resp = self.session.get(url, params=params, headers=headers, timeout=timeout)
+                if resp.status_code == 200:
+                    body = resp.text
+                    data = json.loads(body) if parse == 'json' else body
+                    if valid is not None and not valid(data):
+                        return None, self._error(f"respuesta rechazada ({url})")
+                    return body, None
+                if resp.status_code not in RETRY_STATUS:
+                    return None, self._error(f"HTTP {resp.status_code} ({url})")
+                if resp.status_code == 429:
+                    with self._lock:
+                        self.stats['throttled'] += 1
+                    retry_after = resp.headers.get('Retry-After')
+                error = self._error(f"HTTP {resp.status_code} ({url})")
+            except (requests.RequestException, ValueError) as e:
+                error = self._error(f"{type(e).__name__}: {e}")
+            if attempt < RETRIES:
+                wait = BACKOFF_BASE * 2 ** attempt * random.uniform(0.5, 1.5)
+                if retry_after and str(retry_after).isdigit():
+                    wait = max(wait, float(retry_after))
+                time.sleep(min(wait, BACKOFF_MAX))
+        return None, error
+
+    def _error(self, msg):
+        with self._lock:
+            self.stats['errors'] += 1
+            self.stats['last_error'] = msg
+        return msg
+
+    def quota(self):
+        """Uso de cuota y contadores del proceso."""
+        per_day = self.spec['per_day']
+        used    = self.store.calls_today(self.name) if per_day else None
+        with self._lock:
+            stats = dict(self.stats)
+        return {'provider': self.name, 'calls_today': used, 'per_day': per_day,
+                'remaining_today': (per_day - used) if per_day else None,
+                'rate_per_min': round(self.spec['rate'] * 60, 1),
+                'tokens': round(self.bucket.available(), 1), **stats}
+
+
+_store = None
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name):
+    """Proveedor por nombre (singleton de proceso)."""
+    global _store
+    if name not in _providers:
+        with _providers_lock:
+            if name not in _providers:
+                if _store is None:
+                    _store = ResponseStore()
+                _providers[name] = Provider(name, PROVIDERS[name], _store)
+    return _providers[name]
+
+
+def provider_session(name='web'):
+    """requests.Session compartida del proveedor (pool + rate limit), para scraping directo."""
+    return get_provider(name).session
+
+
+def quota_report():
+    """Lista de dicts de cuota, uno por proveedor configurado."""
+    return [get_provider(name).quota() for name in PROVIDERS]
+
+
+def translate_en_es(text, timeout=6):
+    """Traducción inglés → castellano vía MyMemory (caché 30 días). None si no hay traducción."""
+    d = get_provider('mymemory').get_json(params={'q': text, 'langpair': 'en|es'}, ttl=30 * 86400,
+                                          timeout=timeout, valid=lambda d: d.get('responseStatus') == 200)
+    return d['responseData']['translatedText'] if d else None
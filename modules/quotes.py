@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+quotes.py — Snapshot de cotizaciones compartido (último precio, cierre previo y
+variaciones 1D/3D/1W/1M) para cualquier conjunto de símbolos.
+
+Todos los consumidores (ticker tape, heatmap sectorial, ticker de noticias y el
+briefing diario) registran sus símbolos en un universo común; la primera lectura
+de cada ventana de refresco descarga el universo completo con un único
+yf.download y el resto de lecturas de esa ventana salen de memoria.
+
+Solo depende de yfinance/pandas para poder usarse fuera de Streamlit
+(scripts/generate_briefing.py).
+"""
+import threading
+import time
+
+import pandas as pd
+import yfinance as yf
+
+SNAPSHOT_WINDOW = 60       # segundos por ventana de refresco
+SNAPSHOT_PERIOD = "1mo"    # cubre todas las variaciones publicadas
+# Barras hacia atrás para cada variación; None = primera barra del periodo
+CHANGE_OFFSETS  = {"1D": 1, "3D": 3, "1W": 5, "1M": None}
+
+_universe = set()
+_snapshot = {"window": None, "data": {}, "missing": set()}
+_lock     = threading.Lock()
+
+
+def register_symbols(symbols):
+    """Añade símbolos al universo que se descarga en cada ventana."""
+    with _lock:
+        _universe.update(symbols)
+
+
+def _pct(current, prev):
+    return (current - prev) / prev * 100 if prev else None
+
+
+def _quote_from_bars(bars):
+    close = bars["Close"].dropna()
+    if close.empty:
+        return None
+    price = float(close.iloc[-1])
+    quote = {
+        "price": price,
+        "prev_close": float(close.iloc[-2]) if len(close) >= 2 else None,
+        # Sin dropna, las filas de fin de semana de las cripto (calendario unión
+        # del yf.download conjunto) dejarían en NaN a las acciones
+        "high_5d": float(bars["High"].dropna().tail(5).max()),
+        "low_5d": float(bars["Low"].dropna().tail(5).min()),
+        "as_of": close.index[-1],
+    }
+    for label, offset in CHANGE_OFFSETS.items():
+        if len(close) < 2:
+            quote[f"chg_{label.lower()}"] = None
+            continue
+        ref = close.iloc[0] if offset is None else close.iloc[-(offset + 1)] if len(close) > offset else close.iloc[0]
+        quote[f"chg_{label.lower()}"] = _pct(price, float(ref))
+    return quote
+
+
+def _download(symbols):
+    """Una sola llamada yf.download → {símbolo: quote}."""
+    symbols = sorted(symbols)
+    raw = yf.download(symbols, period=SNAPSHOT_PERIOD, interval="1d", auto_adjust=True,
+                      progress=False, group_by="ticker", threads=True)
+    if raw is None or raw.empty:
+        return {}
+    if not isinstance(raw.columns, pd.MultiIndex):
+        raw = pd.concat({symbols[0]: raw}, axis=1)
+    quotes = {}
+    for sym in symbols:
+        if sym not in raw.columns.get_level_values(0):
+            continue
+        try:
+            q = _quote_from_bars(raw[sym])
+        except Exception:
+            q = None
+        if q:
+            quotes[sym] = q
+    return quotes
+
+
+def get_quote_snapshot(symbols):
+    """
+    Cotizaciones de `symbols` para la ventana de refresco actual.
+    Retorna {símbolo: {price, prev_close, chg_1d, chg_3d, chg_1w, chg_1m,
+    high_5d, low_5d, as_of}}; los símbolos sin datos se omiten.
+    """
+    symbols = set(symbols)
+    window = int(time.time() // SNAPSHOT_WINDOW)
+    with _lock:
+        _universe.update(symbols)
+        if _snapshot["window"] != window:
+            try:
+                data = _download(_universe)
+            except Exception:
+                data = {}
+            # Si la descarga falla se sirve la ventana anterior
+            if data or _snapshot["window"] is None:
+                _snapshot["data"] = data
+            _snapshot["window"]  = window
+            _snapshot["missing"] = _universe - set(_snapshot["data"])
+        elif not symbols <= set(_snapshot["data"]):
+            # Símbolos nuevos en mitad de la ventana: solo se piden los que faltan
+            faltan = symbols - set(_snapshot["data"]) - _snapshot["missing"]
+            if faltan:
+                try:
+                    nuevos = _download(faltan)
+                except Exception:
+                    nuevos = {}
+                _snapshot["data"] = {**_snapshot["data"], **nuevos}
+                _snapshot["missing"] |= faltan - set(nuevos)
+        data = _snapshot["data"]
+    return {s: data[s] for s in symbols if s in data}
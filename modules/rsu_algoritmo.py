@@ -599,17 +599,102 @@ def calcular_max_drawdown(precios, precio_entrada):
     return max_dd if max_dd < 0 else 0.0
 
 
+def _normalizar_batch(raw, simbolos):
+    """Separa la salida de yf.download(group_by='ticker') en {símbolo: DataFrame OHLCV}."""
+    resultado = {}
+    if raw is None or raw.empty:
+        return resultado
+    if not isinstance(raw.columns, pd.MultiIndex):
+        df = raw.dropna(how='all')
+        if not df.empty:
+            resultado[simbolos[0]] = df
+        return resultado
+    for sym in simbolos:
+        try:
+            df = raw[sym].dropna(how='all')
+            if not df.empty and 'Close' in df.columns:
+                resultado[sym] = df
+        except KeyError:
+            continue
+    return resultado
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def descargar_historicos_batch(simbolos_tuple, period="2y"):
+    """Una sola llamada yf.download para todos los símbolos. Retorna {símbolo: DataFrame}."""
+    simbolos = list(dict.fromkeys(simbolos_tuple))
+    if not simbolos:
+        return {}
+    try:
+        raw = yf.download(simbolos, period=period, interval="1d", auto_adjust=True,
+                          progress=False, group_by='ticker', threads=True)
+    except Exception:
+        return {}
+    return _normalizar_batch(raw, simbolos)
+
+
 def descargar_datos_sectores():
-    sector_data = {}
     with st.spinner('🔄 Cargando datos sectoriales para análisis de amplitud...'):
-        for etf in SECTOR_ETFS:
-            try:
-                df = yf.Ticker(etf).history(period="3mo", interval="1d")
-                if not df.empty:
-                    sector_data[etf] = df
-            except Exception:
-                continue
-    return sector_data
+        return descargar_historicos_batch(tuple(SECTOR_ETFS), period="3mo")
+
+
+def _backtest_serie(df_hist, vix_hist=None, sectores_hist=None, umbral_señal=50):
+    """Núcleo del backtest sobre una serie ya descargada. Retorna la lista de señales."""
+    señales = []
+    for i in range(60, len(df_hist) - 60):
+        ventana_df = df_hist.iloc[:i]
+        vix_window = vix_hist.iloc[:i] if vix_hist is not None else None
+        sector_window = None
+        if sectores_hist:
+            sector_window = {etf: df_sec.iloc[:i] for etf, df_sec in sectores_hist.items() if len(df_sec) >= i}
+
+        resultado = detectar_fondo_comprehensivo(ventana_df, vix_window, sector_window)
+        if resultado['score'] >= umbral_señal:
+            pe = df_hist['Close'].iloc[i]
+            ps5  = df_hist['Close'].iloc[min(i+5,  len(df_hist)-1)]
+            ps10 = df_hist['Close'].iloc[min(i+10, len(df_hist)-1)]
+            ps20 = df_hist['Close'].iloc[min(i+20, len(df_hist)-1)]
+            ps60 = df_hist['Close'].iloc[min(i+60, len(df_hist)-1)]
+            r5  = (ps5  - pe) / pe * 100
+            r10 = (ps10 - pe) / pe * 100
+            r20 = (ps20 - pe) / pe * 100
+            r60 = (ps60 - pe) / pe * 100
+            precios_60d = df_hist['Close'].iloc[i:min(i+61, len(df_hist))]
+            max_dd = calcular_max_drawdown(precios_60d, pe)
+            señales.append({
+                'fecha': df_hist.index[i].strftime('%Y-%m-%d'),
+                'score': resultado['score'], 'estado': resultado['estado'],
+                'advertencias': len(resultado['advertencias']),
+                'precio_entrada': round(pe, 2),
+                'retorno_5d':  round(r5,  2), 'retorno_10d': round(r10, 2),
+                'retorno_20d': round(r20, 2), 'retorno_60d': round(r60, 2),
+                'max_drawdown_60d': round(max_dd, 2),
+                'exito_5d': r5>0, 'exito_10d': r10>0, 'exito_20d': r20>0, 'exito_60d': r60>0,
+                'umbral_usado': umbral_señal
+            })
+    return señales
+
+
+def _metricas_backtest(df_res, umbral_señal):
+    return {
+        'total_señales': len(df_res), 'umbral_aplicado': umbral_señal,
+        'score_promedio': df_res['score'].mean(),
+        'win_rate_5d':  df_res['exito_5d'].mean()  * 100,
+        'win_rate_10d': df_res['exito_10d'].mean() * 100,
+        'win_rate_20d': df_res['exito_20d'].mean() * 100,
+        'win_rate_60d': df_res['exito_60d'].mean() * 100,
+        'retorno_medio_5d':  df_res['retorno_5d'].mean(),
+        'retorno_medio_10d': df_res['retorno_10d'].mean(),
+        'retorno_medio_20d': df_res['retorno_20d'].mean(),
+        'retorno_medio_60d': df_res['retorno_60d'].mean(),
+        'retorno_total_20d': df_res['retorno_20d'].sum(),
+        'retorno_total_60d': df_res['retorno_60d'].sum(),
+        'max_drawdown_promedio': df_res['max_drawdown_60d'].mean(),
+        'peor_drawdown': df_res['max_drawdown_60d'].min(),
+        'mejor_señal': df_res.loc[df_res['retorno_20d'].idxmax()].to_dict() if len(df_res) > 0 else None,
+        'peor_señal':  df_res.loc[df_res['retorno_20d'].idxmin()].to_dict() if len(df_res) > 0 else None,
+        'detalle': df_res
+    }
 
 
 def backtest_strategy(ticker_symbol="SPY", years=2, umbral_señal=50, usar_sectores=False):
@@ -626,73 +711,136 @@ def backtest_strategy(ticker_symbol="SPY", years=2, umbral_señal=50, usar_secto
         sectores_hist = {}
         if usar_sectores:
             st.info("Modo preciso: Descargando datos sectoriales...")
-            for etf in SECTOR_ETFS:
-                try:
-                    sectores_hist[etf] = yf.Ticker(etf).history(period=f"{years}y", interval="1d")
-                except Exception:
-                    continue
-
-        señales = []
-        for i in range(60, len(df_hist) - 60):
-            ventana_df = df_hist.iloc[:i]
-            vix_window = vix_hist.iloc[:i] if vix_hist is not None else None
-            sector_window = None
-            if usar_sectores and sectores_hist:
-                sector_window = {etf: df_sec.iloc[:i] for etf, df_sec in sectores_hist.items() if len(df_sec) >= i}
-
-            resultado = detectar_fondo_comprehensivo(ventana_df, vix_window, sector_window)
-            if resultado['score'] >= umbral_señal:
-                pe = df_hist['Close'].iloc[i]
-                ps5  = df_hist['Close'].iloc[min(i+5,  len(df_hist)-1)]
-                ps10 = df_hist['Close'].iloc[min(i+10, len(df_hist)-1)]
-                ps20 = df_hist['Close'].iloc[min(i+20, len(df_hist)-1)]
-                ps60 = df_hist['Close'].iloc[min(i+60, len(df_hist)-1)]
-                r5  = (ps5  - pe) / pe * 100
-                r10 = (ps10 - pe) / pe * 100
-                r20 = (ps20 - pe) / pe * 100
-                r60 = (ps60 - pe) / pe * 100
-                precios_60d = df_hist['Close'].iloc[i:min(i+61, len(df_hist))]
-                max_dd = calcular_max_drawdown(precios_60d, pe)
-                señales.append({
-                    'fecha': df_hist.index[i].strftime('%Y-%m-%d'),
-                    'score': resultado['score'], 'estado': resultado['estado'],
-                    'advertencias': len(resultado['advertencias']),
-                    'precio_entrada': round(pe, 2),
-                    'retorno_5d':  round(r5,  2), 'retorno_10d': round(r10, 2),
-                    'retorno_20d': round(r20, 2), 'retorno_60d': round(r60, 2),
-                    'max_drawdown_60d': round(max_dd, 2),
-                    'exito_5d': r5>0, 'exito_10d': r10>0, 'exito_20d': r20>0, 'exito_60d': r60>0,
-                    'umbral_usado': umbral_señal
-                })
+            sectores_hist = descargar_historicos_batch(tuple(SECTOR_ETFS), period=f"{years}y")
 
+        señales = _backtest_serie(df_hist, vix_hist, sectores_hist, umbral_señal)
         if not señales:
             return None, f"No se generaron señales con score >= {umbral_señal}"
 
-        df_res = pd.DataFrame(señales)
-        metricas = {
-            'total_señales': len(señales), 'umbral_aplicado': umbral_señal,
-            'score_promedio': df_res['score'].mean(),
-            'win_rate_5d':  df_res['exito_5d'].mean()  * 100,
-            'win_rate_10d': df_res['exito_10d'].mean() * 100,
-            'win_rate_20d': df_res['exito_20d'].mean() * 100,
-            'win_rate_60d': df_res['exito_60d'].mean() * 100,
-            'retorno_medio_5d':  df_res['retorno_5d'].mean(),
-            'retorno_medio_10d': df_res['retorno_10d'].mean(),
-            'retorno_medio_20d': df_res['retorno_20d'].mean(),
-            'retorno_medio_60d': df_res['retorno_60d'].mean(),
-            'retorno_total_20d': df_res['retorno_20d'].sum(),
-            'retorno_total_60d': df_res['retorno_60d'].sum(),
-            'max_drawdown_promedio': df_res['max_drawdown_60d'].mean(),
-            'peor_drawdown': df_res['max_drawdown_60d'].min(),
-            'mejor_señal': df_res.loc[df_res['retorno_20d'].idxmax()].to_dict() if len(df_res) > 0 else None,
-            'peor_señal':  df_res.loc[df_res['retorno_20d'].idxmin()].to_dict() if len(df_res) > 0 else None,
-            'detalle': df_res
-        }
-        return metricas, None
+        return _metricas_backtest(pd.DataFrame(señales), umbral_señal), None
     except Exception as e:
         return None, f"Error en backtest: {str(e)}"
 
 
+# ─── Backtest multi-activo ─────────────────────────────────────────────────────
+UNIVERSO_BACKTEST = [
+    'SPY', 'QQQ', 'IWM', 'DIA', 'MDY', 'EFA', 'EEM', 'TLT', 'GLD',
+    'XLK', 'XLF', 'XLV', 'XLY', 'XLP', 'XLI', 'XLB', 'XLRE', 'XLU', 'XLE', 'XLC',
+    'SMH', 'XBI', 'KRE', 'XHB', 'ITB', 'IBB', 'ARKK',
+    'AAPL', 'MSFT', 'NVDA', 'AMZN', 'GOOGL', 'META', 'TSLA', 'AVGO', 'JPM',
+    'V', 'MA', 'UNH', 'LLY', 'XOM', 'HD', 'COST', 'WMT', 'PG', 'JNJ',
+    'NFLX', 'AMD', 'CRM', 'ORCL', 'BAC', 'CAT', 'GE',
+]
+
+
+def _alinear(df, index):
+    """Reindexa una serie auxiliar (VIX/sector) al calendario del activo."""
+    return df.reindex(index).ffill().dropna(how='all')
+
+
+def _backtest_shard(shard, vix_hist, sectores_hist, umbral_señal):
+    """Worker de proceso: ejecuta el backtest de un lote de símbolos con inputs compartidos."""
+    salida = {}
+    for sym, df_hist in shard.items():
+        try:
+            if df_hist is None or len(df_hist) < 100:
+                salida[sym] = (None, "Datos insuficientes")
+                continue
+            vix = _alinear(vix_hist, df_hist.index) if vix_hist is not None else None
+            sect = {etf: _alinear(d, df_hist.index) for etf, d in sectores_hist.items()} if sectores_hist else None
+            salida[sym] = (_backtest_serie(df_hist, vix, sect, umbral_señal), None)
+        except Exception as e:
+            salida[sym] = (None, str(e))
+    return salida
+
+
+def _resumen_activo(sym, df_res):
+    return {
+        'Símbolo': sym, 'Señales': len(df_res),
+        'Win Rate 5d':  round(df_res['exito_5d'].mean()  * 100, 1),
+        'Win Rate 20d': round(df_res['exito_20d'].mean() * 100, 1),
+        'Win Rate 60d': round(df_res['exito_60d'].mean() * 100, 1),
+        'Ret. Medio 20d': round(df_res['retorno_20d'].mean(), 2),
+        'Ret. Medio 60d': round(df_res['retorno_60d'].mean(), 2),
+        'Max DD Prom': round(df_res['max_drawdown_60d'].mean(), 2),
+        'Peor DD': round(df_res['max_drawdown_60d'].min(), 2),
+    }
+
+
+def backtest_multi_activo(simbolos, years=2, umbral_señal=50, usar_sectores=False,
+                          max_workers=None, progress_cb=None):
+    """
+    Backtest del detector de fondos sobre una lista de índices/ETFs/acciones.
+    - Una única descarga batch para activos + ^VIX (+ sectores si usar_sectores).
+    - Símbolos repartidos en lotes sobre un ProcessPoolExecutor (fallback serie).
+    Retorna (reporte, error) con métricas agregadas, resumen por activo y detalle.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    simbolos = [s.strip().upper() for s in simbolos if s and s.strip()]
+    simbolos = list(dict.fromkeys(simbolos))
+    if not simbolos:
+        return None, "Lista de símbolos vacía"
+
+    extra = ['^VIX'] + (SECTOR_ETFS if usar_sectores else [])
+    datos = descargar_historicos_batch(tuple(simbolos + extra), period=f"{years}y")
+    if not datos:
+        return None, "No se pudieron descargar datos"
+
+    vix_hist = datos.get('^VIX')
+    sectores_hist = {etf: datos[etf] for etf in SECTOR_ETFS if etf in datos} if usar_sectores else {}
+    activos = {s: datos[s] for s in simbolos if s in datos}
+    errores = {s: "Sin datos" for s in simbolos if s not in datos}
+
+    n_workers = max_workers or min(len(activos), os.cpu_count() or 1, 8) or 1
+    nombres = list(activos)
+    shards = [{s: activos[s] for s in nombres[k::n_workers]} for k in range(n_workers)]
+    shards = [sh for sh in shards if sh]
+
+    parciales = {}
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers) as ex:
+            futures = [ex.submit(_backtest_shard, sh, vix_hist, sectores_hist, umbral_señal) for sh in shards]
+            for n, fut in enumerate(as_completed(futures), 1):
+                parciales.update(fut.result())
+                if progress_cb:
+                    progress_cb(n / len(futures))
+    except Exception:
+        # Entornos sin fork/multiproceso → ejecución serie
+        for n, sh in enumerate(shards, 1):
+            if all(s in parciales for s in sh):
+                continue
+            parciales.update(_backtest_shard(sh, vix_hist, sectores_hist, umbral_señal))
+            if progress_cb:
+                progress_cb(n / len(shards))
+
+    resumen, detalles = [], []
+    for sym in simbolos:
+        señales, err = parciales.get(sym, (None, errores.get(sym, "Sin datos")))
+        if err or not señales:
+            errores[sym] = err or f"Sin señales con score >= {umbral_señal}"
+            continue
+        df_sym = pd.DataFrame(señales)
+        df_sym.insert(0, 'simbolo', sym)
+        detalles.append(df_sym)
+        resumen.append(_resumen_activo(sym, df_sym))
+
+    if not detalles:
+        return None, f"No se generaron señales con score >= {umbral_señal} en ningún activo"
+
+    df_all = pd.concat(detalles, ignore_index=True)
+    df_resumen = pd.DataFrame(resumen).sort_values('Win Rate 20d', ascending=False).reset_index(drop=True)
+    reporte = _metricas_backtest(df_all, umbral_señal)
+    reporte.update({
+        'activos_analizados': len(activos),
+        'activos_con_señal': len(resumen),
+        'pct_activos_wr20_positivo': (df_resumen['Win Rate 20d'] > 50).mean() * 100,
+        'resumen_activos': df_resumen,
+        'errores': errores,
+    })
+    return reporte, None
+
+
 def crear_grafico_acumulacion(df, resultado):
     try:
         import plotly.graph_objects as go
@@ -1061,6 +1209,56 @@ def render():
                             resultados_bt['detalle']['año'] = pd.to_datetime(resultados_bt['detalle']['fecha']).dt.year
                             st.bar_chart(resultados_bt['detalle'].groupby('año').size())
 
+        # ── Backtest multi-activo ──
+        st.markdown("<hr>", unsafe_allow_html=True)
+        st.markdown("<h2>🌐 BACKTEST MULTI-ACTIVO</h2>", unsafe_allow_html=True)
+        st.markdown("<p>Valida la señal sobre una cesta de índices, ETFs o acciones con una única descarga "
+                    "batch y VIX/sectores compartidos.</p>", unsafe_allow_html=True)
+        simbolos_txt = st.text_area("Símbolos (separados por coma o espacio)",
+                                    value=", ".join(UNIVERSO_BACKTEST), height=90)
+        col_ma1, col_ma2, col_ma3 = st.columns([1, 1, 2])
+        with col_ma1:
+            umbral_ma = st.slider("Umbral multi-activo", 30, 85, 50, 5, key="umbral_multi")
+        with col_ma2:
+            años_ma = st.selectbox("Período multi-activo (años)", [1, 2, 3, 5], index=1, key="años_multi")
+            sectores_ma = st.checkbox("Usar sectores", value=False, key="sectores_multi")
+        with col_ma3:
+            if st.button("🚀 Ejecutar Backtest Multi-Activo", use_container_width=True):
+                simbolos = simbolos_txt.replace(",", " ").split()
+                bar_ma = st.progress(0.0, text=f"Backtest de {len(simbolos)} activos...")
+                rep, err = backtest_multi_activo(
+                    simbolos, years=años_ma, umbral_señal=umbral_ma, usar_sectores=sectores_ma,
+                    progress_cb=lambda f: bar_ma.progress(min(f, 1.0), text=f"Procesando lotes... {f*100:.0f}%"))
+                bar_ma.empty()
+                if err:
+                    st.warning(err)
+                else:
+                    st.success(f"✅ {rep['total_señales']} señales en {rep['activos_con_señal']}/"
+                               f"{rep['activos_analizados']} activos (Umbral: {rep['umbral_aplicado']})")
+                    a1, a2, a3, a4 = st.columns(4)
+                    a1.metric("Win Rate 5d",  f"{rep['win_rate_5d']:.1f}%")
+                    a2.metric("Win Rate 20d", f"{rep['win_rate_20d']:.1f}%")
+                    a3.metric("Win Rate 60d", f"{rep['win_rate_60d']:.1f}%")
+                    a4.metric("Max DD Promedio", f"{rep['max_drawdown_promedio']:.1f}%",
+                              delta=f"Peor: {rep['peor_drawdown']:.1f}%", delta_color="inverse")
+                    a5, a6, a7, a8 = st.columns(4)
+                    a5.metric("Ret. Medio 20d", f"{rep['retorno_medio_20d']:.2f}%")
+                    a6.metric("Ret. Medio 60d", f"{rep['retorno_medio_60d']:.2f}%")
+                    a7.metric("Score Promedio", f"{rep['score_promedio']:.1f}")
+                    a8.metric("Activos WR20 > 50%", f"{rep['pct_activos_wr20_positivo']:.0f}%")
+
+                    st.markdown("<h3>Resumen por Activo</h3>", unsafe_allow_html=True)
+                    st.dataframe(rep['resumen_activos'], use_container_width=True, hide_index=True)
+                    st.bar_chart(rep['resumen_activos'].set_index('Símbolo')['Ret. Medio 20d'])
+
+                    with st.expander("Ver señales detalladas"):
+                        st.dataframe(rep['detalle'].sort_values('fecha', ascending=False),
+                                     use_container_width=True, hide_index=True)
+                    if rep['errores']:
+                        with st.expander(f"Activos sin resultado ({len(rep['errores'])})"):
+                            st.dataframe(pd.DataFrame(list(rep['errores'].items()), columns=['Símbolo', 'Motivo']),
+                                         use_container_width=True, hide_index=True)
+
     # ─────────────────────────────────────────────────────────────────────────
     # TAB 3: METODOLOGÍA
     # ─────────────────────────────────────────────────────────────────────────
@@ -9,6 +9,11 @@ import numpy as np
 from datetime import datetime, timedelta
 import plotly.graph_objects as go
 import plotly.express as px
+from modules.options_analytics import (analyze_chains, select_flow,
+                                       dealer_gamma_exposure, unusualness_score)
+from modules.options_chains import fetch_chains, load_snapshot, save_snapshot, diff_snapshot
+from modules.flow_store import FlowStore
+from modules.background_cache import swr_cached
 
 # ─────────────────────────────────────────────
 # CONFIG
@@ -44,6 +49,35 @@ MOCK_PRICES = {
     'ALAB': 138, 'CELH': 32, 'BIIB': 148, 'AZN': 72
 }
 
+# Universo del escaneo real de flujo: TICKERS + nombres líquidos en opciones.
+# La descarga concurrente (options_chains) permite escanearlos todos en cada refresco.
+FLOW_EXTRA = {
+    'AVGO': 'Semiconductors', 'MU': 'Semiconductors', 'INTC': 'Semiconductors', 'QCOM': 'Semiconductors',
+    'SMCI': 'Semiconductors', 'ARM': 'Semiconductors', 'TSM': 'Semiconductors', 'MRVL': 'Semiconductors',
+    'SMH': 'ETF', 'SOXL': 'ETF', 'TQQQ': 'ETF', 'SQQQ': 'ETF', 'DIA': 'ETF', 'XLF': 'ETF',
+    'XLE': 'ETF', 'XLK': 'ETF', 'XBI': 'ETF', 'KRE': 'ETF', 'EEM': 'ETF', 'FXI': 'ETF',
+    'HYG': 'Bonds', 'SLV': 'Commodities', 'USO': 'Commodities', 'UVXY': 'Volatility',
+    'ORCL': 'SaaS', 'ADBE': 'SaaS', 'NOW': 'SaaS', 'SNOW': 'SaaS', 'SHOP': 'SaaS',
+    'CRWD': 'Cybersecurity', 'PANW': 'Cybersecurity', 'NET': 'Cybersecurity', 'ZS': 'Cybersecurity',
+    'IBM': 'Tech', 'DELL': 'Tech', 'HPE': 'Tech', 'ANET': 'Tech', 'SNAP': 'Tech', 'PINS': 'Tech',
+    'RBLX': 'Media', 'DIS': 'Media', 'ROKU': 'Media', 'SPOT': 'Media', 'WBD': 'Media',
+    'MSTR': 'Crypto', 'MARA': 'Crypto', 'RIOT': 'Crypto', 'HOOD': 'Fintech', 'SOFI': 'Fintech',
+    'PYPL': 'Fintech', 'XYZ': 'Fintech', 'AFRM': 'Fintech', 'UPST': 'Fintech',
+    'JPM': 'Banks', 'BAC': 'Banks', 'C': 'Banks', 'WFC': 'Banks', 'GS': 'Banks', 'MS': 'Banks',
+    'SCHW': 'Banks', 'V': 'Payments', 'MA': 'Payments', 'BRK-B': 'Financials',
+    'XOM': 'Energy', 'CVX': 'Energy', 'OXY': 'Energy', 'SLB': 'Energy', 'FSLR': 'Energy', 'ENPH': 'Energy',
+    'BA': 'Industrials', 'CAT': 'Industrials', 'DE': 'Industrials', 'GE': 'Industrials', 'LMT': 'Defense/AI',
+    'RTX': 'Defense/AI', 'F': 'Auto', 'GM': 'Auto', 'RIVN': 'Auto', 'LCID': 'Auto', 'NIO': 'Auto',
+    'LLY': 'Pharma', 'NVO': 'Pharma', 'PFE': 'Pharma', 'MRK': 'Pharma', 'JNJ': 'Pharma',
+    'MRNA': 'Biotech', 'UNH': 'Healthcare', 'HIMS': 'Healthcare',
+    'WMT': 'Retail', 'COST': 'Retail', 'TGT': 'Retail', 'HD': 'Retail', 'NKE': 'Retail',
+    'SBUX': 'Retail', 'MCD': 'Retail', 'LULU': 'Retail', 'BABA': 'China', 'PDD': 'China', 'JD': 'China',
+    'ABNB': 'Transport', 'DAL': 'Transport', 'AAL': 'Transport', 'CCL': 'Transport',
+    'GME': 'Meme', 'AMC': 'Meme', 'RDDT': 'Tech', 'IONQ': 'Quantum', 'RGTI': 'Quantum',
+}
+SECTOR_MAP.update(FLOW_EXTRA)
+FLOW_UNIVERSE = tuple(TICKERS) + tuple(t for t in FLOW_EXTRA if t not in TICKERS)
+
 
 # ─────────────────────────────────────────────
 # CSS - ESTÉTICA VT323 TERMINAL
@@ -297,40 +331,20 @@ def get_flow_label(ft):
 
 def score_unusualness(row):
     """
-    Score de Inusualidad 0-100 basado en:
+    Score de Inusualidad 0-100 de una fila (ver options_analytics.unusualness_score):
     - Vol/OI ratio (40 pts)
     - Premium size (30 pts)
     - Sweep/Block flags (15 pts)
     - DTE corto con premium alto (15 pts)
     """
-    score = 0
-
-    # Vol/OI ratio (40 pts)
-    voi = row.get('volume_oi_ratio', 0)
-    if voi >= 10:   score += 40
-    elif voi >= 5:  score += 30
-    elif voi >= 2:  score += 20
-    elif voi >= 1:  score += 10
-
-    # Premium size (30 pts)
-    prem = row.get('premium', 0)
-    if prem >= 5_000_000:   score += 30
-    elif prem >= 1_000_000: score += 22
-    elif prem >= 500_000:   score += 14
-    elif prem >= 100_000:   score += 6
-
-    # Sweep / Block (15 pts)
-    if row.get('is_sweep') and row.get('is_block'): score += 15
-    elif row.get('is_sweep'): score += 10
-    elif row.get('is_block'): score += 8
-
-    # DTE corto con premium relevante (15 pts)
-    dte = row.get('days_to_exp', 999)
-    if dte <= 7 and prem >= 500_000:   score += 15
-    elif dte <= 14 and prem >= 300_000: score += 10
-    elif dte <= 30 and prem >= 100_000: score += 5
-
-    return min(score, 100)
+    return int(unusualness_score(row.get('volume_oi_ratio', 0), row.get('premium', 0),
+                                 bool(row.get('is_sweep')), bool(row.get('is_block')),
+                                 row.get('days_to_exp', 999)))
+
+def score_frame(df):
+    """Score de inusualidad de todo un DataFrame de flow, vectorizado."""
+    return unusualness_score(df['volume_oi_ratio'], df['premium'], df['is_sweep'],
+                             df['is_block'], df['days_to_exp'])
 
 def score_color(s):
     if s >= 80: return '#f23645'
@@ -348,100 +362,100 @@ def score_label(s):
 # ─────────────────────────────────────────────
 # DATA SOURCES
 # ─────────────────────────────────────────────
-@st.cache_data(ttl=900, show_spinner=False)
-def fetch_real_data():
+# Esquema de la tabla de flujo: un resultado vacío conserva columnas y tipos
+_FLOW_SCHEMA = {
+    'ticker': 'object', 'spot': 'float64', 'flow_type': 'object', 'strike': 'float64',
+    'moneyness': 'float64', 'expiration': 'object', 'days_to_exp': 'int64', 'premium': 'float64',
+    'premium_formatted': 'object', 'volume': 'int64', 'open_interest': 'int64',
+    'volume_oi_ratio': 'float64', 'is_sweep': 'bool', 'is_block': 'bool', 'timestamp': 'object',
+    'sentiment': 'object', 'sector': 'object', 'source': 'object', 'score': 'int64',
+    'iv': 'float64', 'delta': 'float64', 'gamma': 'float64', 'new_volume': 'int64',
+}
+
+
+def _flow_rows(sel, now, source):
+    """Prints seleccionados (salida de options_analytics) → formato de tabla de RSU DB."""
+    if sel.empty:
+        return pd.DataFrame({c: pd.Series(dtype=t) for c, t in _FLOW_SCHEMA.items()})
+    return pd.DataFrame({
+        'ticker': sel['ticker'],
+        'spot': sel['spot'].round(2),
+        'flow_type': sel['flow_type'],
+        'strike': sel['strike'].astype(float),
+        'moneyness': sel['moneyness'],
+        'expiration': sel['expiration'].dt.strftime('%m/%d/%y'),
+        'days_to_exp': sel['days_to_exp'],
+        'premium': sel['premium'],
+        'premium_formatted': sel['premium'].map(format_premium),
+        'volume': sel['volume'],
+        'open_interest': sel['open_interest'],
+        'volume_oi_ratio': sel['volume_oi_ratio'],
+        'is_sweep': sel['is_sweep'],
+        'is_block': sel['is_block'],
+        'timestamp': now.strftime('%H:%M:%S'),
+        'sentiment': sel['sentiment'],
+        'sector': sel['ticker'].map(SECTOR_MAP).fillna('Other'),
+        'source': source,
+        'score': sel['score'],
+        'iv': sel['iv'].round(4),
+        'delta': sel['delta'].round(3),
+        'gamma': sel['gamma'],
+        'new_volume': sel['vol_delta'] if 'vol_delta' in sel else sel['volume'],
+    })
+
+
+@swr_cached(ttl=900)
+def scan_options_flow(tickers=FLOW_UNIVERSE, n_expirations=3):
     """
-    Obtiene datos reales de opciones vía yfinance.
-    Retorna DataFrame con estructura compatible, o None si falla.
+    Descarga concurrente de las cadenas near-term de `tickers`, diff contra el
+    snapshot anterior y analítica en bloque. Retorna {'flow': prints relevantes
+    de la sesión, 'new_flow': prints con volumen nuevo desde el snapshot anterior,
+    'since': hora de ese snapshot (o None), 'prev_taken_at': su instante exacto
+    (o None), 'taken_at': instante del escaneo, 'gex': GEX por strike} o None
+    si falla. Corre en el hilo del background cache (render usa .peek()).
     """
     try:
-        import yfinance as yf
-        rows = []
-        now = datetime.now()
-
-        for ticker_sym in TICKERS[:12]:  # limitamos para no sobrecargar
-            try:
-                tk = yf.Ticker(ticker_sym)
-                spot_info = tk.fast_info
-                spot = getattr(spot_info, 'last_price', None) or MOCK_PRICES.get(ticker_sym, 100)
-
-                dates = tk.options
-                if not dates:
-                    continue
-
-                # Tomamos las primeras 3 fechas disponibles (near-term)
-                for exp_str in dates[:3]:
-                    try:
-                        chain = tk.option_chain(exp_str)
-                        exp_dt = datetime.strptime(exp_str, '%Y-%m-%d')
-                        dte = max((exp_dt - now).days, 0)
-
-                        for opt_type, df_opts, flow_buy, flow_sell in [
-                            ('call', chain.calls, 'CALL_BOUGHT', 'CALL_SOLD'),
-                            ('put',  chain.puts,  'PUT_BOUGHT',  'PUT_SOLD'),
-                        ]:
-                            if df_opts.empty:
-                                continue
-
-                            # Filtra solo strikes con volumen significativo
-                            df_opts = df_opts[df_opts['volume'].fillna(0) > 10].copy()
-                            df_opts = df_opts.nlargest(3, 'volume')
-
-                            for _, opt in df_opts.iterrows():
-                                strike   = float(opt.get('strike', spot))
-                                vol      = int(opt.get('volume', 0) or 0)
-                                oi       = int(opt.get('openInterest', 1) or 1)
-                                last_p   = float(opt.get('lastPrice', 0) or 0)
-                                premium  = last_p * vol * 100
-
-                                if premium < 5_000:
-                                    continue
-
-                                voi     = round(vol / oi, 2) if oi > 0 else 0
-                                is_sweep = voi > 3
-                                is_block = premium > 1_000_000
-
-                                # Detecta bullish/bearish
-                                flow_type = flow_buy if (
-                                    opt_type == 'call' and np.random.random() > 0.3
-                                ) or (
-                                    opt_type == 'put' and np.random.random() > 0.7
-                                ) else flow_sell
-
-                                moneyness = ((strike / spot) - 1) * 100
-
-                                row_data = {
-                                    'ticker': ticker_sym,
-                                    'spot': round(spot, 2),
-                                    'flow_type': flow_type,
-                                    'strike': strike,
-                                    'moneyness': round(moneyness, 1),
-                                    'expiration': exp_dt.strftime('%m/%d/%y'),
-                                    'days_to_exp': dte,
-                                    'premium': premium,
-                                    'premium_formatted': format_premium(premium),
-                                    'volume': vol,
-                                    'open_interest': oi,
-                                    'volume_oi_ratio': voi,
-                                    'is_sweep': is_sweep,
-                                    'is_block': is_block,
-                                    'timestamp': now.strftime('%H:%M:%S'),
-                                    'sentiment': 'BULLISH' if flow_type in ['CALL_BOUGHT', 'PUT_SOLD'] else 'BEARISH',
-                                    'sector': SECTOR_MAP.get(ticker_sym, 'Other'),
-                                    'source': 'REAL'
-                                }
-                                row_data['score'] = score_unusualness(row_data)
-                                rows.append(row_data)
-                    except Exception:
-                        continue
-            except Exception:
-                continue
-
-        if rows:
-            return pd.DataFrame(rows)
-        return None
+        import yfinance  # noqa: F401
     except ImportError:
         return None
+    now = datetime.now()
+    raw = fetch_chains(tickers, n_expirations, MOCK_PRICES)
+    if raw is None:
+        return None
+    complete = raw.attrs.get('complete', True)
+
+    prev = load_snapshot()
+    raw  = diff_snapshot(raw, prev, now)
+    # Un escaneo parcial no se guarda: los contratos que faltan aparecerían
+    # como flujo nuevo de toda la sesión en el siguiente diff
+    if complete:
+        save_snapshot(raw, now)
+    since = prev_taken_at = None
+    if prev is not None and str(prev.attrs.get('taken_at', ''))[:10] == now.date().isoformat():
+        prev_taken_at = prev.attrs['taken_at']
+        since = prev_taken_at[11:16]
+
+    # Una sola pasada vectorizada sobre todas las cadenas del refresco
+    analytics = analyze_chains(raw, now)
+    flow = _flow_rows(select_flow(analytics), now, 'REAL')
+    # Flujo nuevo: solo los strikes cuyo volumen creció, puntuados sobre el volumen incremental
+    fresh = raw[raw['vol_delta'] > 0].assign(volume=lambda d: d['vol_delta'])
+    new_flow = _flow_rows(select_flow(analyze_chains(fresh, now)), now, 'REAL')
+    return {'flow': flow, 'new_flow': new_flow, 'since': since,
+            'prev_taken_at': prev_taken_at, 'taken_at': now.isoformat(),
+            'gex': dealer_gamma_exposure(analytics)}
+
+
+def fetch_real_data():
+    """
+    Obtiene datos reales de opciones vía yfinance.
+    Retorna DataFrame con estructura compatible, o None si falla o si el
+    primer escaneo aún está en curso (no bloquea el render).
+    """
+    res, _ = scan_options_flow.peek()
+    if not res or res['flow'].empty:
+        return None
+    return res['flow']
 
 
 def generate_mock_data():
@@ -505,10 +519,11 @@ def generate_mock_data():
                 'sector': SECTOR_MAP.get(ticker, 'Other'),
                 'source': 'MOCK'
             }
-            row_data['score'] = score_unusualness(row_data)
             data.append(row_data)
 
-    return pd.DataFrame(data)
+    df = pd.DataFrame(data)
+    df['score'] = score_frame(df)
+    return df
 
 
 def load_data(use_real: bool):
@@ -516,7 +531,7 @@ def load_data(use_real: bool):
         with st.spinner("⚡ CARGANDO DATOS REALES VÍA YFINANCE..."):
             df = fetch_real_data()
         if df is None or df.empty:
-            st.warning("⚠️ yfinance no disponible o sin datos. Fallback a mock.", icon="⚠️")
+            st.warning("⚠️ Escaneo yfinance en curso o sin datos. Fallback a mock.", icon="⚠️")
             return generate_mock_data()
         return df
     return generate_mock_data()
@@ -525,31 +540,27 @@ def load_data(use_real: bool):
 # ─────────────────────────────────────────────
 # FILTERS
 # ─────────────────────────────────────────────
-def apply_filters(df, filters):
-    f = df.copy()
-
-    pm = filters['min_premium']
-    if pm == ">$100K":   f = f[f['premium'] >= 100_000]
-    elif pm == ">$500K": f = f[f['premium'] >= 500_000]
-    elif pm == ">$1M":   f = f[f['premium'] >= 1_000_000]
-    elif pm == ">$5M":   f = f[f['premium'] >= 5_000_000]
-
-    ef = filters['exp_filter']
-    if ef == "< 7d (Weekly)":     f = f[f['days_to_exp'] < 7]
-    elif ef == "7–30d":           f = f[(f['days_to_exp'] >= 7)  & (f['days_to_exp'] <= 30)]
-    elif ef == "30–90d":          f = f[(f['days_to_exp'] > 30)  & (f['days_to_exp'] <= 90)]
-    elif ef == "> 90d (LEAPS)":   f = f[f['days_to_exp'] > 90]
-
-    if filters['unusual_only']:
-        f = f[(f['volume_oi_ratio'] > 1) | (f['is_sweep']) | (f['is_block'])]
-
-    if filters['sentiment'] != 'All':
-        f = f[f['sentiment'] == filters['sentiment']]
+PREMIUM_FILTERS = {"All": 0, ">$100K": 100_000, ">$500K": 500_000, ">$1M": 1_000_000, ">$5M": 5_000_000}
+EXP_FILTERS = {"All": None, "< 7d (Weekly)": '<7', "7–30d": '7-30', "30–90d": '30-90', "> 90d (LEAPS)": '>90'}
+
+
+def store_query(filters=None):
+    """Filtros del panel → argumentos de FlowStore.rows / FlowStore.aggregates."""
+    if not filters:
+        return {}
+    return {
+        'min_premium': PREMIUM_FILTERS[filters['min_premium']],
+        'dte_bucket': EXP_FILTERS[filters['exp_filter']],
+        'unusual_only': bool(filters['unusual_only']),
+        'sentiment': None if filters['sentiment'] == 'All' else filters['sentiment'],
+        'min_score': filters['min_score'],
+    }
 
-    min_score = filters['min_score']
-    f = f[f['score'] >= min_score]
 
-    return f
+def apply_filters(data, filters):
+    """Filas de `data` (FlowStore o DataFrame) que cumplen los filtros, vía el índice de celdas."""
+    store = data if isinstance(data, FlowStore) else FlowStore(data)
+    return store.rows(**store_query(filters))
 
 
 # ─────────────────────────────────────────────
@@ -580,16 +591,17 @@ def render_header(use_real: bool):
 # ─────────────────────────────────────────────
 # STATS CARDS
 # ─────────────────────────────────────────────
-def render_stats(df):
-    total   = df['premium'].sum()
-    bull    = df[df['sentiment'] == 'BULLISH']['premium'].sum()
-    bear    = df[df['sentiment'] == 'BEARISH']['premium'].sum()
-    calls_p = df[df['flow_type'].isin(['CALL_BOUGHT','CALL_SOLD'])]['premium'].sum()
-    puts_p  = df[df['flow_type'].isin(['PUT_BOUGHT','PUT_SOLD'])]['premium'].sum()
+def render_stats(agg):
+    total   = agg['premium']
+    bull    = agg['bullish']
+    bear    = agg['bearish']
+    by_ft   = agg['by_flow_type']
+    calls_p = by_ft[['CALL_BOUGHT', 'CALL_SOLD']].sum()
+    puts_p  = by_ft[['PUT_BOUGHT', 'PUT_SOLD']].sum()
     pc      = puts_p / calls_p if calls_p > 0 else 0
-    sweeps  = df['is_sweep'].sum()
-    blocks  = df['is_block'].sum()
-    avg_score = df['score'].mean() if not df.empty else 0
+    sweeps  = agg['sweeps']
+    blocks  = agg['blocks']
+    avg_score = agg['avg_score']
 
     pc_color = "#00ffad" if pc < 0.7 else "#f23645" if pc > 1.3 else "#ff9800"
     pc_label = "GREED" if pc < 0.7 else "FEAR" if pc > 1.3 else "NEUTRAL"
@@ -641,22 +653,35 @@ def render_filters():
 # ─────────────────────────────────────────────
 # ALERTS
 # ─────────────────────────────────────────────
-def render_alerts(df):
+def render_alerts(df, fresh=None, since=None):
+    """
+    Alertas de alta convicción. Con `fresh` (modo real) se calculan solo sobre el
+    flujo nuevo desde el snapshot anterior (`since`, HH:MM) en lugar de sobre el
+    acumulado de la sesión.
+    """
+    if fresh is not None:
+        df = fresh
     alerts = df[
         (df['premium'] > 1_000_000) |
         ((df['volume_oi_ratio'] > 5) & (df['premium'] > 500_000)) |
         (df['is_sweep'] & df['is_block'])
     ].nlargest(6, 'score')
 
-    st.markdown("""
+    title_suffix = ''
+    if fresh is not None:
+        title_suffix = f" · NUEVO DESDE {since}" if since else " · NUEVO EN LA SESIÓN"
+
+    st.markdown(f"""
     <div class="terminal-box" style="border-color:#00ffad33;">
         <div style="font-family:'VT323',monospace; color:#00ffad; font-size:1.4rem; letter-spacing:2px; margin-bottom:12px;">
-            🔥 ALERTAS DESTACADAS // HIGH CONVICTION FLOW
+            🔥 ALERTAS DESTACADAS // HIGH CONVICTION FLOW{title_suffix}
         </div>
     """, unsafe_allow_html=True)
 
     if alerts.empty:
-        st.markdown("<p style='color:#444; font-size:0.85rem;'>No hay alertas con los filtros actuales.</p>", unsafe_allow_html=True)
+        msg = "No hay flujo nuevo relevante desde el último refresco." if fresh is not None \
+            else "No hay alertas con los filtros actuales."
+        st.markdown(f"<p style='color:#444; font-size:0.85rem;'>{msg}</p>", unsafe_allow_html=True)
     else:
         for _, a in alerts.iterrows():
             sc      = a['score']
@@ -667,6 +692,7 @@ def render_alerts(df):
             tags    = []
             if a['is_sweep']: tags.append('🧹 SWEEP')
             if a['is_block']: tags.append('💎 BLOCK')
+            if fresh is not None: tags.append(f"+{int(a['new_volume']):,} contratos nuevos")
             tags_str = ' &nbsp; '.join(tags)
             moneyness_str = f"{a['moneyness']:+.1f}%"
 
@@ -759,7 +785,8 @@ def render_flow_table(df, flow_type_key):
 # ─────────────────────────────────────────────
 # CHARTS
 # ─────────────────────────────────────────────
-def render_charts(df):
+def render_charts(df, agg):
+    """df: filas filtradas (scatter); agg: agregados del mismo filtro (FlowStore.aggregates)."""
     if df.empty:
         st.info("Sin datos para graficar.")
         return
@@ -778,9 +805,8 @@ def render_charts(df):
     # ── 1. Premium por Ticker (top 10) ──
     with c1:
         st.markdown("<h3>PREMIUM POR TICKER</h3>", unsafe_allow_html=True)
-        top = df.groupby('ticker')['premium'].sum().nlargest(10).reset_index()
-        colors = ['#00ffad' if t in df[df['sentiment']=='BULLISH']['ticker'].values else '#f23645'
-                  for t in top['ticker']]
+        top = agg['by_ticker'].nlargest(10, 'premium')
+        colors = ['#00ffad' if b > 0 else '#f23645' for b in top['bullish']]
         fig = go.Figure(go.Bar(
             x=top['ticker'], y=top['premium'] / 1e6,
             marker_color=colors,
@@ -801,9 +827,9 @@ def render_charts(df):
     # ── 2. Bullish vs Bearish por Sector ──
     with c2:
         st.markdown("<h3>FLOW NETO POR SECTOR</h3>", unsafe_allow_html=True)
-        bull_s = df[df['sentiment']=='BULLISH'].groupby('sector')['premium'].sum()
-        bear_s = df[df['sentiment']=='BEARISH'].groupby('sector')['premium'].sum()
-        all_sectors = sorted(set(bull_s.index) | set(bear_s.index))
+        by_sector = agg['by_sector']
+        bull_s, bear_s = by_sector['bullish'], by_sector['bearish']
+        all_sectors = sorted(by_sector.index)
         fig2 = go.Figure()
         fig2.add_trace(go.Bar(
             name='BULLISH', x=all_sectors,
@@ -830,10 +856,8 @@ def render_charts(df):
     # ── 3. Distribución de Scores ──
     with c3:
         st.markdown("<h3>DISTRIBUCIÓN DE SCORE</h3>", unsafe_allow_html=True)
-        bins = [0, 20, 40, 60, 80, 101]
-        labels = ['0-20', '20-40', '40-60', '60-80', '80-100']
-        df['score_bin'] = pd.cut(df['score'], bins=bins, labels=labels, right=False)
-        score_dist = df['score_bin'].value_counts().reindex(labels, fill_value=0)
+        score_dist = agg['score_dist']
+        labels = list(score_dist.index)
         bar_colors = ['#333', '#444', '#00d9ff', '#ff9800', '#f23645']
         fig3 = go.Figure(go.Bar(
             x=labels, y=score_dist.values,
@@ -867,7 +891,7 @@ def render_charts(df):
                     opacity=0.7,
                     line=dict(width=0)
                 ),
-                text=sub['ticker'] + ' $' + sub['premium_formatted'],
+                text=sub['ticker'].astype(str) + ' $' + sub['premium_formatted'],
                 hovertemplate='<b>%{text}</b><br>DTE: %{x}<br>Score: %{y}<extra></extra>'
             ))
         fig4.update_layout(
@@ -881,9 +905,10 @@ def render_charts(df):
 
     # ── 5. Ticker Net Flow (resumen inteligente) ──
     st.markdown("<h3>NET FLOW POR TICKER · SMART MONEY BALANCE</h3>", unsafe_allow_html=True)
-    bull_t = df[df['sentiment']=='BULLISH'].groupby('ticker')['premium'].sum()
-    bear_t = df[df['sentiment']=='BEARISH'].groupby('ticker')['premium'].sum()
-    net = (bull_t.reindex(TICKERS, fill_value=0) - bear_t.reindex(TICKERS, fill_value=0)).sort_values()
+    net = agg['by_ticker'].set_index('ticker')['net']
+    net = net.reindex(net.index.union(TICKERS), fill_value=0)
+    # Con el universo ampliado solo caben los 30 mayores desequilibrios
+    net = net.loc[net.abs().nlargest(30).index].sort_values()
     net_colors = ['#f23645' if v < 0 else '#00ffad' for v in net.values]
 
     fig5 = go.Figure(go.Bar(
@@ -902,27 +927,51 @@ def render_charts(df):
     st.plotly_chart(fig5, use_container_width=True)
 
 
+# ─────────────────────────────────────────────
+# DEALER GAMMA EXPOSURE
+# ─────────────────────────────────────────────
+def render_gex(gex):
+    if gex is None or gex.empty:
+        return
+    st.markdown("<h3>DEALER GAMMA EXPOSURE · GEX POR STRIKE</h3>", unsafe_allow_html=True)
+    totals = gex.groupby('ticker')['net_gex'].sum().sort_values()
+    ticker = st.selectbox("SUBYACENTE", list(totals.index), key="gex_ticker",
+                          format_func=lambda t: f"{t} · net {totals[t]/1e6:+.1f}M $/1%")
+    sub = gex[gex['ticker'] == ticker]
+    spot = float(sub['spot'].iloc[0])
+    sub = sub[(sub['strike'] >= spot * 0.85) & (sub['strike'] <= spot * 1.15)]
+    fig = go.Figure()
+    fig.add_trace(go.Bar(name='CALL GEX', x=sub['strike'], y=sub['call_gex'] / 1e6,
+                         marker_color='#00ffad', marker_line_width=0))
+    fig.add_trace(go.Bar(name='PUT GEX', x=sub['strike'], y=sub['put_gex'] / 1e6,
+                         marker_color='#f23645', marker_line_width=0))
+    fig.add_vline(x=spot, line_dash='dash', line_color='#00d9ff')
+    fig.update_layout(
+        paper_bgcolor='#080a0e', plot_bgcolor='#0c0e12', barmode='relative',
+        font=dict(family='Courier New, monospace', color='#888', size=11),
+        xaxis=dict(gridcolor='#1a1e26', zerolinecolor='#1a1e26', title="Strike"),
+        yaxis=dict(gridcolor='#1a1e26', zerolinecolor='#1a1e26', title="GEX ($M por 1%)"),
+        margin=dict(l=40, r=20, t=40, b=40),
+        title=dict(text=f"{ticker} · SPOT ${spot:.2f}", font=dict(family='VT323, monospace', color='#00d9ff', size=14)),
+        legend=dict(font=dict(family='VT323, monospace', color='#666'), bgcolor='#0c0e12'),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+
 # ─────────────────────────────────────────────
 # TICKER NET SUMMARY TAB
 # ─────────────────────────────────────────────
-def render_ticker_summary(df):
+def render_ticker_summary(agg):
     st.markdown("<h3>RESUMEN NETO POR TICKER</h3>", unsafe_allow_html=True)
-    grp = df.groupby('ticker').agg(
-        Total_Premium=('premium', 'sum'),
-        Bullish=('premium', lambda x: x[df.loc[x.index,'sentiment']=='BULLISH'].sum()),
-        Bearish=('premium', lambda x: x[df.loc[x.index,'sentiment']=='BEARISH'].sum()),
-        Trades=('premium', 'count'),
-        Avg_Score=('score', 'mean'),
-        Sweeps=('is_sweep', 'sum'),
-        Blocks=('is_block', 'sum'),
-    ).reset_index()
-    grp['Net_Flow'] = grp['Bullish'] - grp['Bearish']
+    grp = agg['by_ticker'].rename(columns={
+        'premium': 'Total_Premium', 'net': 'Net_Flow', 'trades': 'Trades',
+        'avg_score': 'Avg_Score', 'sweeps': 'Sweeps', 'blocks': 'Blocks'})
     grp['Signal'] = grp['Net_Flow'].apply(lambda x: '🟢 BULLISH' if x > 0 else '🔴 BEARISH')
     grp = grp.sort_values('Total_Premium', ascending=False)
     grp['Total_Premium'] = grp['Total_Premium'].apply(format_premium)
     grp['Net_Flow']      = grp['Net_Flow'].apply(lambda x: ('+' if x > 0 else '') + format_premium(abs(x)))
     grp['Avg_Score']     = grp['Avg_Score'].round(0).astype(int)
-    grp['Sector']        = grp['ticker'].map(SECTOR_MAP)
+    grp['Sector']        = grp['sector']
     display = grp[['ticker','Sector','Signal','Total_Premium','Net_Flow','Trades','Avg_Score','Sweeps','Blocks']].rename(
         columns={'ticker':'Ticker'}
     )
@@ -1012,33 +1061,59 @@ def render():
     render_header(use_real)
 
     # ── CARGAR DATOS ──
-    cache_key = 'data_real' if use_real else 'data_mock'
-    if cache_key not in st.session_state or st.session_state.get('force_reload', False):
-        st.session_state[cache_key] = load_data(use_real)
-        st.session_state['force_reload'] = False
-
-    df = st.session_state[cache_key]
-
-    render_stats(df)
+    # El FlowStore vive en la sesión; en modo real, si la sesión tiene justo el
+    # escaneo anterior al actual basta añadir el flujo incremental (new_flow);
+    # si se saltó alguno se reconstruye desde el flujo completo de la sesión.
+    cache_key = 'store_real' if use_real else 'store_mock'
+    # El escaneo corre en segundo plano; se sirve el último disponible
+    scan  = scan_options_flow.peek()[0] if use_real else None
+    store = st.session_state.get(cache_key)
+    batch = st.session_state.get(f'{cache_key}_batch')
+    force = st.session_state.get('force_reload', False)
+    if scan and not scan['flow'].empty:
+        if store is not None and not force and batch == scan['taken_at']:
+            pass
+        elif store is not None and not force and batch and batch == scan['prev_taken_at']:
+            store.append(scan['new_flow'])
+            st.session_state[f'{cache_key}_batch'] = scan['taken_at']
+        else:
+            store = FlowStore(scan['flow'])
+            st.session_state[cache_key] = store
+            st.session_state[f'{cache_key}_batch'] = scan['taken_at']
+    elif use_real and store is not None and not force:
+        pass
+    elif use_real:
+        # Sin escaneo real todavía: mock solo para esta pasada, nunca como store_real
+        store = FlowStore(load_data(use_real))
+    elif store is None or force:
+        store = FlowStore(load_data(use_real))
+        st.session_state[cache_key] = store
+    st.session_state['force_reload'] = False
+
+    render_stats(store.aggregates())
     st.markdown("<br>", unsafe_allow_html=True)
 
     filters = render_filters()
     if filters['refresh']:
         st.session_state['force_reload'] = True
         if use_real:
-            fetch_real_data.clear()
+            scan_options_flow.refresh()
         st.rerun()
 
-    filtered_df = apply_filters(df, filters)
+    filtered_df = apply_filters(store, filters)
+    filtered_agg = store.aggregates(**store_query(filters))
 
     st.markdown(f"""
     <div style="font-family:'Courier New',monospace; color:#333; font-size:0.72rem; margin-bottom:15px;">
-        {len(filtered_df)} trades · {format_premium(filtered_df['premium'].sum())} total filtrado
+        {filtered_agg['trades']} trades · {format_premium(filtered_agg['premium'])} total filtrado
         {'· <span style="color:#f23645;">⚠ Sin datos</span>' if filtered_df.empty else ''}
     </div>
     """, unsafe_allow_html=True)
 
-    render_alerts(filtered_df)
+    if scan:
+        render_alerts(filtered_df, apply_filters(scan['new_flow'], filters), scan['since'])
+    else:
+        render_alerts(filtered_df)
     st.markdown("<hr>", unsafe_allow_html=True)
 
     # ── TABS ──
@@ -1050,8 +1125,11 @@ def render():
     with tab2: render_flow_table(filtered_df, 'CALLS SOLD')
     with tab3: render_flow_table(filtered_df, 'PUTS BOUGHT')
     with tab4: render_flow_table(filtered_df, 'PUTS SOLD')
-    with tab5: render_charts(filtered_df)
-    with tab6: render_ticker_summary(filtered_df)
+    with tab5:
+        render_charts(filtered_df, filtered_agg)
+        if use_real:
+            render_gex((scan or {}).get('gex'))
+    with tab6: render_ticker_summary(filtered_agg)
 
     st.markdown("<hr>", unsafe_allow_html=True)
     with st.expander("📚 GLOSARIO · CÓMO INTERPRETAR EL FLUJO", expanded=False):
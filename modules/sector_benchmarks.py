@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+sector_benchmarks.py — Tabla de percentiles de métricas fundamentales por
+sector e industria.
+
+El job nocturno (nightly_scan.py) ya descarga el `info` de todo el S&P 500; con
+él se calculan los cortes p10/p25/p50/p75/p90 de cada métrica por industria,
+por sector y para el universo completo, y se guardan en un JSON compacto
+(data/sector_benchmarks.json) que se versiona junto a scan_cache.json.
+
+La app carga la tabla una vez por proceso. Colorear una métrica o puntuarla
+dentro de compute_rsu_score es una búsqueda en un dict más una interpolación
+sobre cinco puntos. Se busca primero la industria, luego el sector y por último
+el universo, pasando al siguiente nivel si el grupo no tiene muestra mínima.
+Si el artefacto no existe, se usa una tabla semilla equivalente a los umbrales
+que antes estaban fijados a mano.
+
+Sin dependencias de Streamlit.
+"""
+import json
+import math
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BENCHMARKS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               "data", "sector_benchmarks.json")
+
+PERCENTILES = (10, 25, 50, 75, 90)
+MIN_INDUSTRY_N = 8       # muestra mínima por métrica para usar el grupo
+MIN_SECTOR_N   = 10
+UNIVERSE = '_all'
+
+# métrica → (claves de yfinance .info en orden de preferencia, más bajo es mejor, solo positivos)
+METRICS = {
+    'pe':             (('trailingPE',), True, True),
+    'forward_pe':     (('forwardPE',), True, True),
+    'peg':            (('trailingPegRatio', 'pegRatio'), True, True),
+    'ps':             (('priceToSalesTrailing12Months',), True, True),
+    'ev_ebitda':      (('enterpriseToEbitda',), True, True),
+    'de':             (('debtToEquity',), True, True),
+    'net_margin':     (('profitMargins',), False, False),
+    'op_margin':      (('operatingMargins',), False, False),
+    'gross_margin':   (('grossMargins',), False, False),
+    'roe':            (('returnOnEquity',), False, False),
+    'revenue_growth': (('revenueGrowth',), False, False),
+}
+_MAX_MULTIPLE = 1000     # P/E de 5000× por beneficios casi nulos distorsiona los cortes
+
+# Nombres alternativos (FMP, GICS) → nombre de sector de Yahoo
+_SECTOR_ALIASES = {
+    'information technology': 'technology',
+    'financials': 'financial services', 'financial': 'financial services',
+    'health care': 'healthcare',
+    'communication': 'communication services', 'telecommunication services': 'communication services',
+    'consumer discretionary': 'consumer cyclical', 'consumer staples': 'consumer defensive',
+    'materials': 'basic materials',
+}
+
+# ── tabla semilla ─────────────────────────────────────────────────────────────
+# Cortes p10..p90 que reproducen los umbrales fijos anteriores (verde/rojo en
+# p25/p75; barato/justo/caro del score en p25/p50/p90).
+_SEED = {
+    'sector:technology': {
+        'pe': (14, 20, 35, 50, 55)},
+    'sector:communication services': {
+        'pe': (12, 18, 30, 45, 55)},
+    'sector:financial services': {
+        'pe': (6, 8, 15, 18, 22), 'roe': (0.02, 0.05, 0.08, 0.10, 0.20),
+        'net_margin': (0.03, 0.08, 0.13, 0.18, 0.25), 'de': (150, 300, 450, 600, 900)},
+    'sector:utilities': {
+        'pe': (8, 12, 18, 22, 28), 'net_margin': (0.0, 0.03, 0.06, 0.08, 0.12),
+        'de': (60, 100, 150, 200, 260)},
+    'sector:real estate': {
+        'pe': (8, 12, 18, 25, 28), 'roe': (0.0, 0.03, 0.05, 0.08, 0.12),
+        'net_margin': (-0.05, 0.02, 0.06, 0.10, 0.20), 'de': (40, 80, 140, 200, 300)},
+    'sector:healthcare': {
+        'pe': (10, 15, 40, 60, 80), 'net_margin': (-0.20, 0.0, 0.06, 0.12, 0.20)},
+    UNIVERSE: {
+        'pe': (9, 12, 22, 28, 35), 'roe': (0.0, 0.08, 0.14, 0.20, 0.30),
+        'net_margin': (-0.02, 0.05, 0.10, 0.15, 0.20), 'op_margin': (0.0, 0.05, 0.10, 0.15, 0.25),
+        'de': (20, 50, 90, 150, 250)},
+}
+
+
+def _norm_sector(sector):
+    s = (sector or '').strip().lower()
+    return _SECTOR_ALIASES.get(s, s)
+
+
+def _norm_industry(industry):
+    return (industry or '').strip().lower()
+
+
+def _sig(x, digits=4):
+    """Redondeo a cifras significativas (artefacto compacto)."""
+    if x == 0 or not math.isfinite(x):
+        return 0.0
+    return round(x, digits - 1 - int(math.floor(math.log10(abs(x)))))
+
+
+# ── construcción ──────────────────────────────────────────────────────────────
+def metrics_frame(info_by_ticker):
+    """
+    {ticker: info de yfinance} → DataFrame (ticker, sector, industry, métricas).
+    Múltiplos negativos o absurdos quedan como NaN.
+    """
+    rows = []
+    for ticker, info in info_by_ticker.items():
+        info = info or {}
+        row = {'ticker': ticker, 'sector': _norm_sector(info.get('sector')),
+               'industry': _norm_industry(info.get('industry'))}
+        for name, (keys, _, _) in METRICS.items():
+            row[name] = next((info[k] for k in keys if info.get(k) is not None), None)
+        rows.append(row)
+    df = pd.DataFrame(rows, columns=['ticker', 'sector', 'industry', *METRICS])
+    for name, (_, _, positive) in METRICS.items():
+        col = pd.to_numeric(df[name], errors='coerce')
+        col = col.where(np.isfinite(col))
+        if positive:
+            col = col.where((col > 0) & (col < _MAX_MULTIPLE))
+        df[name] = col
+    return df
+
+
+def _group_breakpoints(df, by, min_n):
+    """Cortes por grupo para todas las métricas a la vez (groupby.quantile)."""
+    out = {}
+    if by is not None:
+        df = df[df[by] != '']
+        if df.empty:
+            return out
+        grouped = df.groupby(by)[list(METRICS)]
+    else:
+        grouped = df.assign(_g=UNIVERSE).groupby('_g')[list(METRICS)]
+    counts = grouped.count()
+    q = grouped.quantile([p / 100 for p in PERCENTILES])       # índice (grupo, percentil)
+    for group in counts.index:
+        key = UNIVERSE if by is None else f"{by}:{group}"
+        for name in METRICS:
+            if counts.at[group, name] >= min_n:
+                out.setdefault(key, {'n': int(counts.loc[group].max()), 'b': {}})['b'][name] = \
+                    [_sig(float(v)) for v in q.loc[group, name].to_numpy()]
+    return out
+
+
+def build_benchmarks(info_by_ticker):
+    """Tabla de percentiles (dict serializable) a partir del info de todo el universo."""
+    df = metrics_frame(info_by_ticker)
+    groups = {}
+    groups.update(_group_breakpoints(df, 'industry', MIN_INDUSTRY_N))
+    groups.update(_group_breakpoints(df, 'sector', MIN_SECTOR_N))
+    groups.update(_group_breakpoints(df, None, 1))
+    return {
+        'generated_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'universe': len(df),
+        'percentiles': list(PERCENTILES),
+        'groups': groups,
+    }
+
+
+def save_benchmarks(table, path=BENCHMARKS_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(table, f, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+    os.replace(tmp, path)
+
+
+# ── consulta ──────────────────────────────────────────────────────────────────
+class SectorBenchmarks:
+    """Búsqueda O(1) de cortes por métrica con fallback industria → sector → universo."""
+
+    def __init__(self, table=None):
+        self.meta = {k: v for k, v in (table or {}).items() if k != 'groups'}
+        self._pct = np.array(PERCENTILES, dtype=float)
+        self._groups = {}
+        for key, group in (table or {}).get('groups', {}).items():
+            self._groups[key] = {m: np.asarray(b, dtype=float) for m, b in group['b'].items()}
+        # La semilla solo cubre lo que el artefacto no trae
+        self._seed = {key: {m: np.asarray(b, dtype=float) for m, b in group.items()}
+                      for key, group in _SEED.items()}
+
+    @property
+    def from_universe(self):
+        return bool(self._groups)
+
+    def breakpoints(self, metric, sector=None, industry=None):
+        """(cortes p10..p90, grupo usado) o (None, None) si no hay referencia."""
+        keys = (f"industry:{_norm_industry(industry)}", f"sector:{_norm_sector(sector)}", UNIVERSE)
+        for table in (self._groups, self._seed):
+            for key in keys:
+                b = table.get(key, {}).get(metric)
+                if b is not None:
+                    return b, key
+        return None, None
+
+    def percentile(self, metric, value, sector=None, industry=None):
+        """Percentil aproximado (0-100) de `value` dentro de su grupo, o None."""
+        if value is None or metric not in METRICS:
+            return None
+        try:
+            v = float(value)
+        except (TypeError, ValueError):
+            return None
+        if not math.isfinite(v):
+            return None
+        b, _ = self.breakpoints(metric, sector, industry)
+        if b is None:
+            return None
+        if METRICS[metric][2] and v <= 0:
+            # Múltiplo negativo (pérdidas): se trata como el extremo malo del grupo
+            return (100 + self._pct[-1]) / 2
+        return float(np.interp(v, b, self._pct, left=self._pct[0] / 2, right=(100 + self._pct[-1]) / 2))
+
+    def quality(self, metric, value, sector=None, industry=None):
+        """Percentil orientado: 100 = mejor del grupo (invierte las métricas donde menos es mejor)."""
+        p = self.percentile(metric, value, sector, industry)
+        if p is None:
+            return None
+        return 100 - p if METRICS[metric][1] else p
+
+    def percentile_array(self, metric, values, sectors, industries):
+        """
+        Versión vectorizada de percentile(): cortes resueltos una vez por par
+        (sector, industria) e interpolación por filas. NaN donde no hay dato.
+        """
+        v = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+        out = np.full(len(v), np.nan)
+        if metric not in METRICS or not len(v):
+            return out
+        pairs = pd.MultiIndex.from_arrays([pd.Series(sectors).fillna('').astype(str).to_numpy(),
+                                           pd.Series(industries).fillna('').astype(str).to_numpy()])
+        codes, uniques = pd.factorize(pairs)
+        table = np.full((len(uniques), len(PERCENTILES)), np.nan)
+        for i, (sec, ind) in enumerate(uniques):
+            b, _ = self.breakpoints(metric, sec, ind)
+            if b is not None:
+                table[i] = b
+        B = table[codes]                                           # filas × cortes
+        ok = np.isfinite(v) & np.isfinite(B[:, 0])
+        P = self._pct
+        k = np.clip((v[:, None] >= B).sum(axis=1), 1, len(P) - 1)
+        rows = np.arange(len(v))
+        lo, hi = B[rows, k - 1], B[rows, k]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frac = np.clip(np.where(hi > lo, (v - lo) / (hi - lo), 1.0), 0, 1)
+        pct = P[k - 1] + frac * (P[k] - P[k - 1])
+        pct = np.where(v < B[:, 0], P[0] / 2, np.where(v > B[:, -1], (100 + P[-1]) / 2, pct))
+        if METRICS[metric][2]:
+            pct = np.where(v <= 0, (100 + P[-1]) / 2, pct)
+        out[ok] = pct[ok]
+        return out
+
+    def quality_array(self, metric, values, sectors, industries):
+        """Versión vectorizada de quality()."""
+        p = self.percentile_array(metric, values, sectors, industries)
+        return 100 - p if metric in METRICS and METRICS[metric][1] else p
+
+    def color(self, metric, value, sector=None, industry=None):
+        """Verde en el cuartil bueno, rojo en el malo, naranja en medio; None sin referencia."""
+        q = self.quality(metric, value, sector, industry)
+        if q is None:
+            return None
+        if q > 75: return "#00ffad"
+        if q < 25: return "#f23645"
+        return "#ff9800"
+
+
+def load_benchmarks(path=BENCHMARKS_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return SectorBenchmarks(json.load(f))
+    except Exception:
+        return SectorBenchmarks()
+
+
+_instance = None
+_instance_lock = threading.Lock()
+
+
+def get_benchmarks():
+    """Tabla cargada una sola vez por proceso."""
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = load_benchmarks()
+    return _instance
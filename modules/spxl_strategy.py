@@ -131,13 +131,13 @@ def _phase_state(current_price: float, spxl_high: float) -> tuple:
 def _fetch_cds() -> float | None:
     """Fetch BAMLH0A0HYM2 from FRED public API. Returns latest value or None."""
     try:
-        import requests
-        url = ("https://fred.stlouisfed.org/graph/fredgraph.csv"
-               "?id=BAMLH0A0HYM2")
-        r = requests.get(url, timeout=8)
-        if r.status_code != 200:
+        from modules.providers import get_provider
+        # La serie es diaria: 6h de caché persistente compartida entre sesiones
+        text = get_provider('fred').get_text("graph/fredgraph.csv", {"id": "BAMLH0A0HYM2"},
+                                             ttl=6 * 3600, timeout=8)
+        if not text:
             return None
-        lines = [l for l in r.text.strip().splitlines() if not l.startswith("DATE")]
+        lines = [l for l in text.strip().splitlines() if not l.startswith("DATE")]
         # Walk back to find a non-empty value
         for line in reversed(lines):
             parts = line.split(",")
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+ticker_extractor.py — Extractor de tickers compartido (Reddit buzz, noticias).
+
+Se construye una sola vez por proceso a partir de los universos del repo
+(Tickers.txt, tickers.csv del Russell 3000, lista S&P 500 de CANSLIM) y
+compila un autómata sobre tokens:
+  - $TICKER (cashtag): cuenta aunque no esté en el universo, peso 2
+  - TICKER en mayúsculas: solo si pertenece al universo y no es stopword ni
+    una palabra corriente (WORD_TICKERS: LOVE, GOLD, KEY… exigen cashtag), peso 1
+  - Nombre de empresa ("Nvidia", "Bank of America"): trie de palabras, peso 1;
+    solo con mayúscula inicial ("an apple a day" no es AAPL)
+Un único regex tokeniza el texto y cada token se resuelve con lookups O(1),
+así que el coste es lineal en el tamaño del texto y no en el del universo.
+"""
+import csv
+import os
+import re
+import threading
+from collections import Counter
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Palabras en mayúsculas habituales que coinciden con tickers reales
+TICKER_STOPWORDS = {
+    'A','I','IT','IS','AT','BE','BY','DO','FOR','GO','HE','IF','IN','ME',
+    'MY','NO','OF','ON','OR','SO','TO','UP','US','WE','AND','ARE','BUT',
+    'CAN','DID','GET','GOT','HAS','HAD','HER','HIM','HIS','HOW','ITS',
+    'LET','MAY','NEW','NOT','NOW','OFF','OUR','OUT','OWN','PUT','RUN',
+    'SAY','SHE','THE','TOO','TWO','USE','WAS','WAY','WHO','WHY','WITH',
+    'YOU','YOLO','LMAO','FOMO','EPS','CEO','CFO','IPO','ETF','GDP','FED','ALL',
+    'GOOD','BEST','NEXT','LAST','HIGH','LOW','MORE','MUCH','JUST','LIKE',
+    'MAKE','MANY','MOST','MOVE','NEED','OVER','SOME','SUCH','THAN','THAT',
+    'THEM','THEN','THEY','THIS','WHAT','WHEN','WILL','YEAR','HOLD','SELL',
+    'BUY','LONG','SHORT','PUMP','DUMP','MOON','BEAR','BULL','CALLS','PUTS',
+    'DD','TA','OTM','ITM','ATM','WSB','RH','TD','WS','AI','ML','API',
+    'LOL','WTF','OMG','GG','PRE','POST','AH','PM','AM','EST','PST','UTC',
+    'USD','EUR','CAD','GBP','JPY','WELL','WORK','TAKE','GIVE','BACK','COME',
+    'WANT','SHOW','ONLY','VERY','SEC','FDA','CPI','PPI','USA','UK','EU','ECB',
+    'FOMC','IMF','OPEC','NYSE','EV','ESG','TV','CEO','COO','CTO','ATH','EOD',
+}
+
+# Tickers del universo que son palabras corrientes (inglés y titulares en
+# español): en mayúsculas sueltas son casi siempre texto, así que solo cuentan
+# como $cashtag. Curada a mano sobre Russell 3000 + S&P 500 (CAT y DE se
+# mantienen fuera: estaban en la antigua lista blanca de noticias).
+WORD_TICKERS = {
+    'ACT','AIR','ALLY','ALT','AN','AS','ASH','BALL','BAND','BEAM','BILL','BIO',
+    'BOOM','BOOT','BOW','BOX','BROS','CAKE','CALM','CAR','CARE','CARS','CART',
+    'CASH','CENT','CHEF','COLD','COMP','CON','COST','CUBE','CURB','DAWN',
+    'DAY','DEC','DOC','DOCS','DORM','DOW','DRUG','EAT','EDIT','EL','ES',
+    'EVER','EXP','EYE','FAST','FATE','FIVE','FIX','FIZZ','FLEX','FLY','FOLD',
+    'FORM','FOUR','FOX','FUN','GAP','GEN','GLUE','GOLD','GOLF','HALO','HOG',
+    'HOPE','HR','HUM','HUT','ICE','IP','IR','IRON','JACK','KEY','KEYS','KIDS',
+    'LAB','LAND','LAW','LEG','LINE','LION','LOVE','MAMA','MAN','MAS','MASS',
+    'MAT','MAX','MAZE','MED','MET','MOD','NET','NEWT','OI','PACK','PAR','PATH',
+    'PAYS','PEAK','PEG','PEN','PLAY','PLOW','PLUG','PLUS','POOL','PR','RAMP',
+    'RARE','RE','REAL','RELY','REV','ROAD','ROCK','ROOT','RUM','SAFE','SAIL',
+    'SEAT','SEE','SITE','SKIN','SKY','SLAB','SON','STEP','TALK','TEAM','TECH',
+    'TILE','TOWN','TREE','TRIP','UI','UNIT','WASH','WEST','WING','WOOF','YUM',
+    'ZIP',
+}
+
+# Fuera del Russell 3000 pero habituales en noticias/redes: ETFs, ADRs, cripto
+EXTRA_SYMBOLS = {
+    "SPY","QQQ","IWM","DIA","TLT","GLD","SLV","HYG","VXX","UVXY","SQQQ","TQQQ",
+    "BTC","ETH","SOL","ASML","BABA","JD","PDD","NIO","TSM","ARM","SHOP","SQ",
+}
+
+# Alias curados de una palabra (los nombres de varias palabras salen de tickers.csv)
+COMPANY_ALIASES = {
+    "APPLE": "AAPL", "NVIDIA": "NVDA", "MICROSOFT": "MSFT", "AMAZON": "AMZN", "ALPHABET": "GOOGL",
+    "GOOGLE": "GOOGL", "TESLA": "TSLA", "NETFLIX": "NFLX", "PALANTIR": "PLTR",
+    "BROADCOM": "AVGO", "JPMORGAN": "JPM", "EXXON": "XOM", "EXXONMOBIL": "XOM",
+    "CHEVRON": "CVX", "PFIZER": "PFE", "MODERNA": "MRNA", "COINBASE": "COIN",
+    "ROBINHOOD": "HOOD", "MICROSTRATEGY": "MSTR", "SALESFORCE": "CRM",
+    "INTEL": "INTC", "QUALCOMM": "QCOM", "SUPERMICRO": "SMCI", "GAMESTOP": "GME",
+    "WALMART": "WMT", "COSTCO": "COST", "DISNEY": "DIS", "BOEING": "BA",
+    "AIRBNB": "ABNB", "SHOPIFY": "SHOP", "SNOWFLAKE": "SNOW", "TSMC": "TSM",
+    "ALIBABA": "BABA", "BERKSHIRE": "BRK-B", "STARBUCKS": "SBUX", "NIKE": "NKE",
+    "MCDONALD'S": "MCD", "MCDONALDS": "MCD", "PAYPAL": "PYPL", "ORACLE": "ORCL",
+    "ADOBE": "ADBE", "LOCKHEED": "LMT", "RIVIAN": "RIVN", "SOFI": "SOFI",
+}
+
+_NAME_SUFFIXES = {
+    "INC", "CORP", "CORPORATION", "CO", "LTD", "PLC", "LLC", "LP", "SA", "NV", "AG",
+    "HOLDINGS", "HOLDING", "GROUP", "CLASS", "CL", "REIT", "TRUST", "THE", "COMPANY",
+    "A", "B", "C", "ORD", "SHS", "ADR", "PRVT", "VESTING",
+}
+
+# Conectores que pueden ir en minúscula dentro de un nombre ("Bank of America")
+_NAME_CONNECTORS = {"OF", "AND", "THE", "DE", "&"}
+
+_TOKEN_RE = re.compile(r"(\$)?([A-Za-z][A-Za-z0-9]*(?:[.\-][A-Za-z]{1,2}\b)?)")
+
+
+def _words(name):
+    return [m.group(2).upper() for m in _TOKEN_RE.finditer(name)]
+
+
+def _load_universe():
+    """Tickers + nombres de empresa desde los ficheros del repo."""
+    tickers, names = set(EXTRA_SYMBOLS), {}
+    for fname in ("Tickers.txt", "tickers.txt"):
+        try:
+            with open(os.path.join(_ROOT, fname), encoding="utf-8") as f:
+                tickers.update(l.strip().upper() for l in f if l.strip())
+        except OSError:
+            pass
+    try:
+        with open(os.path.join(_ROOT, "tickers.csv"), encoding="utf-8-sig") as f:
+            rows = list(csv.reader(f))
+        header = next(i for i, r in enumerate(rows) if r and r[0] == "Ticker")
+        for r in rows[header + 1:]:
+            if len(r) > 3 and r[3] == "Equity" and re.match(r"^[A-Z][A-Z0-9.\-]{0,5}$", r[0]):
+                tickers.add(r[0])
+                names.setdefault(r[0], r[1])
+    except (OSError, StopIteration):
+        pass
+    try:
+        from modules.canslim import SP500_TICKERS
+        tickers.update(SP500_TICKERS)
+    except Exception:
+        pass
+    return tickers, names
+
+
+class TickerExtractor:
+    """Autómata de tokens: tickers del universo, cashtags y alias de empresa."""
+
+    def __init__(self, tickers, company_names=None, aliases=None,
+                 stopwords=TICKER_STOPWORDS | WORD_TICKERS):
+        # Clases de acción normalizadas al formato yfinance (BRK.B → BRK-B)
+        self.tickers   = {t.upper().replace(".", "-") for t in tickers}
+        self.stopwords = set(stopwords)
+        self._trie     = {}
+        for word, ticker in (aliases or {}).items():
+            self._add_alias(_words(word), ticker)
+        for ticker, name in (company_names or {}).items():
+            words = [w for w in _words(name) if w not in _NAME_SUFFIXES]
+            # Solo nombres de 2+ palabras: los de una palabra ("TARGET", "BLOCK")
+            # son demasiado ambiguos y van, si acaso, en COMPANY_ALIASES
+            if len(words) >= 2:
+                self._add_alias(words, ticker)
+
+    def _add_alias(self, words, ticker):
+        if not words:
+            return
+        node = self._trie
+        for w in words:
+            node = node.setdefault(w, {})
+        node.setdefault(None, ticker)
+
+    def _canonical(self, token):
+        t = token.upper().replace(".", "-")
+        return t if t in self.tickers else None
+
+    def extract(self, text):
+        """Counter {ticker: peso} de un texto (cashtag 2, mención o alias 1)."""
+        found = Counter()
+        if not text:
+            return found
+        matches = list(_TOKEN_RE.finditer(text))
+        upper   = [m.group(2).upper() for m in matches]
+        i, n = 0, len(matches)
+        while i < n:
+            cash, tok = matches[i].group(1), matches[i].group(2)
+            if cash:
+                t, canon = tok.upper(), self._canonical(tok)
+                if canon or (t.isalpha() and len(t) <= 5 and t not in self.stopwords):
+                    found[canon or t] += 2
+                i += 1
+                continue
+            # Alias de empresa: coincidencia más larga en el trie de palabras,
+            # con mayúscula inicial en cada palabra salvo conectores
+            node, j, hit = self._trie, i, None
+            while j < n and upper[j] in node and (
+                    matches[j].group(2)[0].isupper() or (j > i and upper[j] in _NAME_CONNECTORS)):
+                node = node[upper[j]]
+                j += 1
+                if None in node:
+                    hit = (node[None], j)
+            if hit:
+                found[hit[0]] += 1
+                i = hit[1]
+                continue
+            if tok.isupper() and 2 <= len(tok) <= 6 and tok not in self.stopwords:
+                t = self._canonical(tok)
+                if t:
+                    found[t] += 1
+            i += 1
+        return found
+
+    def extract_batch(self, texts):
+        """Lista de Counter, uno por texto."""
+        return [self.extract(t) for t in texts]
+
+    def count_batch(self, texts):
+        """Counter agregado sobre todos los textos."""
+        total = Counter()
+        for t in texts:
+            total.update(self.extract(t))
+        return total
+
+    def tickers_in(self, text):
+        """Tickers distintos mencionados, ordenados alfabéticamente."""
+        return sorted(self.extract(text))
+
+
+# Casos de regresión: (texto, tickers esperados). `python -m modules.ticker_extractor`
+REGRESSION_CASES = [
+    ("an apple a day", []),
+    ("amazon rainforest", []),
+    ("the oracle of omaha", []),
+    ("I LOVE THIS STOCK, REAL CASH FLOW", []),
+    ("AS GOLD FUN SAFE TEAM PLAY HOPE KEY NET TECH", []),
+    ("$GOLD and $NET rally", ["GOLD", "NET"]),
+    ("Apple and Bank of America beat; NVDA up", ["AAPL", "BAC", "NVDA"]),
+    ("Oracle guides higher, TSLA slips", ["ORCL", "TSLA"]),
+]
+
+
+def check_regressions(extractor=None):
+    """Lista de (texto, esperado, obtenido) de los casos que fallan."""
+    extractor = extractor or get_ticker_extractor()
+    fails = []
+    for text, expected in REGRESSION_CASES:
+        got = extractor.tickers_in(text)
+        if got != sorted(expected):
+            fails.append((text, sorted(expected), got))
+    return fails
+
+
+_instance = None
+_instance_lock = threading.Lock()
+
+
+def get_ticker_extractor():
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                tickers, names = _load_universe()
+                _instance = TickerExtractor(tickers, names, COMPANY_ALIASES)
+    return _instance
+
+
+if __name__ == "__main__":
+    _fails = check_regressions()
+    for _text, _exp, _got in _fails:
+        print(f"FAIL {_text!r}: esperado {_exp}, obtenido {_got}")
+    print(f"{len(REGRESSION_CASES) - len(_fails)}/{len(REGRESSION_CASES)} casos OK")
+    raise SystemExit(1 if _fails else 0)
@@ -13,6 +13,8 @@ from datetime import datetime
 import numpy as np
 import pandas as pd
 import yfinance as yf
+from modules.sector_benchmarks import BENCHMARKS_PATH, SectorBenchmarks, build_benchmarks, save_benchmarks
+from modules.fundamental_screener import SCREEN_PATH, run_screen, save_screen
 
 os.makedirs("data", exist_ok=True)
 logging.basicConfig(
@@ -360,6 +362,19 @@ def run_scan(min_score=55, min_composite=65, max_results=100):
         log.info(f"  Batch {idx+1} — {len(hist_data)} descargados")
     log.info("PASO 2/4 — Info fundamental...")
     info_data=download_info(sp500); log.info(f"  {len(info_data)} tickers")
+    log.info("PASO 2b — Percentiles fundamentales por sector/industria...")
+    bench=None
+    try:
+        table=build_benchmarks(info_data); save_benchmarks(table); bench=SectorBenchmarks(table)
+        log.info(f"  {len(table['groups'])} grupos -> {BENCHMARKS_PATH}")
+    except Exception as e:
+        log.warning(f"  Benchmarks no actualizados: {e}")
+    log.info("PASO 2c — Screener fundamental RSU Score...")
+    try:
+        screen=run_screen(info_data,bench); save_screen(screen,universe=len(sp500))
+        log.info(f"  {len(screen)} tickers puntuados -> {SCREEN_PATH}")
+    except Exception as e:
+        log.warning(f"  Screener no actualizado: {e}")
     log.info("PASO 3/4 — Pre-filtro...")
     filtered=pre_filter(sp500,hist_data,info_data); log.info(f"  {len(filtered)} tickers")
     log.info("PASO 3b — SPY + RS + Market Score...")
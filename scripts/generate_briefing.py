@@ -18,12 +18,11 @@ if now_cet.weekday() >= 5:
 
 
 def get_market_snapshot():
-    """Precios reales con análisis técnico básico (medias, distancia a niveles)."""
+    """Precios reales con análisis técnico básico (variaciones, rango de 5 sesiones)."""
     try:
-        import yfinance as yf
-        import statistics
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from modules.quotes import get_quote_snapshot
 
-        result = {}
         specs = {
             'ES=F':     'S&P 500 Futuros',
             'NQ=F':     'Nasdaq 100 Futuros',
@@ -35,31 +34,19 @@ def get_market_snapshot():
             'ZN=F':     'Futuros Bono 10Y',
         }
 
+        # Una sola descarga batch para todos los activos
+        quotes = get_quote_snapshot(specs)
         lines = []
         for sym, name in specs.items():
-            try:
-                h = yf.Ticker(sym).history(period='5d', interval='1h')
-                if h.empty or len(h) < 5:
-                    continue
-                closes = list(h['Close'])
-                price  = closes[-1]
-                prev24 = closes[-25] if len(closes) >= 25 else closes[0]
-                prev5d = closes[0]
-                pct24  = (price - prev24) / prev24 * 100 if prev24 else 0
-                pct5d  = (price - prev5d) / prev5d * 100 if prev5d else 0
-
-                # Simple support/resistance: recent high/low
-                highs = list(h['High'][-50:])
-                lows  = list(h['Low'][-50:])
-                res   = max(highs)
-                sup   = min(lows)
-
-                line = f"  {name}: {price:,.2f} | 24h: {pct24:+.2f}% | 5d: {pct5d:+.2f}%"
-                if sym in ('ES=F', '^GSPC'):
-                    line += f" | Rango 50h: {sup:,.0f} - {res:,.0f}"
-                lines.append(line)
-            except Exception:
+            q = quotes.get(sym)
+            if not q:
                 continue
+            pct24 = q['chg_1d'] or 0
+            pct5d = q['chg_1w'] or 0
+            line = f"  {name}: {q['price']:,.2f} | 24h: {pct24:+.2f}% | 5d: {pct5d:+.2f}%"
+            if sym in ('ES=F', '^GSPC'):
+                line += f" | Rango 5d: {q['low_5d']:,.0f} - {q['high_5d']:,.0f}"
+            lines.append(line)
 
         return '\n'.join(lines) if lines else "  Datos no disponibles"
     except Exception as e: